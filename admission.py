@@ -0,0 +1,141 @@
+# admission.py
+"""Tick-budget accounting, admission control and health/readiness endpoint.
+
+`LoadMonitor` keeps an exponentially weighted average of how much of each
+frame budget the game loop spends working (simulation + broadcast). Above
+`degrade_at` the room sheds load: each client link gets at most one state
+out of `send_every()`, same-host observers too, and a room that is only
+moving paddles (waiting for the trajectory) ticks `tick_stride()` times
+slower with a longer step.
+
+A process hosts one match, so the loop's own budget cannot decide whether
+a new match fits: once it plays, it refuses everyone but resuming players
+anyway. New matches are admitted on host load instead (1-minute load
+average per CPU, `host_refuse_at`), which counts every match process on the
+host: a waiting server refuses the first player of a match above it, and
+/ready turns 503. The health server exposes this on a local HTTP port for
+a load balancer:
+
+    GET /health  -> 200 with the current status (liveness)
+    GET /ready   -> 200 when a new match can be admitted, 503 otherwise
+"""
+import json
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+OK = "ok"
+DEGRADED = "degraded"
+OVERLOADED = "overloaded"
+DEFAULT_HOST_LOAD_MAX = 0.9
+
+
+def host_load_max():
+    """PONG_HOST_LOAD_MAX (load average per CPU above which new matches are refused)."""
+    value = os.environ.get('PONG_HOST_LOAD_MAX')
+    if not value:
+        return DEFAULT_HOST_LOAD_MAX
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning("Invalid PONG_HOST_LOAD_MAX=%r; using %s", value, DEFAULT_HOST_LOAD_MAX)
+        return DEFAULT_HOST_LOAD_MAX
+
+
+class LoadMonitor:
+    def __init__(self, frame_dt, alpha=0.1, degrade_at=0.7, refuse_at=0.9, host_refuse_at=None):
+        self.frame_dt = frame_dt
+        self.alpha = alpha
+        self.degrade_at = degrade_at
+        self.refuse_at = refuse_at
+        if host_refuse_at is None:
+            host_refuse_at = host_load_max()
+        self.host_refuse_at = host_refuse_at
+        self.utilization = 0.0
+        self.peak = 0.0
+        self.ticks = 0
+        self.overruns = 0
+
+    def record(self, busy):
+        """Account one tick that kept the loop busy for `busy` seconds."""
+        u = busy / self.frame_dt
+        self.utilization += self.alpha * (u - self.utilization)
+        self.peak = max(self.peak, u)
+        self.ticks += 1
+        if u > 1.0:
+            self.overruns += 1
+
+    @property
+    def level(self):
+        if self.utilization >= self.refuse_at:
+            return OVERLOADED
+        if self.utilization >= self.degrade_at:
+            return DEGRADED
+        return OK
+
+    @staticmethod
+    def host_load():
+        """1-minute load average per CPU, or None where the OS doesn't provide it."""
+        try:
+            return os.getloadavg()[0] / (os.cpu_count() or 1)
+        except (AttributeError, OSError):
+            return None
+
+    def admit(self):
+        """True when a new match may start here (loop budget and host load)."""
+        if self.level == OVERLOADED:
+            return False
+        host = self.host_load()
+        return host is None or host < self.host_refuse_at
+
+    def send_every(self):
+        """Broadcast one frame out of N: 1 normally, fewer under load."""
+        return {OK: 1, DEGRADED: 2, OVERLOADED: 3}[self.level]
+
+    def tick_stride(self, critical=True):
+        """Frames per simulation step: non-critical rooms step less often under load."""
+        return 1 if critical else self.send_every()
+
+    def snapshot(self):
+        return {
+            "utilization": round(self.utilization, 4),
+            "peak": round(self.peak, 4),
+            "level": self.level,
+            "host_load": None if self.host_load() is None else round(self.host_load(), 3),
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+        }
+
+
+class _HealthHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        status = self.server.status_fn()
+        if self.path.startswith('/ready'):
+            code = 200 if status.get('ready') else 503
+        elif self.path.startswith('/health'):
+            code = 200
+        else:
+            code = 404
+        body = json.dumps(status).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_health_server(host, port, status_fn):
+    """Serve /health and /ready in a daemon thread; `status_fn()` returns a dict with 'ready'."""
+    httpd = ThreadingHTTPServer((host, port), _HealthHandler)
+    httpd.daemon_threads = True
+    httpd.status_fn = status_fn
+    # short poll interval: shutdown() is on the room handoff path
+    t = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, name="health", daemon=True)
+    t.start()
+    return httpd
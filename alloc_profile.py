@@ -0,0 +1,218 @@
+# alloc_profile.py
+"""Opt-in allocation profiler for the tick phases (PONG_ALLOC_PROFILE=N).
+
+The game loop marks its phases (`phase("update")`, `phase("state")`,
+...). Each phase starts with `tracemalloc.clear_traces()`, so at its end
+the traced memory is exactly what the phase allocated and still holds:
+
+    live     bytes allocated in the phase and still alive at its end (the
+             state dicts, encoded frames... that outlive it)
+    peak     high-water mark of the phase's own allocations, temporaries
+             included: a copy of the piece list or a generator frame that
+             is freed before the phase ends still shows up here
+    blocks   number of live blocks, and the source lines that allocated
+             them; counted every SAMPLE_EVERY ticks, as it needs a
+             snapshot (cheap here: it only holds the phase's blocks)
+
+`gc.callbacks` time every collection; its pause is charged to the phase
+the loop thread is in, collections run by other threads (receivers,
+senders) go to "other". Every N ticks the per-tick averages are logged
+and kept for /health; a hot path that allocates nothing in steady state
+shows live 0, blocks 0 and no gen-0 collections.
+
+tracemalloc sees every thread, so allocations of the receive and sender
+threads during a phase are counted in it too, and it slows allocation
+down about twofold: this is a measuring mode, not for production rooms.
+"""
+import gc
+import linecache
+import logging
+import os
+import threading
+import time
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+# a block snapshot (counts and source lines) is taken on one tick out of SAMPLE_EVERY
+SAMPLE_EVERY = 10
+TOP_LINES = 5
+# report every N ticks; unset or 0 disables profiling
+PROFILE_EVERY = int(os.environ.get('PONG_ALLOC_PROFILE', '0') or 0)
+
+_IGNORED = (tracemalloc.__file__, __file__, linecache.__file__)
+
+
+class _Phase:
+    __slots__ = ("calls", "seconds", "live", "peak", "max_peak", "sampled", "blocks", "lines",
+                 "gc", "gc_seconds", "gc_gens")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.live = 0
+        self.peak = 0
+        self.max_peak = 0
+        self.sampled = 0
+        self.blocks = 0
+        # "file:line" -> [blocks, bytes] over the sampled calls
+        self.lines = {}
+        self.gc = 0
+        self.gc_seconds = 0.0
+        self.gc_gens = [0, 0, 0]
+
+    def report(self, ticks):
+        per_tick = lambda v: round(v / ticks, 1)
+        top = sorted(self.lines.items(), key=lambda kv: kv[1][1], reverse=True)[:TOP_LINES]
+        return {
+            "calls": self.calls,
+            "ms_per_tick": round(self.seconds * 1000 / ticks, 3),
+            "live_bytes_per_tick": per_tick(self.live),
+            "peak_bytes_per_tick": per_tick(self.peak),
+            "max_peak_bytes": self.max_peak,
+            "blocks_per_call": round(self.blocks / self.sampled, 1) if self.sampled else None,
+            "gc": self.gc,
+            "gc_ms": round(self.gc_seconds * 1000, 3),
+            "gc_generations": list(self.gc_gens),
+            "top": [[where, round(count / self.sampled, 1), round(size / self.sampled, 1)]
+                    for where, (count, size) in top] if self.sampled else [],
+        }
+
+
+class AllocProfiler:
+    """Per-phase allocation and GC accounting; `every` ticks per report."""
+
+    def __init__(self, every, label="server", frames=1):
+        self.every = every
+        self.label = label
+        self.thread = threading.get_ident()
+        self.phases = {}
+        self.other = _Phase()
+        self.current = None
+        self.started = 0.0
+        self.ticks = 0
+        self.total_ticks = 0
+        self.sampling = False
+        self.gc_started = None
+        self.last_report = None
+        self.filters = [tracemalloc.Filter(False, path) for path in _IGNORED]
+        self.owns_tracing = not tracemalloc.is_tracing()
+        if self.owns_tracing:
+            tracemalloc.start(frames)
+        gc.callbacks.append(self._on_gc)
+
+    def phase(self, name):
+        """End the current phase (if any) and start `name` on the loop thread."""
+        self._end_phase()
+        bucket = self.phases.get(name)
+        if bucket is None:
+            bucket = self.phases[name] = _Phase()
+        self.current = bucket
+        tracemalloc.clear_traces()
+        self.started = time.perf_counter()
+
+    def tick_done(self):
+        """Close the tick's last phase; every `every` ticks, log and keep a report."""
+        if self.current is None:
+            return
+        self._end_phase()
+        self.ticks += 1
+        self.total_ticks += 1
+        self.sampling = self.total_ticks % SAMPLE_EVERY == 0
+        if self.ticks >= self.every:
+            self.last_report = self._report()
+            logger.info("%s", self.format(self.last_report))
+            self.phases = {}
+            self.other = _Phase()
+            self.ticks = 0
+
+    def _end_phase(self):
+        bucket = self.current
+        if bucket is None:
+            return
+        elapsed = time.perf_counter() - self.started
+        live, peak = tracemalloc.get_traced_memory()
+        bucket.calls += 1
+        bucket.seconds += elapsed
+        bucket.live += live
+        bucket.peak += peak
+        bucket.max_peak = max(bucket.max_peak, peak)
+        if self.sampling:
+            stats = tracemalloc.take_snapshot().filter_traces(self.filters).statistics('lineno')
+            bucket.sampled += 1
+            for stat in stats:
+                bucket.blocks += stat.count
+                frame = stat.traceback[0]
+                where = f"{os.path.basename(frame.filename)}:{frame.lineno}"
+                entry = bucket.lines.get(where)
+                if entry is None:
+                    bucket.lines[where] = [stat.count, stat.size]
+                else:
+                    entry[0] += stat.count
+                    entry[1] += stat.size
+        self.current = None
+
+    def _on_gc(self, event, info):
+        if event == "start":
+            self.gc_started = time.perf_counter()
+            return
+        if self.gc_started is None:
+            return
+        pause = time.perf_counter() - self.gc_started
+        self.gc_started = None
+        bucket = self.current if threading.get_ident() == self.thread and self.current is not None else self.other
+        bucket.gc += 1
+        bucket.gc_seconds += pause
+        gen = info.get("generation", 0)
+        if 0 <= gen < 3:
+            bucket.gc_gens[gen] += 1
+
+    def _report(self):
+        ticks = max(1, self.ticks)
+        return {
+            "label": self.label,
+            "ticks": self.ticks,
+            "phases": {name: p.report(ticks) for name, p in self.phases.items()},
+            "other_gc": {"gc": self.other.gc, "gc_ms": round(self.other.gc_seconds * 1000, 3),
+                         "gc_generations": list(self.other.gc_gens)},
+        }
+
+    @staticmethod
+    def format(report):
+        lines = [f"[alloc] {report['label']}: {report['ticks']} ticks, per tick:",
+                 f"  {'phase':8} {'ms':>7} {'live B':>9} {'peak B':>9} {'max peak':>9} {'blocks':>7} "
+                 f"{'gc 0/1/2':>10} {'gc ms':>7}"]
+        for name, p in report["phases"].items():
+            gens = "/".join(str(g) for g in p["gc_generations"])
+            blocks = '-' if p["blocks_per_call"] is None else p["blocks_per_call"]
+            lines.append(f"  {name:8} {p['ms_per_tick']:7.3f} {p['live_bytes_per_tick']:9.0f} "
+                         f"{p['peak_bytes_per_tick']:9.0f} {p['max_peak_bytes']:9d} {blocks:>7} "
+                         f"{gens:>10} {p['gc_ms']:7.2f}")
+            for where, blocks, size in p["top"]:
+                lines.append(f"      {where:32} {blocks:8} blocks {size:10} B")
+        other = report["other_gc"]
+        if other["gc"]:
+            gens = "/".join(str(g) for g in other["gc_generations"])
+            lines.append(f"  other threads: gc {gens}, {other['gc_ms']:.2f} ms")
+        return "\n".join(lines)
+
+    def snapshot(self):
+        return self.last_report
+
+    def close(self):
+        try:
+            gc.callbacks.remove(self._on_gc)
+        except ValueError:
+            pass
+        if self.owns_tracing:
+            tracemalloc.stop()
+
+
+def open_profiler(label="server", every=PROFILE_EVERY):
+    """Profiler for PONG_ALLOC_PROFILE, or None when allocation profiling is off.
+
+    Must be called from the thread that runs the phases.
+    """
+    if every <= 0:
+        return None
+    return AllocProfiler(every, label)
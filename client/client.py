@@ -19,24 +19,21 @@ logger = logging.getLogger(__name__)
 API_BASE_URL = os.environ.get('VIE_API_URL', 'http://localhost:8080/vie-webservice/api/vies')
 
 # Ensure project root is on sys.path before importing project modules so
-# running this file from the `client/` directory imports the top-level
-# `entities` package (and `game`) instead of `client/entities`.
+# running this file from the `client/` directory finds `game` and the
+# `entities` package.
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
 from config import SERVER_HOST, SERVER_PORT
-from renderer import GameRenderer
-# from entities.ball import Ball
-# from entities.paddle import Paddle
-
-# Network helper functions
-def send_json(sock, data):
-    try:
-        msg = json.dumps(data) + "\n"
-        sock.sendall(msg.encode())
-    except Exception:
-        pass
+from renderer import RENDERERS, create_renderer
+from render_plan import PlanBuffer, PlanBuilder
+from local_sim import LocalSimulation
+from clock_sync import ClockSync
+from pacing import FramePacer, FrameStats, PerfHud, RateMeter
+from trajectory import occupied_cells, paddle_contact_y, predict
+from protocol import FrameDecoder, send_json
+from udp_channel import UdpSnapshotClient
 
 class VieEditor:
     """Sidebar widget for editing piece HP values via REST API"""
@@ -335,6 +332,8 @@ class PowerConfigPanel:
     """Panneau latéral droit pour la configuration de puissance"""
     def __init__(self, parent, game=None):
         self.game = game
+        # network mode: callable sending the config to the server
+        self.remote = None
         self.frame = tk.Frame(parent, bg="#0d1b2a")
         self.frame.pack(fill=tk.BOTH, expand=True)
         
@@ -432,6 +431,10 @@ class PowerConfigPanel:
     def set_game(self, game):
         """Définir la référence au jeu"""
         self.game = game
+
+    def set_remote(self, send):
+        """Envoyer la configuration au serveur (mode réseau) au lieu du fichier local"""
+        self.remote = send
     
     def load_config(self):
         """Charger la configuration depuis le fichier"""
@@ -473,20 +476,24 @@ class PowerConfigPanel:
                 "special_damage": special_damage
             }
             
-            # Sauvegarder dans le fichier
-            config_path = os.path.join(ROOT, 'power_config.json')
-            with open(config_path, 'w', encoding='utf-8') as f:
-                json.dump(new_config, f, ensure_ascii=False, indent=2)
-            
             # Mettre à jour le jeu en temps réel si disponible
+            # (le jeu sauvegarde le fichier via le cache de configuration)
             if self.game is not None:
                 try:
                     self.game.update_power_config(new_config)
                     self.status_label.config(text=f"✓ Appliqué!\nCharge: {charge_max}\nDégâts: x{special_damage}", fg="#06d6a0")
                 except Exception as e:
-                    self.status_label.config(text=f"⚠ Fichier OK\nJeu non mis à jour", fg="#ffd166")
+                    self.status_label.config(text=f"⚠ Jeu non mis à jour", fg="#ffd166")
                     logger.error(f"Failed to update game: {e}")
+            elif self.remote is not None:
+                # Mode réseau: le serveur valide et pousse la config à la partie en cours
+                self.remote(new_config)
+                self.status_label.config(text=f"✓ Envoyé au serveur\nCharge: {charge_max}\nDégâts: x{special_damage}", fg="#06d6a0")
             else:
+                # Sauvegarder dans le fichier
+                config_path = os.path.join(ROOT, 'power_config.json')
+                with open(config_path, 'w', encoding='utf-8') as f:
+                    json.dump(new_config, f, ensure_ascii=False, indent=2)
                 self.status_label.config(text=f"✓ Sauvegardé\n(Redémarrer le jeu)", fg="#ffd166")
             
             logger.info(f"Power config saved: max={charge_max}, per_hit={charge_per_hit}, damage={special_damage}")
@@ -501,15 +508,51 @@ class PowerConfigPanel:
 class ClientApp:
     FRAME_RATE = 30
     FRAME_DT = 1.0 / FRAME_RATE
+    # launch speed used by Game._apply_trajectory (for the aim preview)
+    TRAJ_SPEED = 350
+    # how often the last rendered state tick is acknowledged to the server
+    ACK_INTERVAL = 0.1
+    # reconnect attempts after a dropped connection (server grace is 30 s by default)
+    RESUME_ATTEMPTS = 30
+    RESUME_INTERVAL = 1.0
+    # clock sync / RTT probe period once the connect burst is done (ping/pong over TCP)
+    PING_INTERVAL = 1.0
 
-    def __init__(self, master, mode="network"):
+    def __init__(self, master, mode="network", udp=False, fps=None, renderer="tk"):
         """
         mode: 'network' or 'local'
         - network: existing behavior (connects to server and sends commands)
         - local: runs `Game()` locally in-process and renders it; uses same renderer
+        udp: in network mode, receive snapshots and send paddle input over the
+        server's UDP channel (controls stay on TCP); falls back to TCP if the
+        handshake fails.
+        fps: render rate target (defaults to FRAME_RATE); frames are only
+        redrawn when a new snapshot arrived. F3 toggles the performance HUD.
+        renderer: drawing backend, 'tk' (canvas) or 'pygame' (SDL surface,
+        for high frame rates on large boards); see renderer.py.
         """
         self.master = master
         self.mode = mode
+        self.use_udp = udp
+        self.udp = None
+        self.pacer = FramePacer(fps or self.FRAME_RATE)
+        self.frame_stats = FrameStats()
+        self.byte_rate = RateMeter()
+        # network figures for the HUD
+        self.state_seq = 0           # bumped for every snapshot received
+        self.state_received_at = None
+        self.drawn_snapshot = None   # last local simulation snapshot drawn
+        # network snapshots are turned into render plans on the reader
+        # threads (render_plan.py); the Tk thread only applies them
+        self.plans = PlanBuffer()
+        self.plan_builder = PlanBuilder()
+        self.plan_lock = threading.Lock()
+        # server clock offset and RTT (clock_sync.py): maps state timestamps
+        # to local time for the render loop and the HUD
+        self.clock = ClockSync(self.PING_INTERVAL)
+        self.state_timestamp = None  # server `timestamp` of the latest snapshot
+        self.decoder = None          # current TCP decoder (byte counter)
+        self.tcp_bytes_prev = 0      # bytes read by decoders of previous connections
         self.master.title("Chess Pong" + (" [Solo]" if mode == "local" else " [Réseau]"))
         self.master.configure(bg="#0d1b2a")
         
@@ -529,7 +572,8 @@ class ClientApp:
         game_area = tk.Frame(main_container, bg="#0d1b2a")
         game_area.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=(0, 8), pady=8)
         
-        self.renderer = GameRenderer(game_area)
+        self.renderer = create_renderer(renderer, game_area)
+        self.hud = PerfHud(self.renderer)
         
         # Control panel at bottom with new style
         self.ctrl_frame = tk.Frame(game_area, bg="#1b263b", pady=8)
@@ -550,7 +594,7 @@ class ClientApp:
         # Extra dimensions input with new style
         self.dims_label = tk.Label(self.ctrl_frame, text="Grille:", bg="#1b263b", fg="#778da9", font=("Helvetica", 9))
         self.dims_label.pack(side=tk.LEFT, padx=(4,4))
-        self.dims_entry = tk.Entry(self.ctrl_frame, width=4, font=("Helvetica", 9), bg="#415a77", fg="#e0e1dd", insertbackground="#e0e1dd", relief=tk.FLAT)
+        self.dims_entry = tk.Entry(self.ctrl_frame, width=6, font=("Helvetica", 9), bg="#415a77", fg="#e0e1dd", insertbackground="#e0e1dd", relief=tk.FLAT)
         self.dims_entry.pack(side=tk.LEFT, padx=(0,4))
         self.dims_apply = tk.Button(self.ctrl_frame, text="OK", command=lambda: self.apply_dimensions(), bg="#06d6a0", fg="#0d1b2a", relief=tk.FLAT, font=("Helvetica", 9, "bold"), cursor="hand2", width=3)
         self.dims_apply.pack(side=tk.LEFT, padx=(0,8))
@@ -563,9 +607,14 @@ class ClientApp:
         # self.traj_center_btn.pack(side=tk.LEFT, padx=2)
         # self.traj_right_btn = tk.Button(self.ctrl_frame, text="Droite", command=lambda: self.choose_trajectory('right'), width=7)
         # self.traj_right_btn.pack(side=tk.LEFT, padx=2)
-        # overlay label for game over messages
-        self.overlay_label = None
         self.sock = None
+        # the Tk thread (controls, acks, probes) and the reader threads
+        # (pongs) write to the same socket: one message at a time
+        self.send_lock = threading.Lock()
+        self.server_host = SERVER_HOST
+        self.server_port = SERVER_PORT
+        # resume token from the server's assign message (reconnect after a drop)
+        self.resume_token = None
         self.player = None  # 1 or 2 as assigned by server (network mode)
         self.connected = False
         # paused state (client-side for UI; server authoritative in network mode)
@@ -582,21 +631,27 @@ class ClientApp:
         # command to send: 'left'/'right'/'stop' (network mode uses single cmd sent to server)
         self.current_cmd = "stop"
         self.key_pressed = set()
+        # last rendered server tick, acknowledged so paddle hits are rewound to what was drawn
+        self.rendered_tick = None
+        self.acked_tick = None
+        self.last_ack_time = 0.0
 
         # Local mode specific
         if self.mode == "local":
             # import Game lazily so network-only clients don't import/run game logic
             from game import Game
             self.game = Game()
+            # the game runs on its own fixed-step thread; Tk only renders snapshots
+            self.simulation = LocalSimulation(self.game, self.FRAME_DT, publisher=self.open_state_publisher())
             # commands per player index used by Game.update: 0 (top), 1 (bottom)
-            self.local_commands = {0: "stop", 1: "stop"}
-            # Create VieEditor with game reference (after game is initialized)
-            self.vie_editor = VieEditor(main_container, game=self.game)
+            # (shared with the simulation thread)
+            self.local_commands = self.simulation.commands
+            # Create VieEditor with the simulation (game updates are queued on its thread)
+            self.vie_editor = VieEditor(main_container, game=self.simulation)
             # Mettre à jour la référence du jeu dans le panneau de config puissance
-            self.power_config_panel.set_game(self.game)
+            self.power_config_panel.set_game(self.simulation)
             # trajectory selection angle in degrees (default = down)
             self.traj_angle = 270.0
-            self.traj_canvas_id = None
             self.waiting_trajectory = False
             # no sector restriction: player 1 may choose any launch angle
             # allow full-angle selection by default
@@ -606,9 +661,9 @@ class ClientApp:
             self.paused = False
         else:
             self.game = None
+            self.simulation = None
             self.local_commands = None
             self.traj_angle = 270.0
-            self.traj_canvas_id = None
             self.waiting_trajectory = False
             # no sector restriction: player 1 may choose any launch angle
             self.traj_min = 0.0
@@ -616,11 +671,16 @@ class ClientApp:
             self.paused = False
             # Create VieEditor without game reference (network mode)
             self.vie_editor = VieEditor(main_container, game=None)
+            # power config changes go to the server as a control message
+            self.power_config_panel.set_remote(self.send_power_config)
 
         # bind keys
         self.master.bind("<KeyPress>", self.on_key_press)
         self.master.bind("<KeyRelease>", self.on_key_release)
 
+        if self.simulation is not None:
+            self.simulation.start()
+
         # network connect if needed (run in background to avoid blocking GUI)
         if self.mode == "network":
             t_conn = threading.Thread(target=self.connect_to_server, daemon=True)
@@ -628,64 +688,188 @@ class ClientApp:
 
         # start update/render loop
         self.last_render = time.time()
-        self.master.after(int(self.FRAME_DT*1000), self.render_loop)
+        self.master.after(self.pacer.next_delay_ms(), self.render_loop)
 
-    def connect_to_server(self):
+    def open_socket(self, host, port):
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # Reduce latency for small packets and increase buffers
         try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            # Reduce latency for small packets and increase buffers
-            try:
-                s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-                s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 65536)
-                s.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 65536)
-            except Exception:
-                pass
-            s.connect((SERVER_HOST, SERVER_PORT))
+            s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 65536)
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 65536)
+        except Exception:
+            pass
+        s.connect((host, port))
+        return s
+
+    def connect_to_server(self, host=SERVER_HOST, port=SERVER_PORT, redirects=1):
+        self.server_host = host
+        self.server_port = port
+        try:
+            s = self.open_socket(host, port)
             self.sock = s
             self.connected = True
-            # wait for assign message (blocking read until newline)
-            buffer = b""
-            while True:
-                data = s.recv(4096)
-                if not data:
+            # wait for assign message; the same decoder is handed to the reader
+            # so frames that arrived together with `assign` are not lost
+            decoder = FrameDecoder()
+            assigned = False
+            while not assigned:
+                messages = decoder.recv_messages(s)
+                if messages is None:
                     break
-                buffer += data
-                if b'\n' in buffer:
-                    line, buffer = buffer.split(b'\n', 1)
-                    try:
-                        msg = json.loads(line.decode())
-                        if msg.get("type") == "assign":
-                            self.player = msg.get("player")
-                            print("Assigned player:", self.player)
-                            # start the background reader to receive state updates
-                            t = threading.Thread(target=self.network_reader, daemon=True)
-                            t.start()
-                            break
-                    except Exception:
-                        continue
+                for i, msg in enumerate(messages):
+                    if isinstance(msg, dict) and msg.get("type") == "refused":
+                        # server is busy or overloaded; follow its redirect once
+                        print("Server refused the connection:", msg.get("reason"))
+                        s.close()
+                        self.sock = None
+                        self.connected = False
+                        redirect = msg.get("redirect")
+                        if redirect and redirects > 0:
+                            r_host, _, r_port = str(redirect).rpartition(":")
+                            print("Redirected to", redirect)
+                            self.connect_to_server(r_host or host, int(r_port), redirects - 1)
+                        return
+                    if isinstance(msg, dict) and msg.get("type") == "assign":
+                        self.player = msg.get("player")
+                        self.resume_token = msg.get("token")
+                        print("Assigned player:", self.player)
+                        if self.use_udp:
+                            self.start_udp(msg)
+                        # start the background reader to receive state updates
+                        t = threading.Thread(target=self.network_reader, args=(decoder, messages[i + 1:]), daemon=True)
+                        t.start()
+                        assigned = True
+                        break
         except Exception as e:
             print("Failed to connect to server:", e)
             self.connected = False
             self.sock = None
 
-    def network_reader(self):
-        buffer = b""
+    def resume_session(self):
+        """Reconnect after a dropped connection and resume the same seat.
+
+        Returns (decoder, messages) with the keyframe and missed events, or
+        None if the server refused or could not be reached.
+        """
+        if not self.running or not self.resume_token:
+            return None
+        self.connected = False
+        try:
+            self.sock.close()
+        except Exception:
+            pass
+        for attempt in range(self.RESUME_ATTEMPTS):
+            time.sleep(self.RESUME_INTERVAL)
+            if not self.running:
+                return None
+            try:
+                s = self.open_socket(self.server_host, self.server_port)
+                s.settimeout(5.0)
+                send_json(s, {"type": "resume", "token": self.resume_token, "ack": self.rendered_tick})
+                decoder = FrameDecoder()
+                while True:
+                    messages = decoder.recv_messages(s)
+                    if messages is None:
+                        raise ConnectionError("closed during resume")
+                    for i, msg in enumerate(messages):
+                        if not isinstance(msg, dict):
+                            continue
+                        if msg.get("type") == "refused":
+                            print("Session could not be resumed:", msg.get("reason"))
+                            s.close()
+                            return None
+                        if msg.get("type") == "resumed":
+                            print("Session resumed as player", msg.get("player"))
+                            s.settimeout(None)
+                            self.sock = s
+                            self.connected = True
+                            if self.use_udp:
+                                if self.udp is not None:
+                                    self.udp.close()
+                                    self.udp = None
+                                self.start_udp(msg)
+                            return decoder, messages[i + 1:]
+            except Exception as e:
+                print(f"Resume attempt {attempt + 1} failed: {e}")
+        return None
+
+    def start_udp(self, assign_msg):
+        """Open the UDP snapshot channel advertised in the server's assign message."""
+        port = assign_msg.get("udp_port")
+        session = assign_msg.get("session")
+        if port is None or session is None:
+            print("Server does not offer a UDP channel, using TCP")
+            return
+        try:
+            udp = UdpSnapshotClient(self.server_host, int(port), int(session))
+            if udp.handshake():
+                self.udp = udp
+                udp.start(self.on_udp_state)
+                print("UDP snapshot channel active on port", port)
+            else:
+                print("UDP handshake failed, using TCP")
+                udp.close()
+        except Exception as e:
+            print("Failed to open UDP channel:", e)
+
+    def keep_pieces(self, st):
+        """States sent at reduced detail leave out unchanged pieces: reuse the last ones."""
+        if 'pieces' not in st and self.state is not None:
+            st['pieces'] = self.state.get('pieces', [])
+        return st
+
+    def publish_state(self, st):
+        """Reader threads: keep a snapshot and build its render plan for the Tk thread."""
+        with self.plan_lock:
+            with self.state_lock:
+                st = self.state = self.keep_pieces(st)
+                self.state_seq += 1
+                self.state_received_at = time.perf_counter()
+                self.state_timestamp = st.get('timestamp')
+            self.plans.publish(self.plan_builder.build(st))
+
+    def on_udp_state(self, st):
+        self.publish_state(st)
+
+    def network_reader(self, decoder=None, backlog=None):
+        decoder = decoder or FrameDecoder()
+        self.decoder = decoder
+        messages = backlog or []
         try:
             while self.running and self.sock:
-                data = self.sock.recv(4096)
-                if not data:
-                    break
-                buffer += data
-                while b'\n' in buffer:
-                    line, buffer = buffer.split(b'\n', 1)
-                    try:
-                        msg = json.loads(line.decode())
+                try:
+                    # only the newest snapshot of a batch matters
+                    latest = None
+                    for msg in messages:
+                        if not isinstance(msg, dict):
+                            continue
                         if msg.get("type") == "state":
-                            st = msg.get("state")
-                            with self.state_lock:
-                                self.state = st
-                    except Exception:
-                        continue
+                            latest = msg.get("state")
+                        elif msg.get("type") == "pong":
+                            self.clock.on_pong(msg)
+                        elif msg.get("type") == "ping":
+                            # server RTT probe: echo it with our clock estimate, and say
+                            # this client can take states without pieces
+                            self.send_message({"type": "pong", "t": msg.get("t"), "caps": ["keep_pieces"],
+                                               "clock": self.clock.report()})
+                        elif msg.get("type") == "event":
+                            print("Server event:", msg.get("event"), "player", msg.get("player"), "at tick", msg.get("tick"))
+                    if latest is not None:
+                        self.publish_state(latest)
+                    messages = decoder.recv_messages(self.sock)
+                except Exception:
+                    messages = None
+                if messages is None:
+                    # connection lost: try to resume the session before giving up
+                    resumed = self.resume_session()
+                    if resumed is None:
+                        break
+                    self.tcp_bytes_prev += decoder.bytes_in
+                    # new path, maybe a new server process: sync again
+                    self.clock.reset()
+                    decoder, messages = resumed
+                    self.decoder = decoder
         except Exception:
             pass
         finally:
@@ -704,6 +888,9 @@ class ClientApp:
         if key == 'p':
             self.toggle_pause()
             return
+        if key == 'f3':
+            self.hud.toggle()
+            return
         # If waiting for trajectory selection and this client is allowed to choose
         allowed = (self.mode == 'local') or (self.mode == 'network' and self.player == 1)
         # For local mode use the server-side game flag; for network use the client flag
@@ -725,12 +912,7 @@ class ClientApp:
                     angle = float(self.traj_angle)
                     self.choose_trajectory(angle)
                     # hide arrow
-                    try:
-                        if self.traj_canvas_id is not None:
-                            self.renderer.canvas.delete(self.traj_canvas_id)
-                            self.traj_canvas_id = None
-                    except Exception:
-                        pass
+                    self.renderer.set_arrow(None)
                 except Exception:
                     pass
                 return
@@ -808,14 +990,24 @@ class ClientApp:
             self.local_commands[0] = cmd0
             self.local_commands[1] = cmd1
 
+    def send_message(self, msg):
+        """Write one message to the server, never interleaved with another thread's."""
+        with self.send_lock:
+            send_json(self.sock, msg)
+
     def send_command(self, cmd):
         # In network mode send to server, in local mode update local commands
         if self.mode == "network":
             if not self.connected or not self.sock:
                 return
             try:
+                if self.udp is not None and self.udp.active:
+                    self.udp.send_cmd(cmd)
+                    return
                 data = {"type": "cmd", "cmd": cmd}
-                send_json(self.sock, data)
+                if self.rendered_tick is not None:
+                    data["ack"] = self.rendered_tick
+                self.send_message(data)
             except Exception:
                 pass
         else:
@@ -828,22 +1020,21 @@ class ClientApp:
         if self.mode == 'local':
             try:
                 if cmd == 'new_game' and self.game:
-                    self.game.reset_game()
-                    # clear any previous local trajectory command so a new selection is required
+                    self.simulation.submit(self.reset_local_game)
+                    # reflect waiting state immediately on client side
+                    self.waiting_trajectory = True
+                    # a fresh game starts unpaused (game over pauses the UI)
+                    self.paused = False
+                    self.simulation.paused = False
                     try:
-                        if isinstance(self.local_commands, dict) and 'trajectory' in self.local_commands:
-                            del self.local_commands['trajectory']
+                        self.pause_btn.config(text="⏸ Pause")
                     except Exception:
                         pass
-                    # reflect waiting state immediately on client side
-                    self.waiting_trajectory = True
-                    st = self.game.get_state()
-                    with self.state_lock:
-                        self.state = st
                     return
                 if cmd == 'pause':
                     # toggle local pause
                     self.paused = not self.paused
+                    self.simulation.paused = self.paused
                     # update button label
                     try:
                         self.pause_btn.config(text=("▶ Reprendre" if self.paused else "⏸ Pause"))
@@ -857,38 +1048,55 @@ class ClientApp:
             return
         try:
             data = {"type": "control", "cmd": cmd}
-            send_json(self.sock, data)
+            self.send_message(data)
         except Exception:
             pass
 
+    def reset_local_game(self):
+        """Reset the local game (runs on the simulation thread)."""
+        self.game.reset_game()
+        # clear any previous local trajectory command so a new selection is required
+        self.local_commands.pop('trajectory', None)
+
+    def send_power_config(self, config):
+        """Network mode: ask the server to apply a new power configuration."""
+        if not self.connected or not self.sock:
+            return
+        self.send_message({"type": "control", "cmd": "power_config", "value": config})
+
+    def open_state_publisher(self):
+        """Shared memory publisher for local observers when PONG_SHM names a segment."""
+        name = os.environ.get('PONG_SHM')
+        if not name:
+            return None
+        from shm_state import ShmError, StatePublisher
+        try:
+            return StatePublisher(name)
+        except (OSError, ShmError) as e:
+            logger.error("Shared memory state disabled: %s", e)
+            return None
+
     def send_set_dimensions(self, value):
         """Send a control to set extra dimensions. In local mode this sets the env var
         and resets the game; in network mode it sends a control message to server.
         """
-        # validate
-        try:
-            v = int(value)
-        except Exception:
-            return
-        if v <= 0 or v % 2 != 0 or v not in (2,4,6,8):
+        # validate: "N" or "NxM", same rules as the server
+        from game import parse_dimensions
+        dims = parse_dimensions(value)
+        if dims is None:
             return
+        v = f"{dims[0]}x{dims[1]}"
         if self.mode == 'local':
             # set env and reset local game
             os.environ['EXTRA_DIMENSIONS'] = str(v)
-            try:
-                if self.game:
-                    self.game.reset_game()
-                    st = self.game.get_state()
-                    with self.state_lock:
-                        self.state = st
-            except Exception:
-                return
+            if self.game:
+                self.simulation.submit(self.reset_local_game)
         else:
             if not self.connected or not self.sock:
                 return
             try:
                 data = {"type": "control", "cmd": "set_dims", "value": v}
-                send_json(self.sock, data)
+                self.send_message(data)
             except Exception:
                 pass
 
@@ -958,7 +1166,7 @@ class ClientApp:
                     if val > self.traj_max:
                         val = self.traj_max
                 data = {"type": "control", "cmd": "trajectory", "value": val}
-                send_json(self.sock, data)
+                self.send_message(data)
                 # avoid duplicate sends locally until server state arrives
                 try:
                     self.waiting_trajectory = False
@@ -971,6 +1179,7 @@ class ClientApp:
         """Toggle pause: in local mode pause the local game loop; in network mode send pause control to server."""
         if self.mode == 'local':
             self.paused = not self.paused
+            self.simulation.paused = self.paused
             try:
                 self.pause_btn.config(text=("▶ Reprendre" if self.paused else "⏸ Pause"))
             except Exception:
@@ -986,18 +1195,37 @@ class ClientApp:
             # send pause toggle to server
             try:
                 data = {"type": "control", "cmd": "pause"}
-                send_json(self.sock, data)
+                self.send_message(data)
             except Exception:
                 pass
 
+    def send_ack(self, tick):
+        """Tell the server which state tick is on screen (rate-limited)."""
+        if tick is None:
+            return
+        self.rendered_tick = tick
+        now = time.time()
+        if tick == self.acked_tick or now - self.last_ack_time < self.ACK_INTERVAL:
+            return
+        if not self.connected or not self.sock:
+            return
+        self.acked_tick = tick
+        self.last_ack_time = now
+        self.send_message({"type": "ack", "tick": tick})
+
     def render_loop(self):
         if not self.running:
             return
-        # render at ~60 fps using Tkinter after
+        frame_start = time.perf_counter()
+        # paced by self.pacer; the board is only redrawn when a new snapshot arrived
         if self.mode == "network":
             with self.state_lock:
                 st = dict(self.state)  # shallow copy
-            self.renderer.draw_state(st)
+            plan = self.plans.take()
+            fresh = plan is not None
+            if fresh:
+                self.renderer.apply_plan(plan)
+                self.send_ack(plan.tick)
             # update waiting flag from server state
             self.waiting_trajectory = bool(st.get('waiting_trajectory', False))
             # update paused state from server
@@ -1011,20 +1239,15 @@ class ClientApp:
                         pass
             except Exception:
                 pass
+            self.maybe_ping()
         else:
-            # local: step the game and draw
-            # step the game and draw; game.update will handle waiting_trajectory
-            try:
-                if not getattr(self, 'paused', False):
-                    self.game.update(self.FRAME_DT, self.local_commands)
-            except Exception:
-                pass
-            try:
-                st = self.game.get_state()
-                self.waiting_trajectory = getattr(self.game, 'waiting_trajectory', False)
-            except Exception:
-                st = self.game.get_state()
-            self.renderer.draw_state(st)
+            # local: the simulation thread steps the game; just draw its latest snapshot
+            st = self.simulation.snapshot()
+            self.waiting_trajectory = bool(st.get('waiting_trajectory', False))
+            fresh = st is not self.drawn_snapshot
+            if fresh:
+                self.drawn_snapshot = st
+                self.renderer.draw_state(st)
         # Draw/update trajectory arrow overlay if waiting and player 1
         allowed = (self.mode == 'local') or (self.mode == 'network' and self.player == 1)
         if getattr(self, 'waiting_trajectory', False) and allowed:
@@ -1033,25 +1256,28 @@ class ClientApp:
                 bx = ball.get('x', self.renderer.width/2)
                 by = ball.get('y', self.renderer.height/2)
                 r = ball.get('radius', 8)
-                length = max(30, r * 6)
                 ang = math.radians(self.traj_angle)
-                ex = bx + math.cos(ang) * length
-                ey = by + math.sin(ang) * length
+                board = st.get('board')
+                coords = None
+                if board:
+                    # multi-bounce preview: walls and pieces, up to the opponent's paddle line
+                    paddles = st.get('paddles') or []
+                    target_y = paddle_contact_y(paddles[1], r, 1) if len(paddles) > 1 else None
+                    path = predict(bx, by, math.cos(ang) * self.TRAJ_SPEED, math.sin(ang) * self.TRAJ_SPEED, r, board,
+                                   occupied_cells(st.get('pieces', [])), target_y=target_y,
+                                   max_bounces=4, max_time=1.5)
+                    if len(path['points']) > 1:
+                        coords = [c for pt in path['points'] for c in pt]
+                if coords is None:
+                    length = max(30, r * 6)
+                    coords = [bx, by, bx + math.cos(ang) * length, by + math.sin(ang) * length]
                 # draw or update arrow
-                if self.traj_canvas_id is None:
-                    self.traj_canvas_id = self.renderer.canvas.create_line(bx, by, ex, ey, arrow=tk.LAST, fill="#FFFF66", width=3)
-                else:
-                    self.renderer.canvas.coords(self.traj_canvas_id, bx, by, ex, ey)
+                self.renderer.set_arrow(coords)
             except Exception:
                 pass
         else:
             # remove arrow if present
-            if self.traj_canvas_id is not None:
-                try:
-                    self.renderer.canvas.delete(self.traj_canvas_id)
-                except Exception:
-                    pass
-                self.traj_canvas_id = None
+            self.renderer.set_arrow(None)
 
         # overlay: show game over message for both local and network modes
         go = st.get('game_over') if st else None
@@ -1068,22 +1294,61 @@ class ClientApp:
                     pass
             except Exception:
                 pass
-            if self.overlay_label is None:
-                self.overlay_label = tk.Label(self.renderer.canvas, text=text, bg="#000000", fg="#FFFFFF", font=("Arial", 18))
-                self.overlay_label.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
-            else:
-                self.overlay_label.config(text=text)
+            self.renderer.set_banner(text)
         else:
-            if self.overlay_label is not None:
-                try:
-                    self.overlay_label.destroy()
-                except Exception:
-                    pass
-                self.overlay_label = None
-        self.master.after(int(self.FRAME_DT*1000), self.render_loop)
+            self.renderer.set_banner(None)
+        self.hud.update(frame_start, lambda: self.hud_lines(frame_start))
+        self.renderer.present()
+        now = time.perf_counter()
+        if fresh:
+            self.frame_stats.record_draw(now, now - frame_start)
+        else:
+            self.frame_stats.record_skip()
+        self.master.after(self.pacer.next_delay_ms(), self.render_loop)
+
+    def maybe_ping(self):
+        """Send a clock sync probe when due: a burst after connecting, then every PING_INTERVAL seconds."""
+        if not self.connected or not self.sock:
+            return
+        probe = self.clock.probe_due()
+        if probe is not None:
+            self.send_message(probe)
+
+    def bytes_received(self):
+        total = self.tcp_bytes_prev
+        if self.decoder is not None:
+            total += self.decoder.bytes_in
+        if self.udp is not None:
+            total += self.udp.bytes_in
+        return total
+
+    def hud_lines(self, now):
+        p50, p95, p99 = self.frame_stats.draw_percentiles()
+        lines = [
+            f"FPS {self.frame_stats.fps(now):5.1f} / {self.pacer.fps}  skipped {self.frame_stats.skipped}",
+            f"draw ms p50 {p50:5.2f}  p95 {p95:5.2f}  p99 {p99:5.2f}",
+        ]
+        if self.mode == "network":
+            age = (now - self.state_received_at) * 1000 if self.state_received_at is not None else None
+            rtt = self.clock.rtt * 1000 if self.clock.rtt is not None else None
+            offset = self.clock.offset * 1000 if self.clock.offset is not None else None
+            # server time elapsed since the snapshot was produced (one-way latency + age)
+            latency = None
+            if self.clock.synced and isinstance(self.state_timestamp, (int, float)):
+                latency = self.clock.latency(self.state_timestamp) * 1000
+            rate = self.byte_rate.sample(self.bytes_received(), now)
+            lines.append("snapshot age " + (f"{age:6.1f} ms" if age is not None else "   -")
+                         + ("  since server " + (f"{latency:6.1f} ms" if latency is not None else "   -")))
+            lines.append("RTT " + (f"{rtt:6.1f} ms" if rtt is not None else "   -") + ("  (UDP)" if self.udp is not None else ""))
+            lines.append("clock offset " + (f"{offset:+8.1f} ms" if offset is not None else "   -")
+                         + f"  outliers {self.clock.outliers}")
+            lines.append(f"in {rate / 1024:7.1f} KiB/s")
+        return lines
 
     def stop(self):
         self.running = False
+        if self.simulation is not None:
+            self.simulation.stop()
         # when quitting, request a new game on the server (if connected)
         try:
             if self.mode == 'network' and self.connected and self.sock:
@@ -1093,6 +1358,8 @@ class ClientApp:
                     pass
         except Exception:
             pass
+        if self.udp is not None:
+            self.udp.close()
         try:
             if self.sock:
                 self.sock.close()
@@ -1102,9 +1369,13 @@ class ClientApp:
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Pong client: choose local or network mode")
     parser.add_argument("--mode", choices=("local", "network"), default="network", help="Choose play mode")
+    parser.add_argument("--udp", action="store_true", help="Network mode: receive state snapshots over UDP")
+    parser.add_argument("--fps", type=int, default=None, help="Render rate target, e.g. 60 or 120 (default: 30)")
+    parser.add_argument("--renderer", choices=RENDERERS, default="tk",
+                        help="Drawing backend: Tk canvas, or pygame/SDL for high frame rates (needs pygame)")
     args = parser.parse_args()
     root = tk.Tk()
-    app = ClientApp(root, mode=args.mode)
+    app = ClientApp(root, mode=args.mode, udp=args.udp, fps=args.fps, renderer=args.renderer)
     try:
         root.protocol("WM_DELETE_WINDOW", lambda: (app.stop(), root.destroy()))
         root.mainloop()
@@ -1,6 +0,0 @@
-# client/entities package
-from .ball import Ball
-from .paddle import Paddle
-
-__all__ = ["Ball", "Paddle"]
-
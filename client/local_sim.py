@@ -0,0 +1,129 @@
+# client/local_sim.py
+import logging
+import queue
+import threading
+import time
+
+from alloc_profile import open_profiler
+
+logger = logging.getLogger(__name__)
+
+
+class LocalSimulation:
+    """Runs a local `Game` on its own fixed-step thread.
+
+    The Tk thread never calls `Game.update`: it writes paddle commands into
+    `commands`, queues game mutations with `submit()` and renders whatever
+    `snapshot()` returns. A slow draw, a REST call in the sidebar or a GC
+    pause therefore no longer slows the game down.
+
+    Snapshots are fresh dicts built by `Game.get_state()` after each step and
+    are never mutated afterwards; publishing one is a single attribute store.
+    With a `publisher` (shm_state.StatePublisher) each snapshot is also
+    written to shared memory for other local processes. PONG_ALLOC_PROFILE
+    profiles the allocations of the steps and snapshots (alloc_profile.py).
+    """
+
+    # cap on simulated time per wake-up so a long stall doesn't fast-forward the game
+    MAX_CATCH_UP = 0.25
+
+    def __init__(self, game, frame_dt, publisher=None):
+        self.game = game
+        self.frame_dt = frame_dt
+        self.publisher = publisher
+        # commands per player index used by Game.update: 0 (top), 1 (bottom),
+        # plus an optional 'trajectory' entry set by player 1
+        self.commands = {0: "stop", 1: "stop"}
+        self.paused = False
+        self._tasks = queue.SimpleQueue()
+        self._stop = threading.Event()
+        self._thread = None
+        self._snapshot = self._make_snapshot()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="local-sim", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+        if self.publisher is not None:
+            self.publisher.close()
+            self.publisher = None
+        self.game.close_events()
+
+    def snapshot(self):
+        return self._snapshot
+
+    def submit(self, fn, *args):
+        """Run `fn(*args)` on the simulation thread before the next step."""
+        self._tasks.put((fn, args))
+
+    # Game-like helpers so the sidebars can be handed the simulation instead of the Game
+    def refresh_hp_from_api(self):
+        # the REST call stays on the caller's thread, only the update is queued
+        try:
+            hp_map = self.game.fetch_hp_map()
+        except Exception as e:
+            logger.error("Failed to refresh HP from API: %s", e)
+            return False
+        self.submit(self.game.apply_hp_map, hp_map)
+        return True
+
+    def update_power_config(self, new_config):
+        self.submit(self.game.update_power_config, new_config)
+        return True
+
+    def _make_snapshot(self):
+        st = self.game.get_state()
+        st['paused'] = self.paused
+        if self.publisher is not None:
+            self.publisher.publish(st)
+        return st
+
+    def _drain_tasks(self):
+        ran = False
+        while True:
+            try:
+                fn, args = self._tasks.get_nowait()
+            except queue.Empty:
+                return ran
+            try:
+                fn(*args)
+            except Exception:
+                logger.exception("Local simulation task failed")
+            ran = True
+
+    def _run(self):
+        dt = self.frame_dt
+        prev = time.perf_counter()
+        acc = 0.0
+        # opened here: phases are attributed to the thread that runs them
+        alloc = open_profiler("local")
+        while not self._stop.is_set():
+            now = time.perf_counter()
+            acc += min(now - prev, self.MAX_CATCH_UP)
+            prev = now
+            changed = self._drain_tasks()
+            if alloc is not None:
+                alloc.phase("update")
+            while acc >= dt:
+                acc -= dt
+                if self.paused or self.game.game_over is not None:
+                    continue
+                try:
+                    self.game.update(dt, dict(self.commands))
+                except Exception:
+                    logger.exception("Local game update failed")
+                changed = True
+            if changed or self._snapshot.get('paused') != self.paused:
+                if alloc is not None:
+                    alloc.phase("state")
+                self._snapshot = self._make_snapshot()
+            if alloc is not None:
+                alloc.tick_done()
+            # sleep until the next step is due
+            self._stop.wait(max(0.0, dt - acc))
+        if alloc is not None:
+            alloc.close()
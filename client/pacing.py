@@ -0,0 +1,100 @@
+# client/pacing.py
+"""Frame pacing and the on-screen performance HUD for the Tk client.
+
+`FramePacer` schedules each frame on an absolute deadline, so the time spent
+drawing is subtracted from the wait instead of being added to it (a plain
+`after(FRAME_DT)` runs at FRAME_DT + draw time and drifts). `FrameStats`
+keeps the recent draw times and frame timestamps; `PerfHud` shows them
+together with the network figures measured by the client.
+"""
+import math
+import time
+from collections import deque
+
+
+class FramePacer:
+    def __init__(self, fps):
+        self.set_fps(fps)
+        self.deadline = time.perf_counter()
+
+    def set_fps(self, fps):
+        self.fps = max(1, int(fps))
+        self.dt = 1.0 / self.fps
+
+    def next_delay_ms(self):
+        """Call at the end of a frame: milliseconds to wait for the next deadline."""
+        now = time.perf_counter()
+        self.deadline += self.dt
+        # more than a frame behind (stall, window drag): resync instead of bursting
+        if now - self.deadline > self.dt:
+            self.deadline = now
+        return max(0, int(round((self.deadline - now) * 1000)))
+
+
+class FrameStats:
+    def __init__(self, window=240):
+        self.draw_times = deque(maxlen=window)
+        self.frame_times = deque(maxlen=window)
+        self.drawn = 0
+        self.skipped = 0
+
+    def record_draw(self, now, draw_time):
+        self.frame_times.append(now)
+        self.draw_times.append(draw_time)
+        self.drawn += 1
+
+    def record_skip(self):
+        self.skipped += 1
+
+    def fps(self, now, span=1.0):
+        """Frames actually drawn during the last `span` seconds."""
+        return sum(1 for t in self.frame_times if now - t <= span) / span
+
+    def draw_percentiles(self, qs=(0.5, 0.95, 0.99)):
+        """Draw-time percentiles in milliseconds (nearest rank)."""
+        if not self.draw_times:
+            return [0.0 for _ in qs]
+        data = sorted(self.draw_times)
+        n = len(data)
+        # rank ceil(q * n), 1-based (rounded first: 0.07 * 100 is 7.000000000000001)
+        return [data[min(n, max(1, math.ceil(round(q * n, 9)))) - 1] * 1000 for q in qs]
+
+
+class RateMeter:
+    """Per-second rate of a monotonically increasing counter, sampled periodically."""
+
+    def __init__(self):
+        self.last_value = None
+        self.last_time = None
+        self.rate = 0.0
+
+    def sample(self, value, now):
+        if self.last_value is not None and now > self.last_time:
+            self.rate = (value - self.last_value) / (now - self.last_time)
+        self.last_value = value
+        self.last_time = now
+        return self.rate
+
+
+class PerfHud:
+    """Toggleable text overlay in the top-left corner of the game view (drawn by the renderer)."""
+
+    REFRESH = 0.25  # seconds between text updates
+
+    def __init__(self, renderer, visible=False):
+        self.renderer = renderer
+        self.visible = visible
+        self.last_refresh = 0.0
+
+    def toggle(self):
+        self.visible = not self.visible
+        if not self.visible:
+            self.renderer.set_hud_text(None)
+        self.last_refresh = 0.0
+
+    def update(self, now, lines_fn):
+        """Refresh the overlay (at most every REFRESH s); `lines_fn()` returns the text lines."""
+        if not self.visible or now - self.last_refresh < self.REFRESH:
+            return
+        self.last_refresh = now
+        self.renderer.set_hud_text("\n".join(lines_fn()))
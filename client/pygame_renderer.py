@@ -0,0 +1,325 @@
+# client/pygame_renderer.py
+"""Software-blitting renderer backend (pygame / SDL).
+
+The board, grid, piece cells, glyphs and HP bars live in one off-screen
+surface, rebuilt when the layout changes or pieces appear and patched in
+place when a piece is hit or destroyed. A frame is one blit of that
+surface plus the few moving things (power bar, paddles, balls) and the
+overlays, then a flip: no per-item round trip as on the Tk canvas, so
+the cost barely depends on the number of pieces.
+
+The SDL window is embedded in the Tk window (SDL_WINDOWID, X11 and
+Windows); elsewhere it opens next to it. With `SDL_VIDEODRIVER=dummy` it
+renders headless, e.g. for the benchmark:
+
+    python3 client/pygame_renderer.py --dims 32x32 --frames 1200
+"""
+import argparse
+import os
+import sys
+import time
+from functools import lru_cache
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+import pygame
+
+from render_plan import ERASE, REBUILD
+from renderer import BOARD_BG, GRID_COLOR, GameRenderer
+
+# font families tried in order (pygame.font.SysFont), the bundled font otherwise
+GLYPH_FONTS = "dejavusans,segoeuisymbol,applesymbols,freeserif,arialunicodems"
+TEXT_FONTS = "helvetica,arial,dejavusans,freesans"
+MONO_FONTS = "couriernew,courier,dejavusansmono,liberationmono,monospace"
+
+
+@lru_cache(maxsize=64)
+def _font(families, size, bold=False):
+    return pygame.font.SysFont(families, max(6, int(size)), bold=bold)
+
+
+@lru_cache(maxsize=512)
+def _text(families, size, bold, text, color):
+    """Rendered text surface; labels repeat from frame to frame, so they are cached."""
+    return _font(families, size, bold).render(text, True, color)
+
+
+@lru_cache(maxsize=16)
+def _has_chess_glyphs(families, size):
+    """False when the font draws the chess symbols as its missing-glyph box."""
+    font = _font(families, size, True)
+    # U+E000 is a private-use code point: no font has a real glyph for it
+    missing = pygame.image.tobytes(font.render("\ue000", False, "#ffffff"), "RGB")
+    return pygame.image.tobytes(font.render("\u2654", False, "#ffffff"), "RGB") != missing
+
+
+def _rect(x0, y0, x1, y1):
+    x0 = int(round(x0)); y0 = int(round(y0))
+    return pygame.Rect(x0, y0, max(0, int(round(x1)) - x0), max(0, int(round(y1)) - y0))
+
+
+def _frame(surface, color, x0, y0, x1, y1, width):
+    pygame.draw.rect(surface, color, _rect(x0, y0, x1, y1), width)
+
+
+def _dashed_rect(surface, color, x0, y0, x1, y1, width, dash=(4, 2)):
+    on, off = dash
+    step = on + off
+    x0, y0, x1, y1 = (int(round(v)) for v in (x0, y0, x1, y1))
+    for x in range(x0, x1, step):
+        surface.fill(color, (x, y0, min(on, x1 - x), width))
+        surface.fill(color, (x, y1 - width, min(on, x1 - x), width))
+    for y in range(y0, y1, step):
+        surface.fill(color, (x0, y, width, min(on, y1 - y)))
+        surface.fill(color, (x1 - width, y, width, min(on, y1 - y)))
+
+
+def _blit_center(surface, text_surface, cx, cy):
+    surface.blit(text_surface, text_surface.get_rect(center=(int(cx), int(cy))))
+
+
+class PygameRenderer(GameRenderer):
+    """Draws into an SDL surface; `present()` flips it to the screen."""
+
+    def __init__(self, root=None, width=800, height=600, bg="#1a1a2e"):
+        super().__init__(width, height)
+        self.root = root
+        self.bg = pygame.Color(bg)
+        self.frame = None
+        if root is not None:
+            import tkinter as tk
+            self.frame = tk.Frame(root, width=width, height=height, bg=bg,
+                                  highlightthickness=2, highlightbackground="#e94560")
+            self.frame.pack()
+            if os.environ.get('SDL_VIDEODRIVER') != 'dummy' and sys.platform in ('linux', 'win32'):
+                # SDL draws into the Tk frame instead of a window of its own
+                root.update_idletasks()
+                os.environ['SDL_WINDOWID'] = str(self.frame.winfo_id())
+        pygame.display.init()
+        pygame.font.init()
+        self.screen = pygame.display.set_mode((width, height))
+        pygame.display.set_caption("Chess Pong")
+        # board, grid, pieces and their HP bars
+        self.base = None
+        self.layout_key = None
+        self.piece_hp = {}
+        # moving items of the last plan, drawn on every frame
+        self.power = None
+        self.paddles = ()
+        self.ball = None
+        self.extra_balls = ()
+        self.arrow = None
+        self.hud_text = None
+        self.banner = None
+        self.dirty = True
+
+    # -- interface -------------------------------------------------------------
+
+    def clear(self):
+        super().clear()
+        self.base = None
+        self.layout_key = None
+        self.piece_hp = {}
+        self.ball = None
+        self.dirty = True
+
+    def apply_plan(self, plan):
+        w, h = (int(v) for v in plan.size)
+        if (w, h) != self.screen.get_size():
+            self.screen = pygame.display.set_mode((w, h))
+            self.width, self.height = w, h
+        for op, layout, cells in plan.static:
+            if op == REBUILD:
+                self.layout_key = layout
+                self._build_base(layout, cells)
+            elif op == ERASE and self.base is not None:
+                self._erase_pieces(layout, cells)
+        if self.base is not None:
+            self._update_hp_bars(plan.hp)
+        self.power = plan.power
+        self.paddles = plan.paddles
+        self.ball = plan.ball
+        self.extra_balls = plan.extra_balls
+        self.dirty = True
+
+    def set_arrow(self, coords):
+        coords = list(coords) if coords is not None else None
+        if coords != self.arrow:
+            self.arrow = coords
+            self.dirty = True
+
+    def set_hud_text(self, text):
+        if text != self.hud_text:
+            self.hud_text = text
+            self.dirty = True
+
+    def set_banner(self, text):
+        if text != self.banner:
+            self.banner = text
+            self.dirty = True
+
+    def present(self):
+        # keeps the SDL window responsive; input itself goes through Tk
+        pygame.event.pump()
+        if not self.dirty:
+            return
+        self.dirty = False
+        screen = self.screen
+        if self.base is not None:
+            screen.blit(self.base, (0, 0))
+        else:
+            screen.fill(self.bg)
+        if self.ball is not None:
+            self._draw_moving(screen)
+        self._draw_overlays(screen)
+        pygame.display.flip()
+
+    def close(self):
+        pygame.display.quit()
+
+    # -- board layer -----------------------------------------------------------
+
+    def _build_base(self, layout, cells):
+        w, h, bx, by, bw, bh, cols, rows, cell, has_board = layout
+        base = pygame.Surface((int(w), int(h))).convert()
+        base.fill(self.bg)
+        if has_board:
+            base.fill(BOARD_BG, _rect(bx, by, bx + bw, by + bh))
+            # dashed grid lines (4 on / 2 off)
+            grid = pygame.Color(GRID_COLOR)
+            x0, y0 = int(round(bx)), int(round(by))
+            x1, y1 = int(round(bx + bw)), int(round(by + bh))
+            for c in range(1, cols):
+                x = int(round(bx + c*cell))
+                for y in range(y0, y1, 6):
+                    base.fill(grid, (x, y, 1, min(4, y1 - y)))
+            for r in range(1, rows):
+                y = int(round(by + r*cell))
+                for x in range(x0, x1, 6):
+                    base.fill(grid, (x, y, min(4, x1 - x), 1))
+            _frame(base, grid, bx - 1, by - 1, bx + bw + 2, by + bh + 2, 3)
+        glyph_size = max(8, int(cell*0.55)) * 4 // 3
+        # without a font that has the chess symbols, show the piece letter
+        glyphs = _has_chess_glyphs(GLYPH_FONTS, glyph_size)
+        for _, _, left, top, fill, symbol, kind, glyph_color, _ in cells:
+            base.fill(fill, _rect(left+2, top+2, left+cell-2, top+cell-2))
+            _frame(base, "#1d3557", left+1, top+1, left+cell-1, top+cell-1, 2)
+            glyph = _text(GLYPH_FONTS, glyph_size, True, symbol if glyphs else str(kind), glyph_color)
+            _blit_center(base, glyph, left + cell/2, top + cell/2)
+        self.base = base
+        self.piece_hp = {}
+
+    def _erase_pieces(self, layout, cells):
+        """Paint destroyed pieces' cells (HP bar included) back to board background."""
+        cell = layout[8]
+        for col, row, left, top in cells:
+            self.base.fill(BOARD_BG, _rect(left+1, top+1, left+cell-1, top+cell-1))
+            self.piece_hp.pop((col, row), None)
+
+    def _update_hp_bars(self, bars):
+        """Redraw the HP bars whose value changed since the last plan."""
+        known = self.piece_hp
+        base = self.base
+        for key, (value, (bar_left, bar_top, bar_right, bar_bottom), fg_right, fg_color, text, txt_color,
+                  font_size) in bars.items():
+            if known.get(key) == value:
+                continue
+            known[key] = value
+            base.fill("#2b2d42", _rect(bar_left, bar_top, bar_right, bar_bottom))
+            _frame(base, "#8d99ae", bar_left, bar_top, bar_right, bar_bottom, 1)
+            if fg_right > bar_left:
+                base.fill(fg_color, _rect(bar_left, bar_top, fg_right, bar_bottom))
+            if text is not None:
+                _blit_center(base, _text(TEXT_FONTS, font_size * 4 // 3, False, text, txt_color),
+                             (bar_left + bar_right)/2, (bar_top + bar_bottom)/2)
+
+    # -- per frame -------------------------------------------------------------
+
+    def _draw_moving(self, screen):
+        if self.power is not None:
+            x0, y0, x1, y1, fg_w, fg_color, glow, label, text_color = self.power
+            screen.fill("#0d1b2a", _rect(x0, y0, x1, y1))
+            if fg_w > 0:
+                screen.fill(fg_color, _rect(x0, y0, x0 + fg_w, y1))
+            _frame(screen, "#415a77", x0, y0, x1, y1, 2)
+            if glow is not None:
+                _dashed_rect(screen, glow, x0 - 6, y0 - 4, x1 + 6, y1 + 4, 2)
+            _blit_center(screen, _text(TEXT_FONTS, 13, True, label, text_color), self.width/2, (y0 + y1)/2)
+        # paddles
+        for left, top, right, bottom, fill, outline in self.paddles:
+            rect = _rect(left, top, right, bottom)
+            screen.fill(fill, rect)
+            pygame.draw.rect(screen, outline, rect, 3)
+        # extra balls under the primary ball
+        for ball in self.extra_balls:
+            self._ball(screen, ball, 2)
+        self._ball(screen, self.ball, 3)
+
+    @staticmethod
+    def _ball(screen, ball, width):
+        left, top, right, bottom, fill, outline = ball
+        center = (int(round((left + right) / 2)), int(round((top + bottom) / 2)))
+        r = max(1, int(round((right - left) / 2)))
+        pygame.draw.circle(screen, fill, center, r)
+        pygame.draw.circle(screen, outline, center, r, width)
+
+    def _draw_overlays(self, screen):
+        if self.arrow and len(self.arrow) >= 4:
+            points = list(zip(self.arrow[0::2], self.arrow[1::2]))
+            pygame.draw.lines(screen, "#FFFF66", False, points, 3)
+            # arrow head on the last segment
+            (xa, ya), (xb, yb) = points[-2], points[-1]
+            v = pygame.math.Vector2(xb - xa, yb - ya)
+            if v.length() > 0:
+                v.scale_to_length(12)
+                n = pygame.math.Vector2(-v.y, v.x) * 0.45
+                tip = pygame.math.Vector2(xb, yb)
+                pygame.draw.polygon(screen, "#FFFF66", [tip, tip - v + n, tip - v - n])
+        if self.hud_text:
+            y = 8
+            for line in self.hud_text.split("\n"):
+                surf = _text(MONO_FONTS, 13, True, line, "#50fa7b")
+                screen.blit(surf, (8, y))
+                y += surf.get_height()
+        if self.banner:
+            surf = _text(TEXT_FONTS, 24, False, self.banner, "#FFFFFF")
+            box = surf.get_rect(center=(self.width // 2, self.height // 2)).inflate(12, 8)
+            screen.fill("#000000", box)
+            _blit_center(screen, surf, self.width / 2, self.height / 2)
+
+
+def main(argv=None):
+    """Headless frame-rate benchmark on a simulated match."""
+    parser = argparse.ArgumentParser(description="Benchmark the pygame renderer on a simulated match")
+    parser.add_argument("--dims", default="32x32", help="board size (EXTRA_DIMENSIONS), default 32x32")
+    parser.add_argument("--frames", type=int, default=1200)
+    parser.add_argument("--show", action="store_true", help="open a window instead of rendering headless")
+    args = parser.parse_args(argv)
+    if not args.show:
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    os.environ['EXTRA_DIMENSIONS'] = args.dims
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    from game import Game
+    game = Game()
+    game.update(1 / 60, {0: "stop", 1: "stop", 'trajectory': 300.0})
+    state = game.get_state()
+    renderer = PygameRenderer(None, state.get("width", 800), state.get("height", 600))
+    times = []
+    for i in range(args.frames):
+        game.update(1 / 60, {0: "left" if i % 120 < 60 else "right", 1: "stop"})
+        state = game.get_state()
+        start = time.perf_counter()
+        renderer.draw_state(state)
+        renderer.present()
+        times.append(time.perf_counter() - start)
+    renderer.close()
+    times.sort()
+    n = len(times)
+    print(f"{args.dims}: {len(state.get('pieces', []))} pieces left, {n} frames, "
+          f"{n / sum(times):.0f} FPS (render only), p50 {times[n // 2] * 1000:.2f} ms, "
+          f"p99 {times[min(n - 1, int(n * 0.99))] * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
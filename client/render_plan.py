@@ -0,0 +1,298 @@
+# client/render_plan.py
+"""Render plans: snapshots turned into drawing operations off the Tk thread.
+
+`PlanBuilder.build(state)` does all the per-snapshot work of the
+renderers (board geometry, piece keys, HP ratios, colours, bar rects and
+labels) and diffs the result against the previous plan, so a `RenderPlan`
+only lists what changed on the board:
+
+    static  ordered board operations: (REBUILD, layout, cells) redraws the
+            board with every piece, (ERASE, layout, cells) clears the cells
+            of destroyed pieces; `layout` is the board key from board_key()
+    hp      (col, row) -> HP bar entry, for the bars whose value changed
+            (every bar after a REBUILD)
+
+plus the few moving items, always given whole: power bar, paddles and
+balls (the backends skip those equal to what they show).
+
+In network mode the reader threads build the plans and hand them to the
+Tk thread through a `PlanBuffer`: publishing is a single reference store
+and taking one is a read and a counter store, so neither side waits for
+the other. A plan the Tk thread never took is folded into the next one
+(its board operations first), so skipped snapshots lose nothing. Every
+operation sets absolute values, so applying a plan's operations twice
+(the Tk thread took a plan while the next one was being folded) is
+harmless.
+"""
+
+PIECE_UNICODE = {
+    ('K', 'white'): '\u2654',
+    ('Q', 'white'): '\u2655',
+    ('R', 'white'): '\u2656',
+    ('B', 'white'): '\u2657',
+    ('N', 'white'): '\u2658',
+    ('P', 'white'): '\u2659',
+    ('K', 'black'): '\u265A',
+    ('Q', 'black'): '\u265B',
+    ('R', 'black'): '\u265C',
+    ('B', 'black'): '\u265D',
+    ('N', 'black'): '\u265E',
+    ('P', 'black'): '\u265F',
+}
+
+# below this cell size the "hp/max" labels are unreadable and are not drawn
+HP_TEXT_MIN_CELL = 40
+
+REBUILD = "rebuild"
+ERASE = "erase"
+
+
+def _hp_bar_rect(left, top, cell):
+    """(left, top, right, bottom) of the HP bar of the piece in the cell at (left, top)."""
+    bar_w = cell * 0.7
+    bar_h = max(4, int(cell * 0.12))
+    bar_left = left + (cell - bar_w)/2
+    bar_top = top + cell - bar_h - 4
+    return bar_left, bar_top, bar_left + bar_w, bar_top + bar_h
+
+
+def hp_colors(hp, max_hp):
+    """(fill ratio, bar color, text color) of an HP bar."""
+    ratio = max(0.0, min(1.0, hp / max_hp)) if max_hp > 0 else 0.0
+    # color: cyan -> orange based on ratio
+    if ratio > 0.5:
+        fg_color = "#06d6a0"
+    elif ratio > 0.2:
+        fg_color = "#ffd166"
+    else:
+        fg_color = "#ef476f"
+    return ratio, fg_color, "#000000" if ratio > 0.5 else "#FFFFFF"
+
+
+def power_bar(power, w):
+    """Layout of the power bar (top center) for a state's `power` dict.
+
+    Returns (x0, y0, x1, y1, fg_w, fg_color, glow_color or None, label, text_color).
+    """
+    charge = max(0, int(power.get("charge", 0)))
+    max_charge = max(1, int(power.get("max_charge", 10)))
+    ready = bool(power.get("ready", False))
+    active = bool(power.get("active", False))
+    special_damage = int(power.get("special_damage", 1))
+    remaining_damage = int(power.get("remaining_damage", 0))
+    ratio = min(1.0, charge / max_charge) if max_charge > 0 else 0.0
+    bar_w = w * 0.6
+    bar_h = 14
+    x0 = (w - bar_w) / 2
+    y0 = 8
+    # foreground - en mode actif, afficher les dégâts restants
+    if active and remaining_damage > 0:
+        # Barre qui montre les dégâts restants
+        active_ratio = remaining_damage / special_damage if special_damage > 0 else 0
+        fg_w = bar_w * active_ratio
+        fg_color = "#e63946"  # Rouge vif pour indiquer le mode actif
+    else:
+        fg_w = bar_w * ratio
+        fg_color = "#fb8500" if ready else "#06d6a0"
+    # glow when ready or active
+    glow = ("#e63946" if active else "#f4a261") if (ready or active) else None
+    if active and remaining_damage > 0:
+        label = f"⚡ PERÇANT! Dégâts restants: {remaining_damage}/{special_damage}"
+        text_color = "#e63946"
+    elif ready:
+        label = f"⚡ PRÊT! Puissance: {charge}/{max_charge} (x{special_damage})"
+        text_color = "#f4a261"
+    else:
+        label = f"Puissance: {charge}/{max_charge} (x{special_damage})"
+        text_color = "#e0e1dd"
+    return x0, y0, x0 + bar_w, y0 + bar_h, fg_w, fg_color, glow, label, text_color
+
+
+def ball_colors(ball_d):
+    """(fill, outline) of the primary ball: highlighted when the special shot is ready/active."""
+    if ball_d.get("special_active", False):
+        return "#ffb703", "#fb8500"
+    if ball_d.get("special_ready", False):
+        return "#ffd166", "#f77f00"
+    return ball_d.get("color", "#FFFFFF"), "#ff6b6b"
+
+
+def extra_ball_colors(active, ready):
+    """(fill, outline) of an extra ball (multi-ball)."""
+    if active:
+        return "#ffb703", "#fb8500"
+    if ready:
+        return "#ffd166", "#f77f00"
+    return "#8be9fd", "#6272a4"
+
+
+def board_key(w, h, board):
+    """(w, h, bx, by, bw, bh, cols, rows, cell, has_board) of a state's board."""
+    if board:
+        bx = board.get('x', 0)
+        by = board.get('y', 0)
+        bw = board.get('width', w)
+        bh = board.get('height', h)
+        cols = board.get('cols', 8)
+        rows = board.get('rows', 8)
+        cell = board.get('cell_size', bw/cols)
+    else:
+        bx = 0; by = 0; bw = w; bh = h; cols = 8; rows = 8; cell = bw/8
+    return (w, h, bx, by, bw, bh, cols, rows, cell, bool(board))
+
+
+class RenderPlan:
+    __slots__ = ("seq", "tick", "size", "static", "hp", "power", "paddles", "ball", "extra_balls")
+
+    def __init__(self, seq, tick, size):
+        self.seq = seq
+        self.tick = tick
+        self.size = size
+        self.static = []
+        self.hp = {}
+        self.power = None
+        # (left, top, right, bottom, fill, outline)
+        self.paddles = ()
+        self.ball = None
+        self.extra_balls = ()
+
+    def absorb(self, older):
+        """Fold an older plan that was never applied into this one."""
+        if any(op[0] == REBUILD for op in self.static):
+            # this plan redraws the whole board and every bar
+            return
+        hp = dict(older.hp)
+        for op in self.static:
+            for cell in op[2]:
+                hp.pop((cell[0], cell[1]), None)
+        hp.update(self.hp)
+        self.hp = hp
+        self.static = older.static + self.static
+
+
+class PlanBuilder:
+    """Turns successive states into diffed `RenderPlan`s (one builder per stream of states)."""
+
+    def __init__(self, width=800, height=600):
+        # size used when a state has none
+        self.width = width
+        self.height = height
+        self.seq = 0
+        self.layout = None
+        self.piece_keys = None
+        self.pieces = None
+        # (col, row) -> (hp, max_hp) as of the last plan
+        self.hp = {}
+
+    def build(self, state):
+        self.seq += 1
+        w = state.get("width", self.width)
+        h = state.get("height", self.height)
+        plan = RenderPlan(self.seq, state.get("tick"), (w, h))
+        layout = board_key(w, h, state.get("board"))
+        pieces = state.get("pieces", [])
+        # states are never mutated: the same list means the same pieces
+        if pieces is not self.pieces or layout != self.layout:
+            self._diff_pieces(plan, layout, pieces)
+            self.pieces = pieces
+        try:
+            plan.power = power_bar(state.get("power", {}), w)
+        except Exception:
+            plan.power = None
+        plan.paddles = tuple(self._paddle(pd, i, w, h) for i, pd in enumerate(state.get("paddles", [{}, {}])[:2]))
+        ball_d = state.get("ball", {})
+        r = ball_d.get("radius", 8)
+        x = ball_d.get("x", w/2)
+        y = ball_d.get("y", h/2)
+        plan.ball = (x - r, y - r, x + r, y + r) + ball_colors(ball_d)
+        plan.extra_balls = self._extra_balls(state.get("balls"), ball_d)
+        return plan
+
+    def _diff_pieces(self, plan, layout, pieces):
+        keys = frozenset((pc.get('col'), pc.get('row'), pc.get('type'), pc.get('color')) for pc in pieces)
+        bx, by, cell = layout[2], layout[3], layout[8]
+        if layout != self.layout or self.piece_keys is None or not layout[9] or not keys <= self.piece_keys:
+            # new layout, no board, or pieces appeared: the board is drawn again
+            cells = []
+            for pc in pieces:
+                col, row = pc.get('col'), pc.get('row')
+                left = bx + col*cell
+                top = by + row*cell
+                white = pc.get('color') == 'white'
+                cells.append((col, row, left, top, "#a8dadc" if white else "#457b9d",
+                              PIECE_UNICODE.get((pc.get('type'), pc.get('color')), '?'), pc.get('type'),
+                              "#1d3557" if white else "#f1faee", _hp_bar_rect(left, top, cell)))
+            plan.static.append((REBUILD, layout, tuple(cells)))
+            self.hp = {}
+        elif keys != self.piece_keys:
+            removed = self.piece_keys - keys
+            plan.static.append((ERASE, layout, tuple((col, row, bx + col*cell, by + row*cell)
+                                                     for col, row, _, _ in removed)))
+            for col, row, _, _ in removed:
+                self.hp.pop((col, row), None)
+        self.layout = layout
+        self.piece_keys = keys
+        show_text = cell >= HP_TEXT_MIN_CELL
+        known = self.hp
+        for pc in pieces:
+            key = (pc.get('col'), pc.get('row'))
+            value = (pc.get('hp', 1), pc.get('max_hp', 1))
+            if known.get(key) == value:
+                continue
+            known[key] = value
+            hp, max_hp = value
+            bar = _hp_bar_rect(bx + key[0]*cell, by + key[1]*cell, cell)
+            # foreground width based on hp ratio; hp text shows current / max
+            ratio, fg_color, txt_color = hp_colors(hp, max_hp)
+            text = f"{hp}/{max_hp}" if show_text else None
+            font_size = max(6, int((bar[3] - bar[1]) * 0.9))
+            plan.hp[key] = (value, bar, bar[0] + (bar[2] - bar[0]) * ratio, fg_color, text, txt_color, font_size)
+
+    @staticmethod
+    def _paddle(pd, i, w, h):
+        px = pd.get("x", w/2)
+        py = pd.get("y", 0 if i == 0 else h)
+        pw = pd.get("width", 120)
+        ph = pd.get("height", 12)
+        return (px - pw/2, py - ph/2, px + pw/2, py + ph/2, pd.get("color", "#FFFFFF"),
+                "#f8f8f2" if i == 0 else "#282a36")
+
+    @staticmethod
+    def _extra_balls(balls, ball_d):
+        # state["balls"] holds every ball as parallel lists, index 0 being the primary ball
+        if not balls:
+            return ()
+        xs = balls.get("x", [])
+        ys = balls.get("y", [])
+        radii = balls.get("radius", [])
+        active = balls.get("active", [])
+        ready = bool(ball_d.get("special_ready", False))
+        out = []
+        for i in range(1, min(len(xs), len(ys), len(radii))):
+            x, y, r = xs[i], ys[i], radii[i]
+            out.append((x - r, y - r, x + r, y + r) + extra_ball_colors(i < len(active) and active[i], ready))
+        return tuple(out)
+
+
+class PlanBuffer:
+    """Hands the newest plan from the builder thread(s) to the Tk thread without locking."""
+
+    def __init__(self):
+        self.front = None
+        # seq of the last plan taken by the Tk thread
+        self.taken = 0
+
+    def publish(self, plan):
+        """Builder side (callers serialize their `build` + `publish`)."""
+        prev = self.front
+        if prev is not None and prev.seq > self.taken:
+            plan.absorb(prev)
+        self.front = plan
+
+    def take(self):
+        """Tk side: the newest plan not taken yet, or None."""
+        plan = self.front
+        if plan is None or plan.seq <= self.taken:
+            return None
+        self.taken = plan.seq
+        return plan
@@ -1,324 +1,404 @@
+# client/renderer.py
+"""Rendering backends behind one interface.
+
+`GameRenderer` is what the client draws through: `apply_plan(plan)` for
+the board, paddles, balls and power bar, and overlays that can change
+between two states (trajectory arrow, HUD text, centred banner).
+`present()` ends a frame. Plans come from render_plan.py; in network mode
+they are built on the reader threads, `draw_state(state)` builds one on
+the spot (local mode).
+
+- `TkRenderer` draws on a `tk.Canvas` (default).
+- `PygameRenderer` (pygame_renderer.py, needs pygame) blits into an SDL
+  surface embedded in the Tk window; it keeps up 120+ FPS on large boards
+  and also runs with `SDL_VIDEODRIVER=dummy`, headless.
+
+`create_renderer()` picks one by name (`client.py --renderer`).
+"""
 import tkinter as tk
+from abc import ABC, abstractmethod
 
-PIECE_UNICODE = {
-    ('K', 'white'): '\u2654',
-    ('Q', 'white'): '\u2655',
-    ('R', 'white'): '\u2656',
-    ('B', 'white'): '\u2657',
-    ('N', 'white'): '\u2658',
-    ('P', 'white'): '\u2659',
-    ('K', 'black'): '\u265A',
-    ('Q', 'black'): '\u265B',
-    ('R', 'black'): '\u265C',
-    ('B', 'black'): '\u265D',
-    ('N', 'black'): '\u265E',
-    ('P', 'black'): '\u265F',
-}
-
-
-class GameRenderer:
-    def __init__(self, root, width=800, height=600, bg="#1a1a2e"):
-        self.root = root
+from render_plan import ERASE, REBUILD, PlanBuilder
+
+RENDERERS = ("tk", "pygame")
+
+BOARD_BG = "#16213e"
+GRID_COLOR = "#0f3460"
+
+
+def _fill(img, w, h, color, x0, y0, x1, y1):
+    x0 = max(0, int(round(x0))); y0 = max(0, int(round(y0)))
+    x1 = min(int(w), int(round(x1))); y1 = min(int(h), int(round(y1)))
+    if x1 > x0 and y1 > y0:
+        img.put(color, to=(x0, y0, x1, y1))
+
+
+def _frame(img, w, h, color, x0, y0, x1, y1, width):
+    _fill(img, w, h, color, x0, y0, x1, y0 + width)
+    _fill(img, w, h, color, x0, y1 - width, x1, y1)
+    _fill(img, w, h, color, x0, y0, x0 + width, y1)
+    _fill(img, w, h, color, x1 - width, y0, x1, y1)
+
+
+class GameRenderer(ABC):
+    """Interface of the rendering backends."""
+
+    def __init__(self, width=800, height=600):
         self.width = width
         self.height = height
+        self.builder = PlanBuilder(width, height)
+
+    def draw_state(self, state):
+        """Update the view to a state dict (width/height/board/ball/balls/paddles/pieces/power)."""
+        self.apply_plan(self.builder.build(state))
+
+    @abstractmethod
+    def apply_plan(self, plan):
+        """Update the view with a `RenderPlan` (successive plans of one `PlanBuilder`)."""
+
+    @abstractmethod
+    def set_arrow(self, coords):
+        """Show the trajectory preview polyline [x0, y0, x1, y1, ...] with an arrow head; None hides it."""
+
+    @abstractmethod
+    def set_hud_text(self, text):
+        """Multi-line text in the top-left corner; None hides it."""
+
+    @abstractmethod
+    def set_banner(self, text):
+        """Message centred over the board (game over); None hides it."""
+
+    def present(self):
+        """End of a frame: show what was drawn since the last call."""
+
+    def clear(self):
+        """Forget what is drawn: the next plan must come from a fresh `PlanBuilder`."""
+        self.builder = PlanBuilder(self.width, self.height)
+
+
+def create_renderer(name, root, width=800, height=600):
+    """Renderer backend `name` (one of RENDERERS) in `root`; falls back to Tk when pygame is missing."""
+    if name == "pygame":
+        try:
+            from pygame_renderer import PygameRenderer
+        except ImportError as e:
+            print(f"[!] pygame renderer unavailable ({e}), using the Tk canvas")
+        else:
+            return PygameRenderer(root, width, height)
+    return TkRenderer(root, width, height)
+
+
+class TkRenderer(GameRenderer):
+    """Canvas items, updated in place from frame to frame."""
+
+    def __init__(self, root, width=800, height=600, bg="#1a1a2e"):
+        super().__init__(width, height)
+        self.root = root
         self.bg = bg
         self.canvas = tk.Canvas(root, width=width, height=height, bg=bg, highlightthickness=2, highlightbackground="#e94560")
         self.canvas.pack()
         # store canvas ids
         self.ball_id = None
+        # multi-ball: ovals of the extra balls, reused from frame to frame
+        self.extra_ball_ids = []
         self.paddle_ids = [None, None]
-        self.score_text_ids = [None, None]
-        self.board_bg_id = None
-        self.grid_ids = []
-        # pieces: mapping (col,row) -> (rect_id, text_id, hp_bg_id, hp_fg_id, hp_text_id)
+        # what the moving items show, as last applied from a plan
+        self.shown_power = None
+        self.shown_paddles = [None, None]
+        self.shown_ball = None
+        self.shown_extra_balls = ()
+        # static layer: board background, grid, piece cells and HP bar
+        # backgrounds pre-rendered into one image, plus the piece glyphs;
+        # rebuilt when the layout changes or pieces appear, patched in place
+        # when pieces are destroyed
+        self.static_id = None
+        self.static_image = None
+        self.layout_key = None
+        self.glyph_ids = {}
+        # live HP bars: mapping (col,row) -> (hp_fg_id, hp_text_id or None, (hp, max_hp))
         self.piece_items = {}
         # power bar ids
         self.power_bg_id = None
         self.power_fg_id = None
         self.power_text_id = None
         self.power_glow_id = None
+        # overlays
+        self.arrow_id = None
+        self.hud_id = None
+        self.banner = None
 
     def clear(self):
+        super().clear()
         self.canvas.delete("all")
         self.ball_id = None
+        self.extra_ball_ids = []
         self.paddle_ids = [None, None]
-        self.score_text_ids = [None, None]
-        self.board_bg_id = None
-        self.grid_ids = []
+        self.shown_power = None
+        self.shown_paddles = [None, None]
+        self.shown_ball = None
+        self.shown_extra_balls = ()
+        self.static_id = None
+        self.static_image = None
+        self.layout_key = None
+        self.glyph_ids = {}
         self.piece_items = {}
         self.power_bg_id = None
         self.power_fg_id = None
         self.power_text_id = None
         self.power_glow_id = None
+        self.arrow_id = None
+        self.hud_id = None
 
-    def draw_state(self, state):
-        # state contains width/height/board/ball/paddles/pieces/scores
-        w = state.get("width", self.width)
-        h = state.get("height", self.height)
-        board = state.get("board")
-        ball_d = state.get("ball", {})
-        paddles_d = state.get("paddles", [{}, {}])
-        pieces = state.get("pieces", [])
-        scores = state.get("scores", [0,0])
-        power = state.get("power", {})
+    def set_arrow(self, coords):
+        if coords is None:
+            if self.arrow_id is not None:
+                self._delete_items((self.arrow_id,))
+                self.arrow_id = None
+        elif self.arrow_id is None:
+            self.arrow_id = self.canvas.create_line(*coords, arrow=tk.LAST, fill="#FFFF66", width=3)
+        else:
+            self.canvas.coords(self.arrow_id, *coords)
 
-        # power bar (top center)
-        try:
-            charge = max(0, int(power.get("charge", 0)))
-            max_charge = max(1, int(power.get("max_charge", 10)))
-            ready = bool(power.get("ready", False))
-            active = bool(power.get("active", False))
-            special_damage = int(power.get("special_damage", 1))
-            remaining_damage = int(power.get("remaining_damage", 0))
-            ratio = min(1.0, charge / max_charge) if max_charge > 0 else 0.0
-            bar_w = w * 0.6
-            bar_h = 14
-            x0 = (w - bar_w) / 2
-            y0 = 8
-            x1 = x0 + bar_w
-            y1 = y0 + bar_h
-            # background
-            if self.power_bg_id is None:
-                self.power_bg_id = self.canvas.create_rectangle(x0, y0, x1, y1, fill="#0d1b2a", outline="#415a77", width=2)
-            else:
-                self.canvas.coords(self.power_bg_id, x0, y0, x1, y1)
-                self.canvas.itemconfig(self.power_bg_id, fill="#0d1b2a", outline="#415a77")
-            # foreground - en mode actif, afficher les dégâts restants
-            if active and remaining_damage > 0:
-                # Barre qui montre les dégâts restants
-                active_ratio = remaining_damage / special_damage if special_damage > 0 else 0
-                fg_w = bar_w * active_ratio
-                fg_color = "#e63946"  # Rouge vif pour indiquer le mode actif
-            else:
-                fg_w = bar_w * ratio
-                fg_color = "#fb8500" if ready else "#06d6a0"
-            if self.power_fg_id is None:
-                self.power_fg_id = self.canvas.create_rectangle(x0, y0, x0 + fg_w, y1, fill=fg_color, outline=fg_color)
-            else:
-                self.canvas.coords(self.power_fg_id, x0, y0, x0 + fg_w, y1)
-                self.canvas.itemconfig(self.power_fg_id, fill=fg_color, outline=fg_color)
-            # glow when ready or active
-            if (ready or active) and self.power_glow_id is None:
-                glow_col = "#e63946" if active else "#f4a261"
-                self.power_glow_id = self.canvas.create_rectangle(x0 - 6, y0 - 4, x1 + 6, y1 + 4, outline=glow_col, width=2, dash=(4,2))
-            elif ready or active:
-                glow_col = "#e63946" if active else "#f4a261"
-                self.canvas.coords(self.power_glow_id, x0 - 6, y0 - 4, x1 + 6, y1 + 4)
-                self.canvas.itemconfig(self.power_glow_id, outline=glow_col)
-            else:
-                if self.power_glow_id is not None:
-                    try:
-                        self.canvas.delete(self.power_glow_id)
-                    except Exception:
-                        pass
-                    self.power_glow_id = None
-            # text label
-            if active and remaining_damage > 0:
-                label = f"⚡ PERÇANT! Dégâts restants: {remaining_damage}/{special_damage}"
-                text_color = "#e63946"
-            elif ready:
-                label = f"⚡ PRÊT! Puissance: {charge}/{max_charge} (x{special_damage})"
-                text_color = "#f4a261"
-            else:
-                label = f"Puissance: {charge}/{max_charge} (x{special_damage})"
-                text_color = "#e0e1dd"
-            if self.power_text_id is None:
-                self.power_text_id = self.canvas.create_text(w/2, y0 + bar_h/2, text=label, fill=text_color, font=("Helvetica", 10, "bold"))
-            else:
-                self.canvas.coords(self.power_text_id, w/2, y0 + bar_h/2)
-                self.canvas.itemconfig(self.power_text_id, text=label, fill=text_color)
-        except Exception:
-            pass
-
-        # draw board
-        if board:
-            bx = board.get('x', 0)
-            by = board.get('y', 0)
-            bw = board.get('width', w)
-            bh = board.get('height', h)
-            cols = board.get('cols', 8)
-            rows = board.get('rows', 8)
-            cell = board.get('cell_size', bw/cols)
-            # background
-            if self.board_bg_id is None:
-                self.board_bg_id = self.canvas.create_rectangle(bx, by, bx+bw, by+bh, fill="#16213e", outline="#0f3460", width=3)
-            else:
-                self.canvas.coords(self.board_bg_id, bx, by, bx+bw, by+bh)
-            # grid lines (create once if empty)
-            if not self.grid_ids:
-                for c in range(1, cols):
-                    x = bx + c*cell
-                    self.grid_ids.append(self.canvas.create_line(x, by, x, by+bh, fill="#0f3460", dash=(4, 2)))
-                for r in range(1, rows):
-                    y = by + r*cell
-                    self.grid_ids.append(self.canvas.create_line(bx, y, bx+bw, y, fill="#0f3460", dash=(4, 2)))
+    def set_hud_text(self, text):
+        if text is None:
+            if self.hud_id is not None:
+                self._delete_items((self.hud_id,))
+                self.hud_id = None
+            return
+        if self.hud_id is None:
+            self.hud_id = self.canvas.create_text(8, 8, anchor="nw", text=text, fill="#50fa7b",
+                                                  font=("Courier", 10, "bold"))
         else:
-            bx = 0; by = 0; bw = w; bh = h; cell = bw/8
-
-        # Draw pieces: each occupies a full cell (solid block + unicode symbol)
-        existing = set(self.piece_items.keys())
-        seen = set()
-        for pc in pieces:
-            col = pc.get('col')
-            row = pc.get('row')
-            x = pc.get('x')
-            y = pc.get('y')
-            size = pc.get('size', cell)
-            left = bx + col*cell
-            top = by + row*cell
-            right = left + cell
-            bottom = top + cell
-            key = (col, row)
-            seen.add(key)
-            color = "#a8dadc" if pc.get('color') == 'white' else "#457b9d"
-            # draw rect
-            if key not in self.piece_items:
-                rect_id = self.canvas.create_rectangle(left+2, top+2, right-2, bottom-2, fill=color, outline="#1d3557", width=2)
-                # unicode symbol centered
-                symbol = PIECE_UNICODE.get((pc.get('type'), pc.get('color')), '?')
-                text_color = "#1d3557" if pc.get('color') == 'white' else "#f1faee"
-                text_id = self.canvas.create_text(left+cell/2, top+cell/2, text=symbol, fill=text_color, font=("Helvetica", max(8, int(cell*0.55)), "bold"))
-                # HP bar background and foreground
-                hp = pc.get('hp', 1)
-                max_hp = pc.get('max_hp', 1)
-                bar_w = cell * 0.7
-                bar_h = max(4, int(cell * 0.12))
-                bar_left = left + (cell - bar_w)/2
-                bar_top = bottom - bar_h - 4
-                bar_right = bar_left + bar_w
-                bar_bottom = bar_top + bar_h
-                hp_bg_id = self.canvas.create_rectangle(bar_left, bar_top, bar_right, bar_bottom, fill="#2b2d42", outline="#8d99ae")
-                # foreground width based on hp ratio
-                ratio = max(0.0, min(1.0, hp / max_hp)) if max_hp > 0 else 0.0
-                fg_right = bar_left + bar_w * ratio
-                # color: cyan -> orange based on ratio
-                if ratio > 0.5:
-                    fg_color = "#06d6a0"
-                elif ratio > 0.2:
-                    fg_color = "#ffd166"
-                else:
-                    fg_color = "#ef476f"
-                hp_fg_id = self.canvas.create_rectangle(bar_left, bar_top, fg_right, bar_bottom, fill=fg_color, outline=fg_color)
-                # hp text (show current / max)
+            self.canvas.itemconfigure(self.hud_id, text=text)
+        self.canvas.tag_raise(self.hud_id)
+
+    def set_banner(self, text):
+        if text is None:
+            if self.banner is not None:
                 try:
-                    txt_color = "#000000" if ratio > 0.5 else "#FFFFFF"
+                    self.banner.destroy()
                 except Exception:
-                    txt_color = "#FFFFFF"
-                font_size = max(6, int(bar_h * 0.9))
-                hp_text_id = self.canvas.create_text(bar_left + bar_w/2, bar_top + bar_h/2, text=f"{hp}/{max_hp}", fill=txt_color, font=("Arial", font_size))
-                self.piece_items[key] = (rect_id, text_id, hp_bg_id, hp_fg_id, hp_text_id)
+                    pass
+                self.banner = None
+        elif self.banner is None:
+            self.banner = tk.Label(self.canvas, text=text, bg="#000000", fg="#FFFFFF", font=("Arial", 18))
+            self.banner.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
+        else:
+            self.banner.config(text=text)
+
+    def apply_plan(self, plan):
+        w, h = plan.size
+        # power bar (top center)
+        if plan.power is not None and plan.power != self.shown_power:
+            self._draw_power(plan.power, w)
+            self.shown_power = plan.power
+
+        # Static layer: regenerated when the layout changes or pieces appear;
+        # destroyed pieces are only erased from it
+        rebuilt = False
+        for op, layout, cells in plan.static:
+            if op == REBUILD:
+                if layout != self.layout_key:
+                    # geometry changed: every HP bar must be re-created at its new position
+                    self._clear_hp_items()
+                    self.layout_key = layout
+                self._build_static_layer(layout, cells)
+                kept = {(c[0], c[1]) for c in cells}
+                for key in [k for k in self.piece_items if k not in kept]:
+                    self._delete_items(self.piece_items.pop(key)[:2])
+                rebuilt = True
+            elif op == ERASE and self.static_image is not None:
+                self._erase_pieces(layout, cells)
+                for col, row, _, _ in cells:
+                    item = self.piece_items.pop((col, row), None)
+                    if item is not None:
+                        self._delete_items(item[:2])
+
+        # HP bars stay live, but are only touched when a piece's HP changes
+        created = False
+        for key, (value, (bar_left, bar_top, bar_right, bar_bottom), fg_right, fg_color, text, txt_color,
+                  font_size) in plan.hp.items():
+            item = self.piece_items.get(key)
+            if item is not None and item[2] == value:
+                continue
+            if item is None:
+                hp_fg_id = self.canvas.create_rectangle(bar_left, bar_top, fg_right, bar_bottom, fill=fg_color, outline=fg_color)
+                hp_text_id = None
+                if text is not None:
+                    hp_text_id = self.canvas.create_text((bar_left + bar_right)/2, (bar_top + bar_bottom)/2, text=text, fill=txt_color, font=("Arial", font_size))
+                created = True
             else:
-                rect_id, text_id, hp_bg_id, hp_fg_id, hp_text_id = self.piece_items[key]
-                self.canvas.coords(rect_id, left, top, right, bottom)
-                symbol = PIECE_UNICODE.get((pc.get('type'), pc.get('color')), '?')
-                self.canvas.coords(text_id, left+cell/2, top+cell/2)
-                self.canvas.itemconfig(rect_id, fill=color, outline=color)
-                self.canvas.itemconfig(text_id, text=symbol)
-                # update hp bar positions and size
-                hp = pc.get('hp', 1)
-                max_hp = pc.get('max_hp', 1)
-                bar_w = cell * 0.7
-                bar_h = max(4, int(cell * 0.12))
-                bar_left = left + (cell - bar_w)/2
-                bar_top = bottom - bar_h - 4
-                bar_right = bar_left + bar_w
-                bar_bottom = bar_top + bar_h
-                self.canvas.coords(hp_bg_id, bar_left, bar_top, bar_right, bar_bottom)
-                ratio = max(0.0, min(1.0, hp / max_hp)) if max_hp > 0 else 0.0
-                fg_right = bar_left + bar_w * ratio
-                if ratio > 0.5:
-                    fg_color = "#06d6a0"
-                elif ratio > 0.2:
-                    fg_color = "#ffd166"
-                else:
-                    fg_color = "#ef476f"
+                hp_fg_id, hp_text_id, _ = item
                 self.canvas.coords(hp_fg_id, bar_left, bar_top, fg_right, bar_bottom)
                 self.canvas.itemconfig(hp_fg_id, fill=fg_color, outline=fg_color)
-                # update hp text and position
-                try:
-                    txt_color = "#000000" if ratio > 0.5 else "#FFFFFF"
-                    font_size = max(6, int(bar_h * 0.9))
-                    self.canvas.coords(hp_text_id, bar_left + bar_w/2, bar_top + bar_h/2)
-                    self.canvas.itemconfig(hp_text_id, text=f"{hp}/{max_hp}", fill=txt_color, font=("Arial", font_size))
-                except Exception:
-                    pass
-        # remove any stale piece items
-        for stale in (existing - seen):
-            rect_id, text_id, hp_bg_id, hp_fg_id, hp_text_id = self.piece_items.pop(stale)
-            try:
-                self.canvas.delete(rect_id)
-                self.canvas.delete(text_id)
-                self.canvas.delete(hp_bg_id)
-                self.canvas.delete(hp_fg_id)
-                self.canvas.delete(hp_text_id)
-            except Exception:
-                pass
+                if hp_text_id is not None:
+                    self.canvas.itemconfig(hp_text_id, text=text, fill=txt_color)
+            self.piece_items[key] = (hp_fg_id, hp_text_id, value)
 
         # Draw paddles with rounded style
-        for i in range(2):
-            pd = paddles_d[i]
-            px = pd.get("x", w/2)
-            py = pd.get("y", 0 if i==0 else h)
-            pw = pd.get("width", 120)
-            ph = pd.get("height", 12)
-            color = pd.get("color", "#FFFFFF")
-            left = px - pw/2
-            top = py - ph/2
-            right = px + pw/2
-            bottom = py + ph/2
-            outline_color = "#f8f8f2" if i == 0 else "#282a36"
+        for i, paddle in enumerate(plan.paddles):
+            if paddle == self.shown_paddles[i]:
+                continue
+            left, top, right, bottom, color, outline_color = paddle
             if self.paddle_ids[i] is None:
                 self.paddle_ids[i] = self.canvas.create_rectangle(left, top, right, bottom, fill=color, outline=outline_color, width=3)
+                created = True
             else:
                 self.canvas.coords(self.paddle_ids[i], left, top, right, bottom)
                 self.canvas.itemconfig(self.paddle_ids[i], fill=color, outline=outline_color)
+            self.shown_paddles[i] = paddle
 
         # Draw ball with glow effect
-        bx_ball = ball_d.get("x", w/2)
-        by_ball = ball_d.get("y", h/2)
-        r = ball_d.get("radius", 8)
-        # highlight ball when special shot is ready/active
-        is_special_active = bool(ball_d.get("special_active", False))
-        is_special_ready = bool(ball_d.get("special_ready", False))
-        base_color = ball_d.get("color", "#FFFFFF")
-        if is_special_active:
-            color = "#ffb703"
-            glow_color = "#fb8500"
-        elif is_special_ready:
-            color = "#ffd166"
-            glow_color = "#f77f00"
+        if plan.ball != self.shown_ball:
+            left, top, right, bottom, color, glow_color = plan.ball
+            if self.ball_id is None:
+                self.ball_id = self.canvas.create_oval(left, top, right, bottom, fill=color, outline=glow_color, width=3)
+                created = True
+            else:
+                self.canvas.coords(self.ball_id, left, top, right, bottom)
+                self.canvas.itemconfig(self.ball_id, fill=color, outline=glow_color)
+            self.shown_ball = plan.ball
+
+        if plan.extra_balls != self.shown_extra_balls:
+            created = self._draw_extra_balls(plan.extra_balls) or created
+            self.shown_extra_balls = plan.extra_balls
+
+        # Ensure paddles and ball are on top of pieces/board; only new items can end up below
+        if rebuilt or created:
+            try:
+                for eid in self.extra_ball_ids:
+                    self.canvas.tag_raise(eid)
+                if self.ball_id is not None:
+                    self.canvas.tag_raise(self.ball_id)
+                for pid in self.paddle_ids:
+                    if pid is not None:
+                        self.canvas.tag_raise(pid)
+                if self.hud_id is not None:
+                    self.canvas.tag_raise(self.hud_id)
+            except Exception:
+                pass
+
+    def _draw_power(self, power, w):
+        x0, y0, x1, y1, fg_w, fg_color, glow_col, label, text_color = power
+        # background
+        if self.power_bg_id is None:
+            self.power_bg_id = self.canvas.create_rectangle(x0, y0, x1, y1, fill="#0d1b2a", outline="#415a77", width=2)
         else:
-            color = base_color
-            glow_color = "#ff6b6b"
-        left = bx_ball - r
-        top = by_ball - r
-        right = bx_ball + r
-        bottom = by_ball + r
-        if self.ball_id is None:
-            self.ball_id = self.canvas.create_oval(left, top, right, bottom, fill=color, outline=glow_color, width=3)
+            self.canvas.coords(self.power_bg_id, x0, y0, x1, y1)
+        if self.power_fg_id is None:
+            self.power_fg_id = self.canvas.create_rectangle(x0, y0, x0 + fg_w, y1, fill=fg_color, outline=fg_color)
         else:
-            self.canvas.coords(self.ball_id, left, top, right, bottom)
-            self.canvas.itemconfig(self.ball_id, fill=color, outline=glow_color)
+            self.canvas.coords(self.power_fg_id, x0, y0, x0 + fg_w, y1)
+            self.canvas.itemconfig(self.power_fg_id, fill=fg_color, outline=fg_color)
+        # glow when ready or active
+        if glow_col is not None and self.power_glow_id is None:
+            self.power_glow_id = self.canvas.create_rectangle(x0 - 6, y0 - 4, x1 + 6, y1 + 4, outline=glow_col, width=2, dash=(4,2))
+        elif glow_col is not None:
+            self.canvas.coords(self.power_glow_id, x0 - 6, y0 - 4, x1 + 6, y1 + 4)
+            self.canvas.itemconfig(self.power_glow_id, outline=glow_col)
+        elif self.power_glow_id is not None:
+            self._delete_items((self.power_glow_id,))
+            self.power_glow_id = None
+        # text label
+        if self.power_text_id is None:
+            self.power_text_id = self.canvas.create_text(w/2, (y0 + y1)/2, text=label, fill=text_color, font=("Helvetica", 10, "bold"))
+        else:
+            self.canvas.coords(self.power_text_id, w/2, (y0 + y1)/2)
+            self.canvas.itemconfig(self.power_text_id, text=label, fill=text_color)
 
-        # Ensure paddles and ball are on top of pieces/board: raise their canvas items
-        try:
-            if self.ball_id is not None:
-                self.canvas.tag_raise(self.ball_id)
-            for pid in self.paddle_ids:
-                if pid is not None:
-                    self.canvas.tag_raise(pid)
-        except Exception:
-            pass
-
-        # Draw scores (top-right and bottom-right with new style)
-        top_score = scores[0]
-        bottom_score = scores[1]
-            # Scores are hidden by design; remove any existing score text items
-        for i in range(2):
-            if self.score_text_ids[i] is not None:
-                try:
-                    self.canvas.delete(self.score_text_ids[i])
-                except Exception:
-                    pass
-                self.score_text_ids[i] = None
+    def _draw_extra_balls(self, balls):
+        """Extra balls (multi-ball), reusing the ovals of the last frame; True when ovals were created."""
+        created = False
+        for k, (left, top, right, bottom, color, glow_color) in enumerate(balls):
+            if k < len(self.extra_ball_ids):
+                eid = self.extra_ball_ids[k]
+                self.canvas.coords(eid, left, top, right, bottom)
+                self.canvas.itemconfig(eid, fill=color, outline=glow_color)
+            else:
+                self.extra_ball_ids.append(self.canvas.create_oval(left, top, right, bottom, fill=color, outline=glow_color, width=2))
+                created = True
+        # balls gone since the last frame (new game)
+        count = len(balls)
+        if len(self.extra_ball_ids) > count:
+            self._delete_items(self.extra_ball_ids[count:])
+            del self.extra_ball_ids[count:]
+        return created
+
+    def _delete_items(self, ids):
+        for item_id in ids:
+            if item_id is None:
+                continue
+            try:
+                self.canvas.delete(item_id)
+            except Exception:
+                pass
+
+    def _clear_hp_items(self):
+        for hp_fg_id, hp_text_id, _ in self.piece_items.values():
+            self._delete_items((hp_fg_id, hp_text_id))
+        self.piece_items = {}
+
+    def _build_static_layer(self, layout, cells):
+        """Rasterize board background, dashed grid, piece cells and HP bar backgrounds into one PhotoImage.
+
+        Tk's PhotoImage cannot rasterize text without PIL, so the piece glyphs
+        are plain text items created here and never touched per frame.
+        """
+        w, h, bx, by, bw, bh, cols, rows, cell, has_board = layout
+        img = tk.PhotoImage(width=int(w), height=int(h))
+
+        if has_board:
+            _fill(img, w, h, BOARD_BG, bx, by, bx+bw, by+bh)
+            # dashed grid lines (4 on / 2 off); the gaps are board background,
+            # so each line is a single row/column of pixel data
+            x0 = max(0, int(round(bx))); y0 = max(0, int(round(by)))
+            line_w = min(int(w), int(round(bx+bw))) - x0
+            line_h = min(int(h), int(round(by+bh))) - y0
+            if line_w > 0 and line_h > 0:
+                dash_h = " ".join(GRID_COLOR if i % 6 < 4 else BOARD_BG for i in range(line_w))
+                dash_v = " ".join("{%s}" % (GRID_COLOR if i % 6 < 4 else BOARD_BG) for i in range(line_h))
+                for c in range(1, cols):
+                    x = int(round(bx + c*cell))
+                    if 0 <= x < w:
+                        img.put(dash_v, to=(x, y0))
+                for r in range(1, rows):
+                    y = int(round(by + r*cell))
+                    if 0 <= y < h:
+                        img.put("{%s}" % dash_h, to=(x0, y))
+            _frame(img, w, h, GRID_COLOR, bx - 1, by - 1, bx+bw + 2, by+bh + 2, 3)
+
+        # piece cells: solid block with a dark outline, and the empty HP bar
+        for _, _, left, top, color, _, _, _, (bar_left, bar_top, bar_right, bar_bottom) in cells:
+            _fill(img, w, h, color, left+2, top+2, left+cell-2, top+cell-2)
+            _frame(img, w, h, "#1d3557", left+1, top+1, left+cell-1, top+cell-1, 2)
+            _fill(img, w, h, "#2b2d42", bar_left, bar_top, bar_right, bar_bottom)
+            _frame(img, w, h, "#8d99ae", bar_left, bar_top, bar_right, bar_bottom, 1)
+
+        if self.static_id is None:
+            self.static_id = self.canvas.create_image(0, 0, image=img, anchor=tk.NW)
+        else:
+            self.canvas.itemconfig(self.static_id, image=img)
+        # keep a reference, Tk does not own the image
+        self.static_image = img
+        self.canvas.tag_lower(self.static_id)
+
+        # unicode symbols, centered in their cell
+        self._delete_items(self.glyph_ids.values())
+        self.glyph_ids = {}
+        font = ("Helvetica", max(8, int(cell*0.55)), "bold")
+        for col, row, left, top, _, symbol, _, text_color, _ in cells:
+            gid = self.canvas.create_text(left+cell/2, top+cell/2, text=symbol, fill=text_color, font=font)
+            self.canvas.tag_raise(gid, self.static_id)
+            self.glyph_ids[(col, row)] = gid
+
+    def _erase_pieces(self, layout, cells):
+        """Paint destroyed pieces' cells back to board background and drop their glyphs.
 
+        The grid lines lie on the cell borders, outside the area a piece covers,
+        so they survive the erase.
+        """
+        w, h, cell = layout[0], layout[1], layout[8]
+        for col, row, left, top in cells:
+            _fill(self.static_image, w, h, BOARD_BG, left+1, top+1, left+cell-1, top+cell-1)
+            gid = self.glyph_ids.pop((col, row), None)
+            self._delete_items((gid,))
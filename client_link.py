@@ -0,0 +1,306 @@
+# client_link.py
+"""Per-client outbound path with its own congestion control.
+
+The game loop never writes to a client socket itself. Each connection has
+a `ClientLink` with a sender thread: room events queue up in order (they
+are never dropped), while a state frame only replaces the previous one if
+that one has not been written yet. A client whose link is slow falls
+behind on its own; the room keeps its tick rate.
+
+Each link adapts two knobs from what it measures:
+
+- send interval: one state out of `interval` ticks. It doubles when the
+  link is congested and drops by one after each second without congestion.
+- detail: FULL sends every state whole. LITE leaves `pieces` out when
+  the client already has them, and sends HP-only changes at most every
+  HP_REFRESH seconds; a piece appearing, disappearing or moving is always
+  sent. LITE is only used for clients that said (in their `pong`) that
+  they keep the last pieces when a state has none.
+
+What the client has is the piece list of the last FULL state the sender
+thread wrote over TCP; a FULL still queued or being written, or sent as a
+UDP datagram that may be lost, does not count. While a FULL is waiting or
+being written every state is FULL, so a LITE never replaces it.
+
+The link counts as congested when a state frame is still waiting or being
+written when the next one comes, when the kernel send queue holds more than
+two state frames (and at least OUTQ_HIGH bytes), or when the smoothed RTT
+of the ping/pong probes is more than QUEUE_DELAY_HIGH above the lowest RTT
+seen (the excess is time spent in queues, not distance).
+
+The RTT figures (smoothed, minimum, maximum, jitter) and the clock offset
+and RTT the client estimated on its side (clock_sync.py, sent back in its
+pongs) are kept for /health.
+"""
+import struct
+import threading
+import time
+from collections import deque
+
+from protocol import encode
+
+try:
+    import fcntl
+    import termios
+    _TIOCOUTQ = termios.TIOCOUTQ  # same request as SIOCOUTQ for sockets (Linux)
+except (ImportError, AttributeError):
+    _TIOCOUTQ = None
+
+FULL = "full"
+LITE = "lite"
+MAX_INTERVAL = 6
+OUTQ_HIGH = 32 * 1024
+QUEUE_DELAY_HIGH = 0.1
+# a second of clean sends before stepping back toward full rate
+RECOVER_AFTER = 1.0
+# at most one interval increase per this many seconds (or per RTT if longer)
+MIN_REACT = 0.2
+HP_REFRESH = 0.5
+PING_INTERVAL = 1.0
+# capability a client lists in its pong when it keeps pieces between states
+KEEP_PIECES = "keep_pieces"
+
+
+def pieces_key(pieces):
+    """What the client must redraw when it changes: which piece is where, HP left out."""
+    return tuple((p['col'], p['row'], p['type'], p['color']) for p in pieces)
+
+
+def socket_backlog(sock):
+    """Bytes still in the kernel send queue of `sock`, or None where it can't be read."""
+    if _TIOCOUTQ is None:
+        return None
+    try:
+        return struct.unpack('i', fcntl.ioctl(sock.fileno(), _TIOCOUTQ, b'\0\0\0\0'))[0]
+    except (OSError, ValueError):
+        return None
+
+
+class ClientLink:
+    def __init__(self, conn, player, send_lock, on_error=None):
+        self.conn = conn
+        self.player = player
+        self.send_lock = send_lock
+        # called from the sender thread when a write fails
+        self.on_error = on_error
+        self.cond = threading.Condition()
+        self.events = deque()
+        self.state_frame = None
+        # piece list of the waiting state frame when it is a FULL one
+        self.state_pieces = None
+        self.full_in_flight = False
+        self.busy = False
+        self.closing = False
+        # congestion signals since the last adaptation
+        self.pressure = 0
+        self.interval = 1
+        self.detail = FULL
+        self.keeps_pieces = False
+        self.ticks = 0
+        self.last_change = 0.0
+        self.good_since = time.monotonic()
+        self.backlog = None
+        self.frame_bytes = 0
+        # RTT from ping/pong (seconds)
+        self.srtt = None
+        self.min_rtt = None
+        self.max_rtt = None
+        self.rttvar = None
+        self.rtt_samples = 0
+        # the client's own estimate of the server clock (seconds)
+        self.client_offset = None
+        self.client_rtt = None
+        self.last_ping = 0.0
+        # (piece list, pieces_key, monotonic time) of the last FULL written over TCP
+        self.delivered = None
+        self.frames = 0
+        self.bytes = 0
+        self.superseded = 0
+        self.congestion = 0
+        self.thread = threading.Thread(target=self._run, name=f"send-p{player}", daemon=True)
+        self.thread.start()
+
+    # -- game loop side -----------------------------------------------------
+
+    def plan(self, state, now, force=False, floor=1):
+        """Variant of this tick's state for the client (FULL/LITE), or None to skip it.
+
+        `floor` is the room's own minimum interval (load shedding).
+        """
+        self._adapt(now)
+        self.ticks += 1
+        if not force and self.ticks % max(self.interval, floor):
+            return None
+        pieces = state.get('pieces')
+        if self.detail == LITE and self.keeps_pieces and pieces is not None and not force:
+            if self._client_has(pieces, now):
+                return LITE
+        return FULL
+
+    def _client_has(self, pieces, now):
+        with self.cond:
+            if self.state_pieces is not None or self.full_in_flight or self.delivered is None:
+                return False
+            ref, key, at = self.delivered
+        return pieces is ref or (now - at < HP_REFRESH and pieces_key(pieces) == key)
+
+    def udp_ok(self, variant):
+        """Whether a state of this variant may go as a UDP datagram.
+
+        Once the link sends LITE states, a FULL one sets the pieces the next
+        LITE ones rely on, so it has to go over TCP.
+        """
+        return variant == LITE or self.detail == FULL or not self.keeps_pieces
+
+    def ping_due(self, now):
+        if now - self.last_ping < PING_INTERVAL:
+            return None
+        self.last_ping = now
+        return encode({"type": "ping", "t": time.perf_counter()})
+
+    def push(self, event_frames=(), state_frame=None, pieces=None):
+        """Queue frames for the sender thread; never blocks on the socket.
+
+        `pieces` is the piece list of `state_frame` when it is a FULL state.
+        """
+        with self.cond:
+            if self.closing:
+                return
+            if state_frame is not None:
+                if self.state_frame is not None:
+                    # the previous state never left: the client is behind
+                    self.superseded += 1
+                    self.pressure += 1
+                elif self.busy:
+                    self.pressure += 1
+                self.state_frame = state_frame
+                self.state_pieces = pieces
+                self.frame_bytes = len(state_frame)
+            self.events.extend(event_frames)
+            self.cond.notify()
+
+    def _adapt(self, now):
+        pressure, self.pressure = self.pressure, 0
+        self.backlog = socket_backlog(self.conn)
+        queued = self.srtt is not None and self.srtt - self.min_rtt > QUEUE_DELAY_HIGH
+        # one large frame still being read is normal; two or more queued is not
+        backlogged = self.backlog is not None and self.backlog > max(OUTQ_HIGH, 2 * self.frame_bytes)
+        if pressure or queued or backlogged:
+            if now - self.last_change >= max(MIN_REACT, self.srtt or 0.0) and self.interval < MAX_INTERVAL:
+                self.interval = min(MAX_INTERVAL, self.interval * 2)
+                self.last_change = now
+                self.congestion += 1
+            self.detail = LITE
+            self.good_since = now
+        elif now - self.good_since >= RECOVER_AFTER:
+            if self.interval > 1:
+                self.interval -= 1
+            else:
+                self.detail = FULL
+            self.good_since = now
+
+    # -- receiver side --------------------------------------------------------
+
+    def on_pong(self, msg):
+        """RTT sample from the client's answer to one of our pings."""
+        sent = msg.get("t")
+        if not isinstance(sent, (int, float)):
+            return
+        sample = time.perf_counter() - sent
+        if sample < 0:
+            return
+        if self.srtt is None:
+            self.srtt, self.rttvar = sample, sample / 2
+        else:
+            self.rttvar += 0.25 * (abs(self.srtt - sample) - self.rttvar)
+            self.srtt += 0.125 * (sample - self.srtt)
+        self.min_rtt = sample if self.min_rtt is None else min(self.min_rtt, sample)
+        self.max_rtt = sample if self.max_rtt is None else max(self.max_rtt, sample)
+        self.rtt_samples += 1
+        clock = msg.get("clock")
+        if isinstance(clock, dict):
+            offset, rtt = clock.get("offset"), clock.get("rtt")
+            self.client_offset = offset if isinstance(offset, (int, float)) else None
+            self.client_rtt = rtt if isinstance(rtt, (int, float)) else None
+        caps = msg.get("caps")
+        self.keeps_pieces = isinstance(caps, list) and KEEP_PIECES in caps
+
+    # -- sender thread ----------------------------------------------------------
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.events and self.state_frame is None and not self.closing:
+                    self.cond.wait()
+                if not self.events and self.state_frame is None:
+                    return
+                frames = list(self.events)
+                self.events.clear()
+                pieces = self.state_pieces
+                if self.state_frame is not None:
+                    frames.append(self.state_frame)
+                    self.state_frame = None
+                    self.state_pieces = None
+                self.full_in_flight = pieces is not None
+                self.busy = True
+            data = frames[0] if len(frames) == 1 else b"".join(frames)
+            try:
+                with self.send_lock:
+                    self.conn.sendall(data)
+            except OSError:
+                with self.cond:
+                    self.closing = True
+                    self.busy = False
+                    self.full_in_flight = False
+                    self.events.clear()
+                    self.cond.notify_all()
+                if self.on_error is not None:
+                    self.on_error(self.conn, self.player)
+                return
+            delivered = (pieces, pieces_key(pieces), time.monotonic()) if pieces is not None else None
+            with self.cond:
+                if delivered is not None:
+                    self.delivered = delivered
+                self.full_in_flight = False
+                self.busy = False
+                self.frames += len(frames)
+                self.bytes += len(data)
+                self.cond.notify_all()
+
+    def close(self, flush=False, timeout=1.0):
+        """Stop the sender; with `flush`, first wait (up to `timeout`) for queued frames to go out."""
+        with self.cond:
+            if flush:
+                deadline = time.monotonic() + timeout
+                while (self.events or self.state_frame is not None or self.busy) and not self.closing:
+                    left = deadline - time.monotonic()
+                    if left <= 0:
+                        break
+                    self.cond.wait(left)
+            else:
+                self.events.clear()
+                self.state_frame = None
+                self.state_pieces = None
+            self.closing = True
+            self.cond.notify_all()
+        if threading.current_thread() is not self.thread:
+            self.thread.join(timeout)
+
+    def snapshot(self):
+        ms = lambda v: round(v * 1000, 1) if v is not None else None
+        return {
+            "rtt_ms": ms(self.srtt),
+            "min_rtt_ms": ms(self.min_rtt),
+            "max_rtt_ms": ms(self.max_rtt),
+            "jitter_ms": ms(self.rttvar),
+            "rtt_samples": self.rtt_samples,
+            "client_offset_ms": ms(self.client_offset),
+            "client_rtt_ms": ms(self.client_rtt),
+            "interval": self.interval,
+            "detail": self.detail,
+            "backlog": self.backlog,
+            "frames": self.frames,
+            "bytes": self.bytes,
+            "superseded": self.superseded,
+            "congestion": self.congestion,
+        }
@@ -0,0 +1,122 @@
+# clock_sync.py
+"""NTP-style estimate of the server clock, over the TCP ping/pong.
+
+The client sends `{"type": "ping", "t": t0}` with its wall clock. The
+server answers `{"type": "pong", "t": t0, "rx": t1, "tx": t2}`, where t1
+and t2 are its own wall clock when the ping was read and when the pong
+was written. Once the pong arrives at t3:
+
+    delay  = (t3 - t0) - (t2 - t1)           round trip, server time excluded
+    offset = ((t1 - t0) + (t2 - t3)) / 2     server clock - client clock
+
+The offset is exact when both directions take the same time; the error
+is at most delay / 2. So, as in NTP's clock filter, the estimate is the
+offset of the sample with the lowest delay among the last SAMPLES, and
+samples that waited in a queue (delay well above that minimum) are only
+counted as outliers. `ClockSync` probes in a quick burst after
+connecting, then every `interval` seconds.
+
+State messages carry the server's `timestamp: time.time()`;
+`server_time()` and `to_local()` map between the two clocks.
+"""
+import time
+from collections import deque
+
+# samples kept for the filter (about 8 s at the default interval)
+SAMPLES = 8
+# probes sent BURST_INTERVAL apart right after connecting
+BURST = 5
+BURST_INTERVAL = 0.1
+# a sample slower than min delay * OUTLIER_FACTOR + OUTLIER_SLACK is an outlier
+OUTLIER_FACTOR = 2.0
+OUTLIER_SLACK = 0.005
+
+
+def pong(msg, received_at):
+    """Server answer to a client `ping` read at `received_at` (wall clock)."""
+    return {"type": "pong", "t": msg.get("t"), "rx": received_at, "tx": time.time()}
+
+
+class ClockSync:
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.samples = deque(maxlen=SAMPLES)  # (delay, offset)
+        self.offset = None
+        self.rtt = None
+        self.srtt = None
+        self.jitter = None
+        self.outliers = 0
+        self.accepted = 0
+        self.last_probe = 0.0
+
+    def reset(self):
+        """Forget the samples (new connection): the next probes are a burst again."""
+        self.samples.clear()
+        self.accepted = 0
+        self.last_probe = 0.0
+
+    def probe_due(self, now=None):
+        """Ping message to send now, or None."""
+        now = time.time() if now is None else now
+        wait = BURST_INTERVAL if self.accepted < BURST else self.interval
+        if now - self.last_probe < wait:
+            return None
+        self.last_probe = now
+        return {"type": "ping", "t": now}
+
+    def on_pong(self, msg, now=None):
+        """Feed a server pong; returns False when it can't be used."""
+        t3 = time.time() if now is None else now
+        t0, t1, t2 = msg.get("t"), msg.get("rx"), msg.get("tx")
+        if not all(isinstance(v, (int, float)) for v in (t0, t1, t2)):
+            return False
+        delay = (t3 - t0) - (t2 - t1)
+        if delay < 0:
+            # clock stepped between send and receive
+            return False
+        offset = ((t1 - t0) + (t2 - t3)) / 2
+        best = min(self.samples)[0] if self.samples else None
+        self.samples.append((delay, offset))
+        self.srtt = delay if self.srtt is None else self.srtt + 0.125 * (delay - self.srtt)
+        if best is not None and delay > best * OUTLIER_FACTOR + OUTLIER_SLACK:
+            self.outliers += 1
+            return True
+        self.accepted += 1
+        prev = self.offset
+        self.rtt, self.offset = min(self.samples)
+        if prev is not None:
+            change = abs(self.offset - prev)
+            self.jitter = change if self.jitter is None else self.jitter + 0.25 * (change - self.jitter)
+        return True
+
+    @property
+    def synced(self):
+        return self.offset is not None
+
+    def server_time(self, now=None):
+        """Current server wall clock estimate (local clock when not synced yet)."""
+        now = time.time() if now is None else now
+        return now + (self.offset or 0.0)
+
+    def to_local(self, server_ts):
+        """Local wall-clock time of a server timestamp."""
+        return server_ts - (self.offset or 0.0)
+
+    def latency(self, server_ts, now=None):
+        """How long ago (seconds) the server produced something stamped `server_ts`."""
+        return self.server_time(now) - server_ts
+
+    def report(self):
+        """Estimate in the form the client sends back in its pongs (seconds)."""
+        return {"offset": self.offset, "rtt": self.rtt}
+
+    def snapshot(self):
+        ms = lambda v: round(v * 1000, 2) if v is not None else None
+        return {
+            "offset_ms": ms(self.offset),
+            "rtt_ms": ms(self.rtt),
+            "srtt_ms": ms(self.srtt),
+            "jitter_ms": ms(self.jitter),
+            "samples": len(self.samples),
+            "outliers": self.outliers,
+        }
@@ -1,6 +1,6 @@
 # entities package
-__all__ = ["Ball", "Paddle"]
+__all__ = ["BallSet", "BallView", "Paddle"]
 
 from .paddle import Paddle
-from .ball import Ball
+from .balls import BallSet, BallView
 
@@ -0,0 +1,163 @@
+# entities/balls.py
+"""Every ball of a match, stored column-wise in `array('d')` buffers.
+
+Ball i is (x[i], y[i], dx[i], dy[i], radius[i], ...). The simulation walks
+the columns once per phase (move, walls, pieces, paddles) for all balls
+instead of going through one object per ball. Per-ball special state lives
+in the same layout: `piercing[i]` and `remaining[i]` (damage left for a
+piercing shot), and `paddle_hit[2*i + p]` (last hit on paddle p, for the
+per-ball cooldown).
+
+`BallView` exposes one index as a ball object (position, velocity, colour,
+special flags, `reset`/`update`/`to_dict`), for the code that handles a
+single ball (trajectory choice, AI prediction,
+snapshots). Ball 0 is the match's primary ball and is never removed.
+"""
+import math
+import random
+from array import array
+
+
+class BallSet:
+    def __init__(self):
+        self.x = array('d')
+        self.y = array('d')
+        self.dx = array('d')
+        self.dy = array('d')
+        self.radius = array('d')
+        self.speed = array('d')
+        self.piercing = array('b')
+        self.remaining = array('i')
+        self.paddle_hit = array('d')
+        self.colors = []
+        # the power bar is shared: when it is full, every ball shows it
+        self.special_ready = False
+
+    def __len__(self):
+        return len(self.x)
+
+    def add(self, x, y, dx, dy, radius, speed, color):
+        """Append a ball; returns its index."""
+        self.x.append(x)
+        self.y.append(y)
+        self.dx.append(dx)
+        self.dy.append(dy)
+        self.radius.append(radius)
+        self.speed.append(speed)
+        self.piercing.append(0)
+        self.remaining.append(0)
+        self.paddle_hit.extend((0.0, 0.0))
+        self.colors.append(color)
+        return len(self.x) - 1
+
+    def spawn(self, x, y, radius, speed, color, direction_down=True):
+        """Append a ball with a random, mostly vertical velocity."""
+        ang = random.uniform(-math.pi/4, math.pi/4)
+        dx = speed * math.sin(ang)
+        dy = speed * (1 if direction_down else -1) * math.cos(ang)
+        return self.add(x, y, dx, dy, radius, speed, color)
+
+    def view(self, i):
+        return BallView(self, i)
+
+    def step(self, dt):
+        """Advance every ball by its velocity."""
+        x, y, dx, dy = self.x, self.y, self.dx, self.dy
+        for i in range(len(x)):
+            x[i] += dx[i] * dt
+            y[i] += dy[i] * dt
+
+    def clear_special(self):
+        for i in range(len(self.piercing)):
+            self.piercing[i] = 0
+            self.remaining[i] = 0
+        self.special_ready = False
+
+    def to_columns(self, digits=1):
+        """Compact per-column lists for the network state (positions rounded)."""
+        return {
+            "x": [round(v, digits) for v in self.x],
+            "y": [round(v, digits) for v in self.y],
+            "radius": list(self.radius),
+            "active": list(self.piercing),
+        }
+
+
+def _column(name):
+    def get(self):
+        return getattr(self.balls, name)[self.i]
+
+    def set(self, value):
+        getattr(self.balls, name)[self.i] = value
+    return property(get, set)
+
+
+class BallView:
+    """One ball of a `BallSet`, read and written through its columns."""
+
+    __slots__ = ('balls', 'i')
+
+    x = _column('x')
+    y = _column('y')
+    dx = _column('dx')
+    dy = _column('dy')
+    radius = _column('radius')
+    speed = _column('speed')
+
+    def __init__(self, balls, i):
+        self.balls = balls
+        self.i = i
+
+    @property
+    def color(self):
+        return self.balls.colors[self.i]
+
+    @color.setter
+    def color(self, value):
+        self.balls.colors[self.i] = value
+
+    @property
+    def special_ready(self):
+        return self.balls.special_ready
+
+    @special_ready.setter
+    def special_ready(self, value):
+        self.balls.special_ready = bool(value)
+
+    @property
+    def special_active(self):
+        return bool(self.balls.piercing[self.i])
+
+    @special_active.setter
+    def special_active(self, value):
+        self.balls.piercing[self.i] = 1 if value else 0
+
+    def reset(self, x, y, speed=None, direction_down=True):
+        if speed is not None:
+            self.speed = speed
+        self.x = x
+        self.y = y
+        ang = random.uniform(-math.pi/4, math.pi/4)
+        self.dx = self.speed * math.sin(ang)
+        self.dy = self.speed * (1 if direction_down else -1) * math.cos(ang)
+        # reset special flags when ball respawns
+        self.special_ready = False
+        self.special_active = False
+        self.balls.remaining[self.i] = 0
+
+    def update(self, dt):
+        self.x += self.dx * dt
+        self.y += self.dy * dt
+
+    def to_dict(self):
+        return {
+            "x": self.x,
+            "y": self.y,
+            "dx": self.dx,
+            "dy": self.dy,
+            "radius": self.radius,
+            "color": self.color,
+            "speed": self.speed,
+            "special_ready": self.special_ready,
+            "special_active": self.special_active
+        }
@@ -1,12 +1,18 @@
 # game.py
 import time
 import math
+import random
 import logging
 import os
 import json
+from types import SimpleNamespace
 import requests
-from entities.ball import Ball
+from entities.balls import BallSet
 from entities.paddle import Paddle
+from history import SnapshotHistory
+from layout import COLS, ROWS, board_geometry, compile_layout, generate_layout, major_row, ranks_per_side  # noqa: F401
+import match_events as ev
+from power_config import DEFAULT_POWER_CONFIG, get_store, validate_power_config
 
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s %(levelname)s: %(message)s')
@@ -15,18 +21,80 @@ logger = logging.getLogger(__name__)
 # REST API configuration
 API_BASE_URL = os.environ.get('VIE_API_URL', 'http://localhost:8080/vie-webservice/api/vies')
 
-# Chessboard-style board: 8x8 cells. Pieces occupy full cells (no gaps).
-# Paddles sit just outside the pawn rows (between pawns and center area).
-COLS = 8
-ROWS = 8
+# Board layouts (geometry, paddles, starting pieces) are compiled and cached
+# in layout.py; the classic board is COLS x ROWS = 8x8.
+# EXTRA_DIMENSIONS bounds: "N" (legacy 2/4/6/8 -> N columns x 8 rows, other
+# values -> N x N) or "NxM" (N columns x M rows)
+MIN_COLS = 2
+MIN_ROWS = 6
+MAX_DIM = 64
+# Multi-ball: at most PONG_BALLS balls per match (1 = classic game). Extra
+# balls split off the ball that starts a special shot and, when
+# PONG_BALL_SPAWN > 0, are launched from the centre every that many seconds.
+EXTRA_BALL_COLOR = "#8be9fd"
 HIT_COOLDOWN = 0.12  # seconds during which a piece won't take another hit
-# Power-up configuration defaults (overridable via power_config.json)
+# Lag-compensated paddle hits: ticks of ball/paddle history kept, and how far
+# back a paddle contact may be rewound (to the tick the client acknowledged)
+HISTORY_TICKS = 64
+MAX_REWIND_TICKS = 6
+# Power-up configuration (defaults in power_config.DEFAULT_POWER_CONFIG,
+# overridable via power_config.json, cached in memory by the config store)
 POWER_CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'power_config.json')
-DEFAULT_POWER_CONFIG = {
-    "charge_max": 10,          # hits required to charge the special shot
-    "charge_per_hit": 1,       # charge gained per HP removed
-    "special_damage": 3        # HP removed by the empowered hit
-}
+# per-game state files are created next to this module from the template
+STATE_DIR = os.path.dirname(__file__)
+TEMPLATE_PATH = os.path.join(STATE_DIR, 'db_template.json')
+# piece HP when the REST API can't be reached
+DEFAULT_HP_MAP = {'P': 2, 'N': 4, 'R': 5, 'B': 5, 'Q': 8, 'K': 10}
+
+
+def parse_dimensions(raw):
+    """(cols, rows) for an EXTRA_DIMENSIONS value, or None if it is not valid."""
+    if raw is None:
+        return None
+    text = str(raw).strip().lower()
+    try:
+        if 'x' in text:
+            cols, rows = (int(v) for v in text.split('x', 1))
+        else:
+            cols = int(text)
+            rows = ROWS if cols in (2, 4, 6, 8) else cols
+    except ValueError:
+        return None
+    if not (MIN_COLS <= cols <= MAX_DIM and MIN_ROWS <= rows <= MAX_DIM):
+        return None
+    return cols, rows
+
+
+def board_dimensions():
+    """Board size requested through EXTRA_DIMENSIONS (COLS x ROWS by default)."""
+    return parse_dimensions(os.environ.get('EXTRA_DIMENSIONS')) or (COLS, ROWS)
+
+
+def ball_settings():
+    """(max balls per match, seconds between timed spawns) from the environment."""
+    try:
+        max_balls = max(1, int(os.environ.get('PONG_BALLS', '1')))
+    except ValueError:
+        max_balls = 1
+    try:
+        spawn_every = max(0.0, float(os.environ.get('PONG_BALL_SPAWN', '0')))
+    except ValueError:
+        spawn_every = 0.0
+    return max_balls, spawn_every
+
+
+def parse_hp_map(vies_data):
+    """HP map {piece type: HP} from the REST API's list (libelle "Name (X)")."""
+    hp_map = {}
+    for vie in vies_data:
+        libelle = vie.get('libelle', '')
+        # Extract piece type from parentheses
+        if '(' in libelle and ')' in libelle:
+            piece_type = libelle.split('(')[1].split(')')[0]
+            hp_map[piece_type] = vie.get('nombreVieInitiale', 1)
+        else:
+            logger.warning("Skipping invalid libelle format: '%s' (expected format: 'Name (X)')", libelle)
+    return hp_map
 
 
 class Game:
@@ -34,90 +102,9 @@ class Game:
     HEIGHT = 600
 
     def __init__(self):
-        # determine board dimensions: support optional reduced "dimensions"
-        # via environment variable EXTRA_DIMENSIONS (2,4,6,8). When set we
-        # reduce the number of columns to that value and use 4 rows so that
-        # layout becomes compact: majors row, pawns row, pawns row, majors row.
-        raw_dims = os.environ.get('EXTRA_DIMENSIONS')
-        try:
-            if raw_dims is not None:
-                dims = int(raw_dims)
-                if dims in (2, 4, 6, 8):
-                    # active columns used to place pieces (centered within 8 columns)
-                    self.active_cols = dims
-                else:
-                    self.active_cols = COLS
-            else:
-                self.active_cols = COLS
-        except Exception:
-            self.active_cols = COLS
-        # Board grid remains full 8x8 for spacing consistency
-        self.cols = COLS
-        self.rows = ROWS
-
-        # compute board geometry to fit inside WIDTH x HEIGHT with margins
-        margin = 20
-        board_w = self.WIDTH - margin * 2
-        board_h = self.HEIGHT - margin * 2
-        # base cell for the default 8x8 board -- keep this spacing for all dims
-        base_cell = min(board_w / COLS, board_h / ROWS)
-        # Use the base cell size (same spacing as 8x8) for every dimension so
-        # reduced columns keep the same grid spacing as dimension 8
-        cell_size = max(8, int(base_cell))
-        # board width follows number of active columns so reduced-dimensions
-        # produce a narrower board while keeping the same cell spacing
-        board_pixel_w = cell_size * self.active_cols
-        board_pixel_h = cell_size * ROWS
-        board_x0 = (self.WIDTH - board_pixel_w) / 2
-        board_y0 = (self.HEIGHT - board_pixel_h) / 2
-        self.board = {
-            "cols": self.active_cols,
-            "rows": ROWS,
-            "cell_size": cell_size,
-            "x": board_x0,
-            "y": board_y0,
-            "width": board_pixel_w,
-            "height": board_pixel_h,
-        }
-
-        # paddles: index 0 = top player, index 1 = bottom player
-        # place paddles just outside the pawn rows
-        # Adjust paddle size: for very reduced boards (2 cols) make paddles
-        # much smaller so the ball can pass easily. Also reduce the ball radius.
-        if self.active_cols == 2:
-            pad_w = max(int(cell_size * 0.9), int(cell_size))
-            pad_h = max(3, int(cell_size * 0.08))
-            ball_radius = max(3, int(cell_size * 0.10))
-        else:
-            pad_w = cell_size * 1.75
-            pad_h = cell_size * 0.25
-            ball_radius = max(6, int(cell_size * 0.2))
-        # top paddle: below row 1 (rows 0 and 1 belong to top player's pieces)
-        top_paddle_y = board_y0 + cell_size * 2 + pad_h/2 + 4
-        # bottom paddle: above the bottom pawn row (rows -2)
-        bottom_paddle_y = board_y0 + cell_size * (self.rows - 2) - pad_h/2 - 4
-        center_x = self.WIDTH / 2
-        self.paddles = [
-            Paddle(x=center_x, y=top_paddle_y, width=pad_w, height=pad_h, color="#bd93f9"),
-            Paddle(x=center_x, y=bottom_paddle_y, width=pad_w, height=pad_h, color="#f1fa8c")
-        ]
-        # ball placed at board center
-        self.ball = Ball(x=self.WIDTH/2, y=self.HEIGHT/2, radius=ball_radius, color="#ff79c6", speed=350)
-        # power-up: charging bar that empowers the next hit
-        self.power_config_path = POWER_CONFIG_PATH
-        self.power_config = self._load_power_config()
+        self._configure_board(paddle_colors=("#bd93f9", "#f1fa8c"), ball_color="#ff79c6")
+        self._init_state()
         self._reset_power_state(reload_config=False)
-        self.scores = [0, 0]  # index 0 = top player, index 1 = bottom player
-        self.last_update = time.time()
-        # pieces: will be loaded from JSON DB (no hard-coded data in code)
-        self.pieces = []
-        # db template path (original data that must NOT be overwritten)
-        self.template_path = os.path.join(os.path.dirname(__file__), 'db_template.json')
-        # current game state path (per-game file). We'll create a new game file at startup
-        self.state_dir = os.path.dirname(__file__)
-        self.db_path = None
-        # HP map will be set when loading from template/state
-        self.hp_map = {}
         # create a new per-game file from template and load it
         try:
             self._create_new_game_from_template()
@@ -135,105 +122,168 @@ class Game:
                     self._write_db()
                 except Exception:
                     pass
+        self._start_match_events()
+
+    @classmethod
+    def from_snapshot(cls, blob):
+        """Rebuild a game from `game_snapshot.dump_game()` output.
+
+        Goes through the same `_init_state()` as a new game, then the snapshot
+        fills in board, balls, paddles, power state, pieces and flags; neither
+        the REST API nor the game files are touched.
+        """
+        from game_snapshot import restore_game
+        game = cls.__new__(cls)
+        game._init_state()
+        restore_game(game, blob)
+        # the match goes on in the new events file of this process
+        game._start_match_events(resumed_tick=game.tick)
+        return game
+
+    def _init_state(self):
+        """Everything but the board, paddles and balls, at its new-match defaults."""
+        # power-up: charging bar that empowers the next hit
+        self.power_config_path = POWER_CONFIG_PATH
+        self.power_store = get_store(self.power_config_path)
+        self.power_config = self._load_power_config()
+        self.scores = [0, 0]  # index 0 = top player, index 1 = bottom player
+        self.last_update = time.time()
+        # simulation tick counter and time, and recent ball/paddle states
+        # (lag-compensated paddle hits)
+        self.tick = 0
+        self.sim_time = 0.0
+        self.history = SnapshotHistory(HISTORY_TICKS)
+        # last state tick acknowledged by each player (None = no rewind)
+        self.acked_ticks = [None, None]
+        # pieces: will be loaded from JSON DB (no hard-coded data in code);
+        # `cells` indexes them by (col, row) for the collision test
+        self.pieces = []
+        self.cells = {}
+        self._pieces_state = None
+        self._piece_px = {}
+        # db template path (original data that must NOT be overwritten)
+        self.template_path = TEMPLATE_PATH
+        # current game state path (per-game file). We'll create a new game file at startup
+        self.state_dir = STATE_DIR
+        self.db_path = None
+        # HP map will be set when loading from template/state
+        self.hp_map = {}
         # game over flag
         self.game_over = None
         # waiting_trajectory: True if player 1 (top) must choose ball trajectory
         # before the game starts moving the ball
         self.waiting_trajectory = True
         self.pending_trajectory = None  # will be set by player 1 (values: 'left', 'center', 'right')
+        # gameplay events for balance analysis (PONG_EVENTS_DIR), one file per match
+        self.events = ev.open_recorder()
+
+    def _configure_board(self, paddle_colors, ball_color):
+        """Board geometry, paddles and ball for the EXTRA_DIMENSIONS board size.
+
+        The geometry comes from the layout cache (see layout.py).
+        """
+        self.cols, self.rows = board_dimensions()
+        self.active_cols = self.cols
+        geometry = board_geometry(self.cols, self.rows, self.WIDTH, self.HEIGHT)
+        self.board = dict(geometry.board)
+        # paddles: index 0 = top player, index 1 = bottom player
+        center_x = self.WIDTH / 2
+        self.paddles = [
+            Paddle(x=center_x, y=geometry.paddle_y[0], width=geometry.paddle_w, height=geometry.paddle_h,
+                   color=paddle_colors[0]),
+            Paddle(x=center_x, y=geometry.paddle_y[1], width=geometry.paddle_w, height=geometry.paddle_h,
+                   color=paddle_colors[1])
+        ]
+        ball_radius = geometry.ball_radius
+        # ball placed at board center; `ball` is the primary ball, extra
+        # balls of the multi-ball mode only exist in `balls`
+        self.balls = BallSet()
+        self.balls.spawn(self.WIDTH/2, self.HEIGHT/2, ball_radius, 350, ball_color,
+                         direction_down=random.choice((True, False)))
+        self.ball = self.balls.view(0)
+        self.max_balls, self.ball_spawn_every = ball_settings()
+        self.ball_spawn_clock = 0.0
+
+    def _index_pieces(self):
+        """Rebuild the (col, row) -> piece index; call after replacing `self.pieces`."""
+        self.cells = {(pc['col'], pc['row']): pc for pc in self.pieces}
+        self._pieces_state = None
+        self._piece_px = {}
+
+    def _start_match_events(self, **extra):
+        if self.events is None:
+            return
+        meta = {"cols": self.cols, "rows": self.rows, "hp_map": self.hp_map,
+                "power_config": self.power_config, "max_balls": self.max_balls}
+        meta.update(extra)
+        self.events.new_match(meta)
+
+    def close_events(self):
+        """Write the pending match events and stop recording."""
+        if self.events is not None:
+            self.events.close()
+            self.events = None
 
     def reset_ball(self, toward_bottom=True):
         # direction_down True means ball moves downward (toward bottom player)
         self.ball.reset(self.WIDTH/2, self.HEIGHT/2, direction_down=toward_bottom)
     
+    def fetch_hp_map(self):
+        """Fetch the HP map from the REST API (raises on failure)."""
+        response = requests.get(API_BASE_URL, timeout=5)
+        response.raise_for_status()
+        vies_data = response.json()
+        logger.debug("Raw API response: %s", vies_data)
+        new_hp_map = parse_hp_map(vies_data)
+        logger.info("HP map loaded from REST API: %s", new_hp_map)
+        return new_hp_map
+
+    def _fetch_hp_map_or(self, fallback, what):
+        """HP map from the REST API, or `fallback` (logged) when it can't be reached."""
+        try:
+            return self.fetch_hp_map()
+        except Exception as e:
+            logger.error("Failed to load HP values from REST API: %s. Using %s.", e, what)
+            return dict(fallback)
+
+    def apply_hp_map(self, new_hp_map):
+        """Apply a new HP map to the game and reset every piece to its new max HP."""
+        self.hp_map = new_hp_map
+        
+        # Update max_hp and current hp for all existing pieces
+        for piece in self.pieces:
+            piece_type = piece.get('type')
+            if piece_type in new_hp_map:
+                new_max_hp = new_hp_map[piece_type]
+                piece['max_hp'] = new_max_hp
+                # Always reset current hp to new max value
+                piece['hp'] = new_max_hp
+        
+        self._pieces_state = None
+        self._piece_px = {}
+        # Save updated state
+        try:
+            self._write_db()
+        except Exception as e:
+            logger.error("Failed to save after HP refresh: %s", e)
+        
+        logger.info("All pieces updated with new HP values")
+
     def refresh_hp_from_api(self):
         """Reload HP values from REST API and update existing pieces"""
         try:
-            response = requests.get(API_BASE_URL, timeout=5)
-            response.raise_for_status()
-            vies_data = response.json()
-            logger.debug("Refreshing HP from API: %s", vies_data)
-            
-            # Build new hp_map from API response
-            new_hp_map = {}
-            for vie in vies_data:
-                libelle = vie.get('libelle', '')
-                if '(' in libelle and ')' in libelle:
-                    piece_type = libelle.split('(')[1].split(')')[0]
-                    new_hp_map[piece_type] = vie.get('nombreVieInitiale', 1)
-            
-            logger.info("HP map refreshed from API: %s", new_hp_map)
-            
-            # Update hp_map
-            self.hp_map = new_hp_map
-            
-            # Update max_hp and current hp for all existing pieces
-            for piece in self.pieces:
-                piece_type = piece.get('type')
-                if piece_type in new_hp_map:
-                    new_max_hp = new_hp_map[piece_type]
-                    piece['max_hp'] = new_max_hp
-                    # Always reset current hp to new max value
-                    piece['hp'] = new_max_hp
-            
-            # Save updated state
-            try:
-                self._write_db()
-            except Exception as e:
-                logger.error("Failed to save after HP refresh: %s", e)
-            
-            logger.info("All pieces updated with new HP values")
-            return True
-            
+            new_hp_map = self.fetch_hp_map()
         except Exception as e:
             logger.error("Failed to refresh HP from API: %s", e)
             return False
+        self.apply_hp_map(new_hp_map)
+        return True
 
     def _init_pieces(self):
-        # full major piece order for 8 columns
-        majors_full = ['R', 'N', 'B', 'Q', 'K', 'B', 'N', 'R']
-        # Fetch HP values from REST API
-        try:
-            response = requests.get(API_BASE_URL, timeout=5)
-            response.raise_for_status()
-            vies_data = response.json()
-            logger.debug("Raw API response: %s", vies_data)
-            # Build hp_map from API response: extract piece type from libelle
-            # Expected format: "Tour (R)", "Cavalier (N)", etc.
-            self.hp_map = {}
-            for vie in vies_data:
-                libelle = vie.get('libelle', '')
-                # Extract piece type from parentheses
-                if '(' in libelle and ')' in libelle:
-                    piece_type = libelle.split('(')[1].split(')')[0]
-                    self.hp_map[piece_type] = vie.get('nombreVieInitiale', 1)
-                    logger.debug("Parsed piece: %s -> %d HP", piece_type, vie.get('nombreVieInitiale', 1))
-                else:
-                    logger.warning("Skipping invalid libelle format: '%s' (expected format: 'Name (X)')", libelle)
-            logger.info("HP map loaded from REST API: %s", self.hp_map)
-        except Exception as e:
-            logger.error("Failed to load HP values from REST API: %s. Using defaults.", e)
-            # Fallback to default values
-            self.hp_map = {'P': 2, 'N': 4, 'R': 5, 'B': 5, 'Q': 8, 'K': 10}
-        # choose central slice of majors_full according to active columns
-        start = (len(majors_full) - self.active_cols) // 2
-        majors = majors_full[start:start + self.active_cols]
-        # create default pieces layout with hp values; use relative columns
-        # (0..active_cols-1) so the pieces map into the active area drawn by
-        # the renderer which uses board['cols'] == active_cols.
-        for c in range(self.active_cols):
-            m = majors[c]
-            col_rel = c
-            # top majors (row 0)
-            self.pieces.append({"type": m, "color": "black", "col": col_rel, "row": 0, "hp": self.hp_map.get(m, 1), "max_hp": self.hp_map.get(m, 1), "last_hit": 0.0})
-            # top pawns (row 1)
-            self.pieces.append({"type": 'P', "color": "black", "col": col_rel, "row": 1, "hp": self.hp_map.get('P', 1), "max_hp": self.hp_map.get('P', 1), "last_hit": 0.0})
-            logger.debug("Init pawn black at relative col=%d row=%d", col_rel, 1)
-            # bottom pawns (row ROWS-2)
-            self.pieces.append({"type": 'P', "color": "white", "col": col_rel, "row": ROWS - 2, "hp": self.hp_map.get('P', 1), "max_hp": self.hp_map.get('P', 1), "last_hit": 0.0})
-            logger.debug("Init pawn white at relative col=%d row=%d", col_rel, ROWS - 2)
-            # bottom majors (row ROWS-1)
-            self.pieces.append({"type": m, "color": "white", "col": col_rel, "row": ROWS - 1, "hp": self.hp_map.get(m, 1), "max_hp": self.hp_map.get(m, 1), "last_hit": 0.0})
+        self.hp_map = self._fetch_hp_map_or(DEFAULT_HP_MAP, "defaults")
+        self.layout = compile_layout(self.cols, self.rows, self.hp_map, self.WIDTH, self.HEIGHT)
+        self.pieces = self.layout.new_pieces()
+        self._index_pieces()
 
     def _apply_trajectory(self):
         """Apply player 1's chosen trajectory to the ball's initial velocity."""
@@ -271,8 +321,11 @@ class Game:
                 'scores': self.scores,
                 'pieces': self.pieces
             }
+            # written on every destroyed piece: json.dumps without indent
+            # goes through the C encoder, several times faster on large boards
+            text = json.dumps(data, ensure_ascii=False)
             with open(self.db_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+                f.write(text)
         except Exception as e:
             logger.exception('Failed to write DB: %s', e)
 
@@ -281,27 +334,9 @@ class Game:
         with open(self.db_path, 'r', encoding='utf-8') as f:
             data = json.load(f)
         
-        # Fetch current HP values from REST API
-        try:
-            response = requests.get(API_BASE_URL, timeout=5)
-            response.raise_for_status()
-            vies_data = response.json()
-            logger.debug("Raw API response: %s", vies_data)
-            # Build hp_map from API response
-            self.hp_map = {}
-            for vie in vies_data:
-                libelle = vie.get('libelle', '')
-                if '(' in libelle and ')' in libelle:
-                    piece_type = libelle.split('(')[1].split(')')[0]
-                    self.hp_map[piece_type] = vie.get('nombreVieInitiale', 1)
-                    logger.debug("Parsed piece: %s -> %d HP", piece_type, vie.get('nombreVieInitiale', 1))
-                else:
-                    logger.warning("Skipping invalid libelle format: '%s' (expected format: 'Name (X)')", libelle)
-            logger.info("HP map refreshed from REST API: %s", self.hp_map)
-        except Exception as e:
-            logger.warning("Failed to refresh HP values from REST API: %s. Using saved values.", e)
-            # Fallback to saved hp_map
-            self.hp_map = data.get('hp_map', self.hp_map or {})
+        # Fetch current HP values from REST API, else keep the saved ones
+        self.hp_map = self._fetch_hp_map_or(data.get('hp_map', self.hp_map or {}), "saved values")
+        self.layout = compile_layout(self.cols, self.rows, self.hp_map, self.WIDTH, self.HEIGHT)
         
         # scores
         self.scores = data.get('scores', self.scores)
@@ -320,55 +355,47 @@ class Game:
                 p['last_hit'] = 0.0
             loaded.append(p)
         self.pieces = loaded
+        self._index_pieces()
 
     def _load_power_config(self):
-        """Load power-up configuration from JSON with sane fallbacks."""
-        cfg = dict(DEFAULT_POWER_CONFIG)
-        path = getattr(self, 'power_config_path', POWER_CONFIG_PATH)
-        try:
-            with open(path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            if isinstance(data, dict):
-                for key in DEFAULT_POWER_CONFIG:
-                    if key in data:
-                        cfg[key] = data[key]
-            else:
-                logger.warning("Power config at %s is not a JSON object; using defaults", path)
-        except FileNotFoundError:
-            logger.info("Power config not found at %s; using defaults", path)
-        except Exception as e:
-            logger.warning("Failed to load power config %s: %s; using defaults", path, e)
-        return cfg
+        """Return the cached power-up configuration (the file is only parsed on change)."""
+        store = getattr(self, 'power_store', None) or get_store(getattr(self, 'power_config_path', POWER_CONFIG_PATH))
+        return store.get()
 
-    def update_power_config(self, new_config):
-        """Mettre à jour la configuration de puissance depuis un dictionnaire externe."""
-        if not isinstance(new_config, dict):
-            return False
+    def update_power_config(self, new_config, persist=True):
+        """Mettre à jour la configuration de puissance depuis un dictionnaire externe.
+
+        With persist=True the config is saved through the shared store, which
+        also pushes it to every other subscribed game.
+        """
         try:
-            # Sauvegarder dans le fichier
-            path = getattr(self, 'power_config_path', POWER_CONFIG_PATH)
-            with open(path, 'w', encoding='utf-8') as f:
-                json.dump(new_config, f, ensure_ascii=False, indent=2)
-            # Recharger et appliquer (sans reset de charge)
-            self.power_config = new_config
-            cfg = new_config
-            self.power_max_charge = max(1, int(cfg.get('charge_max', DEFAULT_POWER_CONFIG['charge_max'])))
-            self.power_gain_per_hit = max(1, int(cfg.get('charge_per_hit', DEFAULT_POWER_CONFIG['charge_per_hit'])))
-            self.power_special_damage = max(1, int(cfg.get('special_damage', DEFAULT_POWER_CONFIG['special_damage'])))
-            # Si charge dépasse nouveau max, limiter
-            self.power_charge = min(self.power_charge, self.power_max_charge)
-            if self.power_charge >= self.power_max_charge:
-                self.power_ready = True
-            logger.info("Power config updated: max=%d, per_hit=%d, damage=%d", 
-                       self.power_max_charge, self.power_gain_per_hit, self.power_special_damage)
-            return True
-        except Exception as e:
-            logger.error("Failed to update power config: %s", e)
+            cfg = validate_power_config(new_config)
+        except ValueError as e:
+            logger.error("Rejected power config %r: %s", new_config, e)
             return False
+        if persist:
+            try:
+                self.power_store.update(cfg)
+            except OSError as e:
+                logger.error("Failed to save power config to %s: %s", self.power_store.path, e)
+        # Appliquer (sans reset de charge)
+        self.power_config = cfg
+        self.power_max_charge = cfg['charge_max']
+        self.power_gain_per_hit = cfg['charge_per_hit']
+        self.power_special_damage = cfg['special_damage']
+        # Si charge dépasse nouveau max, limiter
+        self.power_charge = min(self.power_charge, self.power_max_charge)
+        if self.power_charge >= self.power_max_charge:
+            self.power_ready = True
+        logger.info("Power config updated: max=%d, per_hit=%d, damage=%d", 
+                   self.power_max_charge, self.power_gain_per_hit, self.power_special_damage)
+        return True
 
     def _reset_power_state(self, reload_config=True):
         """Reset power bar values and optionally reload configuration."""
         if reload_config:
+            # pick up hand edits of the file here too: only the server runs a watcher
+            self.power_store.check()
             self.power_config = self._load_power_config()
         cfg = self.power_config if isinstance(self.power_config, dict) else DEFAULT_POWER_CONFIG
         try:
@@ -390,87 +417,118 @@ class Game:
         self.power_charge = 0
         self.power_ready = False
         self.power_active = False
-        # Mode spécial perçant (traverse les pièces détruites)
+        # Mode spécial perçant (traverse les pièces détruites), par balle
         self.special_piercing = False
         self.special_remaining_damage = 0
         try:
-            self.ball.special_ready = False
-            self.ball.special_active = False
-        except Exception:
+            recorder = getattr(self, 'events', None)
+            if recorder is not None:
+                now_ts = time.time()
+                for i in range(len(self.balls)):
+                    if self.balls.piercing[i]:
+                        recorder.record(ev.SPECIAL_END, self.tick, now_ts, ball=i,
+                                        amount=self.balls.remaining[i], side=ev.END_RESET)
+            self.balls.clear_special()
+        except AttributeError:
             pass
 
     def _create_new_game_from_template(self):
+        """Start a new per-game file from the cached layout of the board.
+
+        The 8x8 template is only read again when it changes on disk; other
+        sizes are generated. HP values come from the REST API.
+        """
         # Ensure template exists
         if not os.path.exists(self.template_path):
             raise FileNotFoundError(f"Template not found: {self.template_path}")
-        
         # Load HP values from REST API FIRST (before creating pieces)
-        try:
-            response = requests.get(API_BASE_URL, timeout=5)
-            response.raise_for_status()
-            vies_data = response.json()
-            logger.debug("Raw API response in _create_new_game_from_template: %s", vies_data)
-            # Build hp_map from API response
-            hp_map = {}
-            for vie in vies_data:
-                libelle = vie.get('libelle', '')
-                if '(' in libelle and ')' in libelle:
-                    piece_type = libelle.split('(')[1].split(')')[0]
-                    hp_map[piece_type] = vie.get('nombreVieInitiale', 1)
-                    logger.debug("Parsed piece in template: %s -> %d HP", piece_type, vie.get('nombreVieInitiale', 1))
-            logger.info("HP map loaded from REST API for new game: %s", hp_map)
-        except Exception as e:
-            logger.error("Failed to load HP values from REST API in _create_new_game_from_template: %s. Using defaults.", e)
-            # Fallback to default values
-            hp_map = {'P': 2, 'N': 4, 'R': 5, 'B': 5, 'Q': 8, 'K': 10}
-        
-        # Store hp_map in instance
-        self.hp_map = hp_map
-        
-        # create a new per-game filename
+        self.hp_map = self._fetch_hp_map_or(DEFAULT_HP_MAP, "defaults")
+        self.layout = compile_layout(self.cols, self.rows, self.hp_map, self.WIDTH, self.HEIGHT,
+                                     template_path=self.template_path)
+        self.pieces = self.layout.new_pieces()
+        self._index_pieces()
+        self.scores = list(self.layout.scores)
+        # create a new per-game file
         ts = int(time.time())
-        new_name = f'game_{ts}.json'
-        new_path = os.path.join(self.state_dir, new_name)
-        # copy template content into new file (load+write to set hp/max_hp explicitly)
-        with open(self.template_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # decide whether to use template pieces (default 8x8) or generate
-        # a reduced layout based on self.active_cols. Use API hp_map (not template)
-        if self.active_cols == COLS:
-            pieces = []
-            for pc in data.get('pieces', []):
-                p = dict(pc)
-                t = p.get('type')
-                default_hp = self.hp_map.get(t, 1)  # Use API hp_map, not template
-                if 'max_hp' not in p:
-                    p['max_hp'] = default_hp
-                if 'hp' not in p:
-                    p['hp'] = p.get('max_hp', default_hp)
-                # Ensure hp is set to API value
-                p['hp'] = default_hp
-                p['max_hp'] = default_hp
-                pieces.append(p)
-        else:
-            # for reduced boards, generate pieces according to self.cols/self.rows
-            self.pieces = []
-            self._init_pieces()
-            pieces = list(self.pieces)
+        self.db_path = os.path.join(self.state_dir, f'game_{ts}.json')
+        self._write_db()
 
-        state = {
-            'hp_map': self.hp_map,  # Use API hp_map
-            'scores': data.get('scores', [0,0]),
-            'pieces': pieces
-        }
-        with open(new_path, 'w', encoding='utf-8') as f:
-            json.dump(state, f, ensure_ascii=False, indent=2)
-        # set current db_path and load pieces into instance
-        self.db_path = new_path
-        self.pieces = pieces
-        self.scores = data.get('scores', [0,0])
 
+    def set_acked_tick(self, player_index, tick):
+        """Record the last state tick a player has seen (paddle contacts rewind to it).
+
+        Acks never go back in time nor past the current tick; None forgets it.
+        """
+        try:
+            if tick is None:
+                self.acked_ticks[player_index] = None
+                return
+            tick = int(tick)
+            prev = self.acked_ticks[player_index]
+            if tick <= self.tick and (prev is None or tick >= prev):
+                self.acked_ticks[player_index] = tick
+        except (TypeError, ValueError, IndexError):
+            pass
+
+    def _rewind_tick(self, i_paddle):
+        """Tick a paddle contact of this player is rewound to, or None (live check only).
+
+        The player's acknowledged tick, no more than MAX_REWIND_TICKS back; an
+        ack the history no longer holds falls back to the live paddle.
+        """
+        ack = self.acked_ticks[i_paddle]
+        if ack is None or ack >= self.tick or not self.history.has(ack):
+            return None
+        return max(ack, self.tick - MAX_REWIND_TICKS)
+
+    def _rewound_hit(self, i, i_paddle, tick, now_ts):
+        """Ball `i` against paddle `i_paddle`, both as they were at `tick`.
+
+        A contact the player saw there and that has not been played since
+        (the ball still heads to that paddle, then and now) bounces the ball
+        where it happened; the ball then moves on to now with its new velocity.
+        """
+        balls = self.balls
+        # a ball moving away from the paddle has already been played off it
+        if (balls.dy[i] < 0) != (i_paddle == 0):
+            return False
+        rec = self.history.ball(tick, i)
+        if rec is None:
+            return False
+        x, y, dx, dy = rec
+        if (dy < 0) != (i_paddle == 0) or dy == 0:
+            return False
+        p = self.paddles[i_paddle]
+        px, py = self.history.paddle(tick, i_paddle)
+        left_p, top_p = px - p.width/2, py - p.height/2
+        right_p, bottom_p = px + p.width/2, py + p.height/2
+        r = balls.radius[i]
+        ddx = x - max(left_p, min(x, right_p))
+        ddy = y - max(top_p, min(y, bottom_p))
+        if ddx*ddx + ddy*ddy > r*r:
+            return False
+        slot = 2 * i + i_paddle
+        if now_ts - balls.paddle_hit[slot] < 0.06:
+            return False
+        balls.paddle_hit[slot] = now_ts
+        ghost = SimpleNamespace(x=x, y=y, dx=dx, dy=dy, radius=r)
+        self._bounce_off_paddle(ghost, p, left_p, top_p, right_p, bottom_p)
+        elapsed = self.sim_time - self.history.time(tick)
+        balls.x[i] = ghost.x + ghost.dx * elapsed
+        balls.y[i] = ghost.y + ghost.dy * elapsed
+        balls.dx[i] = ghost.dx
+        balls.dy[i] = ghost.dy
+        logger.debug("Paddle hit rewound to tick %d for player %d (ball %d)", tick, i_paddle, i)
+        return True
 
     def update(self, dt, player_commands):
+        self.tick += 1
+        self.sim_time += dt
+        result = self._step(dt, player_commands)
+        self.history.record(self.tick, self.sim_time, self.balls, self.paddles)
+        return result
+
+    def _step(self, dt, player_commands):
         # player_commands: dict {0: 'left'/'right'/'stop', 1: ...}
         # At game start, player 1 must choose ball trajectory first
         if self.waiting_trajectory:
@@ -525,289 +583,436 @@ class Game:
         for p in self.paddles:
             p.update(dt, left_bound, right_bound)
 
-        # Update ball
-        self.ball.update(dt)
+        # Move every ball, then resolve walls, pieces and paddles for all
+        # balls phase by phase over the ball columns
+        balls = self.balls
+        balls.step(dt)
+        collided = self._collide_walls()
+        if self._collide_pieces():
+            collided = True
+        if self._collide_paddles():
+            collided = True
+        self._spawn_balls(dt)
 
-        # Board bounds (reflect on all four edges)
+        scored = None
+
+        # cap ball speed
+        max_speed = 800
+        bdx, bdy = balls.dx, balls.dy
+        for i in range(len(balls)):
+            s = math.hypot(bdx[i], bdy[i])
+            if s > max_speed:
+                k = max_speed / s
+                bdx[i] *= k
+                bdy[i] *= k
+
+        # expose power flags to the renderer via the ball dicts
+        balls.special_ready = bool(self.power_ready)
+        self._sync_special()
+
+        return {"scored": scored, "collided": collided}
+
+    def _sync_special(self):
+        """Game-wide view of the per-ball piercing state (power bar, snapshots)."""
+        self.special_piercing = any(self.balls.piercing)
+        self.special_remaining_damage = sum(self.balls.remaining)
+
+    def _collide_walls(self):
+        """Reflect every ball on the four board edges; returns True if one hit a wall."""
+        balls = self.balls
+        bx, by, bdx, bdy, br = balls.x, balls.y, balls.dx, balls.dy, balls.radius
         left = self.board['x']
         right = self.board['x'] + self.board['width']
         top = self.board['y']
         bottom = self.board['y'] + self.board['height']
+        recorder = self.events
         collided = False
-        wall_hit = False
-        # left/right
-        if self.ball.x - self.ball.radius < left:
-            self.ball.x = left + self.ball.radius
-            self.ball.dx *= -1
-            collided = True
-            wall_hit = True
-        if self.ball.x + self.ball.radius > right:
-            self.ball.x = right - self.ball.radius
-            self.ball.dx *= -1
-            collided = True
-            wall_hit = True
-        # top/bottom
-        if self.ball.y - self.ball.radius < top:
-            self.ball.y = top + self.ball.radius
-            self.ball.dy *= -1
-            collided = True
-            wall_hit = True
-        if self.ball.y + self.ball.radius > bottom:
-            self.ball.y = bottom - self.ball.radius
-            self.ball.dy *= -1
+        for i in range(len(balls)):
+            r = br[i]
+            wall = None
+            # left/right
+            if bx[i] - r < left:
+                bx[i] = left + r
+                bdx[i] *= -1
+                wall = ev.WALL_LEFT
+            if bx[i] + r > right:
+                bx[i] = right - r
+                bdx[i] *= -1
+                wall = ev.WALL_RIGHT
+            # top/bottom
+            if by[i] - r < top:
+                by[i] = top + r
+                bdy[i] *= -1
+                wall = ev.WALL_TOP
+            if by[i] + r > bottom:
+                by[i] = bottom - r
+                bdy[i] *= -1
+                wall = ev.WALL_BOTTOM
+            if wall is None:
+                continue
             collided = True
-            wall_hit = True
-        
-        # Si la balle touche un mur pendant le mode spécial actif, annuler le pouvoir
-        if wall_hit and getattr(self, 'special_piercing', False):
-            logger.info("Mur touché! Pouvoir spécial annulé (dégâts restants: %d)", getattr(self, 'special_remaining_damage', 0))
-            self.special_piercing = False
-            self.special_remaining_damage = 0
-            self.power_active = False
-
-        # Piece collisions: detect all pieces intersecting the ball this frame
-        # and apply damage to each (instead of choosing one at random). Then
-        # compute a combined response for the ball reflection based on overlaps.
+            if recorder is not None:
+                recorder.record(ev.WALL_HIT, self.tick, time.time(), ball=i, side=wall)
+            # Si la balle touche un mur pendant le mode spécial actif, annuler le pouvoir
+            if balls.piercing[i]:
+                logger.info("Mur touché! Pouvoir spécial annulé (dégâts restants: %d)", balls.remaining[i])
+                if recorder is not None:
+                    recorder.record(ev.SPECIAL_END, self.tick, time.time(), ball=i,
+                                    amount=balls.remaining[i], side=ev.END_WALL)
+                balls.piercing[i] = 0
+                balls.remaining[i] = 0
+                self.power_active = False
+        return collided
+
+    def _collide_pieces(self):
+        """Damage the pieces touched by each ball and bounce it; returns True on any bounce.
+
+        Only the cells under a ball's bounding box are looked up in the
+        (col, row) index, so the cost per ball does not depend on the number
+        of pieces.
+        """
+        balls = self.balls
+        bx, by, br = balls.x, balls.y, balls.radius
+        cell = self.board['cell_size']
+        bx0 = self.board['x']
+        by0 = self.board['y']
+        max_col = self.board['cols'] - 1
+        max_row = self.board['rows'] - 1
+        cells = self.cells
         now_ts = time.time()
-        colliding = []
-        for pc in list(self.pieces):
-            col = pc['col']
-            row = pc['row']
-            cx = self.board['x'] + col * self.board['cell_size']
-            cy = self.board['y'] + row * self.board['cell_size']
-            rleft = cx
-            rtop = cy
-            rright = cx + self.board['cell_size']
-            rbottom = cy + self.board['cell_size']
-            # circle-rect collision test
-            nearest_x = max(rleft, min(self.ball.x, rright))
-            nearest_y = max(rtop, min(self.ball.y, rbottom))
-            dx = self.ball.x - nearest_x
-            dy = self.ball.y - nearest_y
-            if dx*dx + dy*dy <= (self.ball.radius + 0.0)**2:
-                # compute overlaps as before
-                overlap_x = min(self.ball.x - rleft, rright - self.ball.x)
-                overlap_y = min(self.ball.y - rtop, rbottom - self.ball.y)
-                colliding.append((pc, rleft, rtop, rright, rbottom, overlap_x, overlap_y))
-
-        if colliding:
-            # Vérifier si on est en mode spécial perçant ou si on commence un nouveau spécial
-            use_special = bool(self.power_ready) or getattr(self, 'special_piercing', False)
-            
-            # Si c'est le début d'un nouveau spécial, initialiser le compteur de dégâts restants
-            if self.power_ready and not getattr(self, 'special_piercing', False):
-                self.special_piercing = True
-                self.special_remaining_damage = self.power_special_damage
-                self.power_ready = False
-                self.power_charge = 0
-                logger.info("DÉBUT POUVOIR SPÉCIAL! Capacité: %d dégâts", self.special_remaining_damage)
-            
-            # apply damage to all collided pieces (respect cooldown per piece)
-            charge_gain = 0
-            total_damage_dealt = 0
-            pieces_destroyed = []
-            
-            for (pc, rleft, rtop, rright, rbottom, overlap_x, overlap_y) in colliding:
-                last_hit = pc.get('last_hit', 0.0)
-                if now_ts - last_hit >= HIT_COOLDOWN:
-                    current_hp = pc.get('hp', self.hp_map.get(pc.get('type'), 1))
-                    
-                    if use_special and getattr(self, 'special_remaining_damage', 0) > 0:
-                        # Mode spécial: appliquer les dégâts disponibles
-                        damage_to_apply = min(self.special_remaining_damage, current_hp)
-                        pc['hp'] = max(0, current_hp - damage_to_apply)
-                        self.special_remaining_damage -= damage_to_apply
-                        total_damage_dealt += damage_to_apply
-                        logger.debug("Spécial: pièce touchée, dégâts=%d, HP restant=%d, capacité restante=%d", 
-                                   damage_to_apply, pc['hp'], self.special_remaining_damage)
-                    else:
-                        # Mode normal: 1 dégât
-                        applied = min(1, current_hp)
-                        pc['hp'] = max(0, current_hp - 1)
-                        charge_gain += applied * self.power_gain_per_hit
-                    
-                    pc['last_hit'] = now_ts
-                    
-                    # Marquer les pièces détruites
+        collided = False
+        pieces_destroyed = []
+        for i in range(len(balls)):
+            x = bx[i]
+            y = by[i]
+            r = br[i]
+            # a cell whose edge exactly touches the box is included (ceil - 1)
+            c0 = max(0, math.ceil((x - r - bx0) / cell) - 1)
+            c1 = min(max_col, math.floor((x + r - bx0) / cell))
+            r0 = max(0, math.ceil((y - r - by0) / cell) - 1)
+            r1 = min(max_row, math.floor((y + r - by0) / cell))
+            colliding = []
+            for row in range(r0, r1 + 1):
+                for col in range(c0, c1 + 1):
+                    pc = cells.get((col, row))
+                    if pc is None:
+                        continue
+                    rleft = bx0 + col * cell
+                    rtop = by0 + row * cell
+                    rright = rleft + cell
+                    rbottom = rtop + cell
+                    # circle-rect collision test
+                    nearest_x = max(rleft, min(x, rright))
+                    nearest_y = max(rtop, min(y, rbottom))
+                    dx = x - nearest_x
+                    dy = y - nearest_y
+                    if dx*dx + dy*dy <= r*r:
+                        overlap_x = min(x - rleft, rright - x)
+                        overlap_y = min(y - rtop, rbottom - y)
+                        colliding.append((pc, rleft, rtop, rright, rbottom, overlap_x, overlap_y))
+            if colliding:
+                if self._resolve_piece_hits(i, colliding, now_ts, pieces_destroyed):
+                    collided = True
+
+        # remove pieces with zero hp and persist
+        for pc in pieces_destroyed:
+            try:
+                self.pieces.remove(pc)
+            except ValueError:
+                pass
+            if pc.get('type') == 'K':
+                king_color = pc.get('color')
+                if king_color == 'white':
+                    winner = 0
+                else:
+                    winner = 1
+                self.game_over = {"winner": winner, "king_color": king_color}
+                logger.info("Game over: king %s destroyed, winner=%s", king_color, winner)
+        if pieces_destroyed:
+            try:
+                self._write_db()
+            except Exception:
+                pass
+        return collided
+
+    def _resolve_piece_hits(self, i, colliding, now_ts, pieces_destroyed):
+        """Apply the hits of ball `i` on the `colliding` pieces; returns True if it bounced."""
+        balls = self.balls
+        ball = balls.view(i)
+        recorder = self.events
+        # Vérifier si on est en mode spécial perçant ou si on commence un nouveau spécial
+        use_special = bool(self.power_ready) or bool(balls.piercing[i])
+
+        # Si c'est le début d'un nouveau spécial, initialiser le compteur de dégâts restants
+        if self.power_ready and not balls.piercing[i]:
+            balls.piercing[i] = 1
+            balls.remaining[i] = self.power_special_damage
+            self.power_ready = False
+            self.power_charge = 0
+            logger.info("DÉBUT POUVOIR SPÉCIAL! Capacité: %d dégâts", balls.remaining[i])
+            if recorder is not None:
+                recorder.record(ev.SPECIAL_START, self.tick, now_ts, ball=i, amount=balls.remaining[i])
+            # multi-ball: the special shot splits off a new ball
+            self._split_ball(i)
+
+        # apply damage to all collided pieces (respect cooldown per piece)
+        charge_gain = 0
+        total_damage_dealt = 0
+
+        for (pc, rleft, rtop, rright, rbottom, overlap_x, overlap_y) in colliding:
+            last_hit = pc.get('last_hit', 0.0)
+            if now_ts - last_hit >= HIT_COOLDOWN:
+                current_hp = pc.get('hp', self.hp_map.get(pc.get('type'), 1))
+
+                special_hit = use_special and balls.remaining[i] > 0
+                if special_hit:
+                    # Mode spécial: appliquer les dégâts disponibles
+                    damage_to_apply = min(balls.remaining[i], current_hp)
+                    pc['hp'] = max(0, current_hp - damage_to_apply)
+                    balls.remaining[i] -= damage_to_apply
+                    total_damage_dealt += damage_to_apply
+                    logger.debug("Spécial: pièce touchée, dégâts=%d, HP restant=%d, capacité restante=%d",
+                               damage_to_apply, pc['hp'], balls.remaining[i])
+                else:
+                    # Mode normal: 1 dégât
+                    damage_to_apply = min(1, current_hp)
+                    pc['hp'] = max(0, current_hp - 1)
+                    charge_gain += damage_to_apply * self.power_gain_per_hit
+                if recorder is not None:
+                    piece = ord(pc['type'][0])
+                    color = ev.COLORS.get(pc.get('color'), -1)
+                    recorder.record(ev.HIT, self.tick, now_ts, i, piece, color, pc['col'], pc['row'],
+                                    damage_to_apply, pc['hp'], special=int(special_hit))
                     if pc['hp'] <= 0:
-                        pieces_destroyed.append(pc)
-            
-            # Déterminer si la balle doit rebondir ou traverser
-            should_bounce = True
-            
-            if use_special and getattr(self, 'special_piercing', False):
-                # En mode spécial: ne pas rebondir si toutes les pièces touchées sont détruites
-                # et qu'il reste de la capacité de dégâts
-                all_destroyed = all(pc['hp'] <= 0 for (pc, _, _, _, _, _, _) in colliding)
-                if all_destroyed and self.special_remaining_damage > 0:
-                    should_bounce = False
-                    logger.debug("Traversée! Toutes les pièces détruites, capacité restante: %d", self.special_remaining_damage)
+                        recorder.record(ev.DESTROYED, self.tick, now_ts, i, piece, color, pc['col'], pc['row'],
+                                        pc.get('max_hp', current_hp), 0, special=int(special_hit))
+
+                pc['last_hit'] = now_ts
+                # HP changed: drop its cached entry in get_state
+                self._piece_px.pop((pc['col'], pc['row']), None)
+                self._pieces_state = None
+
+                # Marquer les pièces détruites; other balls no longer see them
+                if pc['hp'] <= 0:
+                    pieces_destroyed.append(pc)
+                    self.cells.pop((pc['col'], pc['row']), None)
+
+        # Déterminer si la balle doit rebondir ou traverser
+        should_bounce = True
+
+        if use_special and balls.piercing[i]:
+            # En mode spécial: ne pas rebondir si toutes les pièces touchées sont détruites
+            # et qu'il reste de la capacité de dégâts
+            all_destroyed = all(pc['hp'] <= 0 for (pc, _, _, _, _, _, _) in colliding)
+            if all_destroyed and balls.remaining[i] > 0:
+                should_bounce = False
+                logger.debug("Traversée! Toutes les pièces détruites, capacité restante: %d", balls.remaining[i])
+            else:
+                # Soit une pièce survit, soit plus de capacité: rebondir et terminer le spécial
+                should_bounce = True
+                if balls.remaining[i] <= 0:
+                    logger.info("FIN POUVOIR SPÉCIAL! Capacité épuisée après %d dégâts", total_damage_dealt)
+                if recorder is not None:
+                    recorder.record(ev.SPECIAL_END, self.tick, now_ts, ball=i, amount=max(0, balls.remaining[i]),
+                                    side=ev.END_EXHAUSTED if balls.remaining[i] <= 0 else ev.END_BLOCKED)
+                balls.piercing[i] = 0
+                balls.remaining[i] = 0
+
+        # Appliquer le rebond si nécessaire
+        if should_bounce:
+            # Decide axis of response by averaging overlaps
+            sum_ox = sum(c[5] for c in colliding)
+            sum_oy = sum(c[6] for c in colliding)
+            axis = 'x' if sum_ox < sum_oy else 'y'
+            # compute average centers to determine which side to push ball out to
+            avg_cx = sum((c[1] + c[3]) / 2.0 for c in colliding) / len(colliding)
+            avg_cy = sum((c[2] + c[4]) / 2.0 for c in colliding) / len(colliding)
+            # respond: push ball outside combined rect area
+            if axis == 'x':
+                if ball.x < avg_cx:
+                    leftmost = min(c[1] for c in colliding)
+                    ball.x = leftmost - ball.radius
                 else:
-                    # Soit une pièce survit, soit plus de capacité: rebondir et terminer le spécial
-                    should_bounce = True
-                    if self.special_remaining_damage <= 0:
-                        logger.info("FIN POUVOIR SPÉCIAL! Capacité épuisée après %d dégâts", total_damage_dealt)
-                    self.special_piercing = False
-                    self.special_remaining_damage = 0
-            
-            # Appliquer le rebond si nécessaire
-            if should_bounce:
-                # Decide axis of response by averaging overlaps
-                sum_ox = sum(c[5] for c in colliding)
-                sum_oy = sum(c[6] for c in colliding)
-                axis = 'x' if sum_ox < sum_oy else 'y'
-                # compute average centers to determine which side to push ball out to
-                avg_cx = sum((c[1] + c[3]) / 2.0 for c in colliding) / len(colliding)
-                avg_cy = sum((c[2] + c[4]) / 2.0 for c in colliding) / len(colliding)
-                # respond: push ball outside combined rect area
-                if axis == 'x':
-                    if self.ball.x < avg_cx:
-                        leftmost = min(c[1] for c in colliding)
-                        self.ball.x = leftmost - self.ball.radius
-                    else:
-                        rightmost = max(c[3] for c in colliding)
-                        self.ball.x = rightmost + self.ball.radius
-                    self.ball.dx *= -1
+                    rightmost = max(c[3] for c in colliding)
+                    ball.x = rightmost + ball.radius
+                ball.dx *= -1
+            else:
+                if ball.y < avg_cy:
+                    topmost = min(c[2] for c in colliding)
+                    ball.y = topmost - ball.radius
                 else:
-                    if self.ball.y < avg_cy:
-                        topmost = min(c[2] for c in colliding)
-                        self.ball.y = topmost - self.ball.radius
-                    else:
-                        bottommost = max(c[4] for c in colliding)
-                        self.ball.y = bottommost + self.ball.radius
-                    self.ball.dy *= -1
-                collided = True
-            
-            # Mettre à jour la charge si en mode normal
-            if charge_gain > 0 and not use_special:
-                self.power_charge = min(self.power_charge + charge_gain, self.power_max_charge)
-                logger.debug("Power charge: %d/%d", self.power_charge, self.power_max_charge)
-                if self.power_charge >= self.power_max_charge:
-                    self.power_ready = True
-                    logger.info("PUISSANCE PRÊTE! Prochain coup = %d dégâts", self.power_special_damage)
-            
-            # Mettre à jour le flag d'activation pour l'affichage
-            self.power_active = getattr(self, 'special_piercing', False)
-
-            # remove pieces with zero hp and persist
-            for pc in pieces_destroyed:
-                try:
-                    self.pieces.remove(pc)
-                except ValueError:
-                    pass
-                try:
-                    self._write_db()
-                except Exception:
-                    pass
-                if pc.get('type') == 'K':
-                    king_color = pc.get('color')
-                    if king_color == 'white':
-                        winner = 0
-                    else:
-                        winner = 1
-                    self.game_over = {"winner": winner, "king_color": king_color}
-                    logger.info("Game over: king %s destroyed, winner=%s", king_color, winner)
+                    bottommost = max(c[4] for c in colliding)
+                    ball.y = bottommost + ball.radius
+                ball.dy *= -1
+
+        # Mettre à jour la charge si en mode normal
+        if charge_gain > 0 and not use_special:
+            self.power_charge = min(self.power_charge + charge_gain, self.power_max_charge)
+            logger.debug("Power charge: %d/%d", self.power_charge, self.power_max_charge)
+            if self.power_charge >= self.power_max_charge:
+                self.power_ready = True
+                logger.info("PUISSANCE PRÊTE! Prochain coup = %d dégâts", self.power_special_damage)
+
+        # Mettre à jour le flag d'activation pour l'affichage
+        self.power_active = any(balls.piercing)
+        return should_bounce
 
-        # Paddle collisions
-        # Paddle collisions - use circle-rect collision test to be robust against tunneling
+    def _collide_paddles(self):
+        """Bounce the balls off both paddles; returns True on any hit.
+
+        A ball is only tested against a paddle when its centre lies in the
+        band the paddle covers, widened by the largest radius; every other
+        ball is rejected with two compares. A ball that misses the live
+        paddle is then checked against the paddle at the tick its player
+        acknowledged (see `_rewound_hit`).
+        """
         # paddle collision handling: use axis test and reflect velocity across
         # the contact normal so that hitting the top/bottom of a paddle always
         # reflects vertically, and hitting the sides reflects horizontally.
-        # Also add a tiny per-paddle cooldown to avoid rapid repeated flips.
-        if not hasattr(self, '_last_paddle_hit'):
-            self._last_paddle_hit = [0.0, 0.0]
+        # Also add a tiny per-ball, per-paddle cooldown to avoid rapid repeated flips.
+        balls = self.balls
+        bx, by, br, last_hits = balls.x, balls.y, balls.radius, balls.paddle_hit
+        n = len(balls)
+        max_r = max(br) if n else 0.0
         now_ts = time.time()
+        collided = False
         for i_paddle in (0, 1):
             p = self.paddles[i_paddle]
             left_p, top_p, right_p, bottom_p = p.get_bounds()
-            nearest_x = max(left_p, min(self.ball.x, right_p))
-            nearest_y = max(top_p, min(self.ball.y, bottom_p))
-            ddx = self.ball.x - nearest_x
-            ddy = self.ball.y - nearest_y
-            if ddx*ddx + ddy*ddy <= (self.ball.radius)**2:
-                # cooldown per paddle
-                if now_ts - self._last_paddle_hit[i_paddle] < 0.06:
+            band_left = left_p - max_r
+            band_top = top_p - max_r
+            band_right = right_p + max_r
+            band_bottom = bottom_p + max_r
+            rewind = self._rewind_tick(i_paddle)
+            for i in range(n):
+                x = bx[i]
+                y = by[i]
+                hit = False
+                if not (y < band_top or y > band_bottom or x < band_left or x > band_right):
+                    r = br[i]
+                    ddx = x - max(left_p, min(x, right_p))
+                    ddy = y - max(top_p, min(y, bottom_p))
+                    hit = ddx*ddx + ddy*ddy <= r*r
+                if not hit:
+                    if rewind is not None and self._rewound_hit(i, i_paddle, rewind, now_ts):
+                        collided = True
+                        if self.events is not None:
+                            self.events.record(ev.PADDLE_HIT, self.tick, now_ts, ball=i, side=i_paddle)
                     continue
-                self._last_paddle_hit[i_paddle] = now_ts
-                # decide axis by overlap (smaller overlap => axis of collision)
-                overlap_x = min(self.ball.x - left_p, right_p - self.ball.x)
-                overlap_y = min(self.ball.y - top_p, bottom_p - self.ball.y)
-                s_pre = math.hypot(self.ball.dx, self.ball.dy)
-                # compute horizontal offset from paddle center
-                try:
-                    offset = (self.ball.x - p.x) / (p.width/2)
-                except Exception:
-                    offset = 0
-                if overlap_x < overlap_y:
-                    # side collision: reflect horizontally
-                    if self.ball.x < (left_p + right_p)/2:
-                        # hit left side -> place ball left
-                        self.ball.x = left_p - self.ball.radius
-                    else:
-                        self.ball.x = right_p + self.ball.radius
-                    self.ball.dx *= -1
-                    # apply horizontal impulse from hit offset
-                    self.ball.dy += offset * 50
-                else:
-                    # vertical collision: reflect vertically
-                    if self.ball.y < (top_p + bottom_p)/2:
-                        # hit top side -> place ball above
-                        self.ball.y = top_p - self.ball.radius
-                        # ensure dy is negative (going up)
-                        self.ball.dy = -abs(self.ball.dy)
-                    else:
-                        # hit bottom side -> place ball below
-                        self.ball.y = bottom_p + self.ball.radius
-                        # ensure dy is positive (going down)
-                        self.ball.dy = abs(self.ball.dy)
-                    # apply horizontal deflection based on hit position
-                    self.ball.dx += offset * 100
-                # normalize to preserve previous speed magnitude
-                cur_s = math.hypot(self.ball.dx, self.ball.dy)
-                if cur_s > 0 and s_pre > 0:
-                    k = s_pre / cur_s
-                    self.ball.dx *= k
-                    self.ball.dy *= k
+                # cooldown per ball and paddle
+                slot = 2 * i + i_paddle
+                if now_ts - last_hits[slot] < 0.06:
+                    continue
+                last_hits[slot] = now_ts
+                self._bounce_off_paddle(balls.view(i), p, left_p, top_p, right_p, bottom_p)
                 collided = True
+                if self.events is not None:
+                    self.events.record(ev.PADDLE_HIT, self.tick, now_ts, ball=i, side=i_paddle)
+        return collided
 
-        scored = None
-
-        # cap ball speed
-        max_speed = 800
-        s = math.hypot(self.ball.dx, self.ball.dy)
-        if s > max_speed:
-            k = max_speed / s
-            self.ball.dx *= k
-            self.ball.dy *= k
-
-        # expose power flags to the renderer via the ball dict
+    def _bounce_off_paddle(self, ball, p, left_p, top_p, right_p, bottom_p):
+        # decide axis by overlap (smaller overlap => axis of collision)
+        overlap_x = min(ball.x - left_p, right_p - ball.x)
+        overlap_y = min(ball.y - top_p, bottom_p - ball.y)
+        s_pre = math.hypot(ball.dx, ball.dy)
+        # compute horizontal offset from paddle center
         try:
-            self.ball.special_ready = bool(self.power_ready)
-            self.ball.special_active = bool(getattr(self, 'special_piercing', False))
+            offset = (ball.x - (left_p + right_p)/2) / (p.width/2)
         except Exception:
-            pass
+            offset = 0
+        if overlap_x < overlap_y:
+            # side collision: reflect horizontally
+            if ball.x < (left_p + right_p)/2:
+                # hit left side -> place ball left
+                ball.x = left_p - ball.radius
+            else:
+                ball.x = right_p + ball.radius
+            ball.dx *= -1
+            # apply horizontal impulse from hit offset
+            ball.dy += offset * 50
+        else:
+            # vertical collision: reflect vertically
+            if ball.y < (top_p + bottom_p)/2:
+                # hit top side -> place ball above
+                ball.y = top_p - ball.radius
+                # ensure dy is negative (going up)
+                ball.dy = -abs(ball.dy)
+            else:
+                # hit bottom side -> place ball below
+                ball.y = bottom_p + ball.radius
+                # ensure dy is positive (going down)
+                ball.dy = abs(ball.dy)
+            # apply horizontal deflection based on hit position
+            ball.dx += offset * 100
+        # normalize to preserve previous speed magnitude
+        cur_s = math.hypot(ball.dx, ball.dy)
+        if cur_s > 0 and s_pre > 0:
+            k = s_pre / cur_s
+            ball.dx *= k
+            ball.dy *= k
 
-        return {"scored": scored, "collided": collided}
+    def _split_ball(self, i):
+        """Multi-ball: add a ball mirrored on x from ball `i` (special shot power-up)."""
+        balls = self.balls
+        if len(balls) >= self.max_balls:
+            return
+        j = balls.add(balls.x[i], balls.y[i], -balls.dx[i], balls.dy[i],
+                      balls.radius[i], balls.speed[i], EXTRA_BALL_COLOR)
+        logger.info("Multi-balle: nouvelle balle %d (coup spécial)", j)
 
-    def get_state(self):
-        # include board and pieces in pixel coordinates for clients
+    def _spawn_balls(self, dt):
+        """Multi-ball: launch a ball from the centre every `ball_spawn_every` seconds."""
+        if self.ball_spawn_every <= 0 or len(self.balls) >= self.max_balls:
+            self.ball_spawn_clock = 0.0
+            return
+        self.ball_spawn_clock += dt
+        if self.ball_spawn_clock < self.ball_spawn_every:
+            return
+        self.ball_spawn_clock = 0.0
+        # alternate the side it heads to
+        j = self.balls.spawn(self.WIDTH/2, self.HEIGHT/2, self.ball.radius, self.ball.speed,
+                             EXTRA_BALL_COLOR, direction_down=len(self.balls) % 2 == 1)
+        logger.info("Multi-balle: nouvelle balle %d (minuterie)", j)
+
+    def _pieces_px(self):
+        """Pieces in pixel coordinates for clients.
+
+        Each piece's dict is cached until its HP changes and the list until
+        any piece changes; a changed piece gets a new dict, so states already
+        handed out are never modified.
+        """
+        if self._pieces_state is not None:
+            return self._pieces_state
         pieces_px = []
+        cache = self._piece_px
+        cell = self.board['cell_size']
+        centers = self.layout.centers
         for pc in self.pieces:
             col = pc['col']
             row = pc['row']
-            x = self.board['x'] + col * self.board['cell_size'] + self.board['cell_size']/2
-            y = self.board['y'] + row * self.board['cell_size'] + self.board['cell_size']/2
-            pieces_px.append({
-                "type": pc['type'],
-                "color": pc['color'],
-                "col": col,
-                "row": row,
-                "x": x,
-                "y": y,
-                "size": self.board['cell_size'],
-                "hp": pc.get('hp', self.hp_map.get(pc.get('type'), 1)),
-                "max_hp": pc.get('max_hp', self.hp_map.get(pc.get('type'), 1))
-            })
+            entry = cache.get((col, row))
+            if entry is None:
+                x, y = centers[(col, row)]
+                entry = {
+                    "type": pc['type'],
+                    "color": pc['color'],
+                    "col": col,
+                    "row": row,
+                    "x": x,
+                    "y": y,
+                    "size": cell,
+                    "hp": pc.get('hp', self.hp_map.get(pc.get('type'), 1)),
+                    "max_hp": pc.get('max_hp', self.hp_map.get(pc.get('type'), 1))
+                }
+                cache[(col, row)] = entry
+            pieces_px.append(entry)
+        self._pieces_state = pieces_px
+        return pieces_px
+
+    def get_state(self):
+        # include board and pieces in pixel coordinates for clients; the
+        # piece list is shared between states and must not be modified
+        pieces_px = self._pieces_px()
 
         power_state = {
             "charge": int(getattr(self, 'power_charge', 0)),
@@ -818,7 +1023,7 @@ class Game:
             "remaining_damage": int(getattr(self, 'special_remaining_damage', 0))
         }
 
-        return {
+        state = {
             "width": self.WIDTH,
             "height": self.HEIGHT,
             "board": dict(self.board),
@@ -826,64 +1031,22 @@ class Game:
             "paddles": [p.to_dict() for p in self.paddles],
             "pieces": pieces_px,
             "scores": list(self.scores),
+            "tick": self.tick,
             "timestamp": time.time(),
             "game_over": self.game_over,
             "waiting_trajectory": getattr(self, 'waiting_trajectory', False),
             "power": power_state
         }
+        # multi-ball: every ball (the primary one included) as parallel lists
+        if len(self.balls) > 1:
+            state["balls"] = self.balls.to_columns()
+        return state
 
     def reset_game(self):
         # Recompute cols/rows in case EXTRA_DIMENSIONS changed, reconfigure
         # board geometry and paddles, then create a new per-game state.
         try:
-            raw_dims = os.environ.get('EXTRA_DIMENSIONS')
-            try:
-                if raw_dims is not None:
-                    dims = int(raw_dims)
-                    if dims in (2,4,6,8):
-                        self.active_cols = dims
-                    else:
-                        self.active_cols = COLS
-                else:
-                    self.active_cols = COLS
-            except Exception:
-                self.active_cols = COLS
-
-            # recompute board geometry and paddles
-            margin = 20
-            board_w = self.WIDTH - margin * 2
-            board_h = self.HEIGHT - margin * 2
-            base_cell = min(board_w / COLS, board_h / ROWS)
-            cell_size = max(8, int(base_cell))
-            board_pixel_w = cell_size * self.active_cols
-            board_pixel_h = cell_size * ROWS
-            board_x0 = (self.WIDTH - board_pixel_w) / 2
-            board_y0 = (self.HEIGHT - board_pixel_h) / 2
-            self.board = {
-                "cols": self.active_cols,
-                "rows": ROWS,
-                "cell_size": cell_size,
-                "x": board_x0,
-                "y": board_y0,
-                "width": board_pixel_w,
-                "height": board_pixel_h,
-            }
-            if self.active_cols == 2:
-                pad_w = max(int(cell_size * 0.9), int(cell_size))
-                pad_h = max(3, int(cell_size * 0.08))
-                ball_radius = max(3, int(cell_size * 0.10))
-            else:
-                pad_w = cell_size * 1.75
-                pad_h = cell_size * 0.25
-                ball_radius = max(6, int(cell_size * 0.2))
-            top_paddle_y = board_y0 + cell_size * 2 + pad_h/2 + 4
-            bottom_paddle_y = board_y0 + cell_size * (ROWS - 2) - pad_h/2 - 4
-            center_x = self.WIDTH / 2
-            self.paddles = [
-                Paddle(x=center_x, y=top_paddle_y, width=pad_w, height=pad_h, color="#00CCFF"),
-                Paddle(x=center_x, y=bottom_paddle_y, width=pad_w, height=pad_h, color="#FFCC00")
-            ]
-            self.ball = Ball(x=self.WIDTH/2, y=self.HEIGHT/2, radius=ball_radius, color="#FFFFFF", speed=350)
+            self._configure_board(paddle_colors=("#00CCFF", "#FFCC00"), ball_color="#FFFFFF")
             self._reset_power_state(reload_config=True)
 
             self._create_new_game_from_template()
@@ -899,6 +1062,10 @@ class Game:
             self.waiting_trajectory = True
             self.pending_trajectory = None
             self.game_over = None
+            # states from the previous game must not be rewound to
+            self.history.clear()
+            self.acked_ticks = [None, None]
+            self._start_match_events()
             logger.info('Game reset: new per-game file created %s', self.db_path)
         except Exception:
             logger.exception('Failed to reset game')
@@ -0,0 +1,209 @@
+# game_snapshot.py
+"""Compact, versioned binary snapshot of a running `Game`.
+
+Everything the simulation needs to continue a match is packed with
+precompiled `struct` layouts: board geometry, balls, paddles, power state,
+scores, flags and one fixed-size record per piece. The few variable-size
+values (HP map, per-game file path, colours, game-over info, a legacy
+trajectory label) go into a short JSON trailer. A full 8x8 board dumps and
+loads in a few tens of microseconds.
+
+Ball/paddle history and acknowledged ticks (lag-compensated paddle hits)
+are not included: they are rebuilt from the next ticks after a restore.
+
+Layout (network byte order):
+    header   magic b'PGS', version, tick, piece count, primary ball's last
+             paddle hit x2
+    board    active cols, cols, rows, cell size, x, y, width, height
+    ball     x, y, dx, dy, radius, speed, special_ready, special_active
+    paddle   x, y, width, height, speed, vx, command   (x2)
+    power    max charge, gain per hit, special damage, charge, remaining
+             damage (primary ball), ready, active, piercing (primary
+             ball), waiting_trajectory
+    scores   top, bottom
+    piece    type, color, col, row, hp, max_hp, last_hit   (x piece count)
+    balls    extra ball count, then x, y, dx, dy, radius, speed, piercing,
+             remaining damage, last paddle hit x2 per extra ball   (v2)
+    trailer  length + JSON
+
+Version 1 snapshots (single ball, no balls section) are still accepted.
+"""
+import json
+import struct
+
+from entities.balls import BallSet
+from entities.paddle import Paddle
+from game import EXTRA_BALL_COLOR, Game, ball_settings
+from layout import compile_layout
+
+MAGIC = b'PGS'
+VERSION = 2
+
+_HEADER = struct.Struct('!3sBqHdd')
+_BOARD = struct.Struct('!HHHHdddd')
+_BALL = struct.Struct('!6d??')
+_PADDLE = struct.Struct('!6dB')
+_POWER = struct.Struct('!5i4?')
+_SCORES = struct.Struct('!2i')
+_PIECE = struct.Struct('!cBHHiid')
+_BALL_COUNT = struct.Struct('!H')
+_EXTRA_BALL = struct.Struct('!6d?i2d')
+_TRAILER = struct.Struct('!I')
+
+COMMANDS = ('stop', 'left', 'right')
+_COMMAND_CODES = {c: i for i, c in enumerate(COMMANDS)}
+PIECE_COLORS = ('black', 'white')
+_COLOR_CODES = {c: i for i, c in enumerate(PIECE_COLORS)}
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def dump_game(game):
+    """Serialize `game` into a versioned blob (bytes)."""
+    board = game.board
+    ball = game.ball
+    balls = game.balls
+    pieces = game.pieces
+    last_hit = balls.paddle_hit
+    pending = getattr(game, 'pending_trajectory', None)
+    parts = [
+        _HEADER.pack(MAGIC, VERSION, game.tick, len(pieces), last_hit[0], last_hit[1]),
+        _BOARD.pack(game.active_cols, game.cols, game.rows, board['cell_size'],
+                    board['x'], board['y'], board['width'], board['height']),
+        _BALL.pack(ball.x, ball.y, ball.dx, ball.dy, ball.radius, ball.speed,
+                   bool(ball.special_ready), bool(ball.special_active)),
+    ]
+    for p in game.paddles:
+        parts.append(_PADDLE.pack(p.x, p.y, p.width, p.height, p.speed, p.vx,
+                                  _COMMAND_CODES.get(p.command, 0)))
+    parts.append(_POWER.pack(game.power_max_charge, game.power_gain_per_hit, game.power_special_damage,
+                             game.power_charge, balls.remaining[0],
+                             bool(game.power_ready), bool(game.power_active),
+                             bool(balls.piercing[0]), bool(game.waiting_trajectory)))
+    parts.append(_SCORES.pack(game.scores[0], game.scores[1]))
+    pack_piece = _PIECE.pack
+    hp_map = game.hp_map
+    for pc in pieces:
+        default_hp = hp_map.get(pc['type'], 1)
+        parts.append(pack_piece(pc['type'].encode('ascii'), _COLOR_CODES[pc['color']], pc['col'], pc['row'],
+                                pc.get('hp', default_hp), pc.get('max_hp', default_hp), pc.get('last_hit', 0.0)))
+    parts.append(_BALL_COUNT.pack(len(balls) - 1))
+    for i in range(1, len(balls)):
+        parts.append(_EXTRA_BALL.pack(balls.x[i], balls.y[i], balls.dx[i], balls.dy[i], balls.radius[i],
+                                      balls.speed[i], bool(balls.piercing[i]), balls.remaining[i],
+                                      balls.paddle_hit[2*i], balls.paddle_hit[2*i + 1]))
+    trailer = json.dumps({
+        "hp_map": hp_map,
+        "db_path": game.db_path,
+        "power_config": game.power_config,
+        "colors": [ball.color] + [p.color for p in game.paddles],
+        "game_over": game.game_over,
+        "pending_trajectory": pending,
+        "ball_colors": balls.colors[1:],
+        "max_balls": game.max_balls,
+        "ball_spawn_every": game.ball_spawn_every,
+        "ball_spawn_clock": game.ball_spawn_clock,
+    }, separators=(',', ':')).encode()
+    parts.append(_TRAILER.pack(len(trailer)))
+    parts.append(trailer)
+    return b''.join(parts)
+
+
+def load_game(blob):
+    """Rebuild a `Game` from `dump_game()` output without touching the REST API or the game files."""
+    return Game.from_snapshot(blob)
+
+
+def restore_game(game, blob):
+    """Apply a `dump_game()` blob to `game`, whose `_init_state()` already ran (see `Game.from_snapshot`)."""
+    view = memoryview(blob)
+    try:
+        magic, version, tick, n_pieces, hit0, hit1 = _HEADER.unpack_from(view, 0)
+    except struct.error as e:
+        raise SnapshotError(f"truncated snapshot: {e}") from None
+    if magic != MAGIC:
+        raise SnapshotError("not a game snapshot")
+    if version not in (1, VERSION):
+        raise SnapshotError(f"unsupported snapshot version {version}")
+    try:
+        off = _HEADER.size
+        active_cols, cols, rows, cell_size, bx, by, bw, bh = _BOARD.unpack_from(view, off)
+        off += _BOARD.size
+        x, y, dx, dy, radius, speed, sp_ready, sp_active = _BALL.unpack_from(view, off)
+        off += _BALL.size
+        paddle_fields = []
+        for _ in range(2):
+            paddle_fields.append(_PADDLE.unpack_from(view, off))
+            off += _PADDLE.size
+        power = _POWER.unpack_from(view, off)
+        off += _POWER.size
+        scores = list(_SCORES.unpack_from(view, off))
+        off += _SCORES.size
+        pieces = []
+        for ptype, color, col, row, hp, max_hp, last in _PIECE.iter_unpack(view[off:off + n_pieces * _PIECE.size]):
+            pieces.append({"type": ptype.decode('ascii'), "color": PIECE_COLORS[color], "col": col, "row": row,
+                           "hp": hp, "max_hp": max_hp, "last_hit": last})
+        off += n_pieces * _PIECE.size
+        extra_balls = []
+        if version >= 2:
+            (n_extra,) = _BALL_COUNT.unpack_from(view, off)
+            off += _BALL_COUNT.size
+            extra_balls = list(_EXTRA_BALL.iter_unpack(view[off:off + n_extra * _EXTRA_BALL.size]))
+            off += n_extra * _EXTRA_BALL.size
+        (n_trailer,) = _TRAILER.unpack_from(view, off)
+        off += _TRAILER.size
+        extra = json.loads(bytes(view[off:off + n_trailer]))
+    except (struct.error, IndexError, ValueError) as e:
+        raise SnapshotError(f"corrupt snapshot: {e}") from None
+
+    colors = extra.get('colors') or ["#ff79c6", "#bd93f9", "#f1fa8c"]
+    game.active_cols = active_cols
+    game.cols = cols
+    game.rows = rows
+    game.board = {"cols": active_cols, "rows": rows, "cell_size": cell_size,
+                  "x": bx, "y": by, "width": bw, "height": bh}
+    balls = BallSet()
+    balls.add(x, y, dx, dy, radius, speed, colors[0])
+    balls.paddle_hit[0] = hit0
+    balls.paddle_hit[1] = hit1
+    ball_colors = extra.get('ball_colors') or []
+    for k, (ex, ey, edx, edy, er, espeed, epiercing, eremaining, ehit0, ehit1) in enumerate(extra_balls):
+        color = ball_colors[k] if k < len(ball_colors) else EXTRA_BALL_COLOR
+        j = balls.add(ex, ey, edx, edy, er, espeed, color)
+        balls.piercing[j] = 1 if epiercing else 0
+        balls.remaining[j] = eremaining
+        balls.paddle_hit[2*j] = ehit0
+        balls.paddle_hit[2*j + 1] = ehit1
+    balls.special_ready = sp_ready
+    game.balls = balls
+    game.ball = balls.view(0)
+    max_balls, spawn_every = ball_settings()
+    game.max_balls = extra.get('max_balls', max_balls)
+    game.ball_spawn_every = extra.get('ball_spawn_every', spawn_every)
+    game.ball_spawn_clock = extra.get('ball_spawn_clock', 0.0)
+    game.paddles = []
+    for (px, py, pw, ph, pspeed, vx, cmd), color in zip(paddle_fields, colors[1:3]):
+        paddle = Paddle(x=px, y=py, width=pw, height=ph, color=color, speed=pspeed)
+        paddle.vx = vx
+        paddle.command = COMMANDS[cmd] if cmd < len(COMMANDS) else 'stop'
+        game.paddles.append(paddle)
+    game.power_config = extra.get('power_config') or game.power_config
+    (game.power_max_charge, game.power_gain_per_hit, game.power_special_damage, game.power_charge,
+     game.special_remaining_damage, game.power_ready, game.power_active, game.special_piercing,
+     game.waiting_trajectory) = power
+    # the power section carries the primary ball's piercing state
+    balls.piercing[0] = 1 if game.special_piercing else 0
+    balls.remaining[0] = game.special_remaining_damage
+    game._sync_special()
+    game.scores = scores
+    game.tick = tick
+    game.pieces = pieces
+    game._index_pieces()
+    game.hp_map = extra.get('hp_map') or {}
+    # cached: only the cell centres are used, the pieces come from the blob
+    game.layout = compile_layout(cols, rows, game.hp_map, Game.WIDTH, Game.HEIGHT)
+    game.db_path = extra.get('db_path')
+    game.game_over = extra.get('game_over')
+    game.pending_trajectory = extra.get('pending_trajectory')
@@ -0,0 +1,100 @@
+# handoff.py
+"""Pass a live room (sockets + state) from a draining server to a fresh one.
+
+The new process is started with `server.py --adopt` and waits on a Unix
+socket; the old one connects on SIGUSR1 and sends, in one `sendmsg`, the
+file descriptors of the listening socket, the client connections and the
+UDP socket, followed by a JSON description of the room and the game
+snapshot. Clients keep their TCP connections: at most a frame or two is
+delayed while the new process takes over.
+
+Wire format on the Unix socket:
+    sendmsg  "!II" (meta length, snapshot length) + SCM_RIGHTS fds
+    stream   meta JSON, then the game snapshot blob
+"""
+import json
+import os
+import socket
+import struct
+
+HANDOFF_VERSION = 1
+HANDOFF_PATH = os.environ.get('PONG_HANDOFF_SOCK', '/tmp/pong-handoff.sock')
+MAX_FDS = 16
+
+_LENGTHS = struct.Struct('!II')
+
+
+class HandoffError(RuntimeError):
+    pass
+
+
+def _recv_exact(sock, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise HandoffError("handoff stream closed early")
+        buf += chunk
+    return bytes(buf)
+
+
+def send_room(meta, snapshot, fds, path=HANDOFF_PATH, timeout=5.0):
+    """Send a room to the process waiting on `path`.
+
+    `meta` is JSON-serializable; its 'fds' entry must describe `fds` in order.
+    """
+    meta = dict(meta, version=HANDOFF_VERSION)
+    body = json.dumps(meta, separators=(',', ':')).encode()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.settimeout(timeout)
+        s.connect(path)
+        socket.send_fds(s, [_LENGTHS.pack(len(body), len(snapshot))], fds)
+        s.sendall(body)
+        s.sendall(snapshot)
+        # wait for the new process to confirm it owns the sockets
+        if s.recv(1) != b'1':
+            raise HandoffError("adopting process did not confirm the handoff")
+
+
+def receive_room(path=HANDOFF_PATH, timeout=None):
+    """Wait for one room on `path`; return (meta, snapshot, fds, conn).
+
+    The caller must `confirm(conn)` once it has taken ownership of the
+    descriptors; until then the old process keeps its copies.
+    """
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        listener.bind(path)
+        listener.listen(1)
+        listener.settimeout(timeout)
+        conn, _ = listener.accept()
+    finally:
+        listener.close()
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+    conn.settimeout(10.0)
+    msg, fds, _flags, _addr = socket.recv_fds(conn, _LENGTHS.size, MAX_FDS)
+    if len(msg) < _LENGTHS.size:
+        msg += _recv_exact(conn, _LENGTHS.size - len(msg))
+    n_meta, n_snapshot = _LENGTHS.unpack(msg)
+    meta = json.loads(_recv_exact(conn, n_meta))
+    snapshot = _recv_exact(conn, n_snapshot)
+    if meta.get('version') != HANDOFF_VERSION:
+        conn.close()
+        for fd in fds:
+            os.close(fd)
+        raise HandoffError(f"unsupported handoff version {meta.get('version')}")
+    return meta, snapshot, fds, conn
+
+
+def confirm(conn):
+    try:
+        conn.sendall(b'1')
+    finally:
+        conn.close()
@@ -0,0 +1,102 @@
+# history.py
+"""Fixed-size ring buffer of recent ball/paddle states, one record per tick.
+
+Records live in one preallocated `array('d')` (no per-tick allocation);
+slot = tick % capacity, and a parallel tick array tells whether a slot still
+holds the requested tick. A record is the simulation time, both paddle
+positions and every ball's position and velocity:
+
+    time | p0_x p0_y | p1_x p1_y | ball count | x y dx dy (x max_balls)
+
+Used to rewind paddle contacts to the tick a client acknowledged (what its
+player saw), and as the baseline of a resuming client: its acknowledged
+tick is only trusted while the buffer still holds it.
+
+The buffer grows (and starts over) the first time a tick has more balls
+than a record can hold.
+"""
+from array import array
+
+HEAD = 6
+BALL_FIELDS = 4
+TIME, P0_X, P0_Y, P1_X, P1_Y, N_BALLS = range(HEAD)
+
+
+class SnapshotHistory:
+    def __init__(self, capacity=64, max_balls=1):
+        self.capacity = capacity
+        self._allocate(max_balls)
+
+    def _allocate(self, max_balls):
+        self.max_balls = max_balls
+        self.stride = HEAD + BALL_FIELDS * max_balls
+        self.data = array('d', [0.0]) * (self.capacity * self.stride)
+        self.ticks = array('q', [-1]) * self.capacity
+        self.latest_tick = -1
+
+    def record(self, tick, t, balls, paddles):
+        n = len(balls)
+        if n > self.max_balls:
+            self._allocate(n)
+        slot = tick % self.capacity
+        # the slot reads as empty while it is rewritten (has() is called from other threads)
+        self.ticks[slot] = -1
+        base = slot * self.stride
+        d = self.data
+        d[base + TIME] = t
+        d[base + P0_X] = paddles[0].x
+        d[base + P0_Y] = paddles[0].y
+        d[base + P1_X] = paddles[1].x
+        d[base + P1_Y] = paddles[1].y
+        d[base + N_BALLS] = n
+        bx, by, bdx, bdy = balls.x, balls.y, balls.dx, balls.dy
+        at = base + HEAD
+        for i in range(n):
+            d[at] = bx[i]
+            d[at + 1] = by[i]
+            d[at + 2] = bdx[i]
+            d[at + 3] = bdy[i]
+            at += BALL_FIELDS
+        self.ticks[slot] = tick
+        self.latest_tick = tick
+
+    def has(self, tick):
+        return tick is not None and tick >= 0 and self.ticks[tick % self.capacity] == tick
+
+    def oldest_tick(self):
+        """Oldest tick still held, or None when empty."""
+        if self.latest_tick < 0:
+            return None
+        for tick in range(max(0, self.latest_tick - self.capacity + 1), self.latest_tick + 1):
+            if self.has(tick):
+                return tick
+        return None
+
+    def time(self, tick):
+        if not self.has(tick):
+            return None
+        return self.data[(tick % self.capacity) * self.stride + TIME]
+
+    def paddle(self, tick, player_index):
+        """(x, y) of a paddle at `tick`, or None if it was overwritten."""
+        if not self.has(tick):
+            return None
+        base = (tick % self.capacity) * self.stride + P0_X + 2 * player_index
+        return self.data[base], self.data[base + 1]
+
+    def ball_count(self, tick):
+        if not self.has(tick):
+            return 0
+        return int(self.data[(tick % self.capacity) * self.stride + N_BALLS])
+
+    def ball(self, tick, i):
+        """(x, y, dx, dy) of ball `i` at `tick`, or None."""
+        if i >= self.ball_count(tick):
+            return None
+        at = (tick % self.capacity) * self.stride + HEAD + BALL_FIELDS * i
+        return tuple(self.data[at:at + BALL_FIELDS])
+
+    def clear(self):
+        for i in range(self.capacity):
+            self.ticks[i] = -1
+        self.latest_tick = -1
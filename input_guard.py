@@ -0,0 +1,108 @@
+# input_guard.py
+"""Per-connection limits on what a client may send to the server.
+
+Every frame a client sends first takes a token from a `TokenBucket`
+(`rate` frames per second, bursts of `burst`). Frames over budget are
+dropped before they are JSON-decoded. Each dropped frame also takes a
+token from a second, slower bucket: a client that keeps flooding empties
+it and is flagged as abusive, and the receiver then disconnects it.
+Occasional bursts (key repeat, a reconnect replay) only cost dropped
+frames.
+
+Control messages are debounced: the same control with the same value
+from the same connection within `debounce` seconds is ignored, so a held
+pause key toggles once instead of flickering.
+
+Counters are kept per connection; `snapshot()` feeds the health endpoint.
+"""
+import json
+import time
+
+# frames per second a client may send on average, and the burst allowed
+INPUT_RATE = 60.0
+INPUT_BURST = 120
+# dropped frames tolerated: sustained rate and burst before disconnecting
+KICK_RATE = 15.0
+KICK_BURST = 240
+# client messages are small; anything larger is a protocol violation
+MAX_INPUT_FRAME = 4096
+# identical control messages closer than this are ignored
+CONTROL_DEBOUNCE = 0.25
+
+
+class TokenBucket:
+    def __init__(self, rate, burst, now=None):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.stamp = time.monotonic() if now is None else now
+
+    def take(self, n=1, now=None):
+        """Take `n` tokens if available; False when over budget."""
+        if now is None:
+            now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens < n:
+            return False
+        self.tokens -= n
+        return True
+
+
+class InputGuard:
+    def __init__(self, rate=INPUT_RATE, burst=INPUT_BURST, kick_rate=KICK_RATE, kick_burst=KICK_BURST,
+                 debounce=CONTROL_DEBOUNCE):
+        self.bucket = TokenBucket(rate, burst)
+        self.strikes = TokenBucket(kick_rate, kick_burst)
+        self.debounce = debounce
+        # control name -> (value key, time) of the last one accepted
+        self.last_control = {}
+        self.abusive = False
+        self.frames = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.debounced = 0
+        self.oversized = 0
+        self.kicked = 0
+
+    def admit(self, frames, now=None):
+        """Frames of one read that fit the budget (the rest are dropped undecoded)."""
+        if now is None:
+            now = time.monotonic()
+        self.frames += len(frames)
+        bucket = self.bucket
+        bucket.take(0, now)
+        allowed = min(len(frames), int(bucket.tokens))
+        bucket.tokens -= allowed
+        over = len(frames) - allowed
+        if over:
+            self.dropped += over
+            if not self.strikes.take(over, now):
+                self.abusive = True
+            return frames[:allowed]
+        return frames
+
+    def accept_control(self, cmd, value, now=None):
+        """False if the same control (and value) was accepted less than `debounce` ago."""
+        if now is None:
+            now = time.monotonic()
+        try:
+            key = json.dumps(value, sort_keys=True)
+        except (TypeError, ValueError):
+            key = repr(value)
+        last = self.last_control.get(cmd)
+        if last is not None and last[0] == key and now - last[1] < self.debounce:
+            self.debounced += 1
+            return False
+        self.last_control[cmd] = (key, now)
+        return True
+
+    def snapshot(self):
+        return {
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "debounced": self.debounced,
+            "oversized": self.oversized,
+            "kicked": self.kicked,
+        }
@@ -0,0 +1,154 @@
+# input_queue.py
+"""Per-player input queues between the receivers and the game loop.
+
+Receivers (TCP recv_loop, the UDP channel) and the room's own threads
+never touch game or room state: they `push()` inputs, each stamped with
+the game tick at which it arrived and a sequence number shared by all
+queues. At the start of each tick the loop calls `drain()`, which hands
+back every pending input of every queue merged by sequence number, so
+the game sees them in the order they were received: a `trajectory` sent
+before a `new_game` goes to the old game, one sent after goes to the new
+one.
+
+Queue 0 carries room inputs (power config pushes, auto-pause when a
+player drops and resume when everybody is back); queues 1 and 2 carry
+the inputs of players 1 and 2. Pushing and draining are deque appends
+and pops under one uncontended lock, O(1) per input.
+
+Movement is a held key, not an event: `held[player]` is the last
+direction received. A key pressed and released within one tick still
+moves the paddle for that tick (`resolve_moves`), so a quick tap is not
+lost between two ticks. Repeats of the held direction (UDP resends,
+key repeat) are not queued.
+
+Queues hold QUEUE_LEN inputs, above what the InputGuard lets a client
+burst. When the loop stalls for that long, a full queue keeps its
+controls and only the latest of its moves (the others are counted in
+`dropped`): the held direction stays right and no 'stop', pause or
+trajectory is lost. A queue of controls only goes past QUEUE_LEN.
+"""
+import heapq
+import itertools
+import threading
+from collections import deque
+
+ROOM = 0
+PLAYERS = (1, 2)
+MOVES = ("left", "right", "stop")
+QUEUE_LEN = 256
+
+
+class InputQueues:
+    def __init__(self, held=None, maxlen=QUEUE_LEN):
+        self.queues = {pn: deque() for pn in (ROOM,) + PLAYERS}
+        self.maxlen = maxlen
+        self.lock = threading.Lock()
+        # last direction received from each player, and applied by the loop
+        self.held = {pn: "stop" for pn in PLAYERS}
+        if held:
+            self.held.update((int(pn), cmd) for pn, cmd in held.items() if cmd in MOVES)
+        self.last_move = dict(self.held)
+        # game tick inputs are stamped with; set by the loop after each update
+        self.tick = 0
+        self.seq = itertools.count()
+        self.pushed = dict.fromkeys(self.queues, 0)
+        self.dropped = dict.fromkeys(self.queues, 0)
+        # largest number of ticks an input waited before being drained
+        self.max_wait = dict.fromkeys(self.queues, 0)
+
+    # -- receiver side -----------------------------------------------------------
+
+    def push(self, player, kind, value=None):
+        """Queue an input of `player` (ROOM for room inputs); False for a repeated move."""
+        queue = self.queues.get(player)
+        if queue is None:
+            return False
+        with self.lock:
+            if kind == "cmd":
+                if value not in MOVES or self.last_move.get(player) == value:
+                    return False
+                self.last_move[player] = value
+            if len(queue) >= self.maxlen:
+                self._collapse_moves(player, queue)
+            queue.append((next(self.seq), self.tick, player, kind, value))
+            self.pushed[player] += 1
+        return True
+
+    def _collapse_moves(self, player, queue):
+        """Keep the controls of a full queue and only its latest move."""
+        kept = []
+        last_move = None
+        for entry in queue:
+            if entry[3] == "cmd":
+                last_move = entry
+            else:
+                kept.append(entry)
+        if last_move is not None:
+            kept.append(last_move)
+            kept.sort()
+        self.dropped[player] += len(queue) - len(kept)
+        queue.clear()
+        queue.extend(kept)
+
+    def pending(self):
+        return any(self.queues.values())
+
+    # -- game loop side ----------------------------------------------------------
+
+    def drain(self):
+        """Every queued input as (seq, tick, player, kind, value), in arrival order."""
+        batches = []
+        for player, queue in self.queues.items():
+            if not queue:
+                continue
+            with self.lock:
+                batch = list(queue)
+                queue.clear()
+            wait = self.tick - batch[0][1]
+            if wait > self.max_wait[player]:
+                self.max_wait[player] = wait
+            batches.append(batch)
+        if not batches:
+            return []
+        if len(batches) == 1:
+            return batches[0]
+        # each batch is already in sequence order
+        return list(heapq.merge(*batches))
+
+    def resolve_moves(self, inputs):
+        """Direction of each player for this tick, given the tick's inputs; updates `held`."""
+        moves = dict(self.held)
+        pressed = set()
+        for _, _, player, kind, value in inputs:
+            if kind != "cmd":
+                continue
+            if value != "stop":
+                moves[player] = value
+                pressed.add(player)
+            elif player not in pressed:
+                moves[player] = value
+            # else: a press released within the tick still counts for this tick
+            self.held[player] = value
+        return moves
+
+    def idle(self):
+        """No input waiting and no key held."""
+        return not self.pending() and all(cmd == "stop" for cmd in self.held.values())
+
+    # -- handoff -------------------------------------------------------------------
+
+    def export(self):
+        """Pending inputs as JSON-friendly lists (room handoff)."""
+        return [[player, tick, kind, value] for _, tick, player, kind, value in self.drain()]
+
+    def import_inputs(self, inputs):
+        for player, tick, kind, value in inputs or ():
+            queue = self.queues.get(int(player))
+            if queue is not None:
+                with self.lock:
+                    queue.append((next(self.seq), tick, int(player), kind, value))
+
+    def snapshot(self):
+        return {str(pn): {"held": self.held.get(pn), "queued": len(q), "pushed": self.pushed[pn],
+                          "dropped": self.dropped[pn], "max_wait_ticks": self.max_wait[pn]}
+                for pn, q in self.queues.items()}
@@ -0,0 +1,165 @@
+# layout.py
+"""Board layouts compiled once and shared by every match on the same board.
+
+`board_geometry()` computes the board rectangle, paddle and ball sizes for
+a board size. `compile_layout()` adds the starting pieces (the 8x8
+template or a generated layout) with their HP and the pixel centre of
+every cell. Both are immutable and kept in LRU caches keyed by board size
+and, for layouts, the HP map: a new game clones the cached piece tuples
+into fresh dicts instead of re-reading the template and redoing the
+geometry.
+"""
+import json
+import os
+from collections import namedtuple
+from functools import lru_cache
+from types import MappingProxyType
+
+# Chessboard-style board: pieces occupy full cells (no gaps). The classic
+# 8x8 board comes from the JSON template, every other size is generated.
+COLS = 8
+ROWS = 8
+BOARD_MARGIN = 20
+LAYOUT_CACHE_SIZE = 16
+
+Geometry = namedtuple('Geometry', 'cols rows board paddle_w paddle_h paddle_y ball_radius')
+Geometry.__doc__ = """Board rectangle (read-only `board` mapping), paddle size, the two
+paddle centre lines (top, bottom) and the ball radius."""
+
+
+class Layout(namedtuple('Layout', 'geometry hp_map pieces centers scores')):
+    """Starting position of a board: `pieces` holds (type, color, col, row, hp)
+    tuples, `centers` maps every (col, row) to the cell's pixel centre."""
+
+    __slots__ = ()
+
+    def new_pieces(self):
+        """Fresh, mutable piece dicts for a new game."""
+        return [{"type": t, "color": color, "col": col, "row": row, "hp": hp, "max_hp": hp, "last_hit": 0.0}
+                for t, color, col, row, hp in self.pieces]
+
+
+def ranks_per_side(rows):
+    """Rows of pieces per player: 2 on the classic board, a quarter of the rows on larger ones."""
+    return max(2, rows // 4)
+
+
+def major_row(cols):
+    """Back rank for `cols` columns: queen and king in the middle, then B, N, R repeated outwards.
+
+    For 2/4/6/8 columns this is the central slice of RNBQKBNR.
+    """
+    row = [None] * cols
+    king = cols // 2
+    row[king] = 'K'
+    if king - 1 >= 0:
+        row[king - 1] = 'Q'
+    outward = ('B', 'N', 'R')
+    for i, c in enumerate(range(king - 2, -1, -1)):
+        row[c] = outward[i % 3]
+    for i, c in enumerate(range(king + 1, cols)):
+        row[c] = outward[i % 3]
+    return row
+
+
+def starting_cells(cols, rows):
+    """(type, color, col, row) of the generated layout: black on top, white mirrored at the bottom."""
+    ranks = ranks_per_side(rows)
+    cells = []
+    for c, m in enumerate(major_row(cols)):
+        cells.append((m, "black", c, 0))
+        for r in range(1, ranks):
+            cells.append(('P', "black", c, r))
+        for r in range(rows - 2, rows - 1 - ranks, -1):
+            cells.append(('P', "white", c, r))
+        cells.append((m, "white", c, rows - 1))
+    return cells
+
+
+def generate_layout(cols, rows, hp_map):
+    """Starting pieces for a cols x rows board, as piece dicts."""
+    pieces = []
+    for t, color, col, row in starting_cells(cols, rows):
+        hp = hp_map.get(t, 1)
+        pieces.append({"type": t, "color": color, "col": col, "row": row, "hp": hp, "max_hp": hp, "last_hit": 0.0})
+    return pieces
+
+
+@lru_cache(maxsize=LAYOUT_CACHE_SIZE)
+def board_geometry(cols, rows, width, height):
+    """Geometry of a cols x rows board in a width x height window.
+
+    The cell size is the largest that fits the window, so the classic
+    8-row boards keep their spacing and large boards shrink their cells.
+    """
+    board_w = width - BOARD_MARGIN * 2
+    board_h = height - BOARD_MARGIN * 2
+    cell_size = max(8, int(min(board_w / cols, board_h / rows)))
+    board_pixel_w = cell_size * cols
+    board_pixel_h = cell_size * rows
+    board_x0 = (width - board_pixel_w) / 2
+    board_y0 = (height - board_pixel_h) / 2
+    board = {
+        "cols": cols,
+        "rows": rows,
+        "cell_size": cell_size,
+        "x": board_x0,
+        "y": board_y0,
+        "width": board_pixel_w,
+        "height": board_pixel_h,
+    }
+    # Adjust paddle size: for very reduced boards (2 cols) make paddles
+    # much smaller so the ball can pass easily. Also reduce the ball radius.
+    if cols == 2:
+        pad_w = max(int(cell_size * 0.9), int(cell_size))
+        pad_h = max(3, int(cell_size * 0.08))
+        ball_radius = max(3, int(cell_size * 0.10))
+    else:
+        # on wide boards a paddle of 1.75 small cells would be a sliver
+        pad_w = max(cell_size * 1.75, board_pixel_w * 0.15)
+        pad_h = max(6, cell_size * 0.25)
+        ball_radius = max(6, int(cell_size * 0.2))
+    # paddles sit just outside the pawn rows of each player
+    ranks = ranks_per_side(rows)
+    top_paddle_y = board_y0 + cell_size * ranks + pad_h/2 + 4
+    bottom_paddle_y = board_y0 + cell_size * (rows - ranks) - pad_h/2 - 4
+    return Geometry(cols, rows, MappingProxyType(board), pad_w, pad_h, (top_paddle_y, bottom_paddle_y), ball_radius)
+
+
+def _template(path):
+    """Pieces (type, color, col, row) and scores of the template file, cached until it changes."""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        raise FileNotFoundError(f"Template not found: {path}") from None
+    return _read_template(path, mtime)
+
+
+@lru_cache(maxsize=4)
+def _read_template(path, mtime):
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    cells = tuple((pc['type'], pc['color'], pc['col'], pc['row']) for pc in data.get('pieces', []))
+    return cells, tuple(data.get('scores', [0, 0]))
+
+
+def compile_layout(cols, rows, hp_map, width, height, template_path=None):
+    """Cached `Layout` of a board for `hp_map` (the template is used for 8x8 when given)."""
+    template = _template(template_path) if template_path and (cols, rows) == (COLS, ROWS) else None
+    return _compile(cols, rows, tuple(sorted(hp_map.items())), width, height, template)
+
+
+@lru_cache(maxsize=LAYOUT_CACHE_SIZE)
+def _compile(cols, rows, hp_items, width, height, template):
+    geometry = board_geometry(cols, rows, width, height)
+    hp_map = dict(hp_items)
+    if template is not None:
+        cells, scores = template
+    else:
+        cells, scores = starting_cells(cols, rows), (0, 0)
+    pieces = tuple((t, color, col, row, hp_map.get(t, 1)) for t, color, col, row in cells)
+    board = geometry.board
+    cell = board['cell_size']
+    centers = {(c, r): (board['x'] + c * cell + cell / 2, board['y'] + r * cell + cell / 2)
+               for c in range(cols) for r in range(rows)}
+    return Layout(geometry, MappingProxyType(hp_map), pieces, MappingProxyType(centers), scores)
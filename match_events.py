@@ -0,0 +1,215 @@
+# match_events.py
+"""Typed gameplay events, recorded per match into columnar `.npz` files.
+
+`Game` reports what happens on the board (piece hits, destroyed pieces,
+special shots, paddle and wall contacts) to an `EventRecorder`. On the
+simulation thread an event is one tuple appended to a deque. A writer
+thread drains the deque every `flush_every` seconds into one `array`
+column per field, and rewrites the match file every `checkpoint_every`
+seconds and when the match ends.
+
+A match file is a deflated zip of `.npy` members, one per column (the
+layout of `numpy.savez_compressed`, written without numpy), plus
+`meta.json` with the match settings (board size, HP map, power config).
+`numpy.load(path)` opens it; `match_stats.py` aggregates many of them.
+
+Columns (one row per event):
+    kind     event code (HIT, DESTROYED, SPECIAL_START, SPECIAL_END,
+             PADDLE_HIT, WALL_HIT)
+    tick     simulation tick
+    t        wall clock time (seconds)
+    ball     ball index
+    piece    ord() of the piece type letter, 0 for other events
+    color    0 white, 1 black, -1 for other events
+    col, row board cell of the piece
+    amount   HIT: damage dealt; DESTROYED: max HP; SPECIAL_START: damage
+             capacity; SPECIAL_END: capacity left unused
+    rest     HIT: HP left after the hit
+    side     PADDLE_HIT: player index; WALL_HIT: 0 left, 1 right, 2 top,
+             3 bottom; SPECIAL_END: END_* reason
+    special  HIT/DESTROYED: 1 when dealt by a special shot
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import zipfile
+from array import array
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+HIT = 1
+DESTROYED = 2
+SPECIAL_START = 3
+SPECIAL_END = 4
+PADDLE_HIT = 5
+WALL_HIT = 6
+KIND_NAMES = {HIT: "hit", DESTROYED: "destroyed", SPECIAL_START: "special_start",
+              SPECIAL_END: "special_end", PADDLE_HIT: "paddle_hit", WALL_HIT: "wall_hit"}
+
+# SPECIAL_END reasons
+END_EXHAUSTED = 0  # capacity used up
+END_BLOCKED = 1    # a piece survived: the ball bounced
+END_WALL = 2       # the ball touched a wall
+END_RESET = 3      # new game or power config reset
+
+WALL_LEFT, WALL_RIGHT, WALL_TOP, WALL_BOTTOM = range(4)
+
+COLORS = {"white": 0, "black": 1}
+
+# column name -> array typecode, in tuple order
+COLUMNS = (
+    ("kind", 'B'),
+    ("tick", 'q'),
+    ("t", 'd'),
+    ("ball", 'h'),
+    ("piece", 'B'),
+    ("color", 'b'),
+    ("col", 'h'),
+    ("row", 'h'),
+    ("amount", 'i'),
+    ("rest", 'i'),
+    ("side", 'b'),
+    ("special", 'B'),
+)
+
+# where `Game` writes its match files; unset disables recording
+EVENTS_DIR = os.environ.get('PONG_EVENTS_DIR') or None
+
+
+def _npy(column):
+    """`.npy` (format 1.0) bytes of a 1-d array.array."""
+    order = '<' if sys.byteorder == 'little' else '>'
+    code = column.typecode
+    kind = 'f' if code == 'd' else ('u' if code.isupper() else 'i')
+    descr = ('|' if column.itemsize == 1 else order) + kind + str(column.itemsize)
+    header = "{'descr': '%s', 'fortran_order': False, 'shape': (%d,), }" % (descr, len(column))
+    # magic (6) + version (2) + header length (2) + header, padded to 64 bytes
+    pad = 64 - (10 + len(header) + 1) % 64
+    header = (header + ' ' * pad + '\n').encode('latin1')
+    return b'\x93NUMPY\x01\x00' + len(header).to_bytes(2, 'little') + header + column.tobytes()
+
+
+def write_match(path, columns, meta):
+    """Write one match file atomically (columns: name -> array.array)."""
+    tmp = path + '.tmp'
+    with zipfile.ZipFile(tmp, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, _ in COLUMNS:
+            zf.writestr(name + '.npy', _npy(columns[name]))
+        zf.writestr('meta.json', json.dumps(meta, separators=(',', ':')))
+    os.replace(tmp, path)
+
+
+class _Match:
+    def __init__(self, path, meta):
+        self.path = path
+        self.meta = meta
+        self.columns = {name: array(code) for name, code in COLUMNS}
+        self.dirty = True
+
+    def extend(self, rows):
+        for (name, _), values in zip(COLUMNS, zip(*rows)):
+            self.columns[name].extend(values)
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        self.meta["events"] = len(self.columns["kind"])
+        try:
+            write_match(self.path, self.columns, self.meta)
+            self.dirty = False
+        except OSError as e:
+            logger.error("Failed to write match events to %s: %s", self.path, e)
+
+
+class EventRecorder:
+    """Collects the events of successive matches; one file per match in `directory`."""
+
+    def __init__(self, directory, flush_every=1.0, checkpoint_every=10.0):
+        self.directory = directory
+        self.flush_every = flush_every
+        self.checkpoint_every = checkpoint_every
+        os.makedirs(directory, exist_ok=True)
+        # event tuples and match markers, in order; deque appends and pops
+        # are atomic, so the simulation thread never takes a lock
+        self.queue = deque()
+        self.recorded = 0
+        self.matches = 0
+        self.stop_event = threading.Event()
+        self.wake = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="match-events", daemon=True)
+        self.thread.start()
+
+    def new_match(self, meta):
+        """Start a new match file; later events go into it."""
+        self.matches += 1
+        name = "match-%s-%d-%d.npz" % (time.strftime('%Y%m%d-%H%M%S'), os.getpid(), self.matches)
+        meta = dict(meta, started=time.time())
+        self.queue.append((os.path.join(self.directory, name), meta))
+
+    def record(self, kind, tick, t, ball=-1, piece=0, color=-1, col=-1, row=-1, amount=0, rest=0, side=-1, special=0):
+        self.queue.append((kind, tick, t, ball, piece, color, col, row, amount, rest, side, special))
+        self.recorded += 1
+
+    def close(self):
+        """Write everything recorded so far and stop the writer."""
+        self.stop_event.set()
+        self.wake.set()
+        self.thread.join()
+
+    def _run(self):
+        match = None
+        last_save = time.monotonic()
+        while True:
+            stopping = self.stop_event.is_set()
+            match = self._drain(match)
+            now = time.monotonic()
+            if match is not None and (stopping or now - last_save >= self.checkpoint_every):
+                match.save()
+                last_save = now
+            if stopping:
+                return
+            self.wake.wait(self.flush_every)
+
+    def _drain(self, match):
+        queue = self.queue
+        rows = []
+        for _ in range(len(queue)):
+            item = queue.popleft()
+            if len(item) == 2:
+                # match marker: close the current file, open the next one
+                if match is not None:
+                    if rows:
+                        match.extend(rows)
+                        rows = []
+                    match.save()
+                match = _Match(*item)
+            else:
+                rows.append(item)
+        if rows and match is not None:
+            match.extend(rows)
+        return match
+
+
+def open_recorder(directory=EVENTS_DIR):
+    """Recorder for PONG_EVENTS_DIR, or None when event recording is off."""
+    if not directory:
+        return None
+    try:
+        return EventRecorder(directory)
+    except OSError as e:
+        logger.error("Match events disabled, cannot use %s: %s", directory, e)
+        return None
+
+
+def load_columns(path):
+    """Columns of a match file as numpy arrays, and its meta dict (needs numpy)."""
+    import numpy as np
+    with np.load(path) as data:
+        columns = {name: data[name] for name, _ in COLUMNS}
+        meta = json.loads(data['meta.json'].decode()) if 'meta.json' in data.files else {}
+    return columns, meta
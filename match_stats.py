@@ -0,0 +1,186 @@
+# match_stats.py
+"""Balance figures aggregated over recorded match files (see match_events.py).
+
+    python3 match_stats.py events/            # every match-*.npz in the directory
+    python3 match_stats.py a.npz b.npz --json
+
+Per piece type: hits, damage (normal and special), pieces destroyed, hits
+and seconds from a piece's first hit to its destruction. Special shots:
+count, damage capacity, damage dealt, efficiency (dealt / capacity),
+pieces destroyed per shot and why they ended. Paddle and wall contacts.
+
+Everything is computed with numpy over the concatenated columns, so
+millions of events take a few seconds, most of it spent inflating the
+files. Unlike the recorder, this tool needs numpy.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+
+import match_events as ev
+
+END_NAMES = {ev.END_EXHAUSTED: "exhausted", ev.END_BLOCKED: "blocked", ev.END_WALL: "wall", ev.END_RESET: "reset"}
+WALL_NAMES = ("left", "right", "top", "bottom")
+# piece keys: file index and board cell (boards are at most 64x64)
+_CELLS = 64 * 64
+
+
+def match_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, 'match-*.npz'))))
+        else:
+            files.append(path)
+    return files
+
+
+def load(files):
+    """Concatenated columns of `files`, with a `match` column (file index)."""
+    import numpy as np
+    parts = {name: [] for name, _ in ev.COLUMNS}
+    parts['match'] = []
+    duration = 0.0
+    for k, path in enumerate(files):
+        columns, _ = ev.load_columns(path)
+        for name, _ in ev.COLUMNS:
+            parts[name].append(columns[name])
+        n = len(columns['kind'])
+        parts['match'].append(np.full(n, k, dtype=np.int64))
+        if n:
+            duration += float(columns['t'][-1] - columns['t'][0])
+    if not files:
+        return None, 0.0
+    return {name: np.concatenate(chunks) for name, chunks in parts.items()}, duration
+
+
+def piece_stats(c):
+    import numpy as np
+    kind, piece = c['kind'], c['piece']
+    key = c['match'] * _CELLS + c['col'].astype(np.int64) * 64 + c['row']
+    hits = kind == ev.HIT
+    destroyed = kind == ev.DESTROYED
+    special = c['special'].astype(bool)
+    # first hit time and hit count of every piece that was hit
+    hit_keys = key[hits]
+    order = np.lexsort((c['t'][hits], hit_keys))
+    keys_sorted = hit_keys[order]
+    uniq, first, counts = np.unique(keys_sorted, return_index=True, return_counts=True)
+    first_t = c['t'][hits][order][first]
+    d_keys = key[destroyed]
+    pos = np.searchsorted(uniq, d_keys)
+    ttk = c['t'][destroyed] - first_t[pos]
+    htk = counts[pos]
+    out = {}
+    for code in np.unique(piece[hits | destroyed]):
+        h = hits & (piece == code)
+        d_sel = piece[destroyed] == code
+        amount = c['amount'][h]
+        out[chr(code)] = {
+            "hits": int(h.sum()),
+            "damage": int(amount.sum()),
+            "special_damage": int(amount[special[h]].sum()),
+            "destroyed": int(d_sel.sum()),
+            "destroyed_by_special": int((special[destroyed] & d_sel).sum()),
+            "max_hp": round(float(c['amount'][destroyed][d_sel].mean()), 2) if d_sel.any() else None,
+            "hits_to_kill": round(float(htk[d_sel].mean()), 2) if d_sel.any() else None,
+            "time_to_kill_s": round(float(ttk[d_sel].mean()), 3) if d_sel.any() else None,
+            "time_to_kill_median_s": round(float(np.median(ttk[d_sel])), 3) if d_sel.any() else None,
+        }
+    return out
+
+
+def special_stats(c):
+    import numpy as np
+    kind = c['kind']
+    sel = np.flatnonzero((kind == ev.SPECIAL_START) | (kind == ev.SPECIAL_END))
+    # events of one ball of one match, in recording order: START, END, START...
+    sel = sel[np.lexsort((sel, c['ball'][sel], c['match'][sel]))]
+    k, m, b = kind[sel], c['match'][sel], c['ball'][sel]
+    pair = (k[:-1] == ev.SPECIAL_START) & (k[1:] == ev.SPECIAL_END) & (m[:-1] == m[1:]) & (b[:-1] == b[1:])
+    starts = sel[:-1][pair]
+    ends = sel[1:][pair]
+    capacity = c['amount'][starts].astype(np.int64)
+    dealt = capacity - c['amount'][ends]
+    shots = int((kind == ev.SPECIAL_START).sum())
+    reasons = np.bincount(c['side'][ends].astype(np.int64), minlength=len(END_NAMES)) if len(ends) else np.zeros(len(END_NAMES), int)
+    destroyed = int(((kind == ev.DESTROYED) & (c['special'] == 1)).sum())
+    return {
+        "shots": shots,
+        "completed": int(len(starts)),
+        "capacity": int(capacity.sum()),
+        "damage_dealt": int(dealt.sum()),
+        "efficiency": round(float(dealt.sum() / capacity.sum()), 4) if capacity.sum() else None,
+        "destroyed_per_shot": round(destroyed / shots, 3) if shots else None,
+        "end_reasons": {END_NAMES[i]: int(n) for i, n in enumerate(reasons) if i in END_NAMES},
+    }
+
+
+def contact_stats(c):
+    import numpy as np
+    kind, side = c['kind'], c['side'].astype(np.int64)
+    paddles = np.bincount(side[kind == ev.PADDLE_HIT], minlength=2)
+    walls = np.bincount(side[kind == ev.WALL_HIT], minlength=4)
+    return {
+        "paddle_hits": {"player1": int(paddles[0]), "player2": int(paddles[1])},
+        "wall_hits": {name: int(walls[i]) for i, name in enumerate(WALL_NAMES)},
+    }
+
+
+def aggregate(files):
+    columns, duration = load(files)
+    if columns is None or not len(columns['kind']):
+        return {"matches": len(files), "events": 0}
+    return {
+        "matches": len(files),
+        "events": int(len(columns['kind'])),
+        "seconds": round(duration, 1),
+        "pieces": piece_stats(columns),
+        "special": special_stats(columns),
+        "contacts": contact_stats(columns),
+    }
+
+
+def print_report(stats):
+    print(f"{stats['matches']} matches, {stats['events']} events, {stats.get('seconds', 0)} s of play")
+    pieces = stats.get('pieces')
+    if pieces:
+        print(f"\n{'piece':5} {'hits':>9} {'damage':>9} {'special':>9} {'killed':>7} {'max hp':>7} "
+              f"{'hits/kill':>9} {'ttk s':>8} {'median':>8}")
+        fmt = lambda v: '-' if v is None else v
+        for t in sorted(pieces):
+            p = pieces[t]
+            print(f"{t:5} {p['hits']:9d} {p['damage']:9d} {p['special_damage']:9d} {p['destroyed']:7d} "
+                  f"{fmt(p['max_hp']):>7} {fmt(p['hits_to_kill']):>9} {fmt(p['time_to_kill_s']):>8} "
+                  f"{fmt(p['time_to_kill_median_s']):>8}")
+    sp = stats.get('special')
+    if sp:
+        print(f"\nspecial shots {sp['shots']}: capacity {sp['capacity']}, dealt {sp['damage_dealt']}, "
+              f"efficiency {sp['efficiency']}, destroyed/shot {sp['destroyed_per_shot']}")
+        print("  ended: " + ", ".join(f"{k} {v}" for k, v in sp['end_reasons'].items()))
+    contacts = stats.get('contacts')
+    if contacts:
+        print("\npaddle hits: " + ", ".join(f"{k} {v}" for k, v in contacts['paddle_hits'].items()))
+        print("wall hits: " + ", ".join(f"{k} {v}" for k, v in contacts['wall_hits'].items()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aggregate recorded match events (PONG_EVENTS_DIR)")
+    parser.add_argument('paths', nargs='+', help="match files or directories")
+    parser.add_argument('--json', action='store_true', help="print the figures as JSON")
+    args = parser.parse_args(argv)
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        sys.exit("[!] match_stats.py needs numpy (pip install numpy)")
+    stats = aggregate(match_files(args.paths))
+    if args.json:
+        print(json.dumps(stats, indent=2))
+    else:
+        print_report(stats)
+
+
+if __name__ == "__main__":
+    main()
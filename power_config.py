@@ -0,0 +1,169 @@
+# power_config.py
+"""Cached power-up configuration with change detection.
+
+`power_config.json` is parsed once per path and kept in memory; games read
+the cached copy instead of the file. Changes arrive either through `update()`
+(validated, persisted, then pushed to subscribers) or are picked up from the
+file by comparing its mtime/size, so edits made by hand also reach running
+games without a reset.
+"""
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POWER_CONFIG = {
+    "charge_max": 10,          # hits required to charge the special shot
+    "charge_per_hit": 1,       # charge gained per HP removed
+    "special_damage": 3        # HP removed by the empowered hit
+}
+
+
+def validate_power_config(data):
+    """Strictly validate a config coming from the network or the UI.
+
+    Every known key must be present and an integer >= 1. Returns a new dict
+    with only the known keys; raises ValueError otherwise.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("power config must be a JSON object")
+    cfg = {}
+    for key in DEFAULT_POWER_CONFIG:
+        if key not in data:
+            raise ValueError(f"missing key: {key}")
+        value = data[key]
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise ValueError(f"{key} must be an integer")
+        if value < 1:
+            raise ValueError(f"{key} must be >= 1")
+        cfg[key] = value
+    return cfg
+
+
+def normalize_power_config(data):
+    """Leniently merge a config read from disk with the defaults."""
+    cfg = dict(DEFAULT_POWER_CONFIG)
+    for key in DEFAULT_POWER_CONFIG:
+        if key in data:
+            try:
+                cfg[key] = max(1, int(data[key]))
+            except Exception:
+                logger.warning("Invalid power config value %s=%r; using default", key, data[key])
+    return cfg
+
+
+class PowerConfigStore:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self._subscribers = []
+        self._stamp = None
+        self._config = dict(DEFAULT_POWER_CONFIG)
+        self.reload()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def reload(self):
+        """Re-read the file (only called on startup and when its mtime changes)."""
+        stamp = self._stat()
+        cfg = dict(DEFAULT_POWER_CONFIG)
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                cfg = normalize_power_config(data)
+            else:
+                logger.warning("Power config at %s is not a JSON object; using defaults", self.path)
+        except FileNotFoundError:
+            logger.info("Power config not found at %s; using defaults", self.path)
+        except Exception as e:
+            logger.warning("Failed to load power config %s: %s; using defaults", self.path, e)
+        with self.lock:
+            self._config = cfg
+            self._stamp = stamp
+        return dict(cfg)
+
+    def get(self):
+        """Return a copy of the cached config (no file access)."""
+        with self.lock:
+            return dict(self._config)
+
+    def check(self):
+        """Reload and notify subscribers if the file changed on disk. Returns True on change."""
+        stamp = self._stat()
+        with self.lock:
+            if stamp == self._stamp:
+                return False
+        old = self.get()
+        cfg = self.reload()
+        if cfg != old:
+            logger.info("Power config changed on disk: %s", cfg)
+            self._notify(cfg)
+        return True
+
+    def update(self, new_config):
+        """Validate, persist and publish a new config. Raises ValueError/OSError."""
+        cfg = validate_power_config(new_config)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(cfg, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+        with self.lock:
+            self._config = dict(cfg)
+            self._stamp = self._stat()
+        self._notify(cfg)
+        return dict(cfg)
+
+    def subscribe(self, callback):
+        with self.lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            try:
+                self._subscribers.remove(callback)
+            except ValueError:
+                pass
+
+    def _notify(self, cfg):
+        with self.lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(dict(cfg))
+            except Exception:
+                logger.exception("Power config subscriber failed")
+
+    def watch(self, stop_event, interval=1.0):
+        """Poll the file's mtime in a daemon thread until `stop_event` is set."""
+        def run():
+            while not stop_event.wait(interval):
+                try:
+                    self.check()
+                except Exception:
+                    logger.exception("Power config watcher failed")
+        t = threading.Thread(target=run, name="power-config-watch", daemon=True)
+        t.start()
+        return t
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path):
+    """Return the shared store for `path` (one parse per process)."""
+    key = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = PowerConfigStore(key)
+            _stores[key] = store
+        return store
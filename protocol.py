@@ -0,0 +1,115 @@
+# protocol.py
+"""Newline-delimited JSON framing shared by the server and the client.
+
+The decoder reads with `recv_into` into one preallocated chunk, appends to a
+`bytearray` and extracts every complete frame of a read in a single pass, so
+a burst of messages costs O(n) instead of re-splitting the buffer per line.
+The encoder produces compact frames and can coalesce several of them into a
+single `sendall`.
+"""
+import json
+
+# frames larger than this are treated as a protocol violation
+MAX_FRAME = 1 << 20
+RECV_SIZE = 65536
+
+
+class FrameTooLarge(ValueError):
+    pass
+
+
+class FrameDecoder:
+    def __init__(self, max_frame=MAX_FRAME, recv_size=RECV_SIZE):
+        self.max_frame = max_frame
+        self.buf = bytearray()
+        # position from which to look for the next newline (already scanned bytes are skipped)
+        self.scan = 0
+        self.chunk = bytearray(recv_size)
+        self.view = memoryview(self.chunk)
+        # total bytes read by recv_frames (bandwidth figures)
+        self.bytes_in = 0
+
+    def feed(self, data):
+        """Append raw bytes and return the list of complete frames (bytes, without newline)."""
+        buf = self.buf
+        buf += data
+        frames = []
+        start = 0
+        pos = buf.find(b'\n', self.scan)
+        while pos != -1:
+            if pos - start > self.max_frame:
+                raise FrameTooLarge(f"frame of {pos - start} bytes exceeds {self.max_frame}")
+            if pos > start:
+                frames.append(bytes(buf[start:pos]))
+            start = pos + 1
+            pos = buf.find(b'\n', start)
+        if start:
+            del buf[:start]
+        self.scan = len(buf)
+        if self.scan > self.max_frame:
+            raise FrameTooLarge(f"partial frame of {self.scan} bytes exceeds {self.max_frame}")
+        return frames
+
+    def recv_frames(self, sock):
+        """Read once from `sock`; return the complete frames, or None on EOF."""
+        n = sock.recv_into(self.chunk)
+        if not n:
+            return None
+        self.bytes_in += n
+        return self.feed(self.view[:n])
+
+    def recv_messages(self, sock):
+        """Read once from `sock`; return the decoded JSON messages, or None on EOF.
+
+        Frames that are not valid JSON are skipped.
+        """
+        frames = self.recv_frames(sock)
+        if frames is None:
+            return None
+        return decode_frames(frames)
+
+    def pending(self):
+        """Bytes received but not yet part of a complete frame."""
+        return bytes(self.buf)
+
+
+def decode_frames(frames):
+    messages = []
+    for frame in frames:
+        try:
+            messages.append(json.loads(frame))
+        except ValueError:
+            continue
+    return messages
+
+
+def encode(msg):
+    """Encode one message as a newline-terminated frame."""
+    return (json.dumps(msg, separators=(',', ':')) + "\n").encode()
+
+
+class FrameEncoder:
+    """Queues frames and writes them with one `sendall` per flush."""
+
+    def __init__(self):
+        self.pending = []
+
+    def add(self, msg):
+        self.pending.append(encode(msg))
+
+    def add_frame(self, frame):
+        self.pending.append(frame)
+
+    def flush(self, sock):
+        if not self.pending:
+            return
+        data = self.pending[0] if len(self.pending) == 1 else b"".join(self.pending)
+        self.pending.clear()
+        sock.sendall(data)
+
+
+def send_json(sock, data):
+    try:
+        sock.sendall(encode(data))
+    except Exception:
+        pass
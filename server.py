@@ -1,62 +1,228 @@
 # server.py
+import argparse
+import select
+import signal
 import socket
 import threading
-import json
 import time
 import os
-from game import Game
+import secrets
+from collections import deque
+import clock_sync
+from admission import LoadMonitor, start_health_server
+from alloc_profile import open_profiler
+from client_link import FULL, ClientLink
+from game import Game, POWER_CONFIG_PATH, parse_dimensions
+from game_snapshot import dump_game, load_game
+from handoff import HANDOFF_PATH, confirm, receive_room, send_room
+from input_guard import MAX_INPUT_FRAME, InputGuard
+from input_queue import ROOM, InputQueues
+from power_config import get_store, validate_power_config
+from protocol import FrameDecoder, FrameEncoder, FrameTooLarge, decode_frames, encode, send_json
+from shm_state import ShmError, StatePublisher
+from trajectory import ai_command
+from udp_channel import UdpSnapshotServer
 
 HOST = "0.0.0.0"
 PORT = 9999  # change as needed
+# UDP port for the optional snapshot channel (same number as TCP by default)
+UDP_PORT = int(os.environ.get('PONG_UDP_PORT', PORT))
+# PONG_AI=1: a single human plays player 1, player 2 is driven by the server
+AI_OPPONENT = os.environ.get('PONG_AI', '') not in ('', '0')
 
 FRAME_RATE = 30.0
 FRAME_DT = 1.0 / FRAME_RATE
+# idle rooms (paused, waiting for the trajectory, finished) only send a frame
+# when an input changes something, plus this low-rate heartbeat
+IDLE_HEARTBEAT = 1.0
+# local health/readiness endpoint (0 disables it) and where refused clients are sent
+HEALTH_HOST = "127.0.0.1"
+HEALTH_PORT = int(os.environ.get('PONG_HEALTH_PORT', 9998))
+REDIRECT = os.environ.get('PONG_REDIRECT') or None
+# a dropped player may resume its session within this many seconds; the room
+# is paused meanwhile. Room events are kept for the catch-up after a resume.
+RESUME_GRACE = float(os.environ.get('PONG_RESUME_GRACE', 30))
+RESUME_HELLO_TIMEOUT = 1.0
+EVENT_BUFFER = 64
+# name of a shared memory segment the latest state is published into every
+# tick for same-host observers (see shm_state.py); unset disables it
+SHM_NAME = os.environ.get('PONG_SHM') or None
 
 
-def send_json(sock, data):
-    try:
-        msg = json.dumps(data) + "\n"
-        sock.sendall(msg.encode())
-    except Exception:
-        pass
+class TickScheduler:
+    """Deadline-based pacing for the game loop.
+
+    Active rooms tick on an absolute deadline every `frame_dt` (no drift and
+    no busy-wait). Idle rooms block until an input event sets `wakeup` or the
+    heartbeat expires.
+    """
+
+    def __init__(self, frame_dt, heartbeat, wakeup):
+        self.frame_dt = frame_dt
+        self.heartbeat = heartbeat
+        self.wakeup = wakeup
+        self.deadline = time.monotonic()
+
+    def wait(self, idle, stride=1):
+        """Block until the next tick; `stride` frames later for a room ticking slower."""
+        if idle:
+            self.wakeup.wait(self.heartbeat)
+            self.wakeup.clear()
+            # restart the fixed-rate clock from now once the room is active again
+            self.deadline = time.monotonic() + self.frame_dt
+            return
+        delay = self.deadline - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self.deadline += self.frame_dt * stride
+        # after a long stall, skip missed ticks instead of bursting to catch up
+        now = time.monotonic()
+        if now - self.deadline > self.frame_dt * 4:
+            self.deadline = now + self.frame_dt
+
+
+def room_is_idle(game, inputs, controls):
+    """A room is idle when nothing can change until a new input arrives."""
+    if inputs.pending():
+        return False
+    if controls.get('paused') or game.game_over is not None:
+        return True
+    if getattr(game, 'waiting_trajectory', False):
+        # only paddles move while waiting; idle if nobody is pressing a key
+        return all(cmd == "stop" for cmd in inputs.held.values())
+    return False
+
+
+def apply_inputs(game, controls, queued, player_commands):
+    """Apply a tick's non-movement inputs (InputQueues.drain()) in arrival order.
+
+    `controls` holds the room state owned by the loop ('paused',
+    'auto_paused'); a trajectory goes into `player_commands` for this
+    tick's `game.update`.
+    """
+    for _, _, pn, kind, value in queued:
+        if kind == 'cmd':
+            continue
+        if kind == 'trajectory':
+            player_commands['trajectory'] = value
+        elif kind == 'pause':
+            # a boolean sets the pause state, None toggles it
+            controls['paused'] = (not controls.get('paused', False)) if value is None else value
+            print(f"[*] Pause from player {pn} -> {controls['paused']}")
+        elif kind == 'power_config':
+            # from a player: save it (the store pushes it to every game);
+            # from the room: the store already has it, only apply it
+            game.update_power_config(value, persist=pn != ROOM)
+        elif kind == 'player_left':
+            if not controls.get('paused'):
+                controls['paused'] = True
+                controls['auto_paused'] = True
+        elif kind == 'players_back':
+            if controls.pop('auto_paused', False):
+                controls['paused'] = False
+        elif kind in ('set_dims', 'new_game'):
+            try:
+                if kind == 'set_dims':
+                    # set environment variable for game creation
+                    os.environ['EXTRA_DIMENSIONS'] = str(value)
+                    print(f"[*] Applying EXTRA_DIMENSIONS={value} and resetting game")
+                else:
+                    print('[*] New game requested, resetting game state')
+                game.reset_game()
+            except Exception as e:
+                print(f"[!] Error resetting game: {e}")
+            # a trajectory sent before the reset was meant for the previous game
+            player_commands.pop('trajectory', None)
+
 
+def wait_readable(conn, events, interval=0.05):
+    """Poll `conn` until it is readable; False if one of `events` got set first."""
+    while not select.select([conn], [], [], interval)[0]:
+        if any(e.is_set() for e in events):
+            return False
+    return True
 
-def recv_loop(conn, addr, player_number, commands_dict, controls_dict, stop_event):
+
+def recv_loop(conn, addr, player_number, inputs, stop_event, wakeup=None, acks_dict=None,
+              handoff_event=None, pending_dict=None, initial=b'', on_disconnect=None, send_lock=None, guard=None,
+              on_pong=None):
     """
-    Receives JSON messages delimited by newline from a client and updates commands_dict[player_number]
-    Also listens for control messages (e.g., new_game) and sets controls_dict flags.
+    Receives JSON messages delimited by newline from a client and pushes its
+    movement commands and control messages (e.g., new_game) into the
+    player's queue of `inputs` (an InputQueues), in the order received.
+    `wakeup` (optional Event) is set after every message so idle rooms react immediately.
+    Validated power_config controls are queued too: the game loop saves them.
+    `acks_dict[player_number]` tracks the last state tick the client rendered (paddle hits are rewound to it).
+    When `handoff_event` is set the loop returns between two reads without
+    closing `conn`, leaving undecoded bytes in `pending_dict[player_number]`;
+    `initial` holds such bytes received by a previous process.
+    `on_disconnect(conn, player_number)` is called when the client goes away;
+    without it a disconnect ends the match (`stop_event`).
+    `ping` messages are answered right away with a `pong` echoing `t` and
+    carrying the server clock at read and reply time (clock_sync.py), under
+    `send_lock` (shared with the game loop's writes to `conn`).
+    `guard` (an InputGuard, kept per player so it outlives reconnections)
+    rate-limits frames before they are decoded, debounces controls and flags
+    flooding clients, which are disconnected. Repeats of the held movement
+    command are not queued, and `wakeup` is set once per read that queued
+    something.
+    `on_pong(msg)` receives the client's answers to the server's RTT probes.
     """
-    buffer = b""
+    if guard is None:
+        guard = InputGuard()
+    decoder = FrameDecoder(max_frame=MAX_INPUT_FRAME)
+    handed_off = False
     try:
+        messages = decode_frames(guard.admit(decoder.feed(initial))) if initial else []
+        received_at = time.time()
         while not stop_event.is_set():
-            data = conn.recv(4096)
-            if not data:
-                break
-            buffer += data
-            while b'\n' in buffer:
-                line, buffer = buffer.split(b'\n', 1)
+            changed = False
+            for msg in messages:
                 try:
-                    msg = json.loads(line.decode())
                     if not isinstance(msg, dict):
                         continue
                     mtype = msg.get("type")
+                    ack = msg.get("tick") if mtype == "ack" else msg.get("ack")
+                    if acks_dict is not None and isinstance(ack, int):
+                        acks_dict[player_number] = ack
+                    if mtype == "ack":
+                        # acknowledgements don't change anything by themselves: don't wake idle rooms
+                        continue
+                    if mtype == "pong":
+                        if on_pong is not None:
+                            on_pong(msg)
+                        continue
+                    if mtype == "ping":
+                        # RTT probe: answer from this thread so the tick rate doesn't add to it
+                        if send_lock is not None:
+                            with send_lock:
+                                send_json(conn, clock_sync.pong(msg, received_at))
+                        else:
+                            send_json(conn, clock_sync.pong(msg, received_at))
+                        continue
                     if mtype == "cmd":
-                        cmd = msg.get("cmd")
-                        if cmd in ("left", "right", "stop"):
-                            commands_dict[player_number] = cmd
-                    elif mtype == "control":
+                        if inputs.push(player_number, "cmd", msg.get("cmd")):
+                            changed = True
+                        else:
+                            guard.coalesced += 1
+                        continue
+                    if mtype == "control":
                         # simple control protocol: {type: 'control', 'cmd': 'new_game'}
                         cmd = msg.get('cmd')
+                        if not guard.accept_control(cmd, msg.get('value')):
+                            continue
+                        changed = True
                         if cmd == 'new_game':
-                            controls_dict['new_game'] = True
+                            inputs.push(player_number, 'new_game')
                             print(f"[+] Control from {addr}: new_game requested")
                         elif cmd == 'set_dims':
-                            # expected message: {type: 'control', cmd: 'set_dims', value: <int>}
-                            try:
-                                val = int(msg.get('value'))
-                                controls_dict['set_dims'] = val
+                            # expected message: {type: 'control', cmd: 'set_dims', value: <int> or "NxM"}
+                            dims = parse_dimensions(msg.get('value'))
+                            if dims is not None:
+                                val = f"{dims[0]}x{dims[1]}"
+                                inputs.push(player_number, 'set_dims', val)
                                 print(f"[+] Control from {addr}: set_dims requested -> {val}")
-                            except Exception:
+                            else:
                                 print(f"[!] Invalid set_dims value from {addr}: {msg.get('value')}")
                         elif cmd == 'trajectory':
                             # trajectory choice from player 1 at game start
@@ -84,7 +250,7 @@ def recv_loop(conn, addr, player_number, commands_dict, controls_dict, stop_even
                                     else:
                                         accepted = None
                             if accepted is not None:
-                                controls_dict['trajectory'] = accepted
+                                inputs.push(player_number, 'trajectory', accepted)
                                 print(f"[+] Control from {addr}: trajectory requested -> {accepted}")
                             else:
                                 print(f"[!] Invalid trajectory value from {addr}: {val}")
@@ -92,34 +258,86 @@ def recv_loop(conn, addr, player_number, commands_dict, controls_dict, stop_even
                             # Toggle or set pause state for the game loop. If a boolean 'value' is provided,
                             # use it; otherwise toggle the current paused state.
                             val = msg.get('value', None)
-                            if isinstance(val, bool):
-                                controls_dict['paused'] = val
-                            else:
-                                controls_dict['paused'] = not controls_dict.get('paused', False)
-                            print(f"[+] Control from {addr}: pause toggled -> {controls_dict.get('paused')}")
+                            val = val if isinstance(val, bool) else None
+                            inputs.push(player_number, 'pause', val)
+                            print(f"[+] Control from {addr}: pause requested -> {'toggle' if val is None else val}")
+                        elif cmd == 'power_config':
+                            # expected message: {type: 'control', cmd: 'power_config', value: {charge_max, charge_per_hit, special_damage}}
+                            # saved by the game loop: no file write on this thread
+                            try:
+                                cfg = validate_power_config(msg.get('value'))
+                                inputs.push(player_number, 'power_config', cfg)
+                                print(f"[+] Control from {addr}: power_config -> {cfg}")
+                            except ValueError as e:
+                                print(f"[!] Invalid power_config from {addr}: {e}")
                 except Exception:
                     continue
+            if changed and wakeup is not None:
+                wakeup.set()
+            if handoff_event is not None and not wait_readable(conn, (handoff_event, stop_event)):
+                handed_off = handoff_event.is_set()
+                break
+            # all complete frames of one read are checked against the budget,
+            # then decoded in a single batch; oversized frames raise and drop
+            # the connection
+            frames = decoder.recv_frames(conn)
+            if frames is None:
+                break
+            received_at = time.time()
+            frames = guard.admit(frames)
+            if guard.abusive:
+                guard.abusive = False
+                guard.kicked += 1
+                print(f"[!] Player {player_number} at {addr} floods the server ({guard.dropped} frames dropped), disconnecting")
+                break
+            messages = decode_frames(frames)
+    except FrameTooLarge as e:
+        guard.oversized += 1
+        print(f"[!] Player {player_number} at {addr} sent an oversized frame ({e}), disconnecting")
     except Exception:
         pass
     finally:
-        stop_event.set()
-        try:
-            conn.close()
-        except:
-            pass
+        if handed_off:
+            # the socket now belongs to the next process
+            if pending_dict is not None:
+                pending_dict[player_number] = decoder.pending()
+        elif on_disconnect is not None:
+            on_disconnect(conn, player_number)
+        else:
+            stop_event.set()
+            try:
+                conn.close()
+            except:
+                pass
+
 
+def new_resume_token():
+    return secrets.token_hex(16)
 
-def accept_two_clients(sock):
+
+def accept_two_clients(sock, udp=None, count=2, sessions=None, load=None, status=None):
+    """Accept the players of the match; with `load`, a host over its load limit
+    refuses (and redirects) the first player instead of starting a match."""
     conns = []
     addrs = []
-    print("Server: waiting for 2 clients to connect...")
-    while len(conns) < 2:
+    print(f"Server: waiting for {count} client(s) to connect...")
+    while len(conns) < count:
         try:
             conn, addr = sock.accept()
             print(f"[+] Client connected from {addr}")
         except Exception as e:
             print(f"[!] Error accepting connection: {e}")
             raise
+        if not conns and load is not None and not load.admit():
+            if status is not None:
+                status['refused'] += 1
+            print(f"[!] Refusing client {addr}: overloaded (host load {load.host_load()})")
+            send_json(conn, {"type": "refused", "reason": "overloaded", "redirect": REDIRECT})
+            try:
+                conn.close()
+            except:
+                pass
+            continue
         # Tune accepted connection sockets to reduce latency
         try:
             conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
@@ -131,107 +349,536 @@ def accept_two_clients(sock):
         addrs.append(addr)
         # send assignment (player number 1 or 2)
         assigned = {"type": "assign", "player": len(conns)}
+        # advertise the optional UDP snapshot channel with a per-session token
+        if udp is not None:
+            assigned["udp_port"] = udp.port
+            assigned["session"] = udp.register(len(conns))
+        # resume token: lets the player reattach after a dropped connection
+        if sessions is not None:
+            token = new_resume_token()
+            sessions[token] = len(conns)
+            assigned["token"] = token
         send_json(conn, assigned)
         print(f"[+] Assigned player {len(conns)} to {addr}")
     return conns, addrs
 
 
-def main():
-    game = Game()
-    server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    # Reduce latency for small packets (disable Nagle) and increase buffers
+def accept_late_clients(sock, status, load, stop_event, resume):
+    """Handle connections that arrive once the match is running."""
+    while not stop_event.is_set():
+        try:
+            conn, addr = sock.accept()
+        except Exception:
+            break
+        threading.Thread(target=handle_late_client, args=(conn, addr, status, load, resume), daemon=True).start()
+
+
+def handle_late_client(conn, addr, status, load, resume):
+    """Resume a dropped player's session, or refuse the connection.
+
+    A returning client sends `{"type": "resume", "token": ..., "ack": <tick>}`
+    first; `resume(conn, addr, msg, leftover)` attaches it to the room.
+    This process hosts a single match, so anyone else gets a `refused`
+    message (reason `busy`, with the PONG_REDIRECT address, if any) instead
+    of hanging in the backlog, whatever the load.
+    """
+    decoder = FrameDecoder()
+    messages = None
     try:
-        server_sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-        server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 65536)
-        server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 65536)
+        conn.settimeout(RESUME_HELLO_TIMEOUT)
+        messages = decoder.recv_messages(conn)
+        conn.settimeout(None)
     except Exception:
         pass
-    server_sock.bind((HOST, PORT))
-    server_sock.listen(2)
-    print(f"[*] Server listening on {HOST}:{PORT}")
-    print(f"[*] Waiting for client connections... (clients should connect to this IP on port {PORT})")
+    msg = messages[0] if messages else None
+    if isinstance(msg, dict) and msg.get("type") == "resume":
+        # frames that arrived right behind the resume request go to the receiver
+        leftover = b"".join(encode(m) for m in messages[1:]) + decoder.pending()
+        try:
+            if resume(conn, addr, msg, leftover):
+                return
+        except Exception as e:
+            print(f"[!] Resume from {addr} failed: {e}")
+        reason = "session_expired"
+    else:
+        reason = "busy"
+    status['refused'] += 1
+    print(f"[!] Refusing client {addr}: {reason}")
+    send_json(conn, {"type": "refused", "reason": reason, "redirect": REDIRECT})
+    try:
+        conn.close()
+    except:
+        pass
+
 
-    conns, addrs = accept_two_clients(server_sock)
+def open_health_endpoint(status_fn):
+    if not HEALTH_PORT:
+        return None
+    try:
+        health = start_health_server(HEALTH_HOST, HEALTH_PORT, status_fn)
+        print(f"[*] Health endpoint on http://{HEALTH_HOST}:{HEALTH_PORT}/health (/ready)")
+        return health
+    except Exception as e:
+        print(f"[!] Health endpoint disabled: {e}")
+        return None
+
+
+def adopt_room():
+    """Receive a live room from a draining server (see handoff.py)."""
+    print(f"[*] Waiting for a room handoff on {HANDOFF_PATH}...")
+    meta, snapshot, fds, hconn = receive_room(HANDOFF_PATH)
+    try:
+        sockets = [socket.socket(fileno=fd) for fd in fds]
+        roles = meta['fds']
+        game = load_game(snapshot)
+    except Exception:
+        for fd in fds:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        hconn.close()
+        raise
+    if meta.get('extra_dimensions') is not None:
+        os.environ['EXTRA_DIMENSIONS'] = meta['extra_dimensions']
+    server_sock = sockets[roles.index('listen')]
+    udp = None
+    if 'udp' in roles:
+        udp = UdpSnapshotServer(HOST, UDP_PORT, sock=sockets[roles.index('udp')])
+        udp.import_sessions(meta.get('udp_sessions') or [])
+    conns = [sk for sk, role in zip(sockets, roles) if role == 'conn']
+    room = {
+        "game": game,
+        "server_sock": server_sock,
+        "udp": udp,
+        "conns": conns,
+        "players": meta['players'],
+        "addrs": [tuple(a) if isinstance(a, list) else a for a in meta['addrs']],
+        "commands": {int(k): v for k, v in meta['commands'].items()},
+        "inputs": meta.get('inputs') or [],
+        "controls": meta['controls'],
+        "acks": {int(k): v for k, v in meta['acks'].items()},
+        "pending": {int(k): bytes.fromhex(v) for k, v in meta['pending'].items()},
+        "sessions": meta.get('sessions') or {},
+        "disconnected": meta.get('disconnected') or [],
+    }
+    confirm(hconn)
+    print(f"[*] Adopted room at tick {game.tick} with {len(conns)} client(s)")
+    return room
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pong chess game server")
+    parser.add_argument('--adopt', action='store_true',
+                        help=f"take over the live room of a running server (send it SIGUSR1), via {HANDOFF_PATH}")
+    args = parser.parse_args(argv)
+
+    # tick-budget accounting drives load shedding and the readiness probe
+    load = LoadMonitor(FRAME_DT)
+    status = {"phase": "waiting", "clients": 0, "refused": 0}
+    # allocations and GC pauses per tick phase (PONG_ALLOC_PROFILE), None when off
+    alloc = open_profiler()
+
+    # input limits and counters of each player (kept across reconnections)
+    guards = {}
+    # outbound path of each TCP connection (sender thread + congestion control)
+    links = {}
+    # input queues of the room (set up with the room below)
+    inputs = None
+
+    def health_status():
+        st = dict(status)
+        st.update(load.snapshot())
+        st['ready'] = status['phase'] == "waiting" and load.admit()
+        st['inputs'] = {str(pn): g.snapshot() for pn, g in list(guards.items())}
+        st['links'] = {str(link.player): link.snapshot() for link in list(links.values())}
+        if inputs is not None:
+            st['input_queues'] = inputs.snapshot()
+        if alloc is not None:
+            st['alloc'] = alloc.snapshot()
+        return st
+
+    if args.adopt:
+        room = adopt_room()
+        game = room['game']
+        server_sock = room['server_sock']
+        udp = room['udp']
+        conns = room['conns']
+        players = room['players']
+        addrs = room['addrs']
+        inputs = InputQueues(room['commands'])
+        inputs.import_inputs(room['inputs'])
+        inputs.tick = game.tick
+        controls = room['controls']
+        acks = room['acks']
+        pending = room['pending']
+        sessions = room['sessions']
+        # players that were away during the handoff get a fresh grace window
+        disconnected = {pn: time.monotonic() for pn in room['disconnected']}
+        health = open_health_endpoint(health_status)
+    else:
+        game = Game()
+        server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        # Reduce latency for small packets (disable Nagle) and increase buffers
+        try:
+            server_sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 65536)
+            server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 65536)
+        except Exception:
+            pass
+        server_sock.bind((HOST, PORT))
+        server_sock.listen(2)
+        print(f"[*] Server listening on {HOST}:{PORT}")
+        print(f"[*] Waiting for client connections... (clients should connect to this IP on port {PORT})")
+        # optional UDP channel for state snapshots and paddle input
+        try:
+            udp = UdpSnapshotServer(HOST, UDP_PORT)
+            print(f"[*] UDP snapshot channel on {HOST}:{udp.port}")
+        except Exception as e:
+            print(f"[!] UDP snapshot channel disabled: {e}")
+            udp = None
+        health = open_health_endpoint(health_status)
+
+        # resume token -> player number
+        sessions = {}
+        disconnected = {}
+        conns, addrs = accept_two_clients(server_sock, udp, count=1 if AI_OPPONENT else 2, sessions=sessions,
+                                          load=load, status=status)
+        players = [i + 1 for i in range(len(conns))]
+        # inputs of players 1 and 2 (and of the room itself), drained every tick
+        inputs = InputQueues()
+        # room state owned by the game loop: paused, auto_paused
+        controls = {}
+        # last state tick acknowledged by each client (keys 1/2)
+        acks = {}
+        # bytes of partial frames handed over by a previous process (keys 1/2)
+        pending = {}
+    status['phase'] = "playing"
+    status['clients'] = len(conns)
+    if AI_OPPONENT:
+        print("[*] Player 2 is controlled by the server AI")
+    # player number and address of each TCP connection
+    conn_players = dict(zip(conns, players))
+    conn_addrs = dict(zip(conns, addrs))
     stop_event = threading.Event()
+    # set by receivers on every input so idle rooms wake up immediately
+    wakeup = threading.Event()
+    # SIGUSR1 asks this process to hand its room to a `--adopt` process; the
+    # handler only sets a flag, the loop acts on it at the next tick boundary
+    handoff = {"requested": False, "done": False}
+    handoff_event = threading.Event()
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: handoff.__setitem__('requested', True))
+    # power config changes (control message or file edit) are queued for the
+    # game loop, which applies them between ticks; only a control message
+    # makes it write the file
+    power_store = get_store(POWER_CONFIG_PATH)
 
-    # commands from clients: default stop, keys are player_number 1 or 2
-    commands = {1: "stop", 2: "stop"}
-    # controls dict for requests like new_game
-    controls = {"new_game": False}
+    def on_power_config(cfg):
+        inputs.push(ROOM, 'power_config', cfg)
+        wakeup.set()
+    power_store.subscribe(on_power_config)
+    power_store.watch(stop_event)
     recv_threads = []
-    for i, conn in enumerate(conns):
-        player_number = i + 1
-        t = threading.Thread(target=recv_loop, args=(conn, addrs[i], player_number, commands, controls, stop_event), daemon=True)
+    # guards conns/conn_players/disconnected against the resume threads
+    room_lock = threading.Lock()
+    # recent room events (replayed after a resume) and those not yet broadcast;
+    # events go out from the game loop so only one thread writes to a socket
+    events = deque(maxlen=EVENT_BUFFER)
+    outbox = deque()
+    # last broadcast state frame: the keyframe for resuming clients
+    latest = {"frame": None}
+    # one lock per connection: the game loop and the pong replies both write to it
+    send_locks = {}
+
+    def push_event(name, **fields):
+        msg = {"type": "event", "event": name, "tick": game.tick}
+        msg.update(fields)
+        events.append(msg)
+        outbox.append(msg)
+        wakeup.set()
+
+    def drop_client(conn, pn):
+        """Detach a client that went away and hold its seat for RESUME_GRACE seconds."""
+        with room_lock:
+            if conn not in conns:
+                return
+            conns.remove(conn)
+            send_locks.pop(conn, None)
+            link = links.pop(conn, None)
+            status['clients'] = len(conns)
+            holding = not stop_event.is_set()
+            acks.pop(pn, None)
+            if holding:
+                disconnected[pn] = time.monotonic()
+                # the loop pauses the room unless it already is
+                inputs.push(ROOM, 'player_left', pn)
+                push_event("player_left", player=pn)
+        try:
+            # wakes a sender thread blocked on a full send buffer
+            conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        try:
+            conn.close()
+        except:
+            pass
+        if link is not None:
+            link.close()
+        if holding:
+            print(f"[!] Player {pn} disconnected, holding the room for {RESUME_GRACE:.0f}s")
+
+    def start_receiver(conn, pn, initial=b''):
+        send_lock = send_locks.setdefault(conn, threading.Lock())
+        link = links.get(conn)
+        if link is None:
+            link = links[conn] = ClientLink(conn, pn, send_lock, on_error=drop_client)
+        t = threading.Thread(target=recv_loop, args=(conn, conn_addrs[conn], pn, inputs, stop_event, wakeup, acks,
+                                                     handoff_event, pending, initial, drop_client, send_lock,
+                                                     guards.setdefault(pn, InputGuard()), link.on_pong), daemon=True)
         t.start()
         recv_threads.append(t)
 
+    def start_receivers():
+        handoff_event.clear()
+        recv_threads.clear()
+        for conn in conns:
+            pn = conn_players[conn]
+            start_receiver(conn, pn, pending.pop(pn, b''))
+        if udp is not None:
+            udp.start(inputs, stop_event, wakeup)
+    start_receivers()
+
+    def resume(conn, addr, msg, leftover):
+        """Reattach a returning player: resumed reply, keyframe, then missed events."""
+        with room_lock:
+            pn = sessions.get(msg.get('token'))
+            if pn is None or pn not in disconnected or stop_event.is_set():
+                return False
+            try:
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            except Exception:
+                pass
+            reply = {"type": "resumed", "player": pn, "token": msg.get('token')}
+            if udp is not None:
+                reply["udp_port"] = udp.port
+                reply["session"] = udp.register(pn)
+            ack = msg.get('ack') if isinstance(msg.get('ack'), int) else -1
+            if ack > game.tick:
+                ack = -1
+            # the acked tick is the baseline only while the history still holds it
+            if game.history.has(ack):
+                acks[pn] = ack
+            else:
+                acks.pop(pn, None)
+            out = FrameEncoder()
+            out.add(reply)
+            if latest["frame"] is not None:
+                out.add_frame(latest["frame"])
+            for ev in list(events):
+                if ev["tick"] >= ack:
+                    out.add(ev)
+            out.flush(conn)
+            del disconnected[pn]
+            conns.append(conn)
+            conn_players[conn] = pn
+            conn_addrs[conn] = addr
+            status['clients'] = len(conns)
+            start_receiver(conn, pn, leftover)
+            if not disconnected:
+                inputs.push(ROOM, 'players_back')
+            push_event("player_rejoined", player=pn)
+        print(f"[+] Player {pn} resumed its session from {addr}")
+        return True
+
+    def hand_off():
+        """Pass sockets and state to the adopting process; True once it confirmed."""
+        nonlocal health
+        print(f"[*] Handing the room off via {HANDOFF_PATH}")
+        # receivers stop polling first; the health port moves to the new
+        # process while they wind down
+        handoff_event.set()
+        if udp is not None:
+            udp.detached = True
+        if health is not None:
+            health.shutdown()
+            health.server_close()
+            health = None
+        for t in recv_threads:
+            t.join(1.0)
+        # frames already queued go out before the sockets change hands
+        for link in list(links.values()):
+            link.close(flush=True)
+        links.clear()
+        udp_sessions = udp.detach() if udp is not None else None
+        fds = [server_sock.fileno()]
+        roles = ['listen']
+        for conn in conns:
+            fds.append(conn.fileno())
+            roles.append('conn')
+        if udp is not None:
+            fds.append(udp.sock.fileno())
+            roles.append('udp')
+        meta = {
+            "fds": roles,
+            "players": [conn_players[c] for c in conns],
+            "addrs": [conn_addrs[c] for c in conns],
+            "commands": inputs.held,
+            "inputs": inputs.export(),
+            "controls": controls,
+            "acks": acks,
+            "pending": {pn: data.hex() for pn, data in pending.items()},
+            "udp_sessions": udp_sessions,
+            "extra_dimensions": os.environ.get('EXTRA_DIMENSIONS'),
+            "sessions": sessions,
+            "disconnected": list(disconnected),
+        }
+        try:
+            send_room(meta, dump_game(game), fds, HANDOFF_PATH)
+        except Exception as e:
+            print(f"[!] Room handoff failed, resuming: {e}")
+            inputs.import_inputs(meta['inputs'])
+            start_receivers()
+            health = open_health_endpoint(health_status)
+            return False
+        print("[*] Room handed off")
+        return True
+
+    threading.Thread(target=accept_late_clients, args=(server_sock, status, load, stop_event, resume), daemon=True).start()
+
+    publisher = None
+    if SHM_NAME:
+        try:
+            publisher = StatePublisher(SHM_NAME)
+            print(f"[*] Publishing the state in shared memory segment {SHM_NAME!r}")
+        except (OSError, ShmError) as e:
+            print(f"[!] Shared memory state disabled: {e}")
+
     print("Both clients connected, starting game loop.")
-    last = time.time()
+    scheduler = TickScheduler(FRAME_DT, IDLE_HEARTBEAT, wakeup)
+    wakeup.set()  # send the initial frame right away
+    last_sent = None  # last broadcast state (without timestamp) for idle change detection
+    last_sent_at = 0.0
+    # (paused, game_over, waiting_trajectory) of the last broadcast state
+    last_flags = None
+    frame_no = 0
     try:
         while not stop_event.is_set():
-            now = time.time()
-            dt = now - last
-            if dt < FRAME_DT:
-                time.sleep(FRAME_DT - dt)
-                continue
-            last = now
+            if alloc is not None:
+                alloc.tick_done()
+            idle = room_is_idle(game, inputs, controls)
+            # under load a room that only moves paddles steps less often, with a longer step
+            stride = load.tick_stride(critical=not getattr(game, 'waiting_trajectory', False))
+            scheduler.wait(idle, stride)
+            if stop_event.is_set():
+                break
+            # a player that didn't come back in time ends the match
+            now = time.monotonic()
+            expired = [pn for pn, since in list(disconnected.items()) if now - since > RESUME_GRACE]
+            if expired:
+                print(f"[!] Player(s) {expired} did not resume within {RESUME_GRACE:.0f}s, ending the match")
+                stop_event.set()
+                break
+            if handoff['requested']:
+                handoff['requested'] = False
+                if hand_off():
+                    handoff['done'] = True
+                    break
+            tick_start = time.perf_counter()
+            frame_no += 1
+            if alloc is not None:
+                alloc.phase("update")
+            if AI_OPPONENT:
+                inputs.push(2, "cmd", ai_command(game, 1))
+            # everything received since the last tick, in arrival order
+            queued = inputs.drain()
+            moves = inputs.resolve_moves(queued)
             # convert commands (1/2) to game player indices (0/1)
-            player_commands = {0: commands.get(1, "stop"), 1: commands.get(2, "stop")}
-            # Check if trajectory control is pending and add it to player_commands
-            if controls.get('trajectory') is not None:
-                player_commands['trajectory'] = controls['trajectory']
-                controls['trajectory'] = None
+            player_commands = {0: moves[1], 1: moves[2]}
+            apply_inputs(game, controls, queued, player_commands)
+            # paddle hits are validated against what each client last saw
+            game.set_acked_tick(0, acks.get(1))
+            game.set_acked_tick(1, acks.get(2))
             # If paused, skip updating game logic; otherwise advance game
             if controls.get('paused'):
                 result = None
             else:
-                result = game.update(FRAME_DT, player_commands)
-            # handle control requests (new game, set_dims)
-            # If set_dims requested, apply it (set env var) and reset game
-            if controls.get('set_dims') is not None:
-                try:
-                    val = int(controls.get('set_dims'))
-                    # set environment variable for game creation
-                    os.environ['EXTRA_DIMENSIONS'] = str(val)
-                    print(f"[*] Applying EXTRA_DIMENSIONS={val} and resetting game")
-                    game.reset_game()
-                except Exception as e:
-                    print(f"[!] Error applying set_dims: {e}")
-                finally:
-                    controls['set_dims'] = None
-            if controls.get('new_game'):
-                print('[*] New game requested, resetting game state')
-                try:
-                    game.reset_game()
-                    # clear control flag
-                    controls['new_game'] = False
-                except Exception as e:
-                    print(f"[!] Error resetting game: {e}")
+                result = game.update(FRAME_DT * stride, player_commands)
+            # inputs arriving from now on are stamped with this tick
+            inputs.tick = game.tick
+            if alloc is not None:
+                alloc.phase("state")
             state = game.get_state()
             # include paused flag in broadcast so clients can update UI
             state['paused'] = bool(controls.get('paused', False))
+            # same-host observers get every tick, sent or not (one out of N under load)
+            if publisher is not None and frame_no % load.send_every() == 0:
+                publisher.publish(state)
+            # idle rooms: only send when something changed or the heartbeat is due
+            fingerprint = dict(state)
+            fingerprint.pop('timestamp', None)
+            now = time.monotonic()
+            idle = room_is_idle(game, inputs, controls)
+            if not outbox and idle and fingerprint == last_sent and now - last_sent_at < IDLE_HEARTBEAT:
+                load.record(time.perf_counter() - tick_start)
+                continue
+            last_sent = fingerprint
+            last_sent_at = now
             # Broadcast state to all connected clients. If a client send fails,
-            # remove that connection but keep the server running for the others.
+            # drop that connection (its player may resume) and keep going.
+            if alloc is not None:
+                alloc.phase("encode")
             msg = {"type": "state", "state": state}
-            js = (json.dumps(msg) + "\n").encode()
-            dead = []
-            for i, conn in enumerate(list(conns)):
-                try:
-                    conn.sendall(js)
-                except Exception:
-                    print(f"Warning: client {i+1} disconnected during send, removing connection")
-                    try:
-                        conn.close()
-                    except:
-                        pass
-                    dead.append(conn)
-            # remove dead conns
-            for d in dead:
-                try:
-                    conns.remove(d)
-                except ValueError:
-                    pass
+            js = encode(msg)
+            latest["frame"] = js
+            # room events always travel over TCP, ahead of the state
+            event_frames = []
+            while outbox:
+                event_frames.append(encode(outbox.popleft()))
+            # each client's link picks its own rate and detail; frames are
+            # written by its sender thread, so a slow client can't stall the room
+            frames = {FULL: js}
+            final = state.get('game_over') is not None
+            # an idle room sends nothing more until something changes, so its
+            # states (and the one flipping paused, game_over or
+            # waiting_trajectory) go to every client now, whatever its rate,
+            # and over TCP
+            flags = (state['paused'], state.get('game_over'), state.get('waiting_trajectory'))
+            force = final or idle or flags != last_flags
+            last_flags = flags
+            if alloc is not None:
+                alloc.phase("send")
+            for conn in list(conns):
+                pn = conn_players.get(conn)
+                link = links.get(conn)
+                if link is None:
+                    continue
+                out = list(event_frames)
+                ping = link.ping_due(now)
+                if ping is not None:
+                    out.append(ping)
+                # shed load: under pressure each link sends at most every Nth
+                # snapshot (the simulation keeps its rate; forced states always go)
+                variant = link.plan(state, now, force=force, floor=load.send_every())
+                frame = None
+                pieces = None
+                if variant is not None:
+                    frame = frames.get(variant)
+                    if frame is None:
+                        # LITE: the client keeps the pieces it already has
+                        lite = dict(state)
+                        del lite['pieces']
+                        frame = frames[variant] = encode({"type": "state", "state": lite})
+                    # clients that completed the UDP handshake get snapshots there
+                    if (udp is not None and not force and udp.has_peer(pn) and link.udp_ok(variant)
+                            and udp.send_state(pn, frame[:-1])):
+                        frame = None
+                    elif variant == FULL:
+                        # the link counts these pieces as the client's once written
+                        pieces = state.get('pieces')
+                link.push(out, frame, pieces)
+            load.record(time.perf_counter() - tick_start)
             # If game ended, stop loop after broadcasting final state
             try:
                 if state.get('game_over') is not None:
@@ -240,8 +887,8 @@ def main():
                     break
             except Exception:
                 pass
-            # if no clients left, stop the server loop
-            if not conns:
+            # if no clients left (and none can come back), stop the server loop
+            if not conns and not disconnected:
                 print("No clients left, stopping server loop.")
                 stop_event.set()
                 break
@@ -249,13 +896,29 @@ def main():
         print("Server shutting down (KeyboardInterrupt).")
     finally:
         stop_event.set()
+        # after a handoff only this process's descriptors are closed: the
+        # connections stay open in the adopting process
+        for link in list(links.values()):
+            link.close(flush=not handoff['done'])
         for conn in conns:
             try:
                 conn.close()
             except:
                 pass
+        if udp is not None:
+            udp.close()
+        power_store.unsubscribe(on_power_config)
+        game.close_events()
+        if alloc is not None:
+            alloc.close()
+        if publisher is not None:
+            # after a handoff the adopting process keeps publishing into it
+            publisher.close(unlink=not handoff['done'])
+        if health is not None:
+            health.shutdown()
+            health.server_close()
         server_sock.close()
-        print("Server closed.")
+        print("Room handed off, exiting." if handoff['done'] else "Server closed.")
 
 if __name__ == "__main__":
     main()
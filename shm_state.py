@@ -0,0 +1,338 @@
+# shm_state.py
+"""Publish the latest game state in shared memory for same-host observers.
+
+The simulation writes every tick into a `multiprocessing.shared_memory`
+segment with a fixed binary layout; local consumers (renderer, recorder,
+stream overlay) map the same segment and unpack the fields straight from it,
+with no JSON, no socket and no call into `Game`.
+
+Consistency uses a seqlock: the writer makes the sequence counter odd, writes
+the frame, then makes it even again. A reader copies the frame and retries if
+the counter was odd or changed meanwhile. There is a single writer per
+segment; readers never write.
+
+Layout (little-endian):
+    header   magic b'PGSM', version, sequence counter, ball capacity,
+             piece capacity
+    frame    tick, timestamp, width, height, cols, rows, cell size, ball
+             count, piece count, flags (waiting trajectory, paused, game
+             over), winner, piece table generation, board x/y, scores,
+             power charge/max/special damage/remaining damage, ready, active
+    paddle   x, y, width, height   (x2)
+    ball     x, y, dx, dy, radius, piercing   (x ball capacity)
+    piece    col, row, type, color, hp, max_hp   (x piece capacity)
+
+The piece table is only rewritten when the state's piece list changed
+(`Game.get_state()` reuses it until then); readers decode it again only when
+its generation number moves.
+
+    PONG_SHM=pong-state python3 server.py
+    python3 shm_state.py pong-state        # prints the live frame
+"""
+import argparse
+import logging
+import struct
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'PGSM'
+VERSION = 1
+MAX_BALLS = 64
+# 64x64 board, a quarter of the rows per side
+MAX_PIECES = 2048
+
+_HEADER = struct.Struct('<4sHxxQHH4x')
+_SEQ_OFFSET = 8
+_FRAME = struct.Struct('<qd8Hb3xIdd2i4i??6x')
+_PADDLE = struct.Struct('<4d')
+_BALL = struct.Struct('<5dB7x')
+_PIECE = struct.Struct('<HHcBii')
+_SEQ = struct.Struct('<Q')
+
+FLAG_WAITING = 1
+FLAG_PAUSED = 2
+FLAG_GAME_OVER = 4
+PIECE_COLORS = ('black', 'white')
+_COLOR_CODES = {c: i for i, c in enumerate(PIECE_COLORS)}
+
+
+class ShmError(RuntimeError):
+    pass
+
+
+def segment_size(max_balls=MAX_BALLS, max_pieces=MAX_PIECES):
+    return (_HEADER.size + _FRAME.size + 2 * _PADDLE.size
+            + max_balls * _BALL.size + max_pieces * _PIECE.size)
+
+
+def _attach(name):
+    """Map an existing segment without handing it to this process's resource tracker.
+
+    Before Python 3.13 every process that maps a segment registers it, and
+    the tracker unlinks it when that process exits -- a reader must not.
+    Registering is skipped rather than undone: a forked child shares its
+    parent's tracker, and unregistering there would drop the parent's entry.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+class StatePublisher:
+    """Single writer of a state segment."""
+
+    def __init__(self, name, max_balls=MAX_BALLS, max_pieces=MAX_PIECES):
+        self.name = name
+        self.max_balls = max_balls
+        self.max_pieces = max_pieces
+        size = segment_size(max_balls, max_pieces)
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            self.owner = True
+        except FileExistsError:
+            # left by the process this one adopted the room from (or by a
+            # crash): keep publishing into it if the layout matches
+            self.shm = _attach(name)
+            self.owner = False
+            magic, version, _, balls, pieces = _HEADER.unpack_from(self.shm.buf, 0)
+            if (magic, version, balls, pieces) != (MAGIC, VERSION, max_balls, max_pieces) or self.shm.size < size:
+                self.shm.close()
+                raise ShmError(f"shared memory segment {name!r} exists with another layout")
+        self.buf = self.shm.buf
+        if self.owner:
+            self.seq = 0
+            _HEADER.pack_into(self.buf, 0, MAGIC, VERSION, self.seq, max_balls, max_pieces)
+        else:
+            # the previous writer may still be publishing: take over its
+            # counter on the first publish
+            self.seq = None
+        self.frame_off = _HEADER.size
+        self.paddles_off = self.frame_off + _FRAME.size
+        self.balls_off = self.paddles_off + 2 * _PADDLE.size
+        self.pieces_off = self.balls_off + max_balls * _BALL.size
+        self.pieces_ref = None
+        # piece dicts last written, by table slot
+        self.piece_slots = []
+        self.pieces_gen = 0
+        self.n_pieces = 0
+        self.truncated = False
+
+    def publish(self, state):
+        """Write one `Game.get_state()`-shaped dict as the latest frame."""
+        buf = self.buf
+        board = state.get('board') or {}
+        ball = state.get('ball') or {}
+        balls = state.get('balls')
+        pieces = state.get('pieces') or []
+        power = state.get('power') or {}
+        scores = state.get('scores') or (0, 0)
+        game_over = state.get('game_over')
+        flags = ((FLAG_WAITING if state.get('waiting_trajectory') else 0)
+                 | (FLAG_PAUSED if state.get('paused') else 0)
+                 | (FLAG_GAME_OVER if game_over is not None else 0))
+        winner = game_over.get('winner', -1) if isinstance(game_over, dict) else -1
+        if balls:
+            n_balls = min(len(balls['x']), self.max_balls)
+        else:
+            n_balls = 1
+        if n_balls < (len(balls['x']) if balls else 1) or len(pieces) > self.max_pieces:
+            if not self.truncated:
+                logger.warning("State larger than the shared memory segment %r; extra balls/pieces are dropped", self.name)
+                self.truncated = True
+        rewrite_pieces = pieces is not self.pieces_ref
+        if self.seq is None:
+            self.seq = _SEQ.unpack_from(buf, _SEQ_OFFSET)[0]
+            # an odd counter means the previous writer died mid-frame
+            self.seq += self.seq & 1
+            self.pieces_gen = _FRAME.unpack_from(buf, self.frame_off)[11]
+
+        self.seq += 1
+        _SEQ.pack_into(buf, _SEQ_OFFSET, self.seq)
+        if rewrite_pieces:
+            self.pieces_ref = pieces
+            self.pieces_gen = (self.pieces_gen + 1) & 0xFFFFFFFF
+            self.n_pieces = min(len(pieces), self.max_pieces)
+            # get_state() keeps the dict of every unchanged piece: only the
+            # slots holding another dict are packed again
+            new = pieces[:self.n_pieces]
+            old = self.piece_slots
+            self.piece_slots = new
+            changed = [i for i, (pc, prev) in enumerate(zip(new, old)) if pc is not prev]
+            changed.extend(range(len(old), len(new)))
+            pack = _PIECE.pack_into
+            size = _PIECE.size
+            off = self.pieces_off
+            for i in changed:
+                pc = new[i]
+                pack(buf, off + i * size, pc['col'], pc['row'], pc['type'].encode('ascii'),
+                     _COLOR_CODES.get(pc['color'], 0), pc.get('hp', 1), pc.get('max_hp', 1))
+        _FRAME.pack_into(buf, self.frame_off,
+                         state.get('tick', 0), state.get('timestamp', 0.0),
+                         state.get('width', 0), state.get('height', 0),
+                         board.get('cols', 0), board.get('rows', 0), int(board.get('cell_size', 0)),
+                         n_balls, self.n_pieces, flags, winner, self.pieces_gen,
+                         board.get('x', 0.0), board.get('y', 0.0), scores[0], scores[1],
+                         power.get('charge', 0), power.get('max_charge', 0),
+                         power.get('special_damage', 0), power.get('remaining_damage', 0),
+                         bool(power.get('ready')), bool(power.get('active')))
+        off = self.paddles_off
+        for pd in (state.get('paddles') or [{}, {}])[:2]:
+            _PADDLE.pack_into(buf, off, pd.get('x', 0.0), pd.get('y', 0.0), pd.get('width', 0.0), pd.get('height', 0.0))
+            off += _PADDLE.size
+        off = self.balls_off
+        if balls:
+            xs, ys, radii, active = balls['x'], balls['y'], balls['radius'], balls['active']
+            for i in range(n_balls):
+                # velocities are only known for the primary ball
+                dx = ball.get('dx', 0.0) if i == 0 else 0.0
+                dy = ball.get('dy', 0.0) if i == 0 else 0.0
+                _BALL.pack_into(buf, off, xs[i], ys[i], dx, dy, radii[i], active[i])
+                off += _BALL.size
+        else:
+            _BALL.pack_into(buf, off, ball.get('x', 0.0), ball.get('y', 0.0), ball.get('dx', 0.0),
+                            ball.get('dy', 0.0), ball.get('radius', 0.0), bool(ball.get('special_active')))
+        self.seq += 1
+        _SEQ.pack_into(buf, _SEQ_OFFSET, self.seq)
+
+    def close(self, unlink=None):
+        """Unmap the segment; by default the creating process also removes it."""
+        self.buf = None
+        self.shm.close()
+        if unlink if unlink is not None else self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+        elif self.owner:
+            # left for another process: the resource tracker must not remove it at exit
+            try:
+                resource_tracker.unregister(self.shm._name, 'shared_memory')
+            except Exception:
+                pass
+
+
+class StateReader:
+    """Reader of a state segment (any number per segment, in any process)."""
+
+    RETRIES = 1000
+
+    def __init__(self, name):
+        self.shm = _attach(name)
+        self.buf = self.shm.buf
+        magic, version, _, self.max_balls, self.max_pieces = _HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ShmError(f"{name!r} is not a game state segment")
+        self.frame_off = _HEADER.size
+        self.paddles_off = self.frame_off + _FRAME.size
+        self.balls_off = self.paddles_off + 2 * _PADDLE.size
+        self.pieces_off = self.balls_off + self.max_balls * _BALL.size
+        self.pieces_gen = None
+        self.pieces = []
+
+    def sequence(self):
+        return _SEQ.unpack_from(self.buf, _SEQ_OFFSET)[0]
+
+    def read(self):
+        """Consistent copy of the latest frame as a state dict (None before the first publish)."""
+        buf = self.buf
+        for _ in range(self.RETRIES):
+            seq = _SEQ.unpack_from(buf, _SEQ_OFFSET)[0]
+            if seq == 0:
+                return None
+            if seq & 1:
+                # mid-write: let the writer finish
+                time.sleep(0)
+                continue
+            frame = _FRAME.unpack_from(buf, self.frame_off)
+            paddles = list(_PADDLE.iter_unpack(buf[self.paddles_off:self.balls_off]))
+            n_balls = frame[7]
+            balls = list(_BALL.iter_unpack(buf[self.balls_off:self.balls_off + n_balls * _BALL.size]))
+            gen = frame[11]
+            pieces = None
+            if gen != self.pieces_gen:
+                end = self.pieces_off + frame[8] * _PIECE.size
+                pieces = list(_PIECE.iter_unpack(buf[self.pieces_off:end]))
+            if _SEQ.unpack_from(buf, _SEQ_OFFSET)[0] == seq:
+                break
+            time.sleep(0)
+        else:
+            raise ShmError("writer kept the frame busy; no consistent read")
+        if pieces is not None:
+            self.pieces_gen = gen
+            self.pieces = [{"col": col, "row": row, "type": t.decode('ascii'), "color": PIECE_COLORS[color],
+                            "hp": hp, "max_hp": max_hp} for col, row, t, color, hp, max_hp in pieces]
+        return self._to_state(frame, paddles, balls)
+
+    def _to_state(self, frame, paddles, balls):
+        (tick, timestamp, width, height, cols, rows, cell, _, _, flags, winner, _,
+         board_x, board_y, score0, score1, charge, max_charge, special_damage, remaining, ready, active) = frame
+        bx, by, bdx, bdy, br, bactive = balls[0] if balls else (0.0, 0.0, 0.0, 0.0, 0.0, 0)
+        state = {
+            "tick": tick,
+            "timestamp": timestamp,
+            "width": width,
+            "height": height,
+            "board": {"cols": cols, "rows": rows, "cell_size": cell, "x": board_x, "y": board_y,
+                      "width": cols * cell, "height": rows * cell},
+            "ball": {"x": bx, "y": by, "dx": bdx, "dy": bdy, "radius": br,
+                     "special_ready": ready, "special_active": bool(bactive)},
+            "paddles": [{"x": x, "y": y, "width": w, "height": h} for x, y, w, h in paddles],
+            # shared between reads until the table changes
+            "pieces": self.pieces,
+            "scores": [score0, score1],
+            "power": {"charge": charge, "max_charge": max_charge, "ready": ready, "active": active,
+                      "special_damage": special_damage, "remaining_damage": remaining},
+            "waiting_trajectory": bool(flags & FLAG_WAITING),
+            "paused": bool(flags & FLAG_PAUSED),
+            "game_over": {"winner": winner} if flags & FLAG_GAME_OVER else None,
+        }
+        if len(balls) > 1:
+            state["balls"] = {"x": [b[0] for b in balls], "y": [b[1] for b in balls],
+                              "radius": [b[4] for b in balls], "active": [b[5] for b in balls]}
+        return state
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the game state published in shared memory")
+    parser.add_argument('name', help="segment name (PONG_SHM of the server)")
+    parser.add_argument('--interval', type=float, default=0.5)
+    args = parser.parse_args()
+    try:
+        reader = StateReader(args.name)
+    except (FileNotFoundError, ShmError) as e:
+        sys.exit(f"[!] {e}")
+    try:
+        last_tick = None
+        while True:
+            state = reader.read()
+            if state is not None and state['tick'] != last_tick:
+                last_tick = state['tick']
+                ball = state['ball']
+                age = (time.time() - state['timestamp']) * 1000
+                n_balls = len(state['balls']['x']) if 'balls' in state else 1
+                print(f"tick {state['tick']:7d}  age {age:6.1f} ms  ball ({ball['x']:6.1f}, {ball['y']:6.1f})  "
+                      f"balls {n_balls}  pieces {len(state['pieces'])}  power {state['power']['charge']}/{state['power']['max_charge']}")
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# server modules first, then the client's (client/ is not a package)
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, 'client'))
+
+
+@pytest.fixture
+def new_game(monkeypatch, tmp_path):
+    """Factory of `Game`s writing their game files to a temp dir, with the default HP map (no REST API)."""
+    import game as game_module
+
+    def unreachable(self):
+        raise ConnectionError("REST API disabled in tests")
+
+    monkeypatch.setattr(game_module, 'STATE_DIR', str(tmp_path))
+    monkeypatch.setattr(game_module.Game, 'fetch_hp_map', unreachable)
+    monkeypatch.delenv('EXTRA_DIMENSIONS', raising=False)
+    monkeypatch.delenv('PONG_BALLS', raising=False)
+    monkeypatch.delenv('PONG_BALL_SPAWN', raising=False)
+
+    return game_module.Game
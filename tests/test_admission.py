@@ -0,0 +1,92 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from admission import DEFAULT_HOST_LOAD_MAX, DEGRADED, OK, OVERLOADED, LoadMonitor, start_health_server
+
+FRAME = 0.02
+
+
+def test_utilization_is_an_ewma_of_the_frame_budget():
+    load = LoadMonitor(FRAME, alpha=0.5)
+    load.record(0.01)
+    assert load.utilization == pytest.approx(0.25)
+    load.record(0.01)
+    assert load.utilization == pytest.approx(0.375)
+    load.record(0.03)
+    assert load.utilization == pytest.approx(0.9375)
+    assert load.peak == pytest.approx(1.5)
+    assert (load.ticks, load.overruns) == (3, 1)
+
+
+@pytest.mark.parametrize('busy, level, every', [
+    (0.0, OK, 1),
+    (0.0139, OK, 1),
+    (0.014, DEGRADED, 2),
+    (0.019, OVERLOADED, 3),
+])
+def test_levels_shed_load(busy, level, every):
+    load = LoadMonitor(FRAME, alpha=1.0)
+    load.record(busy)
+    assert load.level == level
+    assert load.send_every() == every
+    assert load.tick_stride(critical=True) == 1
+    assert load.tick_stride(critical=False) == every
+
+
+def test_admit_on_loop_budget_and_host_load(monkeypatch):
+    host = {"load": 0.5}
+    monkeypatch.setattr(LoadMonitor, 'host_load', staticmethod(lambda: host["load"]))
+    load = LoadMonitor(FRAME, alpha=1.0, host_refuse_at=0.8)
+    assert load.admit()
+    host["load"] = 0.8
+    assert not load.admit()
+    # no load average on this OS: the loop budget decides alone
+    host["load"] = None
+    assert load.admit()
+    load.record(FRAME)
+    assert not load.admit()
+    assert load.snapshot()["level"] == OVERLOADED
+
+
+@pytest.mark.parametrize('value, expected', [
+    (None, DEFAULT_HOST_LOAD_MAX), ('', DEFAULT_HOST_LOAD_MAX), ('1.5', 1.5), ('lots', DEFAULT_HOST_LOAD_MAX)])
+def test_host_load_max_from_environment(monkeypatch, caplog, value, expected):
+    if value is None:
+        monkeypatch.delenv('PONG_HOST_LOAD_MAX', raising=False)
+    else:
+        monkeypatch.setenv('PONG_HOST_LOAD_MAX', value)
+    assert LoadMonitor(FRAME).host_refuse_at == expected
+    assert ("Invalid PONG_HOST_LOAD_MAX" in caplog.text) == (value == 'lots')
+
+
+@pytest.fixture
+def health():
+    status = {"phase": "waiting", "ready": True}
+    httpd = start_health_server('127.0.0.1', 0, lambda: dict(status))
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.test_status = status
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def get(httpd, path):
+    try:
+        with urllib.request.urlopen(httpd.url + path, timeout=5) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_health_endpoint(health):
+    assert get(health, '/health') == (200, {"phase": "waiting", "ready": True})
+    assert get(health, '/ready')[0] == 200
+    health.test_status.update(phase="playing", ready=False)
+    assert get(health, '/ready') == (503, {"phase": "playing", "ready": False})
+    # liveness doesn't depend on readiness
+    assert get(health, '/health')[0] == 200
+    assert get(health, '/metrics')[0] == 404
+
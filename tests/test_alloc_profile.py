@@ -0,0 +1,83 @@
+import gc
+import tracemalloc
+
+import pytest
+
+import alloc_profile
+from alloc_profile import AllocProfiler, open_profiler
+
+TICKS = 4
+SIZE = 200_000
+
+
+@pytest.fixture
+def profiler(monkeypatch):
+    monkeypatch.setattr(alloc_profile, 'SAMPLE_EVERY', 1)
+    prof = AllocProfiler(TICKS, label="test")
+    yield prof
+    prof.close()
+
+
+def run_ticks(prof, ticks=TICKS):
+    kept = []
+    for _ in range(ticks):
+        prof.phase("keep")
+        kept.append(bytearray(SIZE))
+        prof.phase("temp")
+        scratch = bytearray(SIZE)
+        del scratch
+        prof.phase("collect")
+        gc.collect()
+        prof.tick_done()
+    return kept
+
+
+def test_allocations_go_to_the_named_phases(profiler):
+    kept = run_ticks(profiler)
+    report = profiler.snapshot()
+    assert report["label"] == "test" and report["ticks"] == TICKS
+    keep, temp = report["phases"]["keep"], report["phases"]["temp"]
+    assert keep["calls"] == temp["calls"] == TICKS
+    # still alive at the end of its phase: live and peak
+    assert keep["live_bytes_per_tick"] >= SIZE
+    assert keep["peak_bytes_per_tick"] >= SIZE
+    # freed before the phase ended: only the peak shows it
+    assert temp["peak_bytes_per_tick"] >= SIZE
+    assert temp["live_bytes_per_tick"] < SIZE / 10
+    # sampled calls name this file as the allocation site
+    assert keep["top"] and keep["top"][0][0].startswith("test_alloc_profile.py:")
+    assert keep["top"][0][2] >= SIZE
+    assert len(kept) == TICKS
+
+
+def test_gc_pauses_are_charged_to_the_loop_phase(profiler):
+    run_ticks(profiler)
+    phases = profiler.snapshot()["phases"]
+    assert phases["collect"]["gc"] >= TICKS
+    assert phases["collect"]["gc_generations"][2] >= TICKS
+    assert phases["keep"]["gc_generations"][2] == 0
+
+
+def test_report_resets_every_n_ticks(profiler):
+    run_ticks(profiler)
+    first = profiler.snapshot()
+    run_ticks(profiler, TICKS - 1)
+    # no new report before N more ticks
+    assert profiler.snapshot() is first
+    assert profiler.phases["keep"].calls == TICKS - 1
+    assert "[alloc] test: 4 ticks" in AllocProfiler.format(first)
+
+
+def test_close_removes_the_gc_callback_and_stops_tracing():
+    was_tracing = tracemalloc.is_tracing()
+    prof = AllocProfiler(TICKS)
+    assert prof._on_gc in gc.callbacks
+    prof.close()
+    assert prof._on_gc not in gc.callbacks
+    assert tracemalloc.is_tracing() == was_tracing
+    # twice is harmless
+    prof.close()
+
+
+def test_profiling_off_by_default():
+    assert open_profiler(every=0) is None
@@ -0,0 +1,115 @@
+import threading
+import time
+
+from client_link import FULL, LITE, ClientLink
+
+
+class FakeConn:
+    """Socket stand-in whose writes can be held back."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.gate.set()
+        self.written = []
+        self.sent = threading.Condition()
+
+    def fileno(self):
+        return -1
+
+    def sendall(self, data):
+        self.gate.wait(5)
+        with self.sent:
+            self.written.append(data)
+            self.sent.notify_all()
+
+    def wait_written(self, count):
+        with self.sent:
+            return self.sent.wait_for(lambda: len(self.written) >= count, 5)
+
+
+def piece(col, row, hp=2, kind='P'):
+    return {"type": kind, "color": "white", "col": col, "row": row, "x": 0.0, "y": 0.0, "hp": hp, "max_hp": 2}
+
+
+def lite_link(conn):
+    link = ClientLink(conn, 1, threading.Lock())
+    link.detail = LITE
+    link.keeps_pieces = True
+    return link
+
+
+def deliver_full(link, conn, pieces):
+    count = len(conn.written) + 1
+    assert link.plan({"pieces": pieces}, time.monotonic()) == FULL
+    link.push((), b"full\n", pieces)
+    assert conn.wait_written(count)
+    # the baseline is set just after the write returns
+    deadline = time.monotonic() + 5
+    while link.full_in_flight and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def test_full_until_one_was_written_over_tcp():
+    conn = FakeConn()
+    link = lite_link(conn)
+    pieces = [piece(0, 0)]
+    assert link.plan({"pieces": pieces}, time.monotonic()) == FULL
+    # sent over UDP: not counted as delivered
+    link.push((), None)
+    assert link.plan({"pieces": pieces}, time.monotonic()) == FULL
+    deliver_full(link, conn, pieces)
+    assert link.plan({"pieces": pieces}, time.monotonic()) == LITE
+    link.close()
+
+
+def test_pending_full_is_never_replaced_by_lite():
+    conn = FakeConn()
+    link = lite_link(conn)
+    pieces = [piece(0, 0)]
+    deliver_full(link, conn, pieces)
+    conn.gate.clear()
+    # a final state: FULL whatever the client has; its write blocks
+    assert link.plan({"pieces": pieces}, time.monotonic(), force=True) == FULL
+    link.push((), b"full-1\n", pieces)
+    assert link.plan({"pieces": pieces}, time.monotonic()) == FULL
+    while not link.busy:
+        time.sleep(0.001)
+    link.push((), b"full-2\n", pieces)
+    # full-2 waits behind full-1: unchanged pieces still go whole
+    assert link.plan({"pieces": pieces}, time.monotonic()) == FULL
+    conn.gate.set()
+    assert conn.wait_written(3)
+    link.close(flush=True)
+    assert conn.written[1:] == [b"full-1\n", b"full-2\n"]
+    # the blocked write counted as congestion
+    link.interval = 1
+    assert link.plan({"pieces": pieces}, time.monotonic()) == LITE
+
+
+def test_same_count_different_pieces_is_full():
+    conn = FakeConn()
+    link = lite_link(conn)
+    deliver_full(link, conn, [piece(0, 0), piece(1, 0)])
+    moved = [piece(0, 0), piece(2, 0)]
+    assert link.plan({"pieces": moved}, time.monotonic()) == FULL
+    link.close()
+
+
+def test_hp_only_changes_wait_for_the_refresh():
+    conn = FakeConn()
+    link = lite_link(conn)
+    deliver_full(link, conn, [piece(0, 0, hp=2)])
+    hit = [piece(0, 0, hp=1)]
+    now = time.monotonic()
+    assert link.plan({"pieces": hit}, now) == LITE
+    assert link.plan({"pieces": hit}, now + 1.0) == FULL
+    link.close()
+
+
+def test_udp_only_for_lite_once_the_link_relies_on_pieces():
+    link = lite_link(FakeConn())
+    assert link.udp_ok(LITE)
+    assert not link.udp_ok(FULL)
+    link.detail = FULL
+    assert link.udp_ok(FULL)
+    link.close()
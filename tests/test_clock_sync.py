@@ -0,0 +1,56 @@
+from clock_sync import BURST, ClockSync, pong
+
+
+def exchange(clock, t0, offset, up, down, server_time=0.001):
+    """One ping/pong: `up`/`down` seconds each way, server clock ahead by `offset`."""
+    t1 = t0 + up + offset
+    t2 = t1 + server_time
+    t3 = t2 - offset + down
+    return clock.on_pong({"type": "pong", "t": t0, "rx": t1, "tx": t2}, now=t3)
+
+
+def test_symmetric_path_gives_exact_offset():
+    clock = ClockSync()
+    assert not clock.synced
+    assert exchange(clock, 100.0, offset=2.5, up=0.02, down=0.02)
+    assert clock.synced
+    assert abs(clock.offset - 2.5) < 1e-9
+    assert abs(clock.rtt - 0.04) < 1e-9
+    assert abs(clock.to_local(clock.server_time(now=50.0)) - 50.0) < 1e-9
+
+
+def test_keeps_the_lowest_delay_sample_and_counts_outliers():
+    clock = ClockSync()
+    exchange(clock, 0.0, offset=1.0, up=0.01, down=0.01)
+    # queued on the way back: 0.2 s of extra delay skews this sample's offset
+    assert exchange(clock, 1.0, offset=1.0, up=0.01, down=0.21)
+    assert clock.outliers == 1
+    assert abs(clock.offset - 1.0) < 1e-9
+
+
+def test_unusable_pongs():
+    clock = ClockSync()
+    assert not clock.on_pong({"type": "pong", "t": 1.0}, now=2.0)
+    # answered "before" it was sent: the local clock stepped
+    assert not clock.on_pong({"type": "pong", "t": 10.0, "rx": 5.0, "tx": 5.0}, now=9.0)
+    assert not clock.synced
+
+
+def test_probes_burst_then_follow_the_interval():
+    clock = ClockSync(interval=1.0)
+    probe = clock.probe_due(now=10.0)
+    assert probe == {"type": "ping", "t": 10.0}
+    assert clock.probe_due(now=10.05) is None
+    t = 10.0
+    for _ in range(BURST):
+        t += 0.125
+        assert clock.probe_due(now=t) is not None
+        exchange(clock, t, offset=0.0, up=0.01, down=0.01)
+    assert clock.probe_due(now=t + 0.5) is None
+    assert clock.probe_due(now=t + 1.0) is not None
+
+
+def test_server_pong_echoes_the_ping_time():
+    answer = pong({"type": "ping", "t": 3.25}, received_at=4.0)
+    assert (answer["type"], answer["t"], answer["rx"]) == ("pong", 3.25, 4.0)
+    assert isinstance(answer["tx"], float)
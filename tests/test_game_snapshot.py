@@ -0,0 +1,73 @@
+import pytest
+
+from game import Game
+from game_snapshot import SnapshotError, dump_game, load_game
+
+
+def comparable(state):
+    state = dict(state)
+    del state['timestamp']
+    return state
+
+
+def play(game, ticks, trajectory=None):
+    commands = {0: 'left', 1: 'right'}
+    if trajectory is not None:
+        commands['trajectory'] = trajectory
+    for _ in range(ticks):
+        game.update(1 / 60, commands)
+        commands.pop('trajectory', None)
+
+
+def test_round_trip_new_game(new_game):
+    game = new_game()
+    restored = load_game(dump_game(game))
+    assert comparable(restored.get_state()) == comparable(game.get_state())
+
+
+def test_round_trip_mid_match(new_game):
+    game = new_game()
+    play(game, 90, trajectory=60.0)
+    restored = Game.from_snapshot(dump_game(game))
+    assert comparable(restored.get_state()) == comparable(game.get_state())
+    assert restored.pending_trajectory == game.pending_trajectory
+    assert restored.db_path == game.db_path
+
+
+def test_restored_game_keeps_playing_like_the_original(new_game):
+    game = new_game()
+    play(game, 30, trajectory=75.0)
+    restored = load_game(dump_game(game))
+    play(game, 60)
+    play(restored, 60)
+    assert comparable(restored.get_state()) == comparable(game.get_state())
+
+
+def test_restored_game_has_every_attribute_of_a_new_one(new_game):
+    game = new_game()
+    restored = load_game(dump_game(game))
+    assert set(vars(game)) <= set(vars(restored))
+
+
+@pytest.mark.parametrize('blob', [b'', b'XYZ' + bytes(40), b'PGS\xff' + bytes(40)])
+def test_rejects_garbage(blob):
+    with pytest.raises(SnapshotError):
+        load_game(blob)
+
+
+def test_rejects_truncated(new_game):
+    blob = dump_game(new_game())
+    with pytest.raises(SnapshotError):
+        load_game(blob[:len(blob) // 2])
+
+
+def test_round_trip_with_extra_balls(new_game):
+    game = new_game()
+    play(game, 10, trajectory=100.0)
+    j = game.balls.add(300.0, 250.0, -120.0, 80.0, game.ball.radius, game.ball.speed, "#8be9fd")
+    game.balls.remaining[j] = 3
+    game._sync_special()
+    restored = load_game(dump_game(game))
+    assert len(restored.balls) == 2
+    assert comparable(restored.get_state()) == comparable(game.get_state())
+    assert restored.balls.remaining[1] == 3
@@ -0,0 +1,157 @@
+from types import SimpleNamespace
+
+from entities.balls import BallSet
+from game import MAX_REWIND_TICKS
+from history import SnapshotHistory
+
+DT = 1 / 60
+
+
+def paddles(x0, x1):
+    return [SimpleNamespace(x=x0, y=10.0), SimpleNamespace(x=x1, y=590.0)]
+
+
+def balls(*states):
+    bs = BallSet()
+    for x, y, dx, dy in states:
+        bs.add(x, y, dx, dy, 8.0, 300.0, "#fff")
+    return bs
+
+
+def test_record_and_read_back():
+    h = SnapshotHistory(capacity=8)
+    h.record(3, 0.05, balls((100.0, 200.0, 30.0, -40.0)), paddles(150.0, 250.0))
+    assert h.has(3) and not h.has(2) and not h.has(None)
+    assert h.time(3) == 0.05
+    assert h.paddle(3, 0) == (150.0, 10.0)
+    assert h.paddle(3, 1) == (250.0, 590.0)
+    assert h.ball_count(3) == 1
+    assert h.ball(3, 0) == (100.0, 200.0, 30.0, -40.0)
+    assert h.ball(3, 1) is None
+
+
+def test_ring_buffer_forgets_old_ticks():
+    h = SnapshotHistory(capacity=4)
+    for tick in range(10):
+        h.record(tick, tick * DT, balls((tick, 0.0, 0.0, 1.0)), paddles(tick, tick))
+    assert h.oldest_tick() == 6
+    assert not h.has(5) and h.paddle(5, 0) is None
+    assert h.ball(9, 0)[0] == 9.0
+    h.clear()
+    assert h.oldest_tick() is None and not h.has(9)
+
+
+def test_grows_when_more_balls_than_a_record_holds():
+    h = SnapshotHistory(capacity=4)
+    h.record(1, DT, balls((1.0, 1.0, 0.0, 1.0)), paddles(0.0, 0.0))
+    h.record(2, 2 * DT, balls((1.0, 1.0, 0.0, 1.0), (2.0, 2.0, 0.0, -1.0)), paddles(0.0, 0.0))
+    assert h.max_balls == 2
+    assert h.ball(2, 1) == (2.0, 2.0, 0.0, -1.0)
+    # the buffer started over
+    assert not h.has(1)
+
+
+def play(game, ticks):
+    """Record `ticks` ticks of the game as it stands, without stepping it."""
+    for _ in range(ticks):
+        game.tick += 1
+        game.sim_time += DT
+        game.history.record(game.tick, game.sim_time, game.balls, game.paddles)
+
+
+def on_bottom_paddle(game):
+    """Put the ball on the bottom paddle's top edge, heading down into it."""
+    p = game.paddles[1]
+    b = game.balls
+    b.x[0] = p.x
+    b.y[0] = p.y - p.height / 2 - b.radius[0] + 1.0
+    b.dx[0] = 0.0
+    b.dy[0] = 300.0
+
+
+def rewind_setup(new_game):
+    game = new_game()
+    game.waiting_trajectory = False
+    play(game, 10)
+    on_bottom_paddle(game)
+    play(game, 1)
+    return game, game.tick
+
+
+def test_paddle_moved_away_still_hits_at_the_acked_tick(new_game):
+    game, seen = rewind_setup(new_game)
+    # the player saw the contact; by now the paddle has moved on and the ball went past
+    game.paddles[1].x += 200
+    game.balls.y[0] += 300.0 * DT
+    game.tick += 1
+    game.sim_time += DT
+    game.set_acked_tick(1, seen)
+    assert game._collide_paddles()
+    ball = game.ball
+    assert ball.dy < 0
+    # moved on from the contact point for the tick that elapsed since
+    p = game.paddles[1]
+    assert ball.y == (p.y - p.height / 2 - ball.radius) + ball.dy * DT
+
+
+def test_no_ack_uses_the_live_paddle_only(new_game):
+    game, seen = rewind_setup(new_game)
+    game.paddles[1].x += 200
+    game.tick += 1
+    game.sim_time += DT
+    assert not game._collide_paddles()
+    assert game.ball.dy > 0
+
+
+def test_ack_older_than_the_buffer_falls_back_to_the_live_paddle(new_game):
+    game, seen = rewind_setup(new_game)
+    game.set_acked_tick(1, seen)
+    play(game, game.history.capacity)
+    assert not game.history.has(seen)
+    assert game._rewind_tick(1) is None
+    # no rewound hit where the paddle was...
+    game.paddles[1].x += 200
+    assert not game._collide_paddles()
+    # ...the live paddle still plays
+    game.paddles[1].x -= 200
+    assert game._collide_paddles()
+    assert game.ball.dy < 0
+
+
+def test_old_ack_does_not_widen_the_paddle(new_game):
+    game, seen = rewind_setup(new_game)
+    # the paddle left right after the contact the player saw
+    game.paddles[1].x += 200
+    play(game, MAX_REWIND_TICKS + 2)
+    game.set_acked_tick(1, seen)
+    assert game._rewind_tick(1) == game.tick - MAX_REWIND_TICKS
+    assert not game._collide_paddles()
+    assert game.ball.dy > 0
+
+
+def test_a_bounce_already_played_is_not_replayed(new_game):
+    game, seen = rewind_setup(new_game)
+    game.set_acked_tick(1, seen)
+    game.tick += 1
+    game.sim_time += DT
+    # live hit first: the ball heads up, the recorded contact is not played again
+    assert game._collide_paddles()
+    dy = game.ball.dy
+    game.balls.y[0] += dy * DT
+    game.balls.paddle_hit[1] = 0.0
+    assert not game._collide_paddles()
+    assert game.ball.dy == dy
+
+
+def test_acked_ticks_are_monotonic_and_bounded(new_game):
+    game = new_game()
+    play(game, 5)
+    game.set_acked_tick(0, 4)
+    game.set_acked_tick(0, 2)
+    assert game.acked_ticks[0] == 4
+    game.set_acked_tick(0, 99)
+    assert game.acked_ticks[0] == 4
+    game.set_acked_tick(0, 'x')
+    assert game.acked_ticks[0] == 4
+    game.set_acked_tick(0, None)
+    assert game.acked_ticks[0] is None
@@ -0,0 +1,40 @@
+from input_guard import InputGuard, TokenBucket
+
+
+def test_token_bucket_burst_then_refill():
+    bucket = TokenBucket(rate=10, burst=3, now=0.0)
+    assert [bucket.take(now=0.0) for _ in range(4)] == [True, True, True, False]
+    assert not bucket.take(now=0.05)
+    assert bucket.take(now=0.15)
+    # never refills above the burst
+    assert bucket.take(3, now=100.0)
+    assert not bucket.take(now=100.0)
+
+
+def test_admit_drops_frames_over_budget():
+    guard = InputGuard(rate=10, burst=5, kick_rate=1, kick_burst=100)
+    frames = [b"f%d" % i for i in range(8)]
+    assert guard.admit(frames, now=guard.bucket.stamp) == frames[:5]
+    assert guard.dropped == 3
+    assert not guard.abusive
+    assert guard.admit([b"late"], now=guard.bucket.stamp + 0.1) == [b"late"]
+
+
+def test_sustained_flood_is_flagged_abusive():
+    guard = InputGuard(rate=10, burst=5, kick_rate=1, kick_burst=20)
+    now = guard.bucket.stamp
+    for i in range(10):
+        guard.admit([b"x"] * 10, now=now + i * 0.01)
+    assert guard.abusive
+    assert guard.snapshot()["dropped"] == guard.dropped > 0
+
+
+def test_identical_controls_are_debounced():
+    guard = InputGuard(debounce=0.25)
+    assert guard.accept_control("pause", None, now=0.0)
+    assert not guard.accept_control("pause", None, now=0.1)
+    assert guard.accept_control("pause", None, now=0.4)
+    # another value is another control
+    assert guard.accept_control("trajectory", 30.0, now=0.5)
+    assert guard.accept_control("trajectory", 45.0, now=0.55)
+    assert guard.debounced == 1
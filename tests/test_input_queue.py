@@ -0,0 +1,85 @@
+from input_queue import ROOM, InputQueues
+
+
+def test_full_queue_keeps_controls_and_the_latest_move():
+    inputs = InputQueues(maxlen=8)
+    inputs.push(1, "control", ("pause", None))
+    for i in range(20):
+        inputs.push(1, "cmd", "left" if i % 2 else "right")
+    inputs.push(1, "control", ("trajectory", 45.0))
+    inputs.push(1, "cmd", "stop")
+    queued = inputs.drain()
+    kinds = [(kind, value) for _, _, _, kind, value in queued]
+    assert ("control", ("pause", None)) in kinds
+    assert ("control", ("trajectory", 45.0)) in kinds
+    assert kinds[-1] == ("cmd", "stop")
+    assert len(queued) <= 8
+    assert [entry[0] for entry in queued] == sorted(entry[0] for entry in queued)
+    assert inputs.dropped[1] > 0
+    inputs.resolve_moves(queued)
+    assert inputs.held[1] == "stop"
+
+
+def test_queue_of_controls_only_is_never_evicted():
+    inputs = InputQueues(maxlen=4)
+    for i in range(10):
+        inputs.push(ROOM, "power_config", {"n": i})
+    values = [value["n"] for _, _, _, _, value in inputs.drain()]
+    assert values == list(range(10))
+    assert inputs.dropped[ROOM] == 0
+
+
+def test_drain_merges_queues_in_arrival_order():
+    inputs = InputQueues()
+    inputs.push(1, "cmd", "left")
+    inputs.push(ROOM, "player_left", 2)
+    inputs.tick = 5
+    inputs.push(2, "cmd", "right")
+    inputs.push(1, "control", ("trajectory", 30.0))
+    queued = inputs.drain()
+    assert [(player, kind) for _, _, player, kind, _ in queued] == [
+        (1, "cmd"), (ROOM, "player_left"), (2, "cmd"), (1, "control")]
+    assert [tick for _, tick, _, _, _ in queued] == [0, 0, 5, 5]
+    assert inputs.drain() == []
+    assert inputs.max_wait[1] == 5
+
+
+def test_repeated_moves_are_not_queued():
+    inputs = InputQueues()
+    assert inputs.push(1, "cmd", "left")
+    assert not inputs.push(1, "cmd", "left")
+    assert not inputs.push(1, "cmd", "jump")
+    assert not inputs.push(3, "cmd", "left")
+    assert len(inputs.drain()) == 1
+
+
+def test_resolve_moves_holds_keys_between_ticks():
+    inputs = InputQueues()
+    inputs.push(1, "cmd", "left")
+    assert inputs.resolve_moves(inputs.drain()) == {1: "left", 2: "stop"}
+    # nothing new: the key is still held
+    assert inputs.resolve_moves(inputs.drain()) == {1: "left", 2: "stop"}
+    inputs.push(1, "cmd", "stop")
+    assert inputs.resolve_moves(inputs.drain()) == {1: "stop", 2: "stop"}
+    assert inputs.idle()
+
+
+def test_a_tap_within_one_tick_still_moves_once():
+    inputs = InputQueues()
+    inputs.push(2, "cmd", "right")
+    inputs.push(2, "cmd", "stop")
+    assert inputs.resolve_moves(inputs.drain())[2] == "right"
+    assert inputs.held[2] == "stop"
+    assert inputs.resolve_moves(inputs.drain())[2] == "stop"
+
+
+def test_export_and_import_for_a_handoff():
+    inputs = InputQueues(held={"1": "left"})
+    inputs.push(1, "cmd", "stop")
+    inputs.push(ROOM, "players_back", None)
+    exported = inputs.export()
+    assert not inputs.pending()
+    other = InputQueues(held={"1": "left"})
+    other.import_inputs(exported)
+    assert [(player, kind, value) for _, _, player, kind, value in other.drain()] == [
+        (1, "cmd", "stop"), (ROOM, "players_back", None)]
@@ -0,0 +1,60 @@
+import pytest
+
+from layout import COLS, ROWS, compile_layout, major_row, ranks_per_side, starting_cells
+
+HP = {'P': 2, 'N': 4, 'R': 5, 'B': 5, 'Q': 8, 'K': 10}
+
+
+@pytest.mark.parametrize('cols, rows', [(2, 8), (4, 6), (8, 8), (12, 10), (16, 16), (20, 8)])
+def test_generated_layout(cols, rows):
+    layout = compile_layout(cols, rows, HP, 800, 600)
+    board = layout.geometry.board
+    assert (board['cols'], board['rows']) == (cols, rows)
+    assert board['width'] == board['cell_size'] * cols <= 800
+    assert board['height'] == board['cell_size'] * rows <= 600
+    # one piece per cell of the back and pawn ranks of each side
+    ranks = ranks_per_side(rows)
+    assert len(layout.pieces) == 2 * ranks * cols
+    assert len({(col, row) for _, _, col, row, _ in layout.pieces}) == len(layout.pieces)
+    for t, color, col, row, hp in layout.pieces:
+        assert 0 <= col < cols and 0 <= row < rows
+        assert hp == HP[t]
+        assert (row < ranks) == (color == 'black')
+    # every cell has its centre, inside the board
+    assert len(layout.centers) == cols * rows
+    x, y = layout.centers[(cols - 1, rows - 1)]
+    assert x < board['x'] + board['width'] and y < board['y'] + board['height']
+    # the paddles sit between the two camps
+    top, bottom = layout.geometry.paddle_y
+    assert board['y'] + ranks * board['cell_size'] < top < bottom < board['y'] + (rows - ranks) * board['cell_size']
+
+
+def test_layouts_are_cached_and_immutable():
+    a = compile_layout(10, 10, HP, 800, 600)
+    assert compile_layout(10, 10, dict(HP), 800, 600) is a
+    assert compile_layout(10, 10, dict(HP, P=3), 800, 600) is not a
+    with pytest.raises(TypeError):
+        a.geometry.board['cols'] = 3
+
+
+def test_new_pieces_are_fresh_dicts():
+    layout = compile_layout(6, 6, HP, 800, 600)
+    first = layout.new_pieces()
+    first[0]['hp'] = 0
+    assert layout.new_pieces()[0]['hp'] == layout.pieces[0][4]
+
+
+def test_template_for_the_classic_board(tmp_path):
+    template = tmp_path / "template.json"
+    template.write_text('{"pieces": [{"type": "K", "color": "white", "col": 3, "row": 7}], "scores": [1, 2]}')
+    layout = compile_layout(COLS, ROWS, HP, 800, 600, template_path=str(template))
+    assert layout.pieces == (('K', 'white', 3, 7, 10),)
+    assert layout.scores == (1, 2)
+    # other sizes ignore the template
+    assert len(compile_layout(10, 8, HP, 800, 600, template_path=str(template)).pieces) > 1
+
+
+def test_major_row_is_the_classic_back_rank():
+    assert ''.join(major_row(8)) == 'RNBQKBNR'
+    assert ''.join(major_row(4)) == 'BQKB'
+    assert len(starting_cells(8, 8)) == 32
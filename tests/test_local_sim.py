@@ -0,0 +1,101 @@
+import threading
+import time
+
+import pytest
+
+from local_sim import LocalSimulation
+
+DT = 1 / 200
+
+
+def wait_for(cond, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.002)
+    return True
+
+
+class Publisher:
+    def __init__(self):
+        self.ticks = []
+        self.closed = False
+
+    def publish(self, state):
+        self.ticks.append(state['tick'])
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def sim(new_game):
+    sims = []
+
+    def make(game=None, publisher=None):
+        s = LocalSimulation(game or new_game(), DT, publisher=publisher)
+        sims.append(s)
+        return s
+    yield make
+    for s in sims:
+        s.stop()
+
+
+def test_snapshot_tick_is_the_game_tick(sim, new_game):
+    game = new_game()
+    # e.g. a game restored from a snapshot: its tick doesn't start at 0
+    game.tick = 500
+    s = sim(game)
+    assert s.snapshot()['tick'] == 500
+    s.submit(game.update, DT, {0: 'stop', 1: 'stop', 'trajectory': 60.0})
+    s.start()
+    assert wait_for(lambda: s.snapshot()['tick'] >= 510)
+    snap = s.snapshot()
+    assert snap['tick'] <= game.tick
+    assert not snap['waiting_trajectory']
+
+
+def test_tasks_run_on_the_simulation_thread(sim):
+    s = sim()
+    ran = []
+    s.submit(lambda: ran.append(threading.current_thread().name))
+    s.start()
+    assert wait_for(lambda: ran)
+    assert ran == ["local-sim"]
+
+
+def test_paused_stops_the_steps(sim):
+    s = sim()
+    s.start()
+    assert wait_for(lambda: s.snapshot()['tick'] > 0)
+    s.paused = True
+    assert wait_for(lambda: s.snapshot()['paused'])
+    tick = s.snapshot()['tick']
+    time.sleep(10 * DT)
+    assert s.game.tick == tick
+    s.paused = False
+    assert wait_for(lambda: s.snapshot()['tick'] > tick and not s.snapshot()['paused'])
+
+
+def test_snapshots_are_published_and_the_publisher_closed(sim):
+    pub = Publisher()
+    s = sim(publisher=pub)
+    s.start()
+    assert wait_for(lambda: len(pub.ticks) >= 5)
+    s.stop()
+    assert pub.closed and s.publisher is None
+    assert pub.ticks == sorted(pub.ticks)
+    assert pub.ticks[-1] == s.game.tick
+
+
+def test_power_config_update_is_queued(sim, new_game, monkeypatch, tmp_path):
+    import game as game_module
+    monkeypatch.setattr(game_module, 'POWER_CONFIG_PATH', str(tmp_path / 'power_config.json'))
+    s = sim(new_game())
+    cfg = {"charge_max": 3, "charge_per_hit": 1, "special_damage": 2}
+    assert s.update_power_config(cfg)
+    # not applied on the caller's thread
+    assert s.game.power_max_charge != 3
+    s.start()
+    assert wait_for(lambda: s.game.power_max_charge == 3)
@@ -0,0 +1,91 @@
+import io
+import os
+from array import array
+
+import pytest
+
+import match_events as ev
+import match_stats
+
+np = pytest.importorskip('numpy')
+
+
+@pytest.mark.parametrize('code, values', [
+    ('B', [0, 7, 255]),
+    ('b', [-1, 0, 127]),
+    ('h', [-300, 5]),
+    ('i', [-(2**31), 2**31 - 1]),
+    ('q', [2**40, -3]),
+    ('d', [0.5, -1e300]),
+    ('q', []),
+])
+def test_npy_loads_with_numpy(code, values):
+    column = array(code, values)
+    blob = ev._npy(column)
+    # header padded so the data starts 64-byte aligned
+    assert (10 + int.from_bytes(blob[8:10], 'little')) % 64 == 0
+    loaded = np.load(io.BytesIO(blob))
+    assert loaded.dtype.itemsize == column.itemsize
+    assert loaded.dtype.kind == ('f' if code == 'd' else 'u' if code.isupper() else 'i')
+    assert loaded.tolist() == values
+
+
+def record_matches(directory):
+    """Two matches of synthetic events, written by the recorder thread."""
+    rec = ev.EventRecorder(str(directory), flush_every=0.01)
+    R, N = ord('R'), ord('N')
+    rec.new_match({"cols": 8, "rows": 8})
+    rec.record(ev.HIT, 1, 0.5, ball=0, piece=R, color=0, col=0, row=0, amount=2, rest=3)
+    rec.record(ev.SPECIAL_START, 2, 1.0, ball=0, amount=6)
+    rec.record(ev.HIT, 3, 1.1, ball=0, piece=R, color=0, col=0, row=0, amount=3, rest=0, special=1)
+    rec.record(ev.DESTROYED, 3, 1.1, ball=0, piece=R, color=0, col=0, row=0, amount=5, special=1)
+    rec.record(ev.HIT, 4, 1.2, ball=0, piece=N, color=0, col=1, row=0, amount=2, rest=2, special=1)
+    rec.record(ev.SPECIAL_END, 4, 1.3, ball=0, amount=1, side=ev.END_BLOCKED)
+    rec.record(ev.PADDLE_HIT, 5, 2.0, ball=0, side=0)
+    rec.record(ev.WALL_HIT, 6, 2.5, ball=0, side=ev.WALL_TOP)
+    rec.new_match({"cols": 8, "rows": 8})
+    rec.record(ev.HIT, 1, 9.0, ball=0, piece=N, color=1, col=1, row=0, amount=1, rest=3)
+    rec.record(ev.SPECIAL_START, 2, 9.5, ball=1, amount=4)
+    rec.record(ev.SPECIAL_END, 3, 9.6, ball=1, amount=4, side=ev.END_WALL)
+    rec.record(ev.HIT, 4, 10.0, ball=0, piece=N, color=1, col=1, row=0, amount=3, rest=0)
+    rec.record(ev.DESTROYED, 4, 10.0, ball=0, piece=N, color=1, col=1, row=0, amount=4)
+    rec.close()
+    return match_stats.match_files([str(directory)])
+
+
+def test_recorded_match_loads_with_numpy(tmp_path):
+    files = record_matches(tmp_path)
+    assert len(files) == 2
+    assert not [f for f in os.listdir(tmp_path) if f.endswith('.tmp')]
+    columns, meta = ev.load_columns(files[0])
+    assert meta["events"] == 8 and meta["cols"] == 8 and "started" in meta
+    assert columns['kind'].tolist() == [ev.HIT, ev.SPECIAL_START, ev.HIT, ev.DESTROYED,
+                                        ev.HIT, ev.SPECIAL_END, ev.PADDLE_HIT, ev.WALL_HIT]
+    assert columns['t'].dtype == np.float64 and columns['t'][2] == 1.1
+    assert columns['piece'][0] == ord('R') and columns['color'][6] == -1
+    assert columns['amount'].tolist()[:4] == [2, 6, 3, 5]
+    assert columns['side'][5] == ev.END_BLOCKED
+
+
+def test_match_stats(tmp_path):
+    stats = match_stats.aggregate(record_matches(tmp_path))
+    assert stats["matches"] == 2 and stats["events"] == 13
+    rook, knight = stats["pieces"]["R"], stats["pieces"]["N"]
+    assert (rook["hits"], rook["damage"], rook["special_damage"]) == (2, 5, 3)
+    assert (rook["destroyed"], rook["destroyed_by_special"], rook["max_hp"]) == (1, 1, 5.0)
+    assert rook["hits_to_kill"] == 2.0 and rook["time_to_kill_s"] == 0.6
+    # the knight hit in the first match is another piece than the one destroyed in the second
+    assert (knight["hits"], knight["damage"], knight["special_damage"]) == (3, 6, 2)
+    assert (knight["destroyed"], knight["destroyed_by_special"]) == (1, 0)
+    assert knight["hits_to_kill"] == 2.0 and knight["time_to_kill_s"] == 1.0
+    special = stats["special"]
+    assert (special["shots"], special["completed"]) == (2, 2)
+    assert (special["capacity"], special["damage_dealt"], special["efficiency"]) == (10, 5, 0.5)
+    assert special["destroyed_per_shot"] == 0.5
+    assert special["end_reasons"] == {"exhausted": 0, "blocked": 1, "wall": 1, "reset": 0}
+    assert stats["contacts"]["paddle_hits"] == {"player1": 1, "player2": 0}
+    assert stats["contacts"]["wall_hits"]["top"] == 1
+
+
+def test_no_events(tmp_path):
+    assert match_stats.aggregate([]) == {"matches": 0, "events": 0}
@@ -0,0 +1,102 @@
+import pytest
+
+import pacing
+from pacing import FramePacer, FrameStats, RateMeter
+
+
+class Clock:
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(pacing.time, 'perf_counter', clock)
+    return clock
+
+
+def test_draw_time_is_taken_off_the_wait(clock):
+    pacer = FramePacer(50)
+    # a frame that took 5 ms to draw waits the remaining 15 ms
+    clock.now += 0.005
+    assert pacer.next_delay_ms() == 15
+    # woken up 2 ms late, 4 ms of drawing: the next deadline is still 20 ms on
+    clock.now = 100.026
+    assert pacer.next_delay_ms() == 14
+    assert pacer.deadline == pytest.approx(100.04)
+
+
+def test_deadlines_do_not_drift(clock):
+    pacer = FramePacer(60)
+    for _ in range(600):
+        clock.now += pacer.next_delay_ms() / 1000 + 0.003
+    # 600 frames at 60 fps: 10 s, give or take a rounded millisecond
+    assert pacer.deadline == pytest.approx(110.0)
+    assert clock.now - 100.0 == pytest.approx(10.0, abs=0.005)
+
+
+def test_late_frame_within_a_frame_catches_up(clock):
+    pacer = FramePacer(50)
+    clock.now += 0.035
+    # 15 ms behind the deadline: no wait, the next frame starts right away
+    assert pacer.next_delay_ms() == 0
+    assert pacer.deadline == pytest.approx(100.02)
+
+
+def test_resync_after_a_stall(clock):
+    pacer = FramePacer(50)
+    clock.now += 0.5
+    # far behind: start over from now rather than drawing a burst of frames
+    assert pacer.next_delay_ms() == 0
+    assert pacer.deadline == clock.now
+    clock.now += 0.002
+    assert pacer.next_delay_ms() == 18
+
+
+def test_set_fps_clamps():
+    pacer = FramePacer(0)
+    assert (pacer.fps, pacer.dt) == (1, 1.0)
+    pacer.set_fps(120.7)
+    assert pacer.fps == 120
+
+
+def test_draw_percentiles_nearest_rank():
+    stats = FrameStats()
+    assert stats.draw_percentiles() == [0.0, 0.0, 0.0]
+    for ms in range(100, 0, -1):
+        stats.record_draw(0.0, ms / 1000)
+    assert stats.draw_percentiles() == pytest.approx([50.0, 95.0, 99.0])
+    assert stats.draw_percentiles((0.0, 0.07, 1.0)) == pytest.approx([1.0, 7.0, 100.0])
+    stats = FrameStats()
+    stats.record_draw(0.0, 0.004)
+    assert stats.draw_percentiles() == pytest.approx([4.0, 4.0, 4.0])
+
+
+def test_draw_percentiles_use_the_window():
+    stats = FrameStats(window=4)
+    for ms in (90, 1, 2, 3, 4):
+        stats.record_draw(0.0, ms / 1000)
+    assert stats.draw_percentiles((0.5, 1.0)) == pytest.approx([2.0, 4.0])
+    assert stats.drawn == 5
+
+
+def test_fps_counts_the_last_second():
+    stats = FrameStats()
+    for i in range(90):
+        stats.record_draw(10.0 + i / 60, 0.001)
+    stats.record_skip()
+    assert stats.fps(11.5) == 60
+    assert stats.skipped == 1
+
+
+def test_rate_meter():
+    meter = RateMeter()
+    assert meter.sample(1000, 10.0) == 0.0
+    assert meter.sample(3000, 10.5) == 4000.0
+    # same timestamp: the previous rate is kept
+    assert meter.sample(3500, 10.5) == 4000.0
+    assert meter.sample(3500, 11.5) == 0.0
@@ -0,0 +1,117 @@
+import json
+import os
+
+import pytest
+
+from input_queue import ROOM
+from power_config import DEFAULT_POWER_CONFIG, PowerConfigStore, validate_power_config
+
+CFG = {"charge_max": 4, "charge_per_hit": 2, "special_damage": 5}
+
+
+def write(path, cfg, bump_ns=0):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(cfg, f)
+    if bump_ns:
+        # same size, later mtime: only the stamp tells the edit apart
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + bump_ns))
+
+
+@pytest.mark.parametrize('data, error', [
+    ([], "JSON object"),
+    ({"charge_max": 4, "charge_per_hit": 2}, "missing key: special_damage"),
+    (dict(CFG, charge_max="4"), "charge_max must be an integer"),
+    (dict(CFG, charge_per_hit=True), "charge_per_hit must be an integer"),
+    (dict(CFG, special_damage=0), "special_damage must be >= 1"),
+])
+def test_validation_rejects(data, error):
+    with pytest.raises(ValueError, match=error):
+        validate_power_config(data)
+
+
+def test_validation_keeps_known_keys_only():
+    assert validate_power_config(dict(CFG, extra=1)) == CFG
+
+
+def test_store_defaults_and_lenient_file(tmp_path):
+    path = str(tmp_path / 'power.json')
+    assert PowerConfigStore(path).get() == DEFAULT_POWER_CONFIG
+    write(path, {"charge_max": "7", "special_damage": -2})
+    cfg = PowerConfigStore(path).get()
+    assert cfg == dict(DEFAULT_POWER_CONFIG, charge_max=7, special_damage=1)
+
+
+def test_check_detects_a_changed_mtime(tmp_path):
+    path = str(tmp_path / 'power.json')
+    write(path, CFG)
+    store = PowerConfigStore(path)
+    seen = []
+    store.subscribe(seen.append)
+    assert not store.check()
+    write(path, dict(CFG, charge_max=9), bump_ns=10**9)
+    assert store.check()
+    assert store.get()["charge_max"] == 9
+    assert seen == [dict(CFG, charge_max=9)]
+    # touched but unchanged: reloaded, nobody notified
+    write(path, dict(CFG, charge_max=9), bump_ns=2 * 10**9)
+    assert store.check()
+    assert len(seen) == 1
+
+
+def test_update_persists_and_notifies(tmp_path):
+    path = str(tmp_path / 'power.json')
+    store = PowerConfigStore(path)
+    seen = []
+    store.subscribe(seen.append)
+    store.subscribe(lambda cfg: 1 / 0)  # a failing subscriber doesn't stop the others
+    assert store.update(CFG) == CFG
+    with open(path, encoding='utf-8') as f:
+        assert json.load(f) == CFG
+    assert seen == [CFG]
+    assert not store.check()
+    store.unsubscribe(seen.append)
+    with pytest.raises(ValueError):
+        store.update({"charge_max": 0})
+    assert store.get() == CFG
+
+
+@pytest.fixture
+def power_game(new_game, monkeypatch, tmp_path):
+    import game as game_module
+    path = str(tmp_path / 'power_config.json')
+    write(path, CFG)
+    monkeypatch.setattr(game_module, 'POWER_CONFIG_PATH', path)
+    return new_game(), path
+
+
+def test_reset_picks_up_a_hand_edit(power_game):
+    game, path = power_game
+    assert game.power_max_charge == 4
+    write(path, dict(CFG, charge_max=8), bump_ns=10**9)
+    game._reset_power_state(reload_config=True)
+    assert game.power_max_charge == 8
+
+
+def test_player_config_is_saved_by_the_game_loop(power_game):
+    from server import apply_inputs
+    game, path = power_game
+    new_cfg = dict(CFG, special_damage=2)
+    apply_inputs(game, {}, [(0, 0, 1, 'power_config', new_cfg)], {})
+    assert game.power_special_damage == 2
+    with open(path, encoding='utf-8') as f:
+        assert json.load(f) == new_cfg
+    # from the room: the store already has it, the file is left alone
+    os.remove(path)
+    apply_inputs(game, {}, [(1, 0, ROOM, 'power_config', CFG)], {})
+    assert game.power_special_damage == 5
+    assert not os.path.exists(path)
+
+
+def test_failed_save_is_logged_and_still_applied(power_game, caplog):
+    from server import apply_inputs
+    game, path = power_game
+    game.power_store.path = os.path.join(path, 'missing', 'power_config.json')
+    apply_inputs(game, {}, [(0, 0, 2, 'power_config', dict(CFG, charge_max=6))], {})
+    assert game.power_max_charge == 6
+    assert "Failed to save power config" in caplog.text
@@ -0,0 +1,66 @@
+import socket
+
+import pytest
+
+from protocol import FrameDecoder, FrameEncoder, FrameTooLarge, decode_frames, encode
+
+
+def test_frame_split_across_reads():
+    decoder = FrameDecoder()
+    frame = encode({"type": "cmd", "cmd": "left"})
+    assert decoder.feed(frame[:5]) == []
+    assert decoder.pending() == frame[:5]
+    assert decoder.feed(frame[5:-1]) == []
+    assert decoder.feed(frame[-1:]) == [frame[:-1]]
+    assert decoder.pending() == b""
+
+
+def test_several_frames_in_one_read_and_a_partial_tail():
+    decoder = FrameDecoder()
+    data = encode({"n": 1}) + encode({"n": 2}) + b'\n' + encode({"n": 3})[:4]
+    frames = decoder.feed(data)
+    assert decode_frames(frames) == [{"n": 1}, {"n": 2}]
+    assert decode_frames(decoder.feed(b':3}\n')) == [{"n": 3}]
+
+
+def test_invalid_json_frames_are_skipped():
+    assert decode_frames([b'{"ok":1}', b'not json', b'[]']) == [{"ok": 1}, []]
+
+
+def test_oversized_complete_frame():
+    decoder = FrameDecoder(max_frame=16)
+    with pytest.raises(FrameTooLarge):
+        decoder.feed(b'x' * 17 + b'\n')
+
+
+def test_oversized_partial_frame():
+    decoder = FrameDecoder(max_frame=16)
+    decoder.feed(b'x' * 10)
+    with pytest.raises(FrameTooLarge):
+        decoder.feed(b'x' * 10)
+
+
+def test_frame_of_exactly_max_size_is_accepted():
+    decoder = FrameDecoder(max_frame=16)
+    assert decoder.feed(b'x' * 16 + b'\n') == [b'x' * 16]
+
+
+def test_socket_round_trip_and_eof():
+    a, b = socket.socketpair()
+    try:
+        encoder = FrameEncoder()
+        encoder.add({"type": "ping", "t": 1.5})
+        encoder.add_frame(encode({"type": "ack", "tick": 7}))
+        encoder.flush(a)
+        a.close()
+        decoder = FrameDecoder(recv_size=8)
+        messages = []
+        while True:
+            batch = decoder.recv_messages(b)
+            if batch is None:
+                break
+            messages += batch
+        assert messages == [{"type": "ping", "t": 1.5}, {"type": "ack", "tick": 7}]
+        assert decoder.bytes_in == len(encode(messages[0])) + len(encode(messages[1]))
+    finally:
+        b.close()
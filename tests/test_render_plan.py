@@ -0,0 +1,140 @@
+import random
+
+from render_plan import ERASE, REBUILD, PlanBuffer, PlanBuilder
+
+BOARD = {"x": 120.0, "y": 20.0, "width": 560, "height": 560, "cols": 8, "rows": 8, "cell_size": 70}
+
+
+class Board:
+    """What a backend shows of the board after applying plans."""
+
+    def __init__(self):
+        self.cells = {}
+        self.hp = {}
+
+    def apply(self, plan):
+        for op, _, cells in plan.static:
+            if op == REBUILD:
+                self.cells = {(c[0], c[1]): c[6] for c in cells}
+                self.hp = {}
+            elif op == ERASE:
+                for c in cells:
+                    self.cells.pop((c[0], c[1]), None)
+                    self.hp.pop((c[0], c[1]), None)
+        for key, entry in plan.hp.items():
+            self.hp[key] = entry[0]
+
+
+def state(tick, pieces):
+    return {"tick": tick, "width": 800, "height": 600, "board": BOARD, "pieces": pieces,
+            "ball": {"x": 400, "y": 300, "radius": 8}, "paddles": [{"x": 400, "y": 100}, {"x": 400, "y": 500}]}
+
+
+def piece(col, row, hp, kind='P'):
+    return {"type": kind, "color": "white" if row > 3 else "black", "col": col, "row": row, "hp": hp, "max_hp": 4}
+
+
+def match(seed, ticks=300):
+    """States of a match where pieces lose HP and get destroyed; each change is a new list."""
+    rng = random.Random(seed)
+    pieces = [piece(c, r, 4) for c in range(8) for r in (0, 1, 6, 7)]
+    states = []
+    for tick in range(ticks):
+        if rng.random() < 0.2 and pieces:
+            pieces = list(pieces)
+            i = rng.randrange(len(pieces))
+            hit = dict(pieces[i], hp=pieces[i]['hp'] - 1)
+            if hit['hp'] <= 0:
+                del pieces[i]
+            else:
+                pieces[i] = hit
+        states.append(state(tick, pieces))
+    return states
+
+
+def expected(pieces):
+    return {(p['col'], p['row']): p['type'] for p in pieces}, {(p['col'], p['row']): (p['hp'], 4) for p in pieces}
+
+
+def test_first_plan_rebuilds_then_only_diffs():
+    builder = PlanBuilder()
+    pieces = [piece(0, 0, 4), piece(1, 0, 4)]
+    first = builder.build(state(0, pieces))
+    assert [op[0] for op in first.static] == [REBUILD]
+    assert set(first.hp) == {(0, 0), (1, 0)}
+    same = builder.build(state(1, pieces))
+    assert same.static == [] and same.hp == {}
+    hit = builder.build(state(2, [piece(0, 0, 3), piece(1, 0, 4)]))
+    assert hit.static == [] and set(hit.hp) == {(0, 0)}
+    gone = builder.build(state(3, [piece(1, 0, 4)]))
+    assert [op[0] for op in gone.static] == [ERASE]
+    assert [c[:2] for c in gone.static[0][2]] == [(0, 0)]
+
+
+def test_a_new_piece_rebuilds_the_board():
+    builder = PlanBuilder()
+    builder.build(state(0, [piece(0, 0, 4)]))
+    plan = builder.build(state(1, [piece(0, 0, 4), piece(2, 2, 4)]))
+    assert [op[0] for op in plan.static] == [REBUILD]
+
+
+def test_absorb_keeps_older_board_operations():
+    builder = PlanBuilder()
+    board = Board()
+    board.apply(builder.build(state(0, [piece(0, 0, 4), piece(1, 0, 4), piece(2, 0, 4)])))
+    older = builder.build(state(1, [piece(0, 0, 2), piece(1, 0, 4)]))
+    newer = builder.build(state(2, [piece(0, 0, 1), piece(1, 0, 3)]))
+    newer.absorb(older)
+    board.apply(newer)
+    assert board.cells == {(0, 0): 'P', (1, 0): 'P'}
+    assert board.hp == {(0, 0): (1, 4), (1, 0): (3, 4)}
+
+
+def test_absorb_drops_bars_of_erased_cells():
+    builder = PlanBuilder()
+    builder.build(state(0, [piece(0, 0, 4), piece(1, 0, 4)]))
+    older = builder.build(state(1, [piece(0, 0, 1), piece(1, 0, 4)]))
+    newer = builder.build(state(2, [piece(1, 0, 4)]))
+    newer.absorb(older)
+    assert (0, 0) not in newer.hp
+    assert [op[0] for op in newer.static] == [ERASE]
+
+
+def test_plan_buffer_hands_out_each_plan_once():
+    buffer = PlanBuffer()
+    builder = PlanBuilder()
+    assert buffer.take() is None
+    buffer.publish(builder.build(state(0, [])))
+    plan = buffer.take()
+    assert plan.seq == 1
+    assert buffer.take() is None
+
+
+def test_skipped_plans_lose_nothing():
+    for seed in range(5):
+        rng = random.Random(seed)
+        states = match(seed)
+        builder = PlanBuilder()
+        buffer = PlanBuffer()
+        board = Board()
+        for st in states:
+            buffer.publish(builder.build(st))
+            # the Tk thread only gets some of the plans
+            if rng.random() < 0.3:
+                plan = buffer.take()
+                if plan is not None:
+                    board.apply(plan)
+        plan = buffer.take()
+        if plan is not None:
+            board.apply(plan)
+        cells, hp = expected(states[-1]["pieces"])
+        assert board.cells == cells
+        assert board.hp == hp
+
+
+def test_moving_items_are_given_whole():
+    plan = PlanBuilder().build(dict(state(0, []), balls={"x": [400, 200], "y": [300, 100], "radius": [8, 6],
+                                                          "active": [False, True]}))
+    assert plan.ball[:4] == (392, 292, 408, 308)
+    assert len(plan.paddles) == 2
+    assert len(plan.extra_balls) == 1 and plan.extra_balls[0][:4] == (194, 94, 206, 106)
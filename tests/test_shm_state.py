@@ -0,0 +1,183 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from multiprocessing import shared_memory
+
+import pytest
+
+from shm_state import _SEQ, _SEQ_OFFSET, ShmError, StatePublisher, StateReader
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# a reader or a publisher in another process, driven line by line over stdin
+CHILD = r'''
+import json, sys
+sys.path.insert(0, sys.argv[1])
+import shm_state
+role, name = sys.argv[2:4]
+if role == 'reader':
+    # a test holds the counter odd for a while
+    shm_state.StateReader.RETRIES = 10**7
+    obj = shm_state.StateReader(name)
+else:
+    obj = shm_state.StatePublisher(name, max_balls=4, max_pieces=64)
+    print(json.dumps({"owner": obj.owner}), flush=True)
+for line in sys.stdin:
+    if role == 'reader':
+        out = obj.read()
+    else:
+        obj.publish(json.loads(line))
+        out = {"seq": obj.seq}
+    print(json.dumps(out), flush=True)
+obj.close()
+'''
+
+
+class Child:
+    def __init__(self, role, name):
+        self.proc = subprocess.Popen([sys.executable, '-c', CHILD, ROOT, role, name],
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+
+    def send(self, line='read'):
+        self.proc.stdin.write(line + '\n')
+        self.proc.stdin.flush()
+
+    def recv(self):
+        return json.loads(self.proc.stdout.readline())
+
+    def call(self, line='read'):
+        self.send(line)
+        return self.recv()
+
+    def close(self):
+        self.proc.stdin.close()
+        assert self.proc.wait(5) == 0
+
+
+@pytest.fixture
+def segment():
+    name = f"pong-test-{os.getpid()}-{time.monotonic_ns()}"
+    yield name
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+@pytest.fixture
+def state(new_game):
+    game = new_game()
+    game.update(1 / 60, {0: 'left', 1: 'stop', 'trajectory': 60.0})
+    for _ in range(5):
+        game.update(1 / 60, {0: 'left', 1: 'right'})
+    return game.get_state()
+
+
+def pieces_of(state):
+    return [{k: pc[k] for k in ('col', 'row', 'type', 'color', 'hp', 'max_hp')} for pc in state['pieces']]
+
+
+def test_fields_round_trip_to_another_process(segment, state):
+    pub = StatePublisher(segment, max_balls=4, max_pieces=64)
+    reader = Child('reader', segment)
+    try:
+        pub.publish(state)
+        got = reader.call()
+    finally:
+        reader.close()
+        pub.close()
+    assert got['tick'] == state['tick'] == 6
+    assert got['timestamp'] == state['timestamp']
+    assert (got['width'], got['height']) == (state['width'], state['height'])
+    assert got['board'] == state['board']
+    for key in ('x', 'y', 'dx', 'dy', 'radius', 'special_active'):
+        assert got['ball'][key] == state['ball'][key]
+    for mine, theirs in zip(got['paddles'], state['paddles']):
+        assert mine == {k: theirs[k] for k in ('x', 'y', 'width', 'height')}
+    assert got['scores'] == state['scores']
+    assert got['power'] == state['power']
+    assert got['pieces'] == pieces_of(state)
+    assert got['waiting_trajectory'] is False and got['game_over'] is None
+
+
+def test_piece_count_change_reaches_the_reader(segment, state):
+    pub = StatePublisher(segment, max_balls=4, max_pieces=64)
+    reader = Child('reader', segment)
+    try:
+        pub.publish(state)
+        assert len(reader.call()['pieces']) == len(state['pieces'])
+        # same list again: the table is not rewritten
+        pub.publish(dict(state, tick=7))
+        assert reader.call()['pieces'] == pieces_of(state)
+        # a piece taken, another one hit
+        pieces = [dict(pc) for pc in state['pieces'][1:]]
+        pieces[0]['hp'] = 1
+        pub.publish(dict(state, tick=8, pieces=pieces))
+        got = reader.call()
+    finally:
+        reader.close()
+        pub.close()
+    assert got['tick'] == 8
+    assert len(got['pieces']) == len(state['pieces']) - 1
+    assert got['pieces'] == pieces_of({'pieces': pieces})
+
+
+def test_reader_retries_while_the_sequence_is_odd(segment, state):
+    pub = StatePublisher(segment, max_balls=4, max_pieces=64)
+    reader = Child('reader', segment)
+    try:
+        pub.publish(state)
+        assert reader.call()['tick'] == 6
+        # writer stalled mid-frame
+        _SEQ.pack_into(pub.buf, _SEQ_OFFSET, pub.seq + 1)
+        reader.send()
+        time.sleep(0.2)
+        pub.publish(dict(state, tick=7))
+        got = reader.recv()
+    finally:
+        reader.close()
+        pub.close()
+    # not the frame that was there before the stall
+    assert got['tick'] == 7
+
+
+def test_reader_gives_up_on_a_writer_stuck_mid_frame(segment, state):
+    pub = StatePublisher(segment, max_balls=4, max_pieces=64)
+    pub.publish(state)
+    _SEQ.pack_into(pub.buf, _SEQ_OFFSET, pub.seq + 1)
+    reader = StateReader(segment)
+    try:
+        with pytest.raises(ShmError, match="no consistent read"):
+            reader.read()
+    finally:
+        reader.close()
+        pub.close()
+
+
+def test_adopting_process_keeps_publishing_into_the_segment(segment, state):
+    pub = StatePublisher(segment, max_balls=4, max_pieces=64)
+    pub.publish(state)
+    seq = pub.seq
+    # handoff: the old process leaves the segment in place
+    pub.close(unlink=False)
+    adopter = Child('publisher', segment)
+    reader = StateReader(segment)
+    try:
+        assert adopter.recv() == {"owner": False}
+        assert reader.read()['tick'] == 6
+        pieces = [dict(pc) for pc in state['pieces'][:3]]
+        out = adopter.call(json.dumps(dict(state, tick=7, pieces=pieces)))
+        got = reader.read()
+    finally:
+        reader.close()
+        adopter.close()
+    # the counter goes on from the previous writer's
+    assert out['seq'] == seq + 2
+    assert got['tick'] == 7
+    assert got['pieces'] == pieces_of({'pieces': pieces})
+    # the adopter doesn't remove a segment it didn't create
+    StateReader(segment).close()
@@ -0,0 +1,90 @@
+import pytest
+
+from trajectory import occupied_cells, paddle_contact_y, predict
+
+BOARD = {"x": 120.0, "y": 20.0, "width": 560, "height": 560, "cols": 8, "rows": 8, "cell_size": 70}
+
+
+def first_bounce(game, dt):
+    """Where the stepped game first reverses a velocity component, and on which axis."""
+    dx, dy = game.ball.dx, game.ball.dy
+    for _ in range(int(4.0 / dt)):
+        x, y = game.ball.x, game.ball.y
+        game.update(dt, {0: 'stop', 1: 'stop'})
+        if (game.ball.dx > 0) != (dx > 0):
+            return x, y, 'x'
+        if (game.ball.dy > 0) != (dy > 0):
+            return x, y, 'y'
+    return None
+
+
+def launch(game, angle, pieces=()):
+    game.pieces = [{"type": "K", "color": "white", "col": col, "row": row, "hp": 99, "max_hp": 99,
+                    "last_hit": 0.0} for col, row in pieces]
+    game._index_pieces()
+    game.update(1 / 60, {0: 'stop', 1: 'stop', 'trajectory': angle})
+    assert not game.waiting_trajectory
+
+
+@pytest.mark.parametrize('angle', [20.0, 60.0, 80.0, 120.0])
+def test_paddle_intercept_matches_the_simulation(new_game, angle):
+    game = new_game()
+    launch(game, angle)
+    ball = game.ball
+    target_y = paddle_contact_y(game.paddles[1], ball.radius, 1)
+    path = predict(ball.x, ball.y, ball.dx, ball.dy, ball.radius, game.board, game.cells, target_y=target_y)
+    ix, _, t = path["intercept"]
+    dt = 1 / 480
+    elapsed = 0.0
+    prev = (ball.x, ball.y)
+    while elapsed < 2.0:
+        game.update(dt, {0: 'stop', 1: 'stop'})
+        elapsed += dt
+        cur = (game.ball.x, game.ball.y)
+        if cur[1] >= target_y:
+            f = (target_y - prev[1]) / (cur[1] - prev[1])
+            x = prev[0] + f * (cur[0] - prev[0])
+            break
+        prev = cur
+    else:
+        pytest.fail("the ball never reached the paddle line")
+    assert x == pytest.approx(ix, abs=2.0)
+    assert elapsed == pytest.approx(t, abs=2 * dt)
+
+
+@pytest.mark.parametrize('angle, cell, axis', [(60.0, (4, 5), 'y'), (120.0, (3, 5), 'y'), (40.0, (6, 5), 'x')])
+def test_first_bounce_matches_the_simulation(new_game, angle, cell, axis):
+    game = new_game()
+    launch(game, angle, pieces=[cell])
+    # the bottom paddle out of the way: only the piece or a wall can deflect the ball
+    game.paddles[1].y = 10 * game.HEIGHT
+    ball = game.ball
+    path = predict(ball.x, ball.y, ball.dx, ball.dy, ball.radius, game.board, game.cells, max_bounces=1)
+    x, y, hit_axis = first_bounce(game, 1 / 480)
+    assert hit_axis == axis
+    assert (x, y) == pytest.approx(path["points"][1], abs=1.5)
+
+
+def test_walls_only():
+    path = predict(400.0, 300.0, 100.0, 0.0, 10, BOARD, max_bounces=2, max_time=10.0)
+    assert path["points"][1:3] == [(670.0, 300.0), (130.0, 300.0)]
+    # the time budget runs out before the third wall
+    assert path["bounces"] == 2
+    assert path["points"][3] == pytest.approx((320.0, 300.0))
+
+
+def test_bounces_off_an_occupied_cell():
+    # moving right along row 4, the piece at (6, 4) starts at x = 540
+    path = predict(400.0, 300.0, 100.0, 0.0, 10, BOARD, occupied={(6, 4)}, max_bounces=0)
+    assert path["points"][1] == pytest.approx((530.0, 300.0))
+
+
+def test_still_ball():
+    assert predict(1.0, 2.0, 0, 0, 5, BOARD) == {"points": [(1.0, 2.0)], "intercept": None, "bounces": 0}
+
+
+def test_helpers():
+    assert occupied_cells([{"col": 1, "row": 2}, {"col": 3, "row": 4}]) == {(1, 2), (3, 4)}
+    paddle = {"y": 500.0, "height": 10}
+    assert paddle_contact_y(paddle, 8, 1) == 487.0
+    assert paddle_contact_y(paddle, 8, 0) == 513.0
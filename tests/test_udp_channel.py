@@ -0,0 +1,150 @@
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from input_queue import InputQueues
+from udp_channel import (CMD, HELLO, SEQ_MOD, STATE, UdpSnapshotClient, UdpSnapshotServer, _LossySocket,
+                         pack, seq_newer, unpack)
+
+
+class RecordingSocket:
+    def __init__(self):
+        self.sent = []
+
+    def sendto(self, data, addr):
+        self.sent.append((data, addr))
+        return len(data)
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return predicate()
+
+
+def test_seq_newer_wraps_around():
+    assert seq_newer(1, None)
+    assert seq_newer(5, 4)
+    assert not seq_newer(4, 5)
+    assert not seq_newer(4, 4)
+    assert seq_newer(2, SEQ_MOD - 3)
+    assert not seq_newer(SEQ_MOD - 3, 2)
+
+
+def test_pack_unpack():
+    datagram = pack(STATE, 0xDEADBEEF, SEQ_MOD + 7, b'{"a":1}')
+    assert unpack(datagram) == (STATE, 0xDEADBEEF, 7, b'{"a":1}')
+    assert unpack(b'PC') is None
+    assert unpack(b'XX' + datagram[2:]) is None
+
+
+@pytest.mark.parametrize('loss, sent', [(0.0, 50), (1.0, 0)])
+def test_lossy_socket(loss, sent):
+    raw = RecordingSocket()
+    lossy = _LossySocket(raw, loss)
+    for i in range(50):
+        lossy.sendto(b"%d" % i, ("127.0.0.1", 1))
+    assert len(raw.sent) == lossy.sent == sent
+    assert lossy.dropped == 50 - sent
+
+
+def test_lossy_socket_drops_about_the_ratio():
+    lossy = _LossySocket(RecordingSocket(), 0.3)
+    for _ in range(2000):
+        lossy.sendto(b"x", ("127.0.0.1", 1))
+    assert 400 < lossy.dropped < 800
+
+
+@pytest.fixture
+def channel():
+    stop = threading.Event()
+    server = UdpSnapshotServer('127.0.0.1', 0, loss=0.0)
+    port = server.sock.getsockname()[1]
+    inputs = InputQueues()
+    server.start(inputs, stop)
+    clients = []
+
+    def connect(player, loss=0.0):
+        client = UdpSnapshotClient('127.0.0.1', port, server.register(player), loss=loss, resend_interval=0.02)
+        clients.append(client)
+        assert client.handshake(timeout=2.0, interval=0.05)
+        assert wait_for(lambda: server.has_peer(player))
+        return client
+
+    yield server, inputs, connect
+    for client in clients:
+        client.close()
+    stop.set()
+    server.thread.join(1.0)
+    server.close()
+
+
+def test_client_drops_stale_snapshots_and_counts_gaps(channel):
+    server, _, connect = channel
+    client = connect(1)
+    got = []
+    client.start(lambda st: got.append(st["n"]))
+    addr = client.sock.getsockname()
+    for seq in (1, 2, 5, 3, 6):
+        payload = json.dumps({"type": "state", "state": {"n": seq}}).encode()
+        server.sock.sendto(pack(STATE, client.session, seq, payload), addr)
+    assert wait_for(lambda: len(got) == 4 and client.dropped_old == 1)
+    assert got == [1, 2, 5, 6]
+    assert client.gaps == 2
+
+
+def test_server_sends_states_in_sequence(channel):
+    server, _, connect = channel
+    client = connect(2)
+    got = []
+    client.start(got.append)
+    for n in range(5):
+        assert server.send_state(2, json.dumps({"type": "state", "state": {"n": n}}).encode())
+    assert wait_for(lambda: len(got) == 5)
+    assert [st["n"] for st in got] == list(range(5))
+    assert not server.send_state(1, b"{}")
+
+
+def test_commands_reach_the_input_queue_and_stale_ones_are_ignored(channel):
+    server, inputs, connect = channel
+    client = connect(1)
+    client.send_cmd("left")
+    assert wait_for(inputs.pending)
+    # a command overtaken on the way (older sequence number) is dropped
+    client.out.sendto(pack(CMD, client.session, client.cmd_seq - 1, b'{"cmd":"right"}'), client.server_addr)
+    client.send_cmd("stop")
+    assert wait_for(lambda: inputs.last_move[1] == "stop")
+    time.sleep(0.05)
+    moves = [value for _, _, player, kind, value in inputs.drain() if kind == "cmd"]
+    assert moves == ["left", "stop"]
+
+
+def test_lost_commands_are_resent(channel):
+    server, inputs, connect = channel
+    client = connect(1, loss=1.0)
+    client.start(lambda st: None)
+    client.send_cmd("right")
+    time.sleep(0.1)
+    assert not inputs.pending()
+    assert client.out.dropped >= 2
+    client.out.loss = 0.0
+    assert wait_for(lambda: inputs.last_move[1] == "right")
+
+
+def test_unknown_sessions_are_ignored(channel):
+    server, inputs, connect = channel
+    connect(1)
+    probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        probe.sendto(pack(HELLO, 12345, 1), server.sock.getsockname())
+        probe.sendto(pack(CMD, 12345, 2, b'{"cmd":"left"}'), server.sock.getsockname())
+        time.sleep(0.1)
+        assert not inputs.pending()
+    finally:
+        probe.close()
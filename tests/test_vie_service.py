@@ -0,0 +1,88 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from vie_service import read_seed, start_vie_service
+
+
+def stop(httpd):
+    httpd.shutdown()
+    httpd.server_close()
+    httpd.store.close()
+
+
+@pytest.fixture(scope='module')
+def service():
+    httpd = start_vie_service(port=0, db_path=':memory:')
+    yield httpd
+    stop(httpd)
+
+
+def call(httpd, method, path='', body=None, raw=None):
+    data = raw if raw is not None else (json.dumps(body).encode() if body is not None else None)
+    req = urllib.request.Request(httpd.url + path, data=data, method=method,
+                                 headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(req, timeout=5) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_seeded_from_init_sql(service):
+    seed = read_seed()
+    assert ('Tour (R)', 5) in seed and ('Pion (P)', 2) in seed
+    code, vies = call(service, 'GET')
+    assert code == 200
+    assert [(v['libelle'], v['nombreVieInitiale']) for v in vies] == seed
+    assert call(service, 'GET', '/count') == (200, {"count": len(seed)})
+    assert call(service, 'GET', '/1') == (200, {"lid": 1, "libelle": seed[0][0], "nombreVieInitiale": seed[0][1]})
+
+
+def test_crud_and_null_omitted(service):
+    code, created = call(service, 'POST', body={"libelle": "Fantôme"})
+    assert code == 201
+    # a null nombreVieInitiale is left out, as JSON-B does
+    assert created == {"lid": created["lid"], "libelle": "Fantôme"}
+    assert call(service, 'GET', f'/{created["lid"]}')[1] == created
+    code, updated = call(service, 'PUT', f'/{created["lid"]}', {"libelle": "Fantôme", "nombreVieInitiale": 3})
+    assert (code, updated["nombreVieInitiale"]) == (200, 3)
+    assert call(service, 'DELETE', f'/{created["lid"]}')[0] == 200
+    assert call(service, 'GET', '/count')[1]["count"] == len(read_seed())
+
+
+@pytest.mark.parametrize('method, path, body, message', [
+    ('GET', '/999', None, "Vie non trouvée avec l'ID: 999"),
+    ('GET', '/abc', None, "Vie non trouvée avec l'ID: abc"),
+    ('GET', '/1/extra', None, "Ressource introuvable"),
+    ('PUT', '/999', {"libelle": "x"}, "Vie non trouvée avec l'ID: 999"),
+    ('DELETE', '/999', None, "Vie non trouvée avec l'ID: 999"),
+    ('POST', '/1', {"libelle": "x"}, "Ressource introuvable"),
+])
+def test_not_found_bodies(service, method, path, body, message):
+    assert call(service, method, path, body) == (404, {"error": message})
+
+
+@pytest.mark.parametrize('body, raw, message', [
+    (None, b'{not json', "Corps JSON invalide"),
+    ([1, 2], None, "Corps JSON invalide"),
+    ({"nombreVieInitiale": 3}, None, "Le libellé est obligatoire"),
+    ({"libelle": "  "}, None, "Le libellé est obligatoire"),
+    ({"libelle": "x", "nombreVieInitiale": "3"}, None, "nombreVieInitiale doit être un entier"),
+    ({"libelle": "x", "nombreVieInitiale": True}, None, "nombreVieInitiale doit être un entier"),
+])
+def test_bad_request_bodies(service, body, raw, message):
+    assert call(service, 'POST', body=body, raw=raw) == (400, {"error": message})
+
+
+def test_count_failure_message():
+    httpd = start_vie_service(port=0, db_path=':memory:')
+    httpd.store.db.close()
+    try:
+        code, body = call(httpd, 'GET', '/count')
+    finally:
+        stop(httpd)
+    assert code == 500
+    assert body["error"].startswith("Erreur lors du comptage des vies: ")
@@ -0,0 +1,186 @@
+# trajectory.py
+"""Closed-form ball path prediction.
+
+The ball is advanced from event to event instead of frame by frame: the next
+event is the earliest of a wall contact (computed analytically from the
+board bounds inset by the radius) or the ball's bounding box entering an
+occupied board cell (found with a DDA walk over the grid lines crossed by
+its leading edges). Each event reflects the velocity on the contact axis,
+so the cost depends on the number of cells crossed, not on the frame rate.
+
+Used for the multi-bounce aim preview on the client and for the server-side
+AI paddle.
+"""
+import math
+
+INF = float('inf')
+EPS = 1e-9
+
+
+def occupied_cells(pieces):
+    """Set of (col, row) occupied by pieces (game pieces or state dicts)."""
+    return {(pc['col'], pc['row']) for pc in pieces}
+
+
+def _next_boundary(edge, origin, cell, direction):
+    """Coordinate of the next grid line strictly ahead of `edge`."""
+    k = (edge - origin) / cell
+    if direction > 0:
+        return origin + (math.floor(k + EPS) + 1) * cell
+    return origin + (math.ceil(k - EPS) - 1) * cell
+
+
+def predict(x, y, dx, dy, radius, board, occupied=(), target_y=None, max_bounces=8, max_time=4.0):
+    """Predict the ball path.
+
+    board: dict with x, y, width, height, cols, rows, cell_size (as in Game.board).
+    occupied: set of (col, row) cells the ball bounces off (or a dict keyed by
+    them, such as Game.cells).
+    target_y: optional horizontal line (e.g. a paddle's y); the path stops at
+    the first crossing and it is reported as the intercept.
+
+    Returns {"points": [(x, y), ...], "intercept": (x, y, t) or None, "bounces": n}.
+    """
+    bx = board['x']
+    by = board['y']
+    cell = board['cell_size']
+    cols = board['cols']
+    rows = board['rows']
+    left = bx + radius
+    right = bx + board['width'] - radius
+    top = by + radius
+    bottom = by + board['height'] - radius
+    points = [(x, y)]
+    intercept = None
+    bounces = 0
+    t_total = 0.0
+    if dx == 0 and dy == 0:
+        return {"points": points, "intercept": None, "bounces": 0}
+
+    while bounces <= max_bounces and t_total < max_time:
+        sx = 1 if dx > 0 else (-1 if dx < 0 else 0)
+        sy = 1 if dy > 0 else (-1 if dy < 0 else 0)
+        # wall contact times (closed form)
+        t_wall_x = ((right - x) / dx if sx > 0 else (left - x) / dx) if sx else INF
+        t_wall_y = ((bottom - y) / dy if sy > 0 else (top - y) / dy) if sy else INF
+        t_wall = min(t_wall_x, t_wall_y, max_time - t_total)
+
+        # DDA over grid lines crossed by the leading edges of the ball's box
+        hit_axis = None
+        t_hit = INF
+        if occupied:
+            t = 0.0
+            while t < t_wall:
+                cx = x + dx * t
+                cy = y + dy * t
+                tx = (_next_boundary(cx + radius * sx, bx, cell, sx) - (cx + radius * sx)) / dx + t if sx else INF
+                ty = (_next_boundary(cy + radius * sy, by, cell, sy) - (cy + radius * sy)) / dy + t if sy else INF
+                if tx <= ty:
+                    t = tx
+                    if t >= t_wall:
+                        break
+                    ex = x + dx * t + radius * sx
+                    col = int(round((ex - bx) / cell)) - (0 if sx > 0 else 1)
+                    yc = y + dy * t
+                    r0 = int(math.floor((yc - radius - by) / cell + EPS))
+                    r1 = int(math.ceil((yc + radius - by) / cell - EPS)) - 1
+                    if 0 <= col < cols and any((col, r) in occupied for r in range(max(0, r0), min(rows - 1, r1) + 1)):
+                        hit_axis, t_hit = 'x', t
+                        break
+                else:
+                    t = ty
+                    if t >= t_wall:
+                        break
+                    ey = y + dy * t + radius * sy
+                    row = int(round((ey - by) / cell)) - (0 if sy > 0 else 1)
+                    xc = x + dx * t
+                    c0 = int(math.floor((xc - radius - bx) / cell + EPS))
+                    c1 = int(math.ceil((xc + radius - bx) / cell - EPS)) - 1
+                    if 0 <= row < rows and any((c, row) in occupied for c in range(max(0, c0), min(cols - 1, c1) + 1)):
+                        hit_axis, t_hit = 'y', t
+                        break
+
+        if hit_axis is None:
+            t_event = t_wall
+            if t_wall == t_wall_x:
+                hit_axis = 'x'
+            elif t_wall == t_wall_y:
+                hit_axis = 'y'
+        else:
+            t_event = t_hit
+
+        # paddle line crossing before the event?
+        if target_y is not None and sy != 0:
+            t_target = (target_y - y) / dy
+            if 0 < t_target <= t_event:
+                ix = x + dx * t_target
+                points.append((ix, target_y))
+                intercept = (ix, target_y, t_total + t_target)
+                break
+
+        x += dx * t_event
+        y += dy * t_event
+        t_total += t_event
+        points.append((x, y))
+        if hit_axis == 'x':
+            dx = -dx
+        elif hit_axis == 'y':
+            dy = -dy
+        else:
+            break  # time budget exhausted
+        bounces += 1
+
+    return {"points": points, "intercept": intercept, "bounces": bounces}
+
+
+def paddle_contact_y(paddle, radius, player_index):
+    """Ball center y when it touches the paddle face turned toward the board center.
+
+    `paddle` may be a Paddle or its state dict.
+    """
+    get = paddle.get if isinstance(paddle, dict) else lambda k, d=None: getattr(paddle, k, d)
+    half = get('height', 0) / 2 + radius
+    # player 0 (top) is hit from below, player 1 (bottom) from above
+    return get('y', 0) + half if player_index == 0 else get('y', 0) - half
+
+
+def _most_urgent_ball(game, player_index):
+    """Ball that reaches `player_index`'s paddle line first (straight-line estimate)."""
+    balls = game.balls
+    if len(balls) == 1:
+        return game.ball
+    line_y = game.paddles[player_index].y
+    best, best_t = 0, INF
+    for i in range(len(balls)):
+        dy = balls.dy[i]
+        # player 0 (top) waits for balls going up, player 1 for balls going down
+        if (dy < 0) if player_index == 0 else (dy > 0):
+            t = (line_y - balls.y[i]) / dy
+            if 0 <= t < best_t:
+                best, best_t = i, t
+    return balls.view(best)
+
+
+def ai_command(game, player_index, dead_zone=0.15):
+    """Paddle command ('left'/'right'/'stop') for an AI-controlled player.
+
+    The paddle moves toward where the ball will next cross its line, or back
+    to the board center when the ball is not moving. With several balls it
+    follows the one heading to its side that is closest to its line.
+    """
+    paddle = game.paddles[player_index]
+    ball = _most_urgent_ball(game, player_index)
+    board = game.board
+    target_x = board['x'] + board['width'] / 2
+    if ball.dx or ball.dy:
+        res = predict(ball.x, ball.y, ball.dx, ball.dy, ball.radius, board,
+                      game.cells, target_y=paddle_contact_y(paddle, ball.radius, player_index),
+                      max_bounces=12)
+        if res['intercept'] is not None:
+            target_x = res['intercept'][0]
+    slack = paddle.width * dead_zone
+    if target_x < paddle.x - slack:
+        return 'left'
+    if target_x > paddle.x + slack:
+        return 'right'
+    return 'stop'
@@ -0,0 +1,339 @@
+# udp_channel.py
+"""Optional UDP transport for latest-wins traffic.
+
+State snapshots (server -> client) and paddle input (client -> server) only
+ever matter in their most recent version, so they can travel over UDP and
+avoid TCP head-of-line blocking. Reliable controls (new_game, set_dims,
+pause, trajectory) stay on the TCP connection.
+
+Datagram layout: a fixed binary header followed by a JSON payload.
+
+    magic (2s) | kind (B) | session (Q) | seq (I) | payload (JSON, utf-8)
+
+The session token is handed out by the server in the TCP `assign` message;
+the client proves it owns the TCP session by echoing the token in a HELLO
+datagram, which also tells the server which UDP address to send to.
+"""
+import json
+import os
+import random
+import secrets
+import socket
+import struct
+import threading
+import time
+
+MAGIC = b'PC'
+HEADER = struct.Struct('!2sBQI')
+HEADER_SIZE = HEADER.size
+MAX_DATAGRAM = 65507
+
+# datagram kinds
+HELLO = 1
+HELLO_ACK = 2
+STATE = 3
+CMD = 4
+
+SEQ_MOD = 1 << 32
+
+# Simulated packet loss ratio (0.0 - 1.0) applied to outgoing datagrams.
+# Handy to exercise the drop logic over loopback: PONG_UDP_LOSS=0.2
+try:
+    DEFAULT_LOSS = float(os.environ.get('PONG_UDP_LOSS', '0') or 0)
+except ValueError:
+    DEFAULT_LOSS = 0.0
+
+
+def seq_newer(a, b):
+    """Return True if sequence number `a` is newer than `b` (wrap-around safe)."""
+    if b is None:
+        return True
+    diff = (a - b) % SEQ_MOD
+    return 0 < diff < SEQ_MOD // 2
+
+
+def new_session_token():
+    return secrets.randbits(64)
+
+
+def pack(kind, session, seq, payload=b''):
+    return HEADER.pack(MAGIC, kind, session, seq % SEQ_MOD) + payload
+
+
+def unpack(datagram):
+    """Return (kind, session, seq, payload) or None for malformed datagrams."""
+    if len(datagram) < HEADER_SIZE:
+        return None
+    magic, kind, session, seq = HEADER.unpack_from(datagram)
+    if magic != MAGIC:
+        return None
+    return kind, session, seq, datagram[HEADER_SIZE:]
+
+
+class _LossySocket:
+    """Small wrapper around a UDP socket that can drop outgoing datagrams."""
+
+    def __init__(self, sock, loss=0.0):
+        self.sock = sock
+        self.loss = max(0.0, min(1.0, float(loss or 0.0)))
+        self.sent = 0
+        self.dropped = 0
+
+    def sendto(self, data, addr):
+        if self.loss and random.random() < self.loss:
+            self.dropped += 1
+            return 0
+        self.sent += 1
+        return self.sock.sendto(data, addr)
+
+
+class UdpSnapshotServer:
+    """Server side of the UDP channel.
+
+    One instance serves every player of the match. Sessions are registered
+    when the TCP `assign` message is sent, and become active once the client
+    completes the HELLO handshake.
+    """
+
+    def __init__(self, host, port, loss=None, sock=None):
+        if sock is None:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 262144)
+            except Exception:
+                pass
+            sock.bind((host, port))
+        # an already bound socket may be passed in (room handoff)
+        self.sock = sock
+        self.port = self.sock.getsockname()[1]
+        self.out = _LossySocket(self.sock, DEFAULT_LOSS if loss is None else loss)
+        self.lock = threading.Lock()
+        # session token -> {'player', 'addr', 'seq_out', 'seq_in'}
+        self.sessions = {}
+        self.by_player = {}
+        self.thread = None
+        self.detached = False
+
+    def register(self, player_number):
+        """Create a session for a player and return its token."""
+        token = new_session_token()
+        with self.lock:
+            old = self.by_player.pop(player_number, None)
+            if old is not None:
+                self.sessions.pop(old, None)
+            self.sessions[token] = {"player": player_number, "addr": None, "seq_out": 0, "seq_in": None}
+            self.by_player[player_number] = token
+        return token
+
+    def has_peer(self, player_number):
+        with self.lock:
+            token = self.by_player.get(player_number)
+            sess = self.sessions.get(token)
+            return sess is not None and sess["addr"] is not None
+
+    def send_state(self, player_number, payload):
+        """Send an already-encoded state payload to a player. Returns False if no UDP peer."""
+        with self.lock:
+            token = self.by_player.get(player_number)
+            sess = self.sessions.get(token)
+            if sess is None or sess["addr"] is None:
+                return False
+            sess["seq_out"] = (sess["seq_out"] + 1) % SEQ_MOD
+            seq = sess["seq_out"]
+            addr = sess["addr"]
+        data = pack(STATE, token, seq, payload)
+        if len(data) > MAX_DATAGRAM:
+            return False
+        try:
+            self.out.sendto(data, addr)
+        except OSError:
+            return False
+        return True
+
+    def start(self, inputs, stop_event, wakeup=None):
+        self.detached = False
+        self.thread = threading.Thread(target=self.serve, args=(inputs, stop_event, wakeup), daemon=True)
+        self.thread.start()
+        return self.thread
+
+    def serve(self, inputs, stop_event, wakeup=None):
+        """Handle HELLO handshakes and paddle input datagrams (pushed into `inputs`, an InputQueues)."""
+        # short timeout so detach() doesn't have to wait long for this thread
+        self.sock.settimeout(0.05)
+        while not stop_event.is_set() and not self.detached:
+            try:
+                data, addr = self.sock.recvfrom(MAX_DATAGRAM)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            parsed = unpack(data)
+            if parsed is None:
+                continue
+            kind, token, seq, payload = parsed
+            with self.lock:
+                sess = self.sessions.get(token)
+                if sess is None:
+                    continue
+                # follow the client if its address changes (NAT rebinding)
+                sess["addr"] = addr
+                player = sess["player"]
+                if kind == CMD:
+                    if not seq_newer(seq, sess["seq_in"]):
+                        continue
+                    sess["seq_in"] = seq
+            if kind == HELLO:
+                try:
+                    self.sock.sendto(pack(HELLO_ACK, token, seq), addr)
+                except OSError:
+                    pass
+                print(f"[+] UDP session established for player {player} at {addr}")
+            elif kind == CMD:
+                try:
+                    cmd = json.loads(payload.decode()).get("cmd")
+                except Exception:
+                    continue
+                # resends of the held command are not queued again
+                if inputs.push(player, "cmd", cmd) and wakeup is not None:
+                    wakeup.set()
+
+    def detach(self):
+        """Stop serving without closing the socket; return the sessions for `import_sessions`."""
+        self.detached = True
+        if self.thread is not None:
+            self.thread.join(1.0)
+        with self.lock:
+            return [dict(sess, token=token, addr=list(sess["addr"]) if sess["addr"] else None)
+                    for token, sess in self.sessions.items()]
+
+    def import_sessions(self, sessions):
+        """Restore sessions exported by `detach()` in another process."""
+        with self.lock:
+            for sess in sessions:
+                token = sess["token"]
+                addr = tuple(sess["addr"]) if sess.get("addr") else None
+                self.sessions[token] = {"player": sess["player"], "addr": addr,
+                                        "seq_out": sess["seq_out"], "seq_in": sess["seq_in"]}
+                self.by_player[sess["player"]] = token
+
+    def close(self):
+        try:
+            self.sock.close()
+        except Exception:
+            pass
+
+
+class UdpSnapshotClient:
+    """Client side of the UDP channel: receives snapshots, sends paddle input.
+
+    Snapshots older than the newest one already received are dropped.
+    Because input datagrams can be lost too, the latest command is re-sent
+    every `resend_interval` seconds (the server ignores stale sequence numbers).
+    """
+
+    def __init__(self, host, port, session, loss=None, resend_interval=0.1):
+        self.server_addr = (host, port)
+        self.session = session
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 262144)
+        except Exception:
+            pass
+        self.out = _LossySocket(self.sock, DEFAULT_LOSS if loss is None else loss)
+        self.resend_interval = resend_interval
+        self.last_seq = None
+        self.cmd_seq = 0
+        self.cmd = None
+        self.last_cmd_send = 0.0
+        self.active = False
+        self.running = False
+        # counters for diagnostics
+        self.received = 0
+        self.bytes_in = 0
+        self.dropped_old = 0
+        self.gaps = 0
+
+    def handshake(self, timeout=2.0, interval=0.2):
+        """Send HELLO until the server acknowledges. Returns True on success."""
+        deadline = time.time() + timeout
+        self.sock.settimeout(interval)
+        seq = 0
+        while time.time() < deadline:
+            seq += 1
+            try:
+                # HELLO is sent without simulated loss so setup stays deterministic
+                self.sock.sendto(pack(HELLO, self.session, seq), self.server_addr)
+                data, _ = self.sock.recvfrom(MAX_DATAGRAM)
+            except socket.timeout:
+                continue
+            except OSError:
+                return False
+            parsed = unpack(data)
+            if parsed and parsed[0] == HELLO_ACK and parsed[1] == self.session:
+                self.active = True
+                return True
+        return False
+
+    def send_cmd(self, cmd):
+        self.cmd = cmd
+        self._send_cmd()
+
+    def _send_cmd(self):
+        if self.cmd is None:
+            return
+        self.cmd_seq = (self.cmd_seq + 1) % SEQ_MOD
+        payload = json.dumps({"cmd": self.cmd}).encode()
+        try:
+            self.out.sendto(pack(CMD, self.session, self.cmd_seq, payload), self.server_addr)
+        except OSError:
+            pass
+        self.last_cmd_send = time.time()
+
+    def run(self, on_state):
+        """Receive loop: call on_state(state_dict) for every fresh snapshot."""
+        self.running = True
+        self.sock.settimeout(self.resend_interval)
+        while self.running:
+            if self.cmd is not None and time.time() - self.last_cmd_send >= self.resend_interval:
+                self._send_cmd()
+            try:
+                data, _ = self.sock.recvfrom(MAX_DATAGRAM)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.bytes_in += len(data)
+            parsed = unpack(data)
+            if parsed is None:
+                continue
+            kind, token, seq, payload = parsed
+            if kind != STATE or token != self.session:
+                continue
+            if not seq_newer(seq, self.last_seq):
+                self.dropped_old += 1
+                continue
+            if self.last_seq is not None:
+                self.gaps += ((seq - self.last_seq) % SEQ_MOD) - 1
+            self.last_seq = seq
+            try:
+                msg = json.loads(payload.decode())
+            except Exception:
+                continue
+            self.received += 1
+            if msg.get("type") == "state":
+                on_state(msg.get("state"))
+        self.active = False
+
+    def start(self, on_state):
+        t = threading.Thread(target=self.run, args=(on_state,), daemon=True)
+        t.start()
+        return t
+
+    def close(self):
+        self.running = False
+        self.active = False
+        try:
+            self.sock.close()
+        except Exception:
+            pass
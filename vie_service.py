@@ -0,0 +1,272 @@
+# vie_service.py
+"""Lightweight stand-in for the WildFly `vie-webservice` (stdlib HTTP + SQLite).
+
+Implements the same contract as `VieRestController` under
+`/vie-webservice/api/vies`, with the same JSON shape as the `Vie` entity
+({"lid", "libelle", "nombreVieInitiale"}) and the same error bodies:
+
+    GET    /vies          list
+    GET    /vies/count    {"count": n}
+    GET    /vies/{id}     one Vie, 404 if unknown
+    POST   /vies          create (libelle required), 201
+    PUT    /vies/{id}     update (libelle required), 404 if unknown
+    DELETE /vies/{id}     delete, 404 if unknown
+
+The table is seeded from `ejb-webservice-project/init.sql` when empty. Start
+it and point the game at it:
+
+    python3 vie_service.py --port 8080
+    VIE_API_URL=http://localhost:8080/vie-webservice/api/vies python3 server.py
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+BASE_PATH = '/vie-webservice/api/vies'
+INIT_SQL = os.path.join(os.path.dirname(__file__), 'ejb-webservice-project', 'init.sql')
+DEFAULT_DB = os.environ.get('VIE_DB_PATH', os.path.join(os.path.dirname(__file__), 'vie.db'))
+# used when init.sql is not available
+DEFAULT_VIES = [
+    ('Tour (R)', 5), ('Cavalier (N)', 4), ('Fou (B)', 5),
+    ('Reine (Q)', 8), ('Roi (K)', 10), ('Pion (P)', 2),
+]
+
+_ROW_RE = re.compile(r"\(\s*'((?:[^']|'')*)'\s*,\s*(NULL|-?\d+)\s*\)", re.IGNORECASE)
+
+
+def read_seed(path=INIT_SQL):
+    """(libelle, nombreVieInitiale) rows of the `INSERT INTO Vie` statement in init.sql."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            sql = f.read()
+    except OSError:
+        return list(DEFAULT_VIES)
+    m = re.search(r"INSERT\s+INTO\s+Vie\s*\([^)]*\)\s*VALUES(.*?);", sql, re.IGNORECASE | re.DOTALL)
+    if not m:
+        return list(DEFAULT_VIES)
+    rows = []
+    for libelle, value in _ROW_RE.findall(m.group(1)):
+        rows.append((libelle.replace("''", "'"), None if value.upper() == 'NULL' else int(value)))
+    return rows or list(DEFAULT_VIES)
+
+
+class VieStore:
+    """CRUD on the `Vie` table; one connection shared behind a lock."""
+
+    def __init__(self, db_path=DEFAULT_DB, seed=True):
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.db:
+            self.db.execute("CREATE TABLE IF NOT EXISTS Vie ("
+                            "lid INTEGER PRIMARY KEY AUTOINCREMENT, "
+                            "libelle VARCHAR(100) NOT NULL, "
+                            "nombreVieInitiale INT)")
+            if seed and self.db.execute("SELECT COUNT(*) FROM Vie").fetchone()[0] == 0:
+                self.db.executemany("INSERT INTO Vie (libelle, nombreVieInitiale) VALUES (?, ?)", read_seed())
+
+    @staticmethod
+    def _to_dict(row):
+        lid, libelle, nombre = row
+        vie = {"lid": lid, "libelle": libelle}
+        # JSON-B leaves out null properties
+        if nombre is not None:
+            vie["nombreVieInitiale"] = nombre
+        return vie
+
+    def find_all(self):
+        with self.lock:
+            rows = self.db.execute("SELECT lid, libelle, nombreVieInitiale FROM Vie ORDER BY lid").fetchall()
+        return [self._to_dict(r) for r in rows]
+
+    def find(self, lid):
+        with self.lock:
+            row = self.db.execute("SELECT lid, libelle, nombreVieInitiale FROM Vie WHERE lid = ?", (lid,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def create(self, libelle, nombre):
+        with self.lock, self.db:
+            cur = self.db.execute("INSERT INTO Vie (libelle, nombreVieInitiale) VALUES (?, ?)", (libelle, nombre))
+            lid = cur.lastrowid
+        return self._to_dict((lid, libelle, nombre))
+
+    def update(self, lid, libelle, nombre):
+        with self.lock, self.db:
+            cur = self.db.execute("UPDATE Vie SET libelle = ?, nombreVieInitiale = ? WHERE lid = ?", (libelle, nombre, lid))
+            if cur.rowcount == 0:
+                return None
+        return self._to_dict((lid, libelle, nombre))
+
+    def delete(self, lid):
+        with self.lock, self.db:
+            return self.db.execute("DELETE FROM Vie WHERE lid = ?", (lid,)).rowcount > 0
+
+    def count(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM Vie").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+class VieHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _send(self, code, body):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, code, message):
+        self._send(code, {"error": message})
+
+    def _route(self):
+        """Return (matched, id_segment) for the request path."""
+        path = urlsplit(self.path).path.rstrip('/')
+        if path == BASE_PATH:
+            return True, None
+        if path.startswith(BASE_PATH + '/'):
+            rest = path[len(BASE_PATH) + 1:]
+            if '/' not in rest:
+                return True, rest
+        return False, None
+
+    def _read_vie(self):
+        """Parse the request body; returns (libelle, nombre) or sends a 400 and returns None."""
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._error(400, "Corps JSON invalide")
+            return None
+        if not isinstance(body, dict):
+            self._error(400, "Corps JSON invalide")
+            return None
+        libelle = body.get('libelle')
+        if not isinstance(libelle, str) or not libelle.strip():
+            self._error(400, "Le libellé est obligatoire")
+            return None
+        nombre = body.get('nombreVieInitiale')
+        if nombre is not None and (isinstance(nombre, bool) or not isinstance(nombre, int)):
+            self._error(400, "nombreVieInitiale doit être un entier")
+            return None
+        return libelle, nombre
+
+    @staticmethod
+    def _parse_id(segment):
+        try:
+            return int(segment)
+        except (TypeError, ValueError):
+            return None
+
+    def do_GET(self):
+        matched, segment = self._route()
+        if not matched:
+            return self._error(404, "Ressource introuvable")
+        store = self.server.store
+        # same error bodies as the matching VieRestController methods
+        if segment is None:
+            error, read = "Erreur lors de la récupération des vies", store.find_all
+        elif segment == 'count':
+            error, read = "Erreur lors du comptage des vies", lambda: {"count": store.count()}
+        else:
+            lid = self._parse_id(segment)
+            error, read = "Erreur lors de la récupération de la vie", lambda: store.find(lid) if lid is not None else None
+        try:
+            body = read()
+        except sqlite3.Error as e:
+            return self._error(500, f"{error}: {e}")
+        if body is None:
+            return self._error(404, f"Vie non trouvée avec l'ID: {segment}")
+        self._send(200, body)
+
+    def do_POST(self):
+        matched, segment = self._route()
+        if not matched or segment is not None:
+            return self._error(404, "Ressource introuvable")
+        vie = self._read_vie()
+        if vie is None:
+            return
+        try:
+            self._send(201, self.server.store.create(*vie))
+        except sqlite3.Error as e:
+            self._error(500, f"Erreur lors de la création de la vie: {e}")
+
+    def do_PUT(self):
+        matched, segment = self._route()
+        lid = self._parse_id(segment)
+        if not matched or lid is None:
+            return self._error(404, "Ressource introuvable")
+        vie = self._read_vie()
+        if vie is None:
+            return
+        try:
+            updated = self.server.store.update(lid, *vie)
+        except sqlite3.Error as e:
+            return self._error(500, f"Erreur lors de la mise à jour de la vie: {e}")
+        if updated is None:
+            return self._error(404, f"Vie non trouvée avec l'ID: {lid}")
+        self._send(200, updated)
+
+    def do_DELETE(self):
+        matched, segment = self._route()
+        lid = self._parse_id(segment)
+        if not matched or lid is None:
+            return self._error(404, "Ressource introuvable")
+        try:
+            deleted = self.server.store.delete(lid)
+        except sqlite3.Error as e:
+            return self._error(500, f"Erreur lors de la suppression de la vie: {e}")
+        if not deleted:
+            return self._error(404, f"Vie non trouvée avec l'ID: {lid}")
+        self._send(200, {"message": "Vie supprimée avec succès lesy a"})
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(host='127.0.0.1', port=8080, db_path=DEFAULT_DB, verbose=False):
+    httpd = ThreadingHTTPServer((host, port), VieHandler)
+    httpd.daemon_threads = True
+    httpd.store = VieStore(db_path)
+    httpd.verbose = verbose
+    httpd.url = f"http://{host}:{httpd.server_address[1]}{BASE_PATH}"
+    return httpd
+
+
+def start_vie_service(host='127.0.0.1', port=8080, db_path=DEFAULT_DB, verbose=False):
+    """Start the service in a daemon thread; returns the server (its URL is in `.url`)."""
+    httpd = make_server(host, port, db_path, verbose)
+    threading.Thread(target=httpd.serve_forever, name="vie-service", daemon=True).start()
+    return httpd
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedded HP (Vie) REST service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--db', default=DEFAULT_DB, help="SQLite file (':memory:' for a throwaway store)")
+    parser.add_argument('--verbose', action='store_true', help="log every request")
+    args = parser.parse_args()
+    httpd = make_server(args.host, args.port, args.db, args.verbose)
+    print(f"[*] Vie service on {httpd.url} (db: {args.db})")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        httpd.store.close()
+
+
+if __name__ == "__main__":
+    main()